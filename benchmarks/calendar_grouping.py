@@ -0,0 +1,65 @@
+"""
+Скорость группировки слотов по годам, месяцам и дням (get_schedule).
+
+Сравниваются прежний способ (from_utc для каждого слота, вложенный словарь слотов
+и второй проход по нему) и CalendarIndex (один проход со смещением часового пояса по периодам).
+
+Запуск: TIMEZONE=Europe/Moscow python -m benchmarks.calendar_grouping
+"""
+
+import timeit
+from datetime import datetime, timedelta
+
+from src.calendar_index import CalendarIndex
+from src.config import TIMEZONE
+from src.stuff.common.utils import from_utc
+
+
+NUMBER = 5
+FIRST_SLOT = datetime(2030, 1, 1, 5)
+SLOTS_PER_DAY = 24
+DAYS = [30, 365, 730]
+
+
+def _group_by_from_utc(utc_datetimes: list[datetime]) -> dict[int, dict[int, dict[int, list[str]]]]:
+    slots_dict: dict[int, dict[int, dict[int, list[datetime]]]] = {}
+    for utc_datetime in utc_datetimes:
+        tz_datetime = from_utc(utc_datetime, TIMEZONE)
+        days = slots_dict.setdefault(tz_datetime.year, {}).setdefault(tz_datetime.month, {})
+        days.setdefault(tz_datetime.day, []).append(tz_datetime)
+    return {
+        year_: {
+            month_: {
+                day_: [tz_datetime.time().isoformat(timespec="minutes") for tz_datetime in tz_datetimes]
+                for day_, tz_datetimes in days.items()
+            }
+            for month_, days in months_days.items()
+        }
+        for year_, months_days in slots_dict.items()
+    }
+
+
+def main() -> None:
+    print(f"Часовой пояс: {TIMEZONE}, слотов в дне: {SLOTS_PER_DAY}")
+    for days in DAYS:
+        utc_datetimes = [
+            FIRST_SLOT + timedelta(days=day, minutes=30 * i)
+            for day in range(days)
+            for i in range(SLOTS_PER_DAY)
+        ]
+        index = CalendarIndex.from_utc_datetimes(utc_datetimes, TIMEZONE)
+        assert index.to_times_dict() == _group_by_from_utc(utc_datetimes)
+        from_utc_seconds = timeit.timeit(lambda: _group_by_from_utc(utc_datetimes), number=NUMBER)
+        index_seconds = timeit.timeit(
+            lambda: CalendarIndex.from_utc_datetimes(utc_datetimes, TIMEZONE).to_times_dict(),
+            number=NUMBER,
+        )
+        print(
+            f"{days:>4} дней ({len(utc_datetimes)} слотов): "
+            f"from_utc {from_utc_seconds / NUMBER * 1e3:.1f} мс, "
+            f"CalendarIndex {index_seconds / NUMBER * 1e3:.1f} мс"
+        )
+
+
+if __name__ == "__main__":
+    main()
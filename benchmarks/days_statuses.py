@@ -0,0 +1,52 @@
+"""
+Скорость обработки нажатия на день, неделю или день недели при выборе рабочих дней.
+
+Сравниваются прежняя реализация resolve_days_statuses на списке строк days_statuses
+(замороженная копия в benchmarks._legacy_days_statuses) и MonthSelection
+(битовые маски, как в day_clicked_logic).
+
+Запуск: TIMEZONE=Europe/Moscow python -m benchmarks.days_statuses
+"""
+
+import timeit
+from datetime import datetime
+
+from benchmarks import _legacy_days_statuses
+from src.stuff.schedule.utils import MonthSelection
+
+
+NUMBER = 2000
+TZ_NOW = datetime(2025, 3, 4)
+CLICKED_ELEMENTS = [
+    "not_selected_all",
+    "not_selected_week3",
+    "not_selected_wednesday",
+    "not_selected_2025-03-12",
+]
+
+
+def main() -> None:
+    days_statuses = _legacy_days_statuses.get_days_statuses(TZ_NOW, [], TZ_NOW.year, TZ_NOW.month)
+    state = MonthSelection.create(TZ_NOW, [], TZ_NOW.year, TZ_NOW.month).to_state()
+    for clicked_element in CLICKED_ELEMENTS:
+        clicked_index = days_statuses.index(clicked_element)
+        assert (
+            _legacy_days_statuses.resolve_days_statuses(list(days_statuses), clicked_element)
+            == MonthSelection.from_state(state).click(clicked_index).to_days_statuses()
+        )
+        strings_seconds = timeit.timeit(
+            lambda: _legacy_days_statuses.resolve_days_statuses(list(days_statuses), clicked_element),
+            number=NUMBER,
+        )
+        masks_seconds = timeit.timeit(
+            lambda: MonthSelection.from_state(state).click(clicked_index).to_days_statuses(),
+            number=NUMBER,
+        )
+        print(
+            f"{clicked_element:>24}: resolve_days_statuses (списки строк) {strings_seconds / NUMBER * 1e6:.1f} мкс, "
+            f"MonthSelection {masks_seconds / NUMBER * 1e6:.1f} мкс"
+        )
+
+
+if __name__ == "__main__":
+    main()
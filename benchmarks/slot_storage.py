@@ -0,0 +1,176 @@
+"""
+Размер таблиц и индексов слотов и скорость выборки диапазона слотов до и после
+перехода на хранение даты и времени в минутах от начала эпохи Unix.
+
+База данных сначала создается в прежнем виде (дата и время текстом, таблицы с rowid),
+затем переводится на новую схему миграцией upgrade_schema.
+
+Запуск: TIMEZONE=Europe/Moscow python -m benchmarks.slot_storage
+"""
+
+import os
+import tempfile
+import timeit
+from datetime import datetime, timedelta
+
+from sqlalchemy import Connection, create_engine, text
+
+from src.migrations import set_schema_version, upgrade_schema
+
+
+DAYS = 365
+SLOTS_PER_DAY = 24
+RANGE_DAYS = 30
+NUMBER = 50
+FIRST_DAY = datetime(2030, 1, 1, 5)
+
+LEGACY_TABLES = [
+    "CREATE TABLE service ("
+    "service_id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, price INTEGER NOT NULL, "
+    "duration INTEGER NOT NULL, deleted BOOLEAN DEFAULT (0) NOT NULL, "
+    "CONSTRAINT pk_service PRIMARY KEY (service_id))",
+    "CREATE TABLE slot ("
+    "datetime_ DATETIME NOT NULL, "
+    "CONSTRAINT pk_slot PRIMARY KEY (datetime_), "
+    "CONSTRAINT ck_slot_datetime__gt_current_timestamp CHECK (datetime_ > CURRENT_TIMESTAMP))",
+    "CREATE TABLE appointment ("
+    "appointment_id INTEGER NOT NULL, client_id INTEGER NOT NULL, service_id INTEGER NOT NULL, "
+    "starts_at DATETIME NOT NULL, ends_at DATETIME NOT NULL, "
+    "CONSTRAINT pk_appointment PRIMARY KEY (appointment_id), "
+    "CONSTRAINT ck_appointment_starts_at_gt_current_timestamp CHECK (starts_at > CURRENT_TIMESTAMP), "
+    "CONSTRAINT fk_appointment_service_id_service FOREIGN KEY(service_id) "
+    "REFERENCES service (service_id) ON DELETE RESTRICT)",
+    "CREATE TABLE reservation ("
+    "datetime_ DATETIME NOT NULL, appointment_id INTEGER NOT NULL, "
+    "CONSTRAINT pk_reservation PRIMARY KEY (datetime_), "
+    "CONSTRAINT ck_reservation_datetime__gt_current_timestamp CHECK (datetime_ > CURRENT_TIMESTAMP), "
+    "CONSTRAINT fk_reservation_datetime__slot FOREIGN KEY(datetime_) "
+    "REFERENCES slot (datetime_) ON DELETE RESTRICT, "
+    "CONSTRAINT fk_reservation_appointment_id_appointment FOREIGN KEY(appointment_id) "
+    "REFERENCES appointment (appointment_id) ON DELETE CASCADE)",
+    "CREATE TABLE slot_hold ("
+    "datetime_ DATETIME NOT NULL, client_id INTEGER NOT NULL, expires_at DATETIME NOT NULL, "
+    "CONSTRAINT pk_slot_hold PRIMARY KEY (datetime_), "
+    "CONSTRAINT fk_slot_hold_datetime__slot FOREIGN KEY(datetime_) "
+    "REFERENCES slot (datetime_) ON DELETE CASCADE)",
+    "CREATE INDEX ix_appointment_client_id_starts_at ON appointment (client_id, starts_at)",
+    "CREATE INDEX ix_appointment_starts_at ON appointment (starts_at)",
+    "CREATE INDEX ix_reservation_appointment_id ON reservation (appointment_id)",
+    "CREATE UNIQUE INDEX uq_service_name_not_deleted ON service (name) WHERE NOT deleted",
+    "CREATE INDEX ix_slot_hold_client_id ON slot_hold (client_id)",
+    "CREATE INDEX ix_slot_hold_expires_at ON slot_hold (expires_at)",
+]
+
+# Свободные слоты диапазона, как в get_available_start_times
+RANGE_QUERY = text(
+    "SELECT slot.datetime_ FROM slot "
+    "WHERE slot.datetime_ >= :start AND slot.datetime_ < :end "
+    "AND NOT EXISTS (SELECT 1 FROM reservation WHERE reservation.datetime_ = slot.datetime_) "
+    "ORDER BY slot.datetime_"
+)
+
+
+def _to_legacy(datetime_: datetime) -> str:
+    return datetime_.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def _to_epoch_minute(datetime_: datetime) -> int:
+    return (datetime_ - datetime(1970, 1, 1)) // timedelta(minutes=1)
+
+
+def _prepare_legacy_database(conn: Connection) -> None:
+    for statement in LEGACY_TABLES:
+        conn.execute(text(statement))
+    set_schema_version(conn, 2)
+    slots = [
+        FIRST_DAY + timedelta(days=day, minutes=30 * i)
+        for day in range(DAYS)
+        for i in range(SLOTS_PER_DAY)
+    ]
+    conn.execute(text("INSERT INTO service (name, price, duration) VALUES ('Стрижка', 1000, 60)"))
+    conn.execute(
+        text("INSERT INTO slot (datetime_) VALUES (:datetime_)"),
+        [{"datetime_": _to_legacy(slot)} for slot in slots],
+    )
+    # Каждый прием занимает два слота, заняты слоты первой половины каждого дня
+    appointments_starts = [
+        slot for slot in slots[::2]
+        if (slot - FIRST_DAY) % timedelta(days=1) < timedelta(minutes=30 * SLOTS_PER_DAY // 2)
+    ]
+    conn.execute(
+        text(
+            "INSERT INTO appointment (appointment_id, client_id, service_id, starts_at, ends_at) "
+            "VALUES (:appointment_id, :client_id, 1, :starts_at, :ends_at)"
+        ),
+        [
+            {
+                "appointment_id": appointment_id,
+                "client_id": appointment_id % 100,
+                "starts_at": _to_legacy(starts_at),
+                "ends_at": _to_legacy(starts_at + timedelta(hours=1)),
+            }
+            for appointment_id, starts_at in enumerate(appointments_starts, start=1)
+        ],
+    )
+    conn.execute(
+        text("INSERT INTO reservation (datetime_, appointment_id) VALUES (:datetime_, :appointment_id)"),
+        [
+            {"datetime_": _to_legacy(starts_at + timedelta(minutes=30 * i)), "appointment_id": appointment_id}
+            for appointment_id, starts_at in enumerate(appointments_starts, start=1)
+            for i in range(2)
+        ],
+    )
+
+
+def _print_sizes(conn: Connection) -> None:
+    sizes = conn.execute(
+        text(
+            "SELECT name, SUM(pgsize) FROM dbstat "
+            "WHERE name IN ('slot', 'reservation', 'appointment') "
+            "OR name IN ('sqlite_autoindex_slot_1', 'sqlite_autoindex_reservation_1') "
+            "OR name LIKE 'ix_appointment%' OR name LIKE 'ix_reservation%' "
+            "GROUP BY name ORDER BY name"
+        )
+    ).all()
+    for name, size in sizes:
+        print(f"    {name:>40}: {size / 1024:.0f} КиБ")
+    print(f"    {'всего':>40}: {sum(size for _, size in sizes) / 1024:.0f} КиБ")
+
+
+def _time_range_scans(conn: Connection, convert) -> float:
+    ranges = [
+        (convert(FIRST_DAY + timedelta(days=day)), convert(FIRST_DAY + timedelta(days=day + RANGE_DAYS)))
+        for day in range(0, DAYS - RANGE_DAYS, 7)
+    ]
+
+    def scan():
+        for start, end in ranges:
+            conn.execute(RANGE_QUERY, {"start": start, "end": end}).all()
+
+    return timeit.timeit(scan, number=NUMBER) / NUMBER / len(ranges)
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'db.sqlite3')}")
+        with engine.begin() as conn:
+            _prepare_legacy_database(conn)
+        with engine.connect() as conn:
+            conn.execute(text("VACUUM"))
+            print("Дата и время текстом, таблицы с rowid:")
+            _print_sizes(conn)
+            seconds = _time_range_scans(conn, _to_legacy)
+            print(f"    выборка свободных слотов за {RANGE_DAYS} дней: {seconds * 1e6:.0f} мкс")
+        with engine.begin() as conn:
+            upgrade_schema(conn)
+        with engine.connect() as conn:
+            conn.execute(text("VACUUM"))
+            print("Минуты от начала эпохи Unix, slot и reservation WITHOUT ROWID:")
+            _print_sizes(conn)
+            seconds = _time_range_scans(conn, _to_epoch_minute)
+            print(f"    выборка свободных слотов за {RANGE_DAYS} дней: {seconds * 1e6:.0f} мкс")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Скорость получения слотов UTC для выбранных местных дат и времен (get_utc_slots).
+
+Сравниваются прежний способ (разбор дат и времен и pytz localize для каждой пары)
+и get_utc_epoch_minutes (смещение часового пояса вычисляется один раз на дату).
+
+Запуск: TIMEZONE=Europe/Moscow python -m benchmarks.slots_generation
+"""
+
+import timeit
+from datetime import date, datetime, time, timedelta
+
+from src.config import TIMEZONE
+from src.stuff.common.utils import to_utc
+from src.stuff.schedule.utils import get_utc_slots
+
+
+NUMBER = 5
+FIRST_DATE = date(2030, 1, 1)
+DAYS = [30, 365, 730]
+ISO_TIMES = [f"{hour:02}:{minute:02}" for hour in range(8, 20) for minute in (0, 30)]
+
+
+def _get_slots_by_localize(iso_tz_dates: list[str], iso_tz_times: list[str]) -> list[datetime]:
+    slots = []
+    for iso_tz_date in iso_tz_dates:
+        for iso_tz_time in iso_tz_times:
+            tz_date = date.fromisoformat(iso_tz_date)
+            tz_time = time.fromisoformat(iso_tz_time)
+            slot_tz_dt = TIMEZONE.localize(datetime.combine(tz_date, tz_time))
+            slots.append(to_utc(slot_tz_dt).replace(tzinfo=None))
+    return slots
+
+
+def main() -> None:
+    print(f"Часовой пояс: {TIMEZONE}, времен в дне: {len(ISO_TIMES)}")
+    for days in DAYS:
+        iso_dates = [(FIRST_DATE + timedelta(days=day)).isoformat() for day in range(days)]
+        assert get_utc_slots(iso_dates, ISO_TIMES) == _get_slots_by_localize(iso_dates, ISO_TIMES)
+        localize_seconds = timeit.timeit(lambda: _get_slots_by_localize(iso_dates, ISO_TIMES), number=NUMBER)
+        offsets_seconds = timeit.timeit(lambda: get_utc_slots(iso_dates, ISO_TIMES), number=NUMBER)
+        print(
+            f"{days:>4} дней ({days * len(ISO_TIMES)} слотов): "
+            f"localize {localize_seconds / NUMBER * 1e3:.1f} мс, "
+            f"get_utc_epoch_minutes {offsets_seconds / NUMBER * 1e3:.1f} мс"
+        )
+
+
+if __name__ == "__main__":
+    main()
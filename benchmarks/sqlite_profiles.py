@@ -0,0 +1,160 @@
+"""
+Сравнение пропускной способности записи на прием при разных профилях SQLite.
+
+Несколько процессов одновременно записывают клиентов на прием (book_appointment в транзакции
+BEGIN IMMEDIATE, как писатель бота), каждый через свое подключение к одной базе данных,
+параллельно другие процессы смотрят доступные для записи времена. Так подключения
+действительно конкурируют за блокировку базы данных.
+
+Запуск: TIMEZONE=Europe/Moscow python -m benchmarks.sqlite_profiles
+"""
+
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.config import SQLITE_PROFILES
+from src.database import book_appointment, get_available_start_times
+from src.engine import create_read_engine, create_write_engine
+from src.migrations import upgrade_schema
+from src.models import Appointment, Service, Slot
+from src.stuff.appointments.utils import get_datetimes_needed_for_appointment
+
+
+WRITER_PROCESSES = 4
+READER_PROCESSES = 2
+CLIENTS_PER_WRITER = 100
+SERVICE_DURATION = 60
+DAYS = 30
+# Процессы начинают работу одновременно, через это время после запуска
+START_DELAY = 1.0
+
+
+async def _prepare_database(db_url: str, profile_name: str) -> tuple[int, list[datetime]]:
+    engine = create_write_engine(db_url, SQLITE_PROFILES[profile_name])
+    async with engine.begin() as conn:
+        await conn.run_sync(upgrade_schema)
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+    first_day = datetime.now(UTC).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0)
+    slots = [
+        first_day + timedelta(days=day + 1, hours=8, minutes=30 * i)
+        for day in range(DAYS)
+        for i in range(24)
+    ]
+    async with async_session() as session:
+        service = Service(name="Стрижка", price=1000, duration=SERVICE_DURATION)
+        session.add(service)
+        session.add_all([Slot(datetime_=slot) for slot in slots])
+        await session.commit()
+    await engine.dispose()
+    return service.service_id, slots[::SERVICE_DURATION // 30]
+
+
+async def _book(db_url: str, profile_name: str, service_id: int, starts: list[datetime]) -> tuple[int, int]:
+    """Записи клиентов процесса: количество записей и ошибок database is locked."""
+    engine = create_write_engine(db_url, SQLITE_PROFILES[profile_name])
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+    booked = locked = 0
+    for client_id, starts_at in enumerate(starts, start=1):
+        appointment = Appointment(
+            client_id=client_id,
+            service_id=service_id,
+            starts_at=starts_at,
+            ends_at=starts_at + timedelta(minutes=SERVICE_DURATION),
+        )
+        datetimes_to_reserve = get_datetimes_needed_for_appointment(starts_at, SERVICE_DURATION)
+        try:
+            async with async_session() as session:
+                result = await book_appointment(session, appointment, datetimes_to_reserve, datetime.now(UTC))
+                await session.commit()
+        except OperationalError:
+            locked += 1
+        else:
+            booked += result.appointment is not None
+    await engine.dispose()
+    return booked, locked
+
+
+async def _read(db_url: str, profile_name: str, stop) -> tuple[int, int]:
+    """Чтения доступных времен до окончания записи: количество чтений и ошибок database is locked."""
+    engine = create_read_engine(db_url, SQLITE_PROFILES[profile_name], pool_size=1)
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+    reads = locked = 0
+    while not stop.is_set():
+        try:
+            async with async_session() as session:
+                await get_available_start_times(session, datetime.now(UTC), SERVICE_DURATION)
+        except OperationalError:
+            locked += 1
+        else:
+            reads += 1
+    await engine.dispose()
+    return reads, locked
+
+
+def _run_writer(db_url: str, profile_name: str, service_id: int, starts: list[datetime], start_at: float):
+    time.sleep(max(start_at - time.time(), 0))
+    started = time.perf_counter()
+    booked, locked = asyncio.run(_book(db_url, profile_name, service_id, starts))
+    return booked, locked, time.perf_counter() - started
+
+
+def _run_reader(db_url: str, profile_name: str, stop, start_at: float) -> tuple[int, int]:
+    time.sleep(max(start_at - time.time(), 0))
+    return asyncio.run(_read(db_url, profile_name, stop))
+
+
+def run_profile(profile_name: str, context) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_url = f"sqlite+aiosqlite:///{os.path.join(tmp_dir, 'benchmark.db')}"
+        service_id, starts = asyncio.run(_prepare_database(db_url, profile_name))
+        with context.Manager() as manager, context.Pool(WRITER_PROCESSES + READER_PROCESSES) as pool:
+            stop = manager.Event()
+            start_at = time.time() + START_DELAY
+            readers = [
+                pool.apply_async(_run_reader, (db_url, profile_name, stop, start_at))
+                for _ in range(READER_PROCESSES)
+            ]
+            writers = [
+                pool.apply_async(
+                    _run_writer,
+                    (db_url, profile_name, service_id, starts[i::WRITER_PROCESSES][:CLIENTS_PER_WRITER], start_at),
+                )
+                for i in range(WRITER_PROCESSES)
+            ]
+            writers_results = [writer.get() for writer in writers]
+            stop.set()
+            readers_results = [reader.get() for reader in readers]
+    seconds = max(elapsed for _, _, elapsed in writers_results)
+    booked = sum(booked for booked, _, _ in writers_results)
+    return {
+        "booked": booked,
+        "locked": sum(locked for _, locked, _ in writers_results),
+        "reads_locked": sum(locked for _, locked in readers_results),
+        "seconds": seconds,
+        "bookings_per_second": booked / seconds,
+        "reads_per_second": sum(reads for reads, _ in readers_results) / seconds,
+    }
+
+
+def main() -> None:
+    context = multiprocessing.get_context("spawn")
+    print(f"Процессов записи: {WRITER_PROCESSES}, процессов чтения: {READER_PROCESSES}")
+    for name in SQLITE_PROFILES:
+        result = run_profile(name, context)
+        print(
+            f"{name:>8}: {result['booked']:.0f} записей за {result['seconds']:.2f} с "
+            f"({result['bookings_per_second']:.1f} записей/с, "
+            f"{result['reads_per_second']:.1f} чтений/с, "
+            f"database is locked: {result['locked']:.0f} при записи, {result['reads_locked']:.0f} при чтении)"
+        )
+
+
+if __name__ == "__main__":
+    main()
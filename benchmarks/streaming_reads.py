@@ -0,0 +1,124 @@
+"""
+Память и время чтения графика работы и доступных для записи времен из базы данных.
+
+Сравниваются чтение объектов ORM (будущих слотов Slot и get_available_start_times с группировкой
+по дням) и потоковое чтение минут UTC частями (stream_slot_minutes и stream_available_start_minutes
+с построением CalendarIndex по потоку). Память - пик tracemalloc во время чтения и группировки.
+
+Запуск: TIMEZONE=Europe/Moscow python -m benchmarks.streaming_reads
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.calendar_index import CalendarIndex
+from src.config import SQLITE_PROFILES, TIMEZONE
+from src.database import (
+    get_available_start_times,
+    stream_available_start_minutes,
+    stream_slot_minutes,
+)
+from src.engine import create_write_engine
+from src.migrations import upgrade_schema
+from src.models import Slot
+from src.stuff.appointments.utils import select_start_times_within_day
+from src.stuff.schedule.utils import get_schedule
+
+
+DAYS = [90, 365, 730]
+SLOTS_PER_DAY = 24
+DURATION = 60
+FIRST_SLOT = datetime(2030, 1, 1, 5)
+UTC_NOW = datetime(2029, 12, 31)
+
+
+async def _get_future_slots(session: AsyncSession, current_utc_datetime: datetime) -> list[Slot]:
+    """Прежнее чтение будущих слотов объектами ORM."""
+    result = await session.scalars(
+        select(Slot).where(Slot.datetime_ > current_utc_datetime).order_by(Slot.datetime_)
+    )
+    return list(result)
+
+
+async def _read_schedule_orm(session: AsyncSession) -> int:
+    return len(get_schedule(await _get_future_slots(session, UTC_NOW)))
+
+
+async def _read_schedule_stream(session: AsyncSession) -> int:
+    index = await CalendarIndex.from_stream(stream_slot_minutes(session, UTC_NOW), TIMEZONE)
+    return len(index.to_times_dict())
+
+
+async def _read_start_times_orm(session: AsyncSession) -> int:
+    start_times = await get_available_start_times(session, UTC_NOW, DURATION)
+    index = CalendarIndex.from_utc_datetimes(start_times, TIMEZONE)
+    return len(index.to_times_dict(select_start_times_within_day(DURATION)))
+
+
+async def _read_start_times_stream(session: AsyncSession) -> int:
+    index = await CalendarIndex.from_stream(stream_available_start_minutes(session, UTC_NOW, DURATION), TIMEZONE)
+    return len(index.to_times_dict(select_start_times_within_day(DURATION)))
+
+
+async def _measure(
+    async_session: async_sessionmaker[AsyncSession],
+    read: Callable[[AsyncSession], Awaitable[int]],
+) -> tuple[float, int]:
+    """Время (с) и пик памяти (байт) чтения, время измеряется отдельно от памяти."""
+    async with async_session() as session:
+        start = time.perf_counter()
+        await read(session)
+        seconds = time.perf_counter() - start
+    async with async_session() as session:
+        tracemalloc.start()
+        await read(session)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return seconds, peak
+
+
+async def _run(directory: str, days: int) -> None:
+    engine = create_write_engine(
+        f"sqlite+aiosqlite:///{os.path.join(directory, f'{days}.sqlite3')}",
+        SQLITE_PROFILES["tuned"],
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(upgrade_schema)
+        await conn.execute(
+            insert(Slot),
+            [
+                {"datetime_": FIRST_SLOT + timedelta(days=day, minutes=30 * i)}
+                for day in range(days)
+                for i in range(SLOTS_PER_DAY)
+            ],
+        )
+    async_session = async_sessionmaker(engine, expire_on_commit=False)
+    print(f"{days:>4} дней ({days * SLOTS_PER_DAY} слотов):")
+    for name, read in [
+        ("Slot ORM + get_schedule", _read_schedule_orm),
+        ("stream_slot_minutes + CalendarIndex", _read_schedule_stream),
+        ("get_available_start_times", _read_start_times_orm),
+        ("stream_available_start_minutes", _read_start_times_stream),
+    ]:
+        seconds, peak = await _measure(async_session, read)
+        print(f"    {name:>36}: {seconds * 1e3:7.1f} мс, пик памяти {peak / 1024:7.0f} КиБ")
+    await engine.dispose()
+
+
+def main() -> None:
+    print(f"Часовой пояс: {TIMEZONE}, слотов в дне: {SLOTS_PER_DAY}, длительность услуги: {DURATION} минут")
+    with tempfile.TemporaryDirectory() as directory:
+        for days in DAYS:
+            asyncio.run(_run(directory, days))
+
+
+if __name__ == "__main__":
+    main()
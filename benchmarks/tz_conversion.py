@@ -0,0 +1,66 @@
+"""
+Скорость перевода моментов UTC в местное время часового пояса TIMEZONE.
+
+Сравниваются from_utc с pytz.timezone("UTC") при каждом вызове (как было раньше), текущий
+from_utc для каждого момента и таблица смещений src.tz (наивные datetime и минуты от начала эпохи Unix).
+
+Запуск: TIMEZONE=Europe/Moscow python -m benchmarks.tz_conversion
+"""
+
+import timeit
+from datetime import datetime, timedelta, tzinfo
+
+import pytz
+
+from src.config import TIMEZONE
+from src.stuff.common.utils import from_utc
+from src.tz import get_transition_table, to_epoch_minute
+
+
+NUMBER = 3
+FIRST_SLOT = datetime(2030, 1, 1, 5)
+COUNTS = [10_000, 100_000]
+
+
+def _from_utc_by_pytz(utc_dt: datetime, dest_tz: tzinfo) -> datetime:
+    if not utc_dt.tzinfo:
+        utc_dt = pytz.timezone("UTC").localize(utc_dt)
+    return utc_dt.astimezone(dest_tz)
+
+
+def _print_timing(name: str, seconds: float, count: int) -> None:
+    print(f"    {name:>32}: {seconds / NUMBER * 1e3:8.1f} мс ({seconds / NUMBER / count * 1e9:.0f} нс на момент)")
+
+
+def main() -> None:
+    print(f"Часовой пояс: {TIMEZONE}")
+    for count in COUNTS:
+        # Слоты идут по 30 минут, 100 000 слотов - больше пяти лет
+        utc_datetimes = [FIRST_SLOT + timedelta(minutes=30 * i) for i in range(count)]
+        utc_minutes = [to_epoch_minute(utc_datetime) for utc_datetime in utc_datetimes]
+        table = get_transition_table(utc_datetimes[0], utc_datetimes[-1])
+        print(f"{count} моментов:")
+        _print_timing(
+            "from_utc (pytz UTC)",
+            timeit.timeit(lambda: [_from_utc_by_pytz(dt, TIMEZONE) for dt in utc_datetimes], number=NUMBER),
+            count,
+        )
+        _print_timing(
+            "from_utc",
+            timeit.timeit(lambda: [from_utc(dt, TIMEZONE) for dt in utc_datetimes], number=NUMBER),
+            count,
+        )
+        _print_timing(
+            "TransitionTable.from_utc",
+            timeit.timeit(lambda: table.from_utc(utc_datetimes), number=NUMBER),
+            count,
+        )
+        _print_timing(
+            "TransitionTable.to_local_minutes",
+            timeit.timeit(lambda: table.to_local_minutes(utc_minutes), number=NUMBER),
+            count,
+        )
+
+
+if __name__ == "__main__":
+    main()
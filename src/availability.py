@@ -0,0 +1,204 @@
+"""Кэш доступных для записи времен."""
+
+import asyncio
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.calendar_index import CalendarIndex
+from src.config import TIMEZONE
+from src.constraints import DURATION_MULTIPLIER
+from src.database import (
+    AVAILABILITY_CHANGED,
+    HOLDS_CHANGED,
+    HeldSlot,
+    get_held_slots,
+    stream_available_start_minutes,
+)
+from src.intervals import to_naive_utc
+from src.stuff.appointments.utils import get_conflicting_times, select_start_times_within_day
+from src.stuff.common.utils import get_years_with_months_days_by_dates
+
+
+@dataclass
+class _CacheEntry:
+    index: CalendarIndex
+    expires_at: datetime
+
+
+@dataclass
+class ClientAvailability:
+    """
+    Доступные клиенту времена начала приема длительностью duration.
+
+    index - общий для всех клиентов индекс времен начала приема без учета блокировок слотов,
+    excluded - недоступные клиенту местные времена по датам (заблокированные другими клиентами).
+    Времена форматируются только для запрошенного дня.
+    """
+
+    index: CalendarIndex
+    duration: int
+    excluded: dict[date, set[str]]
+
+    def get_days(self) -> dict[int, dict[int, list[int]]]:
+        """Дни (по годам и месяцам), в которые есть хотя бы одно доступное время."""
+        return get_years_with_months_days_by_dates(
+            [tz_date for tz_date in self.index if tz_date not in self.excluded or self.get_times(tz_date)]
+        )
+
+    def get_times(self, tz_date: date) -> list[str]:
+        """Доступные местные времена даты."""
+        times = self.index.get_times(tz_date)
+        excluded = self.excluded.get(tz_date)
+        if not excluded:
+            return times
+        return [time_ for time_ in times if time_ not in excluded]
+
+    def without(self, conflicts: list[datetime]) -> "ClientAvailability":
+        """Доступные времена без тех, что используют конфликтующие слоты (UTC)."""
+        excluded = {tz_date: set(times) for tz_date, times in self.excluded.items()}
+        for tz_date, times in get_conflicting_times(conflicts, self.duration).items():
+            excluded.setdefault(tz_date, set()).update(times)
+        return ClientAvailability(self.index, self.duration, excluded)
+
+
+def get_next_slot_boundary(utc_now: datetime) -> datetime:
+    """Ближайшая после utc_now граница слотов (начало следующего 30 минутного интервала)."""
+    slot_start = utc_now.replace(
+        minute=utc_now.minute - utc_now.minute % DURATION_MULTIPLIER,
+        second=0,
+        microsecond=0,
+    )
+    return slot_start + timedelta(minutes=DURATION_MULTIPLIER)
+
+
+class AvailabilityCache:
+    """
+    Кэш доступных для записи времен начала приема (CalendarIndex) по длительности услуги.
+
+    Запись сбрасывается при фиксации транзакции, изменившей слоты или брони
+    (см. mark_availability_changed), и при наступлении следующей границы слотов,
+    так как начавшиеся слоты перестают быть доступными.
+    Блокировки слотов в индексы не попадают: они меняются на каждом экране подтверждения записи,
+    поэтому при каждом запросе из кэшированных времен удаляются времена, использующие
+    слоты, заблокированные другими клиентами (собственные блокировки клиента не учитываются).
+    Действующие блокировки всех клиентов хранятся в памяти отдельно от индексов и перечитываются
+    только после фиксации транзакции, изменившей блокировки (см. mark_holds_changed),
+    истекшие блокировки отбрасываются при запросе.
+    Индексы общие для всех клиентов и не должны изменяться.
+
+    Одновременные промахи по одному ключу (длительность, версия данных, граница слотов)
+    объединяются (single-flight): запрос к базе данных выполняет только первый из них,
+    остальные ожидают его результат.
+    """
+
+    def __init__(self, async_session: async_sessionmaker[AsyncSession]) -> None:
+        self._async_session = async_session
+        self._entries: dict[int, _CacheEntry] = {}
+        self._in_flight: dict[tuple[int, int, datetime], asyncio.Task[CalendarIndex]] = {}
+        self._held_slots: list[HeldSlot] | None = None
+        self._holds_in_flight: dict[int, asyncio.Task[list[HeldSlot]]] = {}
+        self.version = 0
+        self.holds_version = 0
+        self.hits = 0
+        self.misses = 0
+        self.merged = 0
+        self.invalidations = 0
+        self.holds_loads = 0
+
+    def on_commit(self, session_info: dict) -> None:
+        """Слушатель фиксации транзакций писателя (см. DatabaseWriter.add_commit_listener)."""
+        if session_info.get(AVAILABILITY_CHANGED):
+            self.invalidate()
+        if session_info.get(HOLDS_CHANGED):
+            self.invalidate_holds()
+
+    def invalidate(self) -> None:
+        self.version += 1
+        self.invalidations += 1
+        self._entries.clear()
+
+    def invalidate_holds(self) -> None:
+        self.holds_version += 1
+        self._held_slots = None
+
+    def get_stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "merged": self.merged,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "holds_loads": self.holds_loads,
+        }
+
+    async def get_availability(self, duration: int, utc_now: datetime, client_id: int) -> ClientAvailability:
+        """Доступные клиенту client_id времена для записи на прием длительностью duration."""
+        index = await self._get_index(duration, utc_now)
+        excluded = {}
+        if index:
+            held_slots = await self._get_held_slots(utc_now)
+            naive_utc_now = to_naive_utc(utc_now)
+            excluded = get_conflicting_times(
+                [
+                    held_slot.datetime_
+                    for held_slot in held_slots
+                    if held_slot.client_id != client_id and held_slot.expires_at > naive_utc_now
+                ],
+                duration,
+            )
+        return ClientAvailability(index, duration, excluded)
+
+    async def _get_held_slots(self, utc_now: datetime) -> list[HeldSlot]:
+        if self._held_slots is not None:
+            return self._held_slots
+        # Одновременные запросы блокировок одной версии объединяются, как и промахи по индексам
+        key = self.holds_version
+        task = self._holds_in_flight.get(key)
+        if task is None:
+            self.holds_loads += 1
+            task = asyncio.create_task(self._load_held_slots(utc_now))
+            self._holds_in_flight[key] = task
+            task.add_done_callback(lambda _: self._holds_in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _load_held_slots(self, utc_now: datetime) -> list[HeldSlot]:
+        holds_version = self.holds_version
+        async with self._async_session() as session:
+            held_slots = await get_held_slots(session, utc_now)
+        # Если за время чтения блокировки изменились, результат уже может быть устаревшим
+        if holds_version == self.holds_version:
+            self._held_slots = held_slots
+        return held_slots
+
+    async def _get_index(self, duration: int, utc_now: datetime) -> CalendarIndex:
+        entry = self._entries.get(duration)
+        if entry is not None and utc_now < entry.expires_at:
+            self.hits += 1
+            return entry.index
+        self.misses += 1
+        key = (duration, self.version, get_next_slot_boundary(utc_now))
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.merged += 1
+        else:
+            task = asyncio.create_task(self._compute(duration, utc_now))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Отмена ожидающего клиента не должна отменять общее для всех вычисление
+        return await asyncio.shield(task)
+
+    async def _compute(self, duration: int, utc_now: datetime) -> CalendarIndex:
+        version = self.version
+        # Времена начала читаются из базы данных частями и сразу группируются по дням
+        async with self._async_session() as session:
+            index = await CalendarIndex.from_stream(
+                stream_available_start_minutes(session, utc_now, duration, with_holds=False),
+                TIMEZONE,
+            )
+        index = index.select(select_start_times_within_day(duration))
+        # Если за время вычисления данные изменились, результат уже может быть устаревшим
+        if version == self.version:
+            self._entries[duration] = _CacheEntry(index, get_next_slot_boundary(utc_now))
+        return index
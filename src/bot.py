@@ -7,45 +7,81 @@ import os
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from sqlalchemy import event
-from sqlalchemy.engine import Engine
-from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
 
 from src.stuff.appointments.router import router as appointments_router
 from src.stuff.common.router import router as common_router
 from src.stuff.main_menu.router import router as main_menu_router
 from src.stuff.schedule.router import router as schedule_router
 from src.stuff.services.router import router as services_router
-from src.config import db_url
-from src.models import Base
+from src.availability import AvailabilityCache
+from src.config import (
+    READ_POOL_SIZE,
+    SLOT_HOLDS_SWEEP_INTERVAL,
+    SQLITE_PROFILE,
+    WRITE_BATCH_MAX_SIZE,
+    db_url,
+)
+from src.engine import create_read_engine, create_write_engine, report_sqlite_settings
+from src.holds import SlotHoldsSweeper
+from src.migrations import check_schema, upgrade_schema
+from src.writer import DatabaseWriter
 
 logging.basicConfig(level=logging.INFO)
 
 BOT_TOKEN = os.environ.get("BOT_TOKEN", "")
 
 
-# https://docs.sqlalchemy.org/en/20/dialects/sqlite.html#sqlite-foreign-keys
-@event.listens_for(Engine, "connect")
-def set_sqlite_pragma(dbapi_connection, _):
-    cursor = dbapi_connection.cursor()
-    cursor.execute("PRAGMA foreign_keys=ON")
-    cursor.close()
-
-
-async def on_bot_start(engine: AsyncEngine) -> None:
+async def on_bot_start(
+    engine: AsyncEngine,
+    db_writer: DatabaseWriter,
+    holds_sweeper: SlotHoldsSweeper,
+) -> None:
     """Действия при запуске бота."""
     async with engine.connect() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
         await conn.commit()
+        await conn.run_sync(check_schema)
+        await conn.run_sync(report_sqlite_settings, SQLITE_PROFILE)
+    db_writer.start()
+    holds_sweeper.start()
+
+
+async def on_bot_stop(
+    db_writer: DatabaseWriter,
+    holds_sweeper: SlotHoldsSweeper,
+    availability_cache: AvailabilityCache,
+) -> None:
+    """Действия при остановке бота."""
+    await holds_sweeper.stop()
+    await db_writer.stop()
+    logging.info("Кэш доступных для записи времен: %s", availability_cache.get_stats())
 
 
 async def main() -> None:
     """Запуск бота."""
-    engine = create_async_engine(db_url)
-    async_session = async_sessionmaker(engine, expire_on_commit=False)
+    # Запись идет через единственное подключение, чтение - через пул подключений только для чтения,
+    # поэтому экраны просмотра (календарь, "Ваши записи") не ждут сохранения графика работы
+    engine = create_write_engine(db_url, SQLITE_PROFILE)
+    read_engine = create_read_engine(db_url, SQLITE_PROFILE, READ_POOL_SIZE)
+    async_session = async_sessionmaker(read_engine, expire_on_commit=False)
+    db_writer = DatabaseWriter(
+        async_sessionmaker(engine, expire_on_commit=False),
+        max_batch_size=WRITE_BATCH_MAX_SIZE,
+    )
     bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-    dp = Dispatcher(engine=engine, async_session=async_session)
+    availability_cache = AvailabilityCache(async_session)
+    db_writer.add_commit_listener(availability_cache.on_commit)
+    holds_sweeper = SlotHoldsSweeper(db_writer, SLOT_HOLDS_SWEEP_INTERVAL)
+    dp = Dispatcher(
+        engine=engine,
+        async_session=async_session,
+        db_writer=db_writer,
+        availability_cache=availability_cache,
+        holds_sweeper=holds_sweeper,
+    )
     dp.startup.register(on_bot_start)
+    dp.shutdown.register(on_bot_stop)
     dp.include_routers(
         appointments_router,
         main_menu_router,
@@ -58,6 +94,7 @@ async def main() -> None:
         await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
     finally:
         await bot.session.close()
+        await read_engine.dispose()
         await engine.dispose()
 
 
@@ -0,0 +1,178 @@
+"""Календарный индекс: слоты, сгруппированные по дням часового пояса."""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import AsyncIterable, Callable, Iterable, Iterator, Sequence
+from datetime import date, datetime, timedelta, tzinfo
+
+from src.models import EPOCH, MINUTES_IN_DAY
+from src.tz import TransitionTable, get_transition_table, to_epoch_minute
+
+
+TimesDict = dict[int, dict[int, dict[int, list[str]]]]
+# Выбор слотов дня: получает минуты UTC слотов дня и конец дня (минута UTC),
+# возвращает позиции выбранных слотов в порядке возрастания
+SlotsSelector = Callable[[Sequence[int], int], Iterable[int]]
+
+_EPOCH_DATE = EPOCH.date()
+
+
+def _get_local_day_end(
+    period_starts: list[int],
+    period_offsets: list[int],
+    period: int,
+    local_midnight: int,
+) -> int:
+    """Первая минута UTC, начиная с периода смещения period, местное время которой не раньше local_midnight."""
+    for i in range(period, len(period_offsets)):
+        utc_minute = max(period_starts[i], local_midnight - period_offsets[i])
+        if i + 1 == len(period_starts) or utc_minute < period_starts[i + 1]:
+            return utc_minute
+    return local_midnight - period_offsets[-1]
+
+
+class CalendarIndex:
+    """
+    Слоты, сгруппированные по дням часового пояса.
+
+    Данные хранятся плоскими массивами целых чисел: даты по возрастанию, для каждой даты
+    позиция ее первого слота (day_starts) и конец дня в минутах UTC (day_ends), для каждого
+    слота минута UTC (utc_minutes) и минута от начала местного дня (day_minutes).
+    Минуты UTC отсчитываются от начала эпохи Unix.
+
+    Индекс заполняется за один проход по слотам, идущим по возрастанию (см. extend),
+    поэтому может строиться по частям прямо из потока строк базы данных (см. from_stream).
+    """
+
+    def __init__(self, tz: tzinfo) -> None:
+        self.tz = tz
+        self.dates: list[date] = []
+        self.day_starts = array("q")
+        self.day_ends = array("q")
+        self.utc_minutes = array("q")
+        self.day_minutes = array("h")
+        self._table: TransitionTable | None = None
+        self._period = 0
+        self._local_day_start = 0
+
+    @classmethod
+    def from_utc_datetimes(cls, utc_datetimes: Iterable[datetime], tz: tzinfo) -> "CalendarIndex":
+        """Построение индекса по слотам (UTC) в любом порядке."""
+        index = cls(tz)
+        index.extend(sorted(to_epoch_minute(utc_datetime) for utc_datetime in utc_datetimes))
+        return index
+
+    @classmethod
+    async def from_stream(cls, partitions: AsyncIterable[Iterable[int]], tz: tzinfo) -> "CalendarIndex":
+        """Построение индекса по частям потока минут UTC, идущих по возрастанию."""
+        index = cls(tz)
+        async for utc_minutes in partitions:
+            index.extend(utc_minutes)
+        return index
+
+    def extend(self, utc_minutes: Iterable[int]) -> None:
+        """
+        Добавление слотов (минуты UTC по возрастанию, не раньше уже добавленных).
+
+        Смещения часового пояса берутся из таблицы смещений (см. src.tz), местное время
+        слота получается сложением со смещением текущего периода, конец местного дня
+        вычисляется один раз на день.
+        """
+        table, period, local_day_start = self._table, self._period, self._local_day_start
+        day_end = self.day_ends[-1] if self.day_ends else 0
+        for utc_minute in utc_minutes:
+            # Таблица должна покрывать и конец дня слота
+            if table is None or utc_minute + 2 * MINUTES_IN_DAY > table.end:
+                table = get_transition_table(
+                    EPOCH + timedelta(minutes=utc_minute),
+                    EPOCH + timedelta(minutes=utc_minute + 2 * MINUTES_IN_DAY),
+                    self.tz,
+                )
+                period = bisect_right(table.starts, utc_minute) - 1
+            while period + 1 < len(table.starts) and table.starts[period + 1] <= utc_minute:
+                period += 1
+            local_minute = utc_minute + table.offsets[period]
+            if not self.dates or utc_minute >= day_end:
+                local_day_start = local_minute - local_minute % MINUTES_IN_DAY
+                day_end = _get_local_day_end(table.starts, table.offsets, period, local_day_start + MINUTES_IN_DAY)
+                self.dates.append(_EPOCH_DATE + timedelta(days=local_day_start // MINUTES_IN_DAY))
+                self.day_starts.append(len(self.utc_minutes))
+                self.day_ends.append(day_end)
+            self.utc_minutes.append(utc_minute)
+            self.day_minutes.append(local_minute - local_day_start)
+        self._table, self._period, self._local_day_start = table, period, local_day_start
+
+    def _get_day_bounds(self, i: int) -> tuple[int, int]:
+        """Позиции [первого, после последнего) слотов i-й даты."""
+        stop = self.day_starts[i + 1] if i + 1 < len(self.day_starts) else len(self.utc_minutes)
+        return self.day_starts[i], stop
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __iter__(self) -> Iterator[date]:
+        return iter(self.dates)
+
+    def get_dates(self, year: int, month: int | None = None) -> list[date]:
+        """Даты года или месяца года."""
+        if month is None:
+            first, last = date(year, 1, 1), date(year + 1, 1, 1)
+        else:
+            first = date(year, month, 1)
+            last = date(year + month // 12, month % 12 + 1, 1)
+        return self.dates[bisect_left(self.dates, first):bisect_left(self.dates, last)]
+
+    def get_times(self, tz_date: date) -> list[str]:
+        """Местные времена слотов даты."""
+        i = bisect_left(self.dates, tz_date)
+        if i == len(self.dates) or self.dates[i] != tz_date:
+            return []
+        return [_format_day_minute(self.day_minutes[p]) for p in range(*self._get_day_bounds(i))]
+
+    def select(self, select: SlotsSelector) -> "CalendarIndex":
+        """Индекс только из выбранных слотов каждого дня, дни без выбранных слотов не попадают в индекс."""
+        index = CalendarIndex(self.tz)
+        for i, tz_date in enumerate(self.dates):
+            start, stop = self._get_day_bounds(i)
+            positions = [start + p for p in select(self.utc_minutes[start:stop], self.day_ends[i])]
+            if not positions:
+                continue
+            index.dates.append(tz_date)
+            index.day_starts.append(len(index.utc_minutes))
+            index.day_ends.append(self.day_ends[i])
+            index.utc_minutes.extend(self.utc_minutes[p] for p in positions)
+            index.day_minutes.extend(self.day_minutes[p] for p in positions)
+        return index
+
+    def to_times_dict(self, select: SlotsSelector | None = None) -> TimesDict:
+        """
+        Словарь местных времен слотов по годам, месяцам и дням (см. get_schedule).
+
+        select - выбор слотов каждого дня (по умолчанию все слоты), дни без выбранных слотов
+        в словарь не попадают.
+        """
+        times_dict: TimesDict = {}
+        months_dict: dict[int, dict[int, list[str]]] = {}
+        days_dict: dict[int, list[str]] = {}
+        year_ = month_ = None
+        for i, tz_date in enumerate(self.dates):
+            start, stop = self._get_day_bounds(i)
+            if select is None:
+                positions: Iterable[int] = range(start, stop)
+            else:
+                positions = (start + p for p in select(self.utc_minutes[start:stop], self.day_ends[i]))
+            times = [_format_day_minute(self.day_minutes[p]) for p in positions]
+            if not times:
+                continue
+            if tz_date.year != year_:
+                year_, month_ = tz_date.year, None
+                months_dict = times_dict.setdefault(year_, {})
+            if tz_date.month != month_:
+                month_ = tz_date.month
+                days_dict = months_dict.setdefault(month_, {})
+            days_dict[tz_date.day] = times
+        return times_dict
+
+
+def _format_day_minute(day_minute: int) -> str:
+    return f"{day_minute // 60:02}:{day_minute % 60:02}"
@@ -1,6 +1,9 @@
 """Конфигурационный файл."""
 
 import os
+from dataclasses import dataclass
+from datetime import timedelta
+from enum import IntEnum, StrEnum
 
 import pytz
 
@@ -11,3 +14,79 @@ db_abs_path = os.path.join(target_dir, "secretary.db")
 db_url = f"sqlite+aiosqlite:///{db_abs_path}"
 
 TIMEZONE = pytz.timezone(os.environ["TIMEZONE"])
+
+
+@dataclass(frozen=True)
+class SQLiteProfile:
+    """Настройки SQLite (PRAGMA), задаваемые при каждом подключении."""
+
+    journal_mode: str
+    synchronous: str
+    busy_timeout: int  # миллисекунды
+    cache_size: int  # отрицательное значение - в килобайтах, положительное - в страницах
+    mmap_size: int  # байты
+    temp_store: str
+
+
+SQLITE_PROFILES = {
+    # Значения SQLite по умолчанию (без ожидания снятия блокировки)
+    "default": SQLiteProfile(
+        journal_mode="DELETE",
+        synchronous="FULL",
+        busy_timeout=0,
+        cache_size=-2000,
+        mmap_size=0,
+        temp_store="DEFAULT",
+    ),
+    "tuned": SQLiteProfile(
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        busy_timeout=5000,
+        cache_size=-16000,
+        mmap_size=128 * 1024 * 1024,
+        temp_store="MEMORY",
+    ),
+}
+
+SQLITE_PROFILE = SQLITE_PROFILES[os.environ.get("SQLITE_PROFILE", "tuned")]
+
+# Количество подключений только для чтения (запись идет через единственное подключение)
+READ_POOL_SIZE = int(os.environ.get("READ_POOL_SIZE", "4"))
+# Максимальное количество записей, фиксируемых одной транзакцией
+WRITE_BATCH_MAX_SIZE = int(os.environ.get("WRITE_BATCH_MAX_SIZE", "32"))
+
+# Время, на которое слоты блокируются за клиентом на экране подтверждения записи
+SLOT_HOLD_TTL = timedelta(seconds=int(os.environ.get("SLOT_HOLD_TTL_SECONDS", "300")))
+# Период удаления истекших блокировок слотов (в секундах)
+SLOT_HOLDS_SWEEP_INTERVAL = int(os.environ.get("SLOT_HOLDS_SWEEP_INTERVAL_SECONDS", "60"))
+
+
+class ValidationLevel(IntEnum):
+    """Объем проверок состояния редактора графика работы."""
+
+    OFF = 0
+    CHEAP = 1  # только структурные проверки
+    FULL = 2  # все проверки (используется в тестах)
+
+
+SCHEDULE_VALIDATION_LEVEL = ValidationLevel[os.environ.get("SCHEDULE_VALIDATION_LEVEL", "cheap").upper()]
+
+
+class ScheduleStorage(StrEnum):
+    """Способ хранения графика работы и бронирований."""
+
+    SLOTS = "slots"  # строка на каждый 30 минутный слот и на каждый забронированный слот
+    INTERVALS = "intervals"  # непрерывные рабочие интервалы, бронированием служит интервал приема
+    # еженедельные шаблоны и исключения по датам, рабочее время вычисляется по запросу,
+    # бронирования и блокировки - как при хранении интервалами
+    RULES = "rules"
+
+
+# На сколько дней вперед заранее вычисляется таблица смещений часового пояса TIMEZONE (см. src.tz)
+TIMEZONE_TABLE_HORIZON_DAYS = int(os.environ.get("TIMEZONE_TABLE_HORIZON_DAYS", "730"))
+
+# Способ хранения графика работы: новая база создается им, существующая переводится в него
+# командой python -m src.migrations <способ> (при запуске бота способы хранения сверяются)
+SCHEDULE_STORAGE = ScheduleStorage(os.environ.get("SCHEDULE_STORAGE", "slots"))
+# На сколько дней вперед вычисляется рабочее время по еженедельным шаблонам
+SCHEDULE_RULES_HORIZON_DAYS = int(os.environ.get("SCHEDULE_RULES_HORIZON_DAYS", "90"))
@@ -1,13 +1,114 @@
 """Работа с базой данных."""
 
-from datetime import datetime
+from collections.abc import AsyncIterator, Callable, Iterable
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, tzinfo
 
-from sqlalchemy import and_, delete, select, update
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import (
+    Integer,
+    Select,
+    and_,
+    case,
+    delete,
+    exists,
+    func,
+    insert,
+    or_,
+    select,
+    type_coerce,
+    update,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.expression import ColumnElement
 
 
-from src.models import Appointment, Reservation, Service, Slot
+from src.config import SCHEDULE_RULES_HORIZON_DAYS, SCHEDULE_STORAGE, TIMEZONE, ScheduleStorage
+from src.constraints import DURATION_MULTIPLIER
+from src.intervals import (
+    DayMinutes,
+    Interval,
+    clip_intervals,
+    get_day_minutes,
+    get_intervals_by_rules,
+    get_intervals_by_slots,
+    get_next_slot_start,
+    get_slots_by_intervals,
+    get_slots_count,
+    get_start_times,
+    intersect_intervals,
+    merge_intervals,
+    subtract_intervals,
+    to_naive_utc,
+    to_tz_date,
+)
+from src.models import (
+    Appointment,
+    AppointmentRow,
+    DateException,
+    IntervalHold,
+    Reservation,
+    Service,
+    Slot,
+    SlotHold,
+    WeeklyRule,
+    WorkingInterval,
+)
+from src.stuff.common.utils import from_utc, get_utc_day_bounds, get_utc_now
+from src.tz import get_transition_table, to_epoch_minute
+
+
+# Ограничение SQLite на количество параметров в одном запросе (для старых версий SQLite)
+SQLITE_MAX_VARIABLE_NUMBER = 999
+# Количество строк в одной части потокового чтения (см. stream_slot_minutes)
+STREAM_PARTITION_SIZE = 1000
+# Ключ session.info, которым помечаются транзакции, изменившие доступные для записи слоты
+AVAILABILITY_CHANGED = "availability_changed"
+# Ключ session.info, которым помечаются транзакции, изменившие блокировки слотов
+HOLDS_CHANGED = "holds_changed"
+
+
+@dataclass
+class ScheduleChanges:
+    """
+    Результат изменения графика работы: количество добавленных и удаленных слотов
+    и забронированные слоты (UTC), которые не удалось удалить.
+    """
+
+    inserted: int = 0
+    removed: int = 0
+    booked_slots: list[datetime] = field(default_factory=list)
+
+    @property
+    def kept_booked(self) -> int:
+        return len(self.booked_slots)
+
+
+@dataclass
+class BookingResult:
+    """Результат бронирования: созданная запись или слоты, которые заняты либо отсутствуют."""
+
+    appointment: Appointment | None = None
+    conflicts: list[datetime] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class HeldSlot:
+    """Слот (UTC), заблокированный клиентом client_id до expires_at (UTC)."""
+
+    datetime_: datetime
+    client_id: int
+    expires_at: datetime
+
+
+def mark_availability_changed(session: AsyncSession) -> None:
+    """Пометка транзакции как изменившей доступные для записи слоты (см. AvailabilityCache)."""
+    session.info[AVAILABILITY_CHANGED] = True
+
+
+def mark_holds_changed(session: AsyncSession) -> None:
+    """Пометка транзакции как изменившей блокировки слотов (см. AvailabilityCache)."""
+    session.info[HOLDS_CHANGED] = True
 
 
 async def get_services(
@@ -29,7 +130,7 @@ async def get_services(
 
 async def insert_service(session: AsyncSession, service: Service) -> None:
     session.add(service)
-    await session.commit()
+    await session.flush()
 
 
 async def update_service(
@@ -43,7 +144,6 @@ async def update_service(
         .values(**new_values)
     )
     await session.execute(stmt)
-    await session.commit()
 
 
 async def delete_service(session: AsyncSession, name: str) -> None:
@@ -52,105 +152,1268 @@ async def delete_service(session: AsyncSession, name: str) -> None:
         .where(and_(Service.name == name, Service.deleted.is_(False)))
     )
     await session.execute(stmt)
-    await session.commit()
 
 
-async def get_active_appointments(
+async def stream_active_appointments(
     session: AsyncSession,
     utc_now: datetime,
-    filter_by: dict | None = None,
-) -> list[Appointment]:
-    if filter_by is None:
-        filter_by = dict()
+    client_id: int | None = None,
+) -> AsyncIterator[list[AppointmentRow]]:
+    """
+    Потоковое чтение предстоящих приемов (всех или клиента client_id) без создания объектов ORM:
+    строки (начало, конец, название услуги) выдаются частями по STREAM_PARTITION_SIZE.
+    """
     query = (
-        select(Appointment)
-        .filter_by(**filter_by)
+        select(Appointment.starts_at, Appointment.ends_at, Service.name)
+        .join(Service, Appointment.service_id == Service.service_id)
         .where(Appointment.starts_at > utc_now)
         .order_by(Appointment.starts_at)
     )
-    result = await session.execute(query)
-    appointments = result.scalars().all()
-    return list(appointments)
+    if client_id is not None:
+        query = query.where(Appointment.client_id == client_id)
+    result = await session.stream(query)
+    async for rows in result.partitions(STREAM_PARTITION_SIZE):
+        yield [AppointmentRow(*row) for row in rows]
 
 
 async def insert_appointment(session: AsyncSession, appointment: Appointment) -> None:
     session.add(appointment)
 
 
+# Функции графика работы, бронирований и блокировок делегируют способу хранения графика работы
+# schedule_backend (SlotsBackend, IntervalsBackend или RulesBackend), выбранному один раз
+# по SCHEDULE_STORAGE (см. get_schedule_backend в конце модуля).
+
+
 async def insert_slot(session: AsyncSession, slot: Slot) -> None:
-    session.add(slot)
+    await schedule_backend.insert_slot(session, slot)
 
 
-async def get_slots_by_date(session: AsyncSession, iso_date: str) -> list[Slot]:
-    query = select(Slot).where(Slot.datetime_.istartswith(iso_date))
-    result = await session.execute(query)
-    slots = result.scalars().all()
-    return list(slots)
+async def get_schedule_dates(
+    session: AsyncSession,
+    current_utc_datetime: datetime,
+    tz: tzinfo,
+) -> list[date]:
+    """Получение дат (в часовом поясе tz), на которые есть будущие слоты."""
+    return await schedule_backend.get_schedule_dates(session, current_utc_datetime, tz)
+
+
+async def get_slots_by_days(
+    session: AsyncSession,
+    days_bounds: dict[date, tuple[datetime, datetime]],
+) -> dict[date, list[Slot]]:
+    """
+    Получение слотов (включая забронированные) нескольких дней одним запросом.
+
+    days_bounds - границы [начало, конец) каждого дня в UTC (см. get_utc_day_bounds).
+    """
+    if not days_bounds:
+        return {}
+    return await schedule_backend.get_slots_by_days(session, days_bounds)
 
 
 async def delete_not_booked_future_slots(
     session: AsyncSession,
     current_utc_datetime: datetime,
 ) -> None:
-    booked_slots = select(Reservation.datetime_).where(Reservation.datetime_ > current_utc_datetime)
-    stmt = (
-        delete(Slot)
-        .where(and_(Slot.datetime_ > current_utc_datetime, Slot.datetime_.not_in(booked_slots)))
-    )
-    await session.execute(stmt)
+    await schedule_backend.delete_not_booked_future_slots(session, current_utc_datetime)
 
 
 async def delete_slots(
     session: AsyncSession,
-    iso_utc_slots: list[str],
-):
-    for iso_utc_slot in iso_utc_slots:
-        utc_datetime = datetime.fromisoformat(iso_utc_slot)
-        stmt = delete(Slot).where(Slot.datetime_ == utc_datetime)
-        try:
-            await session.execute(stmt)
-            await session.commit()
-        except IntegrityError:
-            await session.rollback()
+    utc_datetimes: list[datetime],
+) -> ScheduleChanges:
+    """
+    Удаление незабронированных слотов (UTC) из списка.
+
+    Фиксация транзакции остается за вызывающим кодом.
+    """
+    return await schedule_backend.delete_slots(session, utc_datetimes)
+
+
+async def delete_slots_by_days(
+    session: AsyncSession,
+    days_bounds: list[tuple[datetime, datetime]],
+) -> ScheduleChanges:
+    """
+    Удаление всех незабронированных слотов дней.
+
+    days_bounds - границы [начало, конец) каждого дня в UTC (см. get_utc_day_bounds).
+    Фиксация транзакции остается за вызывающим кодом.
+    """
+    if not days_bounds:
+        return ScheduleChanges()
+    return await schedule_backend.delete_slots_by_days(session, days_bounds)
 
 
-async def get_available_slots(
+async def apply_schedule(
+    session: AsyncSession,
+    days_bounds: list[tuple[datetime, datetime]],
+    utc_slots: list[datetime],
+) -> ScheduleChanges:
+    """
+    Применение графика работы для дней в рамках одной транзакции.
+
+    days_bounds - границы [начало, конец) каждого дня в UTC (см. get_utc_day_bounds).
+    Удаляется только незабронированное рабочее время, отсутствующее в utc_slots, прошедшие
+    слоты не добавляются. Забронированные слоты, отсутствующие в графике работы,
+    остаются и возвращаются в ScheduleChanges.booked_slots.
+    Фиксация транзакции остается за вызывающим кодом.
+    """
+    if not days_bounds:
+        return ScheduleChanges()
+    return await schedule_backend.apply_schedule(session, days_bounds, utc_slots)
+
+
+async def get_available_start_times(
     session: AsyncSession,
     current_utc_datetime: datetime,
-) -> list[Slot]:
-    subquery = select(Reservation.datetime_)
-    query = (
-        select(Slot)
-        .where(and_(Slot.datetime_ > current_utc_datetime, Slot.datetime_.not_in(subquery)))
-        .order_by(Slot.datetime_)
+    duration: int,
+    client_id: int | None = None,
+) -> list[datetime]:
+    """
+    Получение времен (UTC), с которых можно начать прием длительностью duration:
+    все необходимые для приема слоты свободны (без бронирования и без действующей блокировки
+    другим клиентом, собственные блокировки клиента client_id не учитываются).
+    """
+    return await schedule_backend.get_available_start_times(session, current_utc_datetime, duration, client_id)
+
+
+def stream_available_start_minutes(
+    session: AsyncSession,
+    current_utc_datetime: datetime,
+    duration: int,
+    client_id: int | None = None,
+    with_holds: bool = True,
+) -> AsyncIterator[list[int]]:
+    """
+    Потоковый вариант get_available_start_times: времена начала приема в минутах UTC
+    (от начала эпохи Unix) по возрастанию, частями по STREAM_PARTITION_SIZE.
+
+    Строки читаются без создания объектов datetime, поэтому расход памяти
+    не зависит от того, на сколько вперед опубликован график.
+    При with_holds=False блокировки слотов не учитываются (см. get_held_slots).
+    """
+    return schedule_backend.stream_available_start_minutes(
+        session, current_utc_datetime, duration, client_id, with_holds,
     )
-    result = await session.execute(query)
-    slots = result.scalars().all()
-    return list(slots)
 
 
-async def get_future_slots(
+def stream_slot_minutes(
+    session: AsyncSession,
+    start: datetime,
+    end: datetime | None = None,
+) -> AsyncIterator[list[int]]:
+    """
+    Потоковое чтение слотов (включая забронированные) в [start, end) без создания объектов ORM:
+    минуты UTC (от начала эпохи Unix) по возрастанию, частями по STREAM_PARTITION_SIZE
+    (end=None - без ограничения, при хранении шаблонами - на SCHEDULE_RULES_HORIZON_DAYS дней).
+    """
+    return schedule_backend.stream_slot_minutes(session, start, end)
+
+
+async def book_appointment(
+    session: AsyncSession,
+    appointment: Appointment,
+    datetimes_to_reserve: list[datetime],
+    current_utc_datetime: datetime,
+) -> BookingResult:
+    """
+    Бронирование слотов под запись, только если все они существуют и свободны.
+
+    Слоты, заблокированные другим клиентом, считаются занятыми, блокировки самого клиента
+    после бронирования снимаются.
+    Вызывается внутри пишущей транзакции (BEGIN IMMEDIATE), поэтому между проверкой слотов
+    и вставкой брони их никто не может изменить. При конфликте ничего не вставляется
+    и возвращаются конфликтующие слоты, без исключений и отката.
+    """
+    booking = await schedule_backend.book_appointment(
+        session,
+        appointment,
+        datetimes_to_reserve,
+        current_utc_datetime,
+    )
+    if booking.appointment is not None:
+        mark_holds_changed(session)
+    return booking
+
+
+async def hold_slots(
     session: AsyncSession,
+    client_id: int,
+    datetimes_to_hold: list[datetime],
+    current_utc_datetime: datetime,
+    expires_at: datetime,
+) -> list[datetime]:
+    """
+    Временная блокировка слотов за клиентом до expires_at.
+
+    Прежние блокировки клиента снимаются. Слоты блокируются, только если все они
+    существуют и свободны, иначе возвращаются конфликтующие слоты.
+    Истекшие блокировки других клиентов перезаписываются.
+    Срок блокировки хранится в минутах, поэтому expires_at округляется вверх до минуты.
+    """
+    mark_holds_changed(session)
+    return await schedule_backend.hold_slots(
+        session,
+        client_id,
+        datetimes_to_hold,
+        current_utc_datetime,
+        _round_up_to_minute(expires_at),
+    )
+
+
+def _round_up_to_minute(datetime_: datetime) -> datetime:
+    rounded = datetime_.replace(second=0, microsecond=0)
+    if rounded == datetime_:
+        return rounded
+    return rounded + timedelta(minutes=1)
+
+
+async def release_slot_holds(session: AsyncSession, client_id: int) -> None:
+    await schedule_backend.release_slot_holds(session, client_id)
+    mark_holds_changed(session)
+
+
+async def delete_expired_slot_holds(session: AsyncSession, current_utc_datetime: datetime) -> int:
+    deleted = await schedule_backend.delete_expired_slot_holds(session, current_utc_datetime)
+    if deleted:
+        mark_holds_changed(session)
+    return deleted
+
+
+async def get_held_slots(session: AsyncSession, current_utc_datetime: datetime) -> list[HeldSlot]:
+    """Получение действующих блокировок слотов всех клиентов по возрастанию слотов."""
+    return await schedule_backend.get_held_slots(session, current_utc_datetime)
+
+
+# Хранение графика работы слотами (SCHEDULE_STORAGE = slots): строка Slot на каждый 30 минутный
+# слот, строка Reservation на каждый забронированный слот, блокировки - SlotHold.
+
+
+class SlotsBackend:
+    """Хранение графика работы слотами."""
+
+    async def insert_slot(self, session: AsyncSession, slot: Slot) -> None:
+        session.add(slot)
+        mark_availability_changed(session)
+
+    async def get_schedule_dates(
+        self,
+        session: AsyncSession,
+        current_utc_datetime: datetime,
+        tz: tzinfo,
+    ) -> list[date]:
+        """
+        Даты вычисляются одним агрегирующим запросом по индексу первичного ключа слотов,
+        смещение от UTC для каждого слота выбирается по промежуткам действия смещений tz
+        из таблицы смещений (см. get_transition_table).
+        """
+        last_slot_datetime = await session.scalar(
+            select(func.max(Slot.datetime_)).where(Slot.datetime_ > current_utc_datetime)
+        )
+        if last_slot_datetime is None:
+            return []
+        utc_start = to_naive_utc(current_utc_datetime)
+        transitions = get_transition_table(utc_start, last_slot_datetime, tz).get_transitions(
+            to_epoch_minute(utc_start),
+            to_epoch_minute(last_slot_datetime),
+        )
+        modifiers = [f"{offset:+d} minutes" for _, offset in transitions]
+        slot_minute = type_coerce(Slot.datetime_, Integer)
+        if len(transitions) == 1:
+            modifier = modifiers[0]
+        else:
+            modifier = case(
+                *[
+                    (slot_minute < next_start, modifier_)
+                    for (next_start, _), modifier_ in zip(transitions[1:], modifiers)
+                ],
+                else_=modifiers[-1],
+            )
+        tz_date = func.date(slot_minute * 60, "unixepoch", modifier)
+        query = (
+            select(tz_date)
+            .where(Slot.datetime_ > current_utc_datetime)
+            .distinct()
+            .order_by(tz_date)
+        )
+        result = await session.execute(query)
+        return [date.fromisoformat(iso_date) for iso_date in result.scalars().all()]
+
+    async def get_slots_by_days(
+        self,
+        session: AsyncSession,
+        days_bounds: dict[date, tuple[datetime, datetime]],
+    ) -> dict[date, list[Slot]]:
+        """
+        Слоты всех дней читаются одним запросом по диапазонам первичного ключа
+        и распределяются по дням за один проход.
+        """
+        slots_by_days: dict[date, list[Slot]] = {day: [] for day in days_bounds}
+        query = (
+            select(Slot)
+            .where(_slot_in_ranges(list(days_bounds.values())))
+            .order_by(Slot.datetime_)
+        )
+        result = await session.execute(query)
+        sorted_days = sorted(days_bounds.items(), key=lambda item: item[1][0])
+        day_index = 0
+        for slot in result.scalars():
+            while sorted_days[day_index][1][1] <= slot.datetime_:
+                day_index += 1
+            day, _ = sorted_days[day_index]
+            slots_by_days[day].append(slot)
+        return slots_by_days
+
+    async def delete_not_booked_future_slots(
+        self,
+        session: AsyncSession,
+        current_utc_datetime: datetime,
+    ) -> None:
+        is_reserved = exists().where(Reservation.datetime_ == Slot.datetime_)
+        stmt = (
+            delete(Slot)
+            .where(and_(Slot.datetime_ > current_utc_datetime, ~is_reserved))
+        )
+        await session.execute(stmt)
+        mark_availability_changed(session)
+
+    async def delete_slots(
+        self,
+        session: AsyncSession,
+        utc_datetimes: list[datetime],
+    ) -> ScheduleChanges:
+        """Слоты удаляются одним запросом на каждые SQLITE_MAX_VARIABLE_NUMBER слотов."""
+        changes = ScheduleChanges()
+        is_reserved = exists().where(Reservation.datetime_ == Slot.datetime_)
+        for i in range(0, len(utc_datetimes), SQLITE_MAX_VARIABLE_NUMBER):
+            chunk = utc_datetimes[i:i + SQLITE_MAX_VARIABLE_NUMBER]
+            booked_slots_query = (
+                select(Slot.datetime_)
+                .where(and_(Slot.datetime_.in_(chunk), is_reserved))
+                .order_by(Slot.datetime_)
+            )
+            changes.booked_slots.extend(await session.scalars(booked_slots_query))
+            stmt = delete(Slot.__table__).where(and_(Slot.datetime_.in_(chunk), ~is_reserved))
+            result = await session.execute(stmt)
+            changes.removed += result.rowcount
+        if changes.removed:
+            mark_availability_changed(session)
+        return changes
+
+    async def delete_slots_by_days(
+        self,
+        session: AsyncSession,
+        days_bounds: list[tuple[datetime, datetime]],
+    ) -> ScheduleChanges:
+        """Слоты всех дней удаляются одним запросом."""
+        changes = ScheduleChanges()
+        in_dates = _slot_in_ranges(days_bounds)
+        is_reserved = exists().where(Reservation.datetime_ == Slot.datetime_)
+        booked_slots_query = (
+            select(Slot.datetime_)
+            .where(and_(in_dates, is_reserved))
+            .order_by(Slot.datetime_)
+        )
+        changes.booked_slots = list(await session.scalars(booked_slots_query))
+        stmt = delete(Slot.__table__).where(and_(in_dates, ~is_reserved))
+        result = await session.execute(stmt)
+        changes.removed = result.rowcount
+        if changes.removed:
+            mark_availability_changed(session)
+        return changes
+
+    async def apply_schedule(
+        self,
+        session: AsyncSession,
+        days_bounds: list[tuple[datetime, datetime]],
+        utc_slots: list[datetime],
+    ) -> ScheduleChanges:
+        """
+        Сохраненные слоты дней вместе с признаком бронирования читаются одним запросом
+        и сравниваются с utc_slots: удаляются только незабронированные слоты, отсутствующие
+        в графике работы, добавляются только недостающие слоты (прошедшие пропускаются
+        через INSERT OR IGNORE).
+        """
+        changes = ScheduleChanges()
+        schedule = {to_naive_utc(utc_slot) for utc_slot in utc_slots}
+        stored_query = (
+            select(Slot.datetime_, exists().where(Reservation.datetime_ == Slot.datetime_))
+            .where(_slot_in_ranges(days_bounds))
+            .order_by(Slot.datetime_)
+        )
+        stored: set[datetime] = set()
+        to_delete: list[datetime] = []
+        for slot_datetime, is_reserved in await session.execute(stored_query):
+            stored.add(slot_datetime)
+            if slot_datetime in schedule:
+                continue
+            if is_reserved:
+                changes.booked_slots.append(slot_datetime)
+            else:
+                to_delete.append(slot_datetime)
+        for i in range(0, len(to_delete), SQLITE_MAX_VARIABLE_NUMBER):
+            chunk = to_delete[i:i + SQLITE_MAX_VARIABLE_NUMBER]
+            result = await session.execute(delete(Slot.__table__).where(Slot.datetime_.in_(chunk)))
+            changes.removed += result.rowcount
+        to_insert = sorted(schedule - stored)
+        if to_insert:
+            insert_stmt = insert(Slot.__table__).prefix_with("OR IGNORE")
+            result = await session.execute(
+                insert_stmt,
+                [{"datetime_": utc_slot} for utc_slot in to_insert],
+            )
+            changes.inserted = result.rowcount
+        if changes.inserted or changes.removed:
+            mark_availability_changed(session)
+        return changes
+
+    async def get_available_start_times(
+        self,
+        session: AsyncSession,
+        current_utc_datetime: datetime,
+        duration: int,
+        client_id: int | None,
+    ) -> list[datetime]:
+        """
+        Свободные слоты разбиваются на острова непрерывно идущих друг за другом слотов
+        (gaps-and-islands): для каждого слота номер острова равен номеру его 30 минутного
+        интервала минус его порядковый номер среди свободных слотов. Время подходит для записи,
+        если от него до конца острова помещается необходимое для услуги количество слотов.
+        """
+        result = await session.execute(_get_available_start_times_query(current_utc_datetime, duration, client_id))
+        start_times = result.scalars().all()
+        return list(start_times)
+
+    async def stream_available_start_minutes(
+        self,
+        session: AsyncSession,
+        current_utc_datetime: datetime,
+        duration: int,
+        client_id: int | None,
+        with_holds: bool,
+    ) -> AsyncIterator[list[int]]:
+        query = _get_available_start_times_query(current_utc_datetime, duration, client_id, with_holds)
+        result = await session.stream_scalars(query.with_only_columns(query.selected_columns.minute))
+        async for start_minutes in result.partitions(STREAM_PARTITION_SIZE):
+            yield list(start_minutes)
+
+    async def stream_slot_minutes(
+        self,
+        session: AsyncSession,
+        start: datetime,
+        end: datetime | None,
+    ) -> AsyncIterator[list[int]]:
+        conditions = [Slot.datetime_ >= start]
+        if end is not None:
+            conditions.append(Slot.datetime_ < end)
+        query = (
+            select(type_coerce(Slot.datetime_, Integer))
+            .where(*conditions)
+            .order_by(Slot.datetime_)
+        )
+        result = await session.stream_scalars(query)
+        async for slot_minutes in result.partitions(STREAM_PARTITION_SIZE):
+            yield list(slot_minutes)
+
+    async def book_appointment(
+        self,
+        session: AsyncSession,
+        appointment: Appointment,
+        datetimes_to_reserve: list[datetime],
+        current_utc_datetime: datetime,
+    ) -> BookingResult:
+        conflicts = await _get_not_free_slots(
+            session,
+            datetimes_to_reserve,
+            current_utc_datetime,
+            appointment.client_id,
+        )
+        if conflicts:
+            return BookingResult(conflicts=conflicts)
+        await self.release_slot_holds(session, appointment.client_id)
+        session.add(appointment)
+        await session.flush()
+        await session.execute(
+            insert(Reservation),
+            [
+                {"datetime_": datetime_, "appointment_id": appointment.appointment_id}
+                for datetime_ in datetimes_to_reserve
+            ],
+        )
+        mark_availability_changed(session)
+        await session.refresh(appointment)
+        return BookingResult(appointment=appointment)
+
+    async def hold_slots(
+        self,
+        session: AsyncSession,
+        client_id: int,
+        datetimes_to_hold: list[datetime],
+        current_utc_datetime: datetime,
+        expires_at: datetime,
+    ) -> list[datetime]:
+        await self.release_slot_holds(session, client_id)
+        conflicts = await _get_not_free_slots(session, datetimes_to_hold, current_utc_datetime, client_id)
+        if conflicts:
+            return conflicts
+        insert_stmt = sqlite_insert(SlotHold)
+        upsert_stmt = insert_stmt.on_conflict_do_update(
+            index_elements=[SlotHold.datetime_],
+            set_={
+                "client_id": insert_stmt.excluded.client_id,
+                "expires_at": insert_stmt.excluded.expires_at,
+            },
+        )
+        await session.execute(
+            upsert_stmt,
+            [
+                {"datetime_": datetime_, "client_id": client_id, "expires_at": expires_at}
+                for datetime_ in datetimes_to_hold
+            ],
+        )
+        return []
+
+    async def release_slot_holds(self, session: AsyncSession, client_id: int) -> None:
+        await session.execute(delete(SlotHold.__table__).where(SlotHold.client_id == client_id))
+
+    async def delete_expired_slot_holds(self, session: AsyncSession, current_utc_datetime: datetime) -> int:
+        result = await session.execute(
+            delete(SlotHold.__table__).where(SlotHold.expires_at <= current_utc_datetime)
+        )
+        return result.rowcount
+
+    async def get_held_slots(self, session: AsyncSession, current_utc_datetime: datetime) -> list[HeldSlot]:
+        result = await session.execute(
+            select(SlotHold.datetime_, SlotHold.client_id, SlotHold.expires_at)
+            .where(SlotHold.expires_at > current_utc_datetime)
+            .order_by(SlotHold.datetime_)
+        )
+        return [HeldSlot(*row) for row in result.tuples()]
+
+
+def _slot_in_ranges(ranges: list[tuple[datetime, datetime]]) -> ColumnElement[bool]:
+    """Условие попадания слота в один из диапазонов [начало, конец), смежные диапазоны объединяются."""
+    merged_ranges: list[tuple[datetime, datetime]] = []
+    for start, end in sorted(ranges):
+        if merged_ranges and merged_ranges[-1][1] >= start:
+            merged_ranges[-1] = (merged_ranges[-1][0], max(merged_ranges[-1][1], end))
+        else:
+            merged_ranges.append((start, end))
+    return or_(
+        *[
+            and_(Slot.datetime_ >= start, Slot.datetime_ < end)
+            for start, end in merged_ranges
+        ]
+    )
+
+
+def _get_available_start_times_query(
     current_utc_datetime: datetime,
-) -> list[Slot]:
+    duration: int,
+    client_id: int | None,
+    with_holds: bool = True,
+) -> Select[tuple[datetime, int]]:
+    """Запрос времен начала приема (см. get_available_start_times): время и его минута от начала эпохи Unix."""
+    slots_needed = duration // DURATION_MULTIPLIER
+    slot_minute = type_coerce(Slot.datetime_, Integer)
+    is_reserved = exists().where(Reservation.datetime_ == Slot.datetime_)
+    conditions = [Slot.datetime_ > current_utc_datetime, ~is_reserved]
+    if with_holds:
+        conditions.append(~_slot_is_held_by_others(current_utc_datetime, client_id))
+    free_slots = (
+        select(Slot.datetime_, slot_minute.label("minute"))
+        .where(*conditions)
+        .cte("free_slots")
+    )
+    islands = (
+        select(
+            free_slots.c.datetime_,
+            free_slots.c.minute,
+            (
+                free_slots.c.minute // DURATION_MULTIPLIER
+                - func.row_number().over(order_by=free_slots.c.datetime_)
+            ).label("island"),
+        )
+        .cte("islands")
+    )
+    island_ends = (
+        select(
+            islands.c.datetime_,
+            islands.c.minute,
+            func.max(islands.c.minute).over(partition_by=islands.c.island).label("island_end"),
+        )
+        .subquery("island_ends")
+    )
+    return (
+        select(island_ends.c.datetime_, island_ends.c.minute)
+        .where(
+            island_ends.c.island_end - island_ends.c.minute
+            >= (slots_needed - 1) * DURATION_MULTIPLIER
+        )
+        .order_by(island_ends.c.datetime_)
+    )
+
+
+def _slot_is_held_by_others(
+    current_utc_datetime: datetime,
+    client_id: int | None,
+) -> ColumnElement[bool]:
+    """Условие наличия у слота действующей блокировки другим клиентом."""
+    conditions = [
+        SlotHold.datetime_ == Slot.datetime_,
+        SlotHold.expires_at > current_utc_datetime,
+    ]
+    if client_id is not None:
+        conditions.append(SlotHold.client_id != client_id)
+    return exists().where(*conditions)
+
+
+async def _get_not_free_slots(
+    session: AsyncSession,
+    datetimes_: list[datetime],
+    current_utc_datetime: datetime,
+    client_id: int,
+) -> list[datetime]:
+    """Получение слотов, которые отсутствуют, уже начались, забронированы или заблокированы другим клиентом."""
+    free_slots = await session.scalars(
+        select(Slot.datetime_)
+        .where(
+            Slot.datetime_.in_(datetimes_),
+            Slot.datetime_ > current_utc_datetime,
+            ~exists().where(Reservation.datetime_ == Slot.datetime_),
+            ~_slot_is_held_by_others(current_utc_datetime, client_id),
+        )
+    )
+    # В базе данных время хранится без часового пояса (UTC)
+    free_datetimes = set(free_slots)
+    return [
+        datetime_ for datetime_ in datetimes_
+        if datetime_.replace(tzinfo=None) not in free_datetimes
+    ]
+
+
+# Хранение графика работы интервалами (SCHEDULE_STORAGE = intervals): рабочее время хранится
+# непрерывными интервалами WorkingInterval, которые разбиваются и объединяются при изменениях
+# графика, бронированием служит интервал приема [starts_at, ends_at), блокировки - IntervalHold.
+# Доступное для записи время - рабочие интервалы за вычетом приемов и блокировок других клиентов.
+
+
+def _overlaps(
+    starts_at: ColumnElement[datetime],
+    ends_at: ColumnElement[datetime],
+    start: datetime,
+    end: datetime | None,
+) -> ColumnElement[bool]:
+    """Условие пересечения интервала [starts_at, ends_at) с [start, end) (end=None - без ограничения)."""
+    if end is None:
+        return ends_at > start
+    return and_(ends_at > start, starts_at < end)
+
+
+async def _get_intervals(
+    session: AsyncSession,
+    starts_at: ColumnElement[datetime],
+    ends_at: ColumnElement[datetime],
+    start: datetime,
+    end: datetime | None,
+    *conditions: ColumnElement[bool],
+) -> list[Interval]:
+    """Получение интервалов таблицы, пересекающихся с [start, end), упорядоченных по началу."""
     query = (
-        select(Slot)
-        .where(Slot.datetime_ > current_utc_datetime)
-        .order_by(Slot.datetime_)
+        select(starts_at, ends_at)
+        .where(_overlaps(starts_at, ends_at, start, end), *conditions)
+        .order_by(starts_at)
     )
     result = await session.execute(query)
-    slots = result.scalars().all()
-    return list(slots)
+    return [(interval_start, interval_end) for interval_start, interval_end in result.all()]
+
+
+class IntervalsBackend:
+    """Хранение графика работы интервалами."""
+
+    async def get_working_intervals(
+        self,
+        session: AsyncSession,
+        start: datetime,
+        end: datetime | None,
+    ) -> list[Interval]:
+        """Рабочее время, пересекающееся с [start, end) (end=None - без ограничения)."""
+        return await _get_intervals(session, WorkingInterval.starts_at, WorkingInterval.ends_at, start, end)
+
+    async def get_free_intervals(
+        self,
+        session: AsyncSession,
+        start: datetime,
+        end: datetime | None,
+        current_utc_datetime: datetime,
+        client_id: int | None,
+        with_holds: bool = True,
+    ) -> list[Interval]:
+        """
+        Свободное рабочее время в [start, end): рабочие интервалы за вычетом приемов
+        и действующих блокировок других клиентов (блокировки клиента client_id не учитываются,
+        при with_holds=False не учитываются все блокировки).
+        """
+        working = await self.get_working_intervals(session, start, end)
+        booked = await _get_intervals(session, Appointment.starts_at, Appointment.ends_at, start, end)
+        held = []
+        if with_holds:
+            held = await _get_intervals(
+                session,
+                IntervalHold.starts_at,
+                IntervalHold.ends_at,
+                start,
+                end,
+                *_interval_hold_conditions(current_utc_datetime, client_id),
+            )
+        return subtract_intervals(clip_intervals(working, start, end), booked + held)
+
+    async def insert_slot(self, session: AsyncSession, slot: Slot) -> None:
+        await _add_working_intervals(session, get_intervals_by_slots([to_naive_utc(slot.datetime_)]))
+        mark_availability_changed(session)
+
+    async def get_schedule_dates(
+        self,
+        session: AsyncSession,
+        current_utc_datetime: datetime,
+        tz: tzinfo,
+    ) -> list[date]:
+        """Даты будущих рабочих интервалов: все даты от первого до последнего слота."""
+        first_slot_start = get_next_slot_start(current_utc_datetime)
+        working = await self.get_working_intervals(session, first_slot_start, None)
+        schedule_dates: set[date] = set()
+        for start, end in clip_intervals(working, first_slot_start):
+            tz_date = from_utc(start, tz).date()
+            last_tz_date = from_utc(end - timedelta(minutes=DURATION_MULTIPLIER), tz).date()
+            while tz_date <= last_tz_date:
+                schedule_dates.add(tz_date)
+                tz_date += timedelta(days=1)
+        return sorted(schedule_dates)
+
+    async def get_slots_by_days(
+        self,
+        session: AsyncSession,
+        days_bounds: dict[date, tuple[datetime, datetime]],
+    ) -> dict[date, list[Slot]]:
+        """Слоты дней, нарезанные из рабочего времени (объекты Slot не добавляются в сессию)."""
+        start = min(day_start for day_start, _ in days_bounds.values())
+        end = max(day_end for _, day_end in days_bounds.values())
+        working = await self.get_working_intervals(session, start, end)
+        return {
+            day: [Slot(datetime_=slot) for slot in get_slots_by_intervals(clip_intervals(working, day_start, day_end))]
+            for day, (day_start, day_end) in days_bounds.items()
+        }
+
+    async def delete_not_booked_future_slots(
+        self,
+        session: AsyncSession,
+        current_utc_datetime: datetime,
+    ) -> None:
+        await _remove_working_intervals(session, [(get_next_slot_start(current_utc_datetime), datetime.max)])
+
+    async def delete_slots(
+        self,
+        session: AsyncSession,
+        utc_datetimes: list[datetime],
+    ) -> ScheduleChanges:
+        slot_intervals = get_intervals_by_slots(to_naive_utc(utc_datetime) for utc_datetime in utc_datetimes)
+        return await _remove_working_intervals(session, slot_intervals)
+
+    async def delete_slots_by_days(
+        self,
+        session: AsyncSession,
+        days_bounds: list[tuple[datetime, datetime]],
+    ) -> ScheduleChanges:
+        return await _remove_working_intervals(session, days_bounds)
+
+    async def apply_schedule(
+        self,
+        session: AsyncSession,
+        days_bounds: list[tuple[datetime, datetime]],
+        utc_slots: list[datetime],
+    ) -> ScheduleChanges:
+        schedule_intervals = get_intervals_by_slots(to_naive_utc(utc_slot) for utc_slot in utc_slots)
+        changes = await _remove_working_intervals(session, subtract_intervals(days_bounds, schedule_intervals))
+        # Прошедшие и начавшиеся слоты не добавляются (как и проверкой CHECK при хранении слотами)
+        changes.inserted = await _add_working_intervals(
+            session,
+            clip_intervals(schedule_intervals, get_next_slot_start(get_utc_now())),
+        )
+        return changes
+
+    async def get_available_start_times(
+        self,
+        session: AsyncSession,
+        current_utc_datetime: datetime,
+        duration: int,
+        client_id: int | None,
+    ) -> list[datetime]:
+        free_intervals = await self.get_free_intervals(
+            session,
+            get_next_slot_start(current_utc_datetime),
+            None,
+            current_utc_datetime,
+            client_id,
+        )
+        return get_start_times(free_intervals, duration)
+
+    async def stream_available_start_minutes(
+        self,
+        session: AsyncSession,
+        current_utc_datetime: datetime,
+        duration: int,
+        client_id: int | None,
+        with_holds: bool,
+    ) -> AsyncIterator[list[int]]:
+        free_intervals = await self.get_free_intervals(
+            session,
+            get_next_slot_start(current_utc_datetime),
+            None,
+            current_utc_datetime,
+            client_id,
+            with_holds,
+        )
+        for start, end in merge_intervals(free_intervals):
+            start_minutes = list(range(to_epoch_minute(start), to_epoch_minute(end) - duration + 1, DURATION_MULTIPLIER))
+            if start_minutes:
+                yield start_minutes
+
+    async def stream_slot_minutes(
+        self,
+        session: AsyncSession,
+        start: datetime,
+        end: datetime | None,
+    ) -> AsyncIterator[list[int]]:
+        working = await self.get_working_intervals(session, start, end)
+        for interval_start, interval_end in clip_intervals(working, start, end):
+            yield list(range(to_epoch_minute(interval_start), to_epoch_minute(interval_end), DURATION_MULTIPLIER))
+
+    async def get_not_free_slots(
+        self,
+        session: AsyncSession,
+        datetimes_: list[datetime],
+        current_utc_datetime: datetime,
+        client_id: int,
+    ) -> list[datetime]:
+        """
+        Получение слотов вне рабочих интервалов, уже начавшихся, занятых приемами
+        или заблокированных другим клиентом.
+        """
+        if not datetimes_:
+            return []
+        naive_datetimes = [to_naive_utc(datetime_) for datetime_ in datetimes_]
+        requested = get_intervals_by_slots(naive_datetimes)
+        free = await self.get_free_intervals(
+            session, requested[0][0], requested[-1][1], current_utc_datetime, client_id,
+        )
+        free = clip_intervals(free, get_next_slot_start(current_utc_datetime))
+        not_free = subtract_intervals(requested, free)
+        return [
+            datetime_ for datetime_, naive_datetime in zip(datetimes_, naive_datetimes)
+            if any(start <= naive_datetime < end for start, end in not_free)
+        ]
+
+    async def book_appointment(
+        self,
+        session: AsyncSession,
+        appointment: Appointment,
+        datetimes_to_reserve: list[datetime],
+        current_utc_datetime: datetime,
+    ) -> BookingResult:
+        """Бронирование: проверка пересечения интервала приема с занятым временем и вставка приема."""
+        conflicts = await self.get_not_free_slots(
+            session,
+            datetimes_to_reserve,
+            current_utc_datetime,
+            appointment.client_id,
+        )
+        if conflicts:
+            return BookingResult(conflicts=conflicts)
+        await self.release_slot_holds(session, appointment.client_id)
+        session.add(appointment)
+        await session.flush()
+        mark_availability_changed(session)
+        await session.refresh(appointment)
+        return BookingResult(appointment=appointment)
+
+    async def hold_slots(
+        self,
+        session: AsyncSession,
+        client_id: int,
+        datetimes_to_hold: list[datetime],
+        current_utc_datetime: datetime,
+        expires_at: datetime,
+    ) -> list[datetime]:
+        await self.release_slot_holds(session, client_id)
+        conflicts = await self.get_not_free_slots(
+            session, datetimes_to_hold, current_utc_datetime, client_id,
+        )
+        if conflicts:
+            return conflicts
+        intervals = get_intervals_by_slots(to_naive_utc(datetime_) for datetime_ in datetimes_to_hold)
+        if not intervals:
+            return []
+        await session.execute(
+            delete(IntervalHold.__table__)
+            .where(
+                IntervalHold.expires_at <= current_utc_datetime,
+                or_(*[_overlaps(IntervalHold.starts_at, IntervalHold.ends_at, start, end) for start, end in intervals]),
+            )
+        )
+        await session.execute(
+            insert(IntervalHold.__table__),
+            [
+                {"starts_at": start, "ends_at": end, "client_id": client_id, "expires_at": expires_at}
+                for start, end in intervals
+            ],
+        )
+        return []
+
+    async def release_slot_holds(self, session: AsyncSession, client_id: int) -> None:
+        await session.execute(delete(IntervalHold.__table__).where(IntervalHold.client_id == client_id))
+
+    async def delete_expired_slot_holds(self, session: AsyncSession, current_utc_datetime: datetime) -> int:
+        result = await session.execute(
+            delete(IntervalHold.__table__).where(IntervalHold.expires_at <= current_utc_datetime)
+        )
+        return result.rowcount
+
+    async def get_held_slots(self, session: AsyncSession, current_utc_datetime: datetime) -> list[HeldSlot]:
+        result = await session.execute(
+            select(IntervalHold.starts_at, IntervalHold.ends_at, IntervalHold.client_id, IntervalHold.expires_at)
+            .where(*_interval_hold_conditions(current_utc_datetime, None))
+        )
+        held_slots = [
+            HeldSlot(slot, client_id, expires_at)
+            for starts_at, ends_at, client_id, expires_at in result.tuples()
+            for slot in get_slots_by_intervals([(starts_at, ends_at)])
+        ]
+        return sorted(held_slots, key=lambda held_slot: held_slot.datetime_)
+
 
+def _interval_hold_conditions(current_utc_datetime: datetime, client_id: int | None) -> list[ColumnElement[bool]]:
+    """Условия действующей блокировки интервала другим клиентом (client_id=None - любым клиентом)."""
+    conditions = [IntervalHold.expires_at > current_utc_datetime]
+    if client_id is not None:
+        conditions.append(IntervalHold.client_id != client_id)
+    return conditions
 
-async def insert_reservations(
+
+async def _replace_working_intervals(
     session: AsyncSession,
-    datetimes_to_reserve: list[datetime],
-    appointment_id: int,
+    old_intervals: list[Interval],
+    new_intervals: list[Interval],
 ) -> None:
-    reservations = []
-    for datetime_to_reserve in datetimes_to_reserve:
-        reservations.append(
-            Reservation(datetime_=datetime_to_reserve, appointment_id=appointment_id)
+    """Замена рабочих интервалов: удаление old_intervals и добавление new_intervals."""
+    old_starts = [start for start, _ in old_intervals]
+    for i in range(0, len(old_starts), SQLITE_MAX_VARIABLE_NUMBER):
+        chunk = old_starts[i:i + SQLITE_MAX_VARIABLE_NUMBER]
+        await session.execute(delete(WorkingInterval.__table__).where(WorkingInterval.starts_at.in_(chunk)))
+    if new_intervals:
+        await session.execute(
+            insert(WorkingInterval.__table__),
+            [{"starts_at": start, "ends_at": end} for start, end in new_intervals],
+        )
+
+
+async def _add_working_intervals(session: AsyncSession, intervals: list[Interval]) -> int:
+    """
+    Добавление рабочего времени с объединением с пересекающимися и смежными рабочими интервалами.
+
+    Возвращается количество добавленных слотов.
+    """
+    intervals = merge_intervals(intervals)
+    if not intervals:
+        return 0
+    # Смежные интервалы тоже объединяются, поэтому границы включаются
+    result = await session.execute(
+        select(WorkingInterval.starts_at, WorkingInterval.ends_at)
+        .where(WorkingInterval.ends_at >= intervals[0][0], WorkingInterval.starts_at <= intervals[-1][1])
+        .order_by(WorkingInterval.starts_at)
+    )
+    existing = [(start, end) for start, end in result.all()]
+    merged = merge_intervals(existing + intervals)
+    inserted = get_slots_count(merged) - get_slots_count(existing)
+    if inserted:
+        existing_set, merged_set = set(existing), set(merged)
+        await _replace_working_intervals(
+            session,
+            [interval for interval in existing if interval not in merged_set],
+            [interval for interval in merged if interval not in existing_set],
         )
-    session.add_all(reservations)
+        mark_availability_changed(session)
+    return inserted
+
+
+async def _remove_working_intervals(session: AsyncSession, ranges: list[Interval]) -> ScheduleChanges:
+    """
+    Удаление рабочего времени в диапазонах ranges, кроме забронированного приемами.
+
+    Рабочие интервалы, частично попавшие в диапазоны, разбиваются. Блокировки удаленного
+    времени снимаются. Количество удаленных и оставленных забронированными слотов
+    возвращается в ScheduleChanges.
+    """
+    changes = ScheduleChanges()
+    ranges = merge_intervals(ranges)
+    if not ranges:
+        return changes
+    start, end = ranges[0][0], ranges[-1][1]
+    working = await _get_intervals(session, WorkingInterval.starts_at, WorkingInterval.ends_at, start, end)
+    booked = await _get_intervals(session, Appointment.starts_at, Appointment.ends_at, start, end)
+    to_remove = intersect_intervals(working, subtract_intervals(ranges, booked))
+    changes.removed = get_slots_count(to_remove)
+    kept_booked = intersect_intervals(working, intersect_intervals(ranges, booked))
+    changes.booked_slots = get_slots_by_intervals(kept_booked)
+    if not to_remove:
+        return changes
+    remaining = subtract_intervals(working, to_remove)
+    working_set, remaining_set = set(working), set(remaining)
+    await _replace_working_intervals(
+        session,
+        [interval for interval in working if interval not in remaining_set],
+        [interval for interval in remaining if interval not in working_set],
+    )
+    await session.execute(
+        delete(IntervalHold.__table__)
+        .where(
+            or_(
+                *[
+                    _overlaps(IntervalHold.starts_at, IntervalHold.ends_at, remove_start, remove_end)
+                    for remove_start, remove_end in to_remove
+                ]
+            )
+        )
+    )
+    mark_availability_changed(session)
+    return changes
+
+
+# Хранение графика работы шаблонами (SCHEDULE_STORAGE = rules): хранятся только еженедельные шаблоны
+# WeeklyRule и исключения DateException (в местном времени TIMEZONE), рабочее время вычисляется
+# по ним для запрошенного промежутка. Изменения графика работы на выбранные даты записываются
+# исключениями. Бронирования и блокировки - как при хранении интервалами.
+
+
+async def _get_intervals_by_rules(session: AsyncSession, start: datetime, end: datetime) -> list[Interval]:
+    """Рабочее время в [start, end), вычисленное по еженедельным шаблонам и исключениям."""
+    weekly_minutes: dict[int, DayMinutes] = {}
+    rules = await session.execute(
+        select(WeeklyRule.day_of_week, WeeklyRule.starts_at_minute, WeeklyRule.ends_at_minute)
+    )
+    for day_of_week, start_minute, end_minute in rules.all():
+        weekly_minutes.setdefault(day_of_week, []).append((start_minute, end_minute))
+    dates_minutes: dict[date, DayMinutes] = {}
+    exceptions = await session.execute(
+        select(DateException.date_, DateException.starts_at_minute, DateException.ends_at_minute)
+        .where(DateException.date_.between(to_tz_date(start, TIMEZONE), to_tz_date(end, TIMEZONE)))
+    )
+    for tz_date, start_minute, end_minute in exceptions.all():
+        day_minutes = dates_minutes.setdefault(tz_date, [])
+        if start_minute is not None:
+            day_minutes.append((start_minute, end_minute))
+    return get_intervals_by_rules(weekly_minutes, dates_minutes, TIMEZONE, start, end)
+
+
+async def _edit_days_by_rules(
+    session: AsyncSession,
+    tz_dates: Iterable[date],
+    edit: Callable[[list[Interval], Interval], list[Interval]],
+) -> ScheduleChanges:
+    """
+    Изменение рабочего времени дат исключениями из еженедельного шаблона.
+
+    edit получает текущее рабочее время даты и границы даты в UTC и возвращает новое рабочее
+    время даты. Забронированное время остается рабочим, блокировки удаленного времени снимаются.
+    Исключения записываются только для дат, рабочее время которых изменилось.
+    """
+    changes = ScheduleChanges()
+    days_bounds = {tz_date: get_utc_day_bounds(tz_date, TIMEZONE) for tz_date in sorted(set(tz_dates))}
+    if not days_bounds:
+        return changes
+    start = min(day_start for day_start, _ in days_bounds.values())
+    end = max(day_end for _, day_end in days_bounds.values())
+    working = await _get_intervals_by_rules(session, start, end)
+    booked = await _get_intervals(session, Appointment.starts_at, Appointment.ends_at, start, end)
+    removed_intervals: list[Interval] = []
+    exceptions: dict[date, DayMinutes] = {}
+    for tz_date, (day_start, day_end) in days_bounds.items():
+        old_intervals = clip_intervals(working, day_start, day_end)
+        new_intervals = clip_intervals(edit(old_intervals, (day_start, day_end)), day_start, day_end)
+        removed = subtract_intervals(old_intervals, new_intervals)
+        kept_booked = intersect_intervals(removed, booked)
+        new_intervals = merge_intervals(new_intervals + kept_booked)
+        if new_intervals == old_intervals:
+            continue
+        changes.inserted += get_slots_count(subtract_intervals(new_intervals, old_intervals))
+        changes.removed += get_slots_count(removed) - get_slots_count(kept_booked)
+        changes.booked_slots.extend(get_slots_by_intervals(kept_booked))
+        removed_intervals.extend(subtract_intervals(removed, kept_booked))
+        exceptions[tz_date] = get_day_minutes(tz_date, new_intervals, TIMEZONE)
+    await _write_date_exceptions(session, exceptions)
+    if removed_intervals:
+        await session.execute(
+            delete(IntervalHold.__table__)
+            .where(
+                or_(
+                    *[
+                        _overlaps(IntervalHold.starts_at, IntervalHold.ends_at, remove_start, remove_end)
+                        for remove_start, remove_end in removed_intervals
+                    ]
+                )
+            )
+        )
+    if changes.inserted or changes.removed:
+        mark_availability_changed(session)
+    return changes
+
+
+async def _write_date_exceptions(session: AsyncSession, exceptions: dict[date, DayMinutes]) -> None:
+    """Перезапись исключений дат (пустой список интервалов - выходной)."""
+    if not exceptions:
+        return None
+    await session.execute(
+        delete(DateException.__table__).where(DateException.date_.in_(list(exceptions)))
+    )
+    await session.execute(
+        insert(DateException.__table__),
+        [
+            {"date_": tz_date, "starts_at_minute": start_minute, "ends_at_minute": end_minute}
+            for tz_date, day_minutes in exceptions.items()
+            for start_minute, end_minute in (day_minutes or [(None, None)])
+        ],
+    )
+
+
+async def _clear_rules(session: AsyncSession, current_utc_datetime: datetime) -> None:
+    """Удаление шаблонов и будущих исключений, забронированное время остается исключениями дат."""
+    first_slot_start = get_next_slot_start(current_utc_datetime)
+    booked = await _get_intervals(session, Appointment.starts_at, Appointment.ends_at, first_slot_start, None)
+    first_tz_date = to_tz_date(first_slot_start, TIMEZONE)
+    await session.execute(delete(WeeklyRule.__table__))
+    await session.execute(delete(DateException.__table__).where(DateException.date_ >= first_tz_date))
+    exceptions: dict[date, DayMinutes] = {}
+    if booked:
+        tz_date, last_tz_date = first_tz_date, to_tz_date(booked[-1][1], TIMEZONE)
+        while tz_date <= last_tz_date:
+            day_start, day_end = get_utc_day_bounds(tz_date, TIMEZONE)
+            day_minutes = get_day_minutes(tz_date, clip_intervals(booked, day_start, day_end), TIMEZONE)
+            if day_minutes:
+                exceptions[tz_date] = day_minutes
+            tz_date += timedelta(days=1)
+    await _write_date_exceptions(session, exceptions)
+    await session.execute(
+        delete(IntervalHold.__table__).where(IntervalHold.ends_at > first_slot_start)
+    )
+    mark_availability_changed(session)
+
+
+class RulesBackend(IntervalsBackend):
+    """Хранение графика работы шаблонами: рабочее время вычисляется по шаблонам, изменения - исключениями."""
+
+    async def get_working_intervals(
+        self,
+        session: AsyncSession,
+        start: datetime,
+        end: datetime | None,
+    ) -> list[Interval]:
+        """Рабочее время, пересекающееся с [start, end) (end=None - на SCHEDULE_RULES_HORIZON_DAYS дней)."""
+        if end is None:
+            end = start + timedelta(days=SCHEDULE_RULES_HORIZON_DAYS)
+        return await _get_intervals_by_rules(session, start, end)
+
+    async def insert_slot(self, session: AsyncSession, slot: Slot) -> None:
+        slot_intervals = get_intervals_by_slots([to_naive_utc(slot.datetime_)])
+        await _edit_days_by_rules(
+            session,
+            [to_tz_date(slot.datetime_, TIMEZONE)],
+            lambda old_intervals, _: old_intervals + slot_intervals,
+        )
+        mark_availability_changed(session)
+
+    async def delete_not_booked_future_slots(
+        self,
+        session: AsyncSession,
+        current_utc_datetime: datetime,
+    ) -> None:
+        await _clear_rules(session, current_utc_datetime)
+
+    async def delete_slots(
+        self,
+        session: AsyncSession,
+        utc_datetimes: list[datetime],
+    ) -> ScheduleChanges:
+        slot_intervals = get_intervals_by_slots(to_naive_utc(utc_datetime) for utc_datetime in utc_datetimes)
+        return await _edit_days_by_rules(
+            session,
+            [to_tz_date(utc_datetime, TIMEZONE) for utc_datetime in utc_datetimes],
+            lambda old_intervals, _: subtract_intervals(old_intervals, slot_intervals),
+        )
+
+    async def delete_slots_by_days(
+        self,
+        session: AsyncSession,
+        days_bounds: list[tuple[datetime, datetime]],
+    ) -> ScheduleChanges:
+        return await _edit_days_by_rules(
+            session,
+            [to_tz_date(day_start, TIMEZONE) for day_start, _ in days_bounds],
+            lambda old_intervals, _: [],
+        )
+
+    async def apply_schedule(
+        self,
+        session: AsyncSession,
+        days_bounds: list[tuple[datetime, datetime]],
+        utc_slots: list[datetime],
+    ) -> ScheduleChanges:
+        schedule_intervals = get_intervals_by_slots(to_naive_utc(utc_slot) for utc_slot in utc_slots)
+        first_slot_start = get_next_slot_start(get_utc_now())
+        # Прошедшие слоты остаются, только если они есть и в графике работы
+        return await _edit_days_by_rules(
+            session,
+            [to_tz_date(day_start, TIMEZONE) for day_start, _ in days_bounds],
+            lambda old_intervals, day_bounds: (
+                clip_intervals(schedule_intervals, first_slot_start)
+                + intersect_intervals(
+                    clip_intervals(old_intervals, day_bounds[0], first_slot_start),
+                    schedule_intervals,
+                )
+            ),
+        )
+
+
+async def set_weekly_rules(
+    session: AsyncSession,
+    days_of_week: list[int],
+    day_minutes: DayMinutes,
+) -> None:
+    """
+    Замена еженедельного шаблона для дней недели days_of_week (1 - понедельник) интервалами day_minutes.
+
+    Даты с исключениями шаблон не затрагивает. Фиксация транзакции остается за вызывающим кодом.
+    """
+    await session.execute(delete(WeeklyRule.__table__).where(WeeklyRule.day_of_week.in_(days_of_week)))
+    if day_minutes:
+        await session.execute(
+            insert(WeeklyRule.__table__),
+            [
+                {"day_of_week": day_of_week, "starts_at_minute": start_minute, "ends_at_minute": end_minute}
+                for day_of_week in days_of_week
+                for start_minute, end_minute in day_minutes
+            ],
+        )
+    mark_availability_changed(session)
+
+
+def get_schedule_backend(storage: ScheduleStorage) -> SlotsBackend | IntervalsBackend:
+    """Получение реализации способа хранения графика работы storage."""
+    if storage is ScheduleStorage.INTERVALS:
+        return IntervalsBackend()
+    if storage is ScheduleStorage.RULES:
+        return RulesBackend()
+    return SlotsBackend()
+
+
+schedule_backend = get_schedule_backend(SCHEDULE_STORAGE)
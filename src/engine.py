@@ -0,0 +1,100 @@
+"""Подключение к базе данных."""
+
+import logging
+
+from sqlalchemy import Connection, event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from src.config import SQLiteProfile
+
+
+logger = logging.getLogger(__name__)
+
+_SYNCHRONOUS_NAMES = {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"}
+_TEMP_STORE_NAMES = {0: "DEFAULT", 1: "FILE", 2: "MEMORY"}
+
+
+def apply_sqlite_profile(dbapi_connection, profile: SQLiteProfile) -> None:
+    # https://docs.sqlalchemy.org/en/20/dialects/sqlite.html#sqlite-foreign-keys
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute(f"PRAGMA journal_mode={profile.journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={profile.synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={int(profile.busy_timeout)}")
+    cursor.execute(f"PRAGMA cache_size={int(profile.cache_size)}")
+    cursor.execute(f"PRAGMA mmap_size={int(profile.mmap_size)}")
+    cursor.execute(f"PRAGMA temp_store={profile.temp_store}")
+    cursor.close()
+
+
+def create_engine(
+    db_url: str,
+    profile: SQLiteProfile,
+    read_only: bool = False,
+    **engine_kwargs,
+) -> AsyncEngine:
+    """Создание движка, каждое подключение которого настраивается по profile."""
+    engine = create_async_engine(db_url, **engine_kwargs)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragma(dbapi_connection, _):
+        apply_sqlite_profile(dbapi_connection, profile)
+        if read_only:
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA query_only=ON")
+            cursor.close()
+
+    return engine
+
+
+def create_write_engine(db_url: str, profile: SQLiteProfile) -> AsyncEngine:
+    """
+    Создание движка с единственным пишущим подключением.
+
+    Транзакции начинаются с BEGIN IMMEDIATE (блокировка на запись берется сразу),
+    что также включает поддержку SAVEPOINT в драйвере.
+    https://docs.sqlalchemy.org/en/20/dialects/sqlite.html#serializable-isolation-savepoints-transactional-ddl
+    """
+    engine = create_engine(db_url, profile, pool_size=1, max_overflow=0)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def disable_driver_transactions(dbapi_connection, _):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+def create_read_engine(db_url: str, profile: SQLiteProfile, pool_size: int) -> AsyncEngine:
+    """Создание движка с пулом подключений только для чтения."""
+    return create_engine(db_url, profile, read_only=True, pool_size=pool_size, max_overflow=0)
+
+
+def get_sqlite_settings(conn: Connection) -> dict[str, str | int]:
+    """Получение фактически действующих настроек SQLite."""
+    synchronous = conn.execute(text("PRAGMA synchronous")).scalar_one()
+    temp_store = conn.execute(text("PRAGMA temp_store")).scalar_one()
+    return {
+        "foreign_keys": conn.execute(text("PRAGMA foreign_keys")).scalar_one(),
+        "journal_mode": str(conn.execute(text("PRAGMA journal_mode")).scalar_one()).upper(),
+        "synchronous": _SYNCHRONOUS_NAMES.get(synchronous, str(synchronous)),
+        "busy_timeout": conn.execute(text("PRAGMA busy_timeout")).scalar_one(),
+        "cache_size": conn.execute(text("PRAGMA cache_size")).scalar_one(),
+        "mmap_size": conn.execute(text("PRAGMA mmap_size")).scalar_one(),
+        "temp_store": _TEMP_STORE_NAMES.get(temp_store, str(temp_store)),
+    }
+
+
+def report_sqlite_settings(conn: Connection, profile: SQLiteProfile) -> dict[str, str | int]:
+    """Логирование действующих настроек SQLite с предупреждением о неприменившихся."""
+    settings = get_sqlite_settings(conn)
+    for name, value in settings.items():
+        expected = getattr(profile, name, None)
+        if expected is not None and str(value).upper() != str(expected).upper():
+            logger.warning("PRAGMA %s = %s (в профиле задано %s)", name, value, expected)
+        else:
+            logger.info("PRAGMA %s = %s", name, value)
+    return settings
@@ -0,0 +1,51 @@
+"""Удаление истекших временных блокировок слотов."""
+
+import asyncio
+import logging
+
+from src.database import delete_expired_slot_holds
+from src.stuff.common.utils import get_utc_now
+from src.writer import DatabaseWriter
+
+
+logger = logging.getLogger(__name__)
+
+
+class SlotHoldsSweeper:
+    """Периодически удаляет истекшие блокировки слотов одним запросом через писателя."""
+
+    def __init__(self, db_writer: DatabaseWriter, interval: float) -> None:
+        self._db_writer = db_writer
+        self._interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return None
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def sweep(self) -> int:
+        utc_now = get_utc_now()
+        deleted = await self._db_writer.write(
+            lambda session: delete_expired_slot_holds(session, utc_now),
+        )
+        if deleted:
+            logger.info("Удалено истекших блокировок слотов: %s", deleted)
+        return deleted
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Не удалось удалить истекшие блокировки слотов")
@@ -0,0 +1,174 @@
+"""Операции над интервалами времени (хранение графика работы интервалами)."""
+
+from collections.abc import Iterable
+from datetime import UTC, date, datetime, time, timedelta
+
+import pytz
+
+from src.constraints import DURATION_MULTIPLIER
+
+
+# Интервал [начало, конец), дата и время в UTC без tzinfo
+Interval = tuple[datetime, datetime]
+# Интервалы внутри дня [начало, конец) в минутах от начала дня (местное время)
+DayMinutes = list[tuple[int, int]]
+
+SLOT_DURATION = timedelta(minutes=DURATION_MULTIPLIER)
+
+
+def to_naive_utc(datetime_: datetime) -> datetime:
+    """Дата и время в UTC без tzinfo (наивные значения считаются заданными в UTC)."""
+    if datetime_.tzinfo is None:
+        return datetime_
+    return datetime_.astimezone(UTC).replace(tzinfo=None)
+
+
+def get_next_slot_start(utc_now: datetime) -> datetime:
+    """Начало первого слота, начинающегося строго позже utc_now."""
+    utc_now = to_naive_utc(utc_now)
+    slot_start = utc_now.replace(
+        minute=utc_now.minute - utc_now.minute % DURATION_MULTIPLIER,
+        second=0,
+        microsecond=0,
+    )
+    return slot_start + SLOT_DURATION
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> list[Interval]:
+    """Объединение пересекающихся и смежных интервалов, результат упорядочен по началу."""
+    merged: list[Interval] = []
+    for start, end in sorted(intervals):
+        if start >= end:
+            continue
+        if merged and merged[-1][1] >= start:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(intervals: Iterable[Interval], to_subtract: Iterable[Interval]) -> list[Interval]:
+    """Части интервалов intervals, не покрытые интервалами to_subtract (за один проход)."""
+    subtrahends = merge_intervals(to_subtract)
+    result: list[Interval] = []
+    i = 0
+    for start, end in merge_intervals(intervals):
+        while i < len(subtrahends) and subtrahends[i][1] <= start:
+            i += 1
+        j = i
+        while j < len(subtrahends) and subtrahends[j][0] < end:
+            if subtrahends[j][0] > start:
+                result.append((start, subtrahends[j][0]))
+            start = max(start, subtrahends[j][1])
+            j += 1
+        if start < end:
+            result.append((start, end))
+    return result
+
+
+def intersect_intervals(intervals: Iterable[Interval], other: Iterable[Interval]) -> list[Interval]:
+    """Пересечение двух наборов интервалов."""
+    intervals = merge_intervals(intervals)
+    return subtract_intervals(intervals, subtract_intervals(intervals, other))
+
+
+def clip_intervals(intervals: Iterable[Interval], start: datetime, end: datetime | None = None) -> list[Interval]:
+    """Части интервалов, лежащие в [start, end) (end=None - без ограничения сверху)."""
+    clipped = []
+    for interval_start, interval_end in merge_intervals(intervals):
+        interval_start = max(interval_start, start)
+        if end is not None:
+            interval_end = min(interval_end, end)
+        if interval_start < interval_end:
+            clipped.append((interval_start, interval_end))
+    return clipped
+
+
+def get_intervals_by_slots(slots: Iterable[datetime]) -> list[Interval]:
+    """Интервалы, составленные из идущих друг за другом слотов."""
+    return merge_intervals((slot, slot + SLOT_DURATION) for slot in slots)
+
+
+def get_slots_by_intervals(intervals: Iterable[Interval]) -> list[datetime]:
+    """Слоты интервалов (интервалы должны быть выровнены по границам слотов)."""
+    slots = []
+    for start, end in merge_intervals(intervals):
+        slot = start
+        while slot < end:
+            slots.append(slot)
+            slot += SLOT_DURATION
+    return slots
+
+
+def get_slots_count(intervals: Iterable[Interval]) -> int:
+    """Количество слотов в интервалах."""
+    return sum((end - start) // SLOT_DURATION for start, end in merge_intervals(intervals))
+
+
+def get_start_times(intervals: Iterable[Interval], duration: int) -> list[datetime]:
+    """Начала слотов, с которых в интервалах помещается прием длительностью duration (в минутах)."""
+    needed = timedelta(minutes=duration)
+    start_times = []
+    for start, end in merge_intervals(intervals):
+        start_time = start
+        while start_time + needed <= end:
+            start_times.append(start_time)
+            start_time += SLOT_DURATION
+    return start_times
+
+
+def to_tz_date(utc_datetime: datetime, tz: pytz.BaseTzInfo) -> date:
+    """Дата в часовом поясе tz для момента utc_datetime."""
+    return to_naive_utc(utc_datetime).replace(tzinfo=UTC).astimezone(tz).date()
+
+
+def get_day_intervals(tz_date: date, day_minutes: DayMinutes, tz: pytz.BaseTzInfo) -> list[Interval]:
+    """Интервалы UTC для интервалов внутри дня tz_date (местное время часового пояса tz)."""
+    day_start = datetime.combine(tz_date, time())
+    return [
+        (
+            tz.localize(day_start + timedelta(minutes=start_minute)).astimezone(UTC).replace(tzinfo=None),
+            tz.localize(day_start + timedelta(minutes=end_minute)).astimezone(UTC).replace(tzinfo=None),
+        )
+        for start_minute, end_minute in day_minutes
+    ]
+
+
+def get_day_minutes(tz_date: date, intervals: Iterable[Interval], tz: pytz.BaseTzInfo) -> DayMinutes:
+    """Интервалы внутри дня tz_date (в минутах от начала дня) по интервалам UTC этого дня."""
+    day_start = tz.localize(datetime.combine(tz_date, time()))
+    day_minutes = []
+    for start, end in merge_intervals(intervals):
+        tz_start = start.replace(tzinfo=UTC).astimezone(tz)
+        tz_end = end.replace(tzinfo=UTC).astimezone(tz)
+        start_minute = (tz_start.replace(tzinfo=None) - day_start.replace(tzinfo=None)) // timedelta(minutes=1)
+        end_minute = (tz_end.replace(tzinfo=None) - day_start.replace(tzinfo=None)) // timedelta(minutes=1)
+        day_minutes.append((start_minute, end_minute))
+    return day_minutes
+
+
+def get_intervals_by_rules(
+    weekly_minutes: dict[int, DayMinutes],
+    dates_minutes: dict[date, DayMinutes],
+    tz: pytz.BaseTzInfo,
+    start: datetime,
+    end: datetime,
+) -> list[Interval]:
+    """
+    Рабочее время в [start, end) по еженедельным шаблонам и исключениям по датам.
+
+    weekly_minutes - интервалы внутри дня по дням недели (1 - понедельник),
+    dates_minutes - исключения: интервалы даты заменяют шаблон ее дня недели
+    (пустой список - выходной).
+    """
+    intervals: list[Interval] = []
+    tz_date = to_tz_date(start, tz)
+    last_tz_date = to_tz_date(end, tz)
+    while tz_date <= last_tz_date:
+        day_minutes = dates_minutes.get(tz_date)
+        if day_minutes is None:
+            day_minutes = weekly_minutes.get(tz_date.isoweekday(), [])
+        intervals.extend(get_day_intervals(tz_date, day_minutes, tz))
+        tz_date += timedelta(days=1)
+    return clip_intervals(intervals, start, end)
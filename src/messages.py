@@ -100,6 +100,29 @@ SELECTED_WORKING_DATES = "<b>Выбранные рабочие даты:</b>\n{s
 SET_WORKING_HOURS = f"<b>{SELECT_WORKING_HOURS}:</b>"
 SELECTED_WORKING_HOURS = "<b>Выбранные рабочие часы:</b>\n{selected_times_view}"
 SCHEDULE_MODIFIED = "График работы изменен"
+SCHEDULE_MODIFIED_WITH_CHANGES = (
+    f"{SCHEDULE_MODIFIED}\n\n"
+    "Добавлено слотов: {inserted}\n"
+    "Удалено слотов: {removed}\n"
+    "Оставлено забронированных слотов: {kept_booked}"
+)
+HOW_TO_SET_WEEKLY_SCHEDULE = (
+    "Для задания еженедельного графика работы выберите даты с нужными днями недели, "
+    f"{SELECT_WORKING_HOURS.lower()} "
+    'и нажмите кнопку <b>"{save_weekly_button}"</b>.\n'
+    "Изменения графика работы на отдельные даты важнее еженедельного графика работы."
+)
+WEEKLY_SCHEDULE_SAVED = (
+    "Еженедельный график работы сохранен\n\n"
+    "Дни недели: {days_of_week}\n"
+    "Рабочие часы: {working_hours}"
+)
+KEPT_BOOKED_SLOTS = "<b>Оставлены забронированные слоты:</b>\n{booked_slots_view}"
+SCHEDULE_SLOTS_DELETED = (
+    f"{SCHEDULE_MODIFIED}\n\n"
+    "Удалено слотов: {removed}\n"
+    "Оставлено забронированных слотов: {kept_booked}"
+)
 CLEAR_SCHEDULE_WARNING = (
     "Весь незанятый график работы будет удален.\n"
     "Вы точно хотите обнулить график работы?"
@@ -0,0 +1,581 @@
+"""Миграции схемы базы данных."""
+
+import argparse
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from sqlalchemy import Connection, create_engine, delete, insert, inspect, make_url, select, text
+
+from src.config import SCHEDULE_STORAGE, TIMEZONE, ScheduleStorage, db_url
+from src.intervals import (
+    Interval,
+    clip_intervals,
+    get_day_intervals,
+    get_day_minutes,
+    get_intervals_by_slots,
+    merge_intervals,
+    to_tz_date,
+)
+from src.models import (
+    Base,
+    DateException,
+    Reservation,
+    ScheduleStorageState,
+    Slot,
+    SlotHold,
+    WorkingInterval,
+)
+from src.stuff.common.utils import get_utc_day_bounds
+
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaMismatchError(Exception):
+    """Схема базы данных не соответствует ORM моделям."""
+
+
+class ScheduleStorageConversionError(Exception):
+    """Перевод графика работы в указанный способ хранения невозможен."""
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def _add_hot_path_indexes(conn: Connection) -> None:
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_appointment_client_id_starts_at "
+            "ON appointment (client_id, starts_at)"
+        )
+    )
+    conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_appointment_starts_at ON appointment (starts_at)")
+    )
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_reservation_appointment_id "
+            "ON reservation (appointment_id)"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_service_name_not_deleted "
+            "ON service (name) WHERE NOT deleted"
+        )
+    )
+
+
+def _add_slot_hold_table(conn: Connection) -> None:
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS slot_hold ("
+            "datetime_ DATETIME NOT NULL, "
+            "client_id INTEGER NOT NULL, "
+            "expires_at DATETIME NOT NULL, "
+            "CONSTRAINT pk_slot_hold PRIMARY KEY (datetime_), "
+            "CONSTRAINT fk_slot_hold_datetime__slot FOREIGN KEY(datetime_) "
+            "REFERENCES slot (datetime_) ON DELETE CASCADE)"
+        )
+    )
+    conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_slot_hold_client_id ON slot_hold (client_id)")
+    )
+    conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_slot_hold_expires_at ON slot_hold (expires_at)")
+    )
+
+
+# Описания таблиц зафиксированы на момент миграций и не зависят от ORM моделей,
+# чтобы последующие изменения моделей не меняли результат уже написанных миграций.
+_EPOCH_MINUTE_CHECK = "(CAST(strftime('%s', CURRENT_TIMESTAMP) AS INTEGER) / 60)"
+
+# Таблицы миграции 3 (в порядке зависимостей по внешним ключам)
+_EPOCH_MINUTE_TABLES = {
+    "slot": (
+        "CREATE TABLE slot ("
+        "datetime_ INTEGER NOT NULL, "
+        "CONSTRAINT pk_slot PRIMARY KEY (datetime_), "
+        f"CONSTRAINT ck_slot_datetime__gt_current_timestamp CHECK (datetime_ > {_EPOCH_MINUTE_CHECK})"
+        ") WITHOUT ROWID",
+    ),
+    "appointment": (
+        "CREATE TABLE appointment ("
+        "appointment_id INTEGER NOT NULL, "
+        "client_id INTEGER NOT NULL, "
+        "service_id INTEGER NOT NULL, "
+        "starts_at INTEGER NOT NULL, "
+        "ends_at INTEGER NOT NULL, "
+        "CONSTRAINT pk_appointment PRIMARY KEY (appointment_id), "
+        f"CONSTRAINT ck_appointment_starts_at_gt_current_timestamp CHECK (starts_at > {_EPOCH_MINUTE_CHECK}), "
+        "CONSTRAINT fk_appointment_service_id_service FOREIGN KEY(service_id) "
+        "REFERENCES service (service_id) ON DELETE RESTRICT)",
+        "CREATE INDEX ix_appointment_client_id_starts_at ON appointment (client_id, starts_at)",
+        "CREATE INDEX ix_appointment_starts_at ON appointment (starts_at)",
+    ),
+    "reservation": (
+        "CREATE TABLE reservation ("
+        "datetime_ INTEGER NOT NULL, "
+        "appointment_id INTEGER NOT NULL, "
+        "CONSTRAINT pk_reservation PRIMARY KEY (datetime_), "
+        f"CONSTRAINT ck_reservation_datetime__gt_current_timestamp CHECK (datetime_ > {_EPOCH_MINUTE_CHECK}), "
+        "CONSTRAINT fk_reservation_datetime__slot FOREIGN KEY(datetime_) "
+        "REFERENCES slot (datetime_) ON DELETE RESTRICT, "
+        "CONSTRAINT fk_reservation_appointment_id_appointment FOREIGN KEY(appointment_id) "
+        "REFERENCES appointment (appointment_id) ON DELETE CASCADE"
+        ") WITHOUT ROWID",
+        "CREATE INDEX ix_reservation_appointment_id ON reservation (appointment_id)",
+    ),
+    # Срок блокировки переводится в минуты только миграцией 6
+    "slot_hold": (
+        "CREATE TABLE slot_hold ("
+        "datetime_ INTEGER NOT NULL, "
+        "client_id INTEGER NOT NULL, "
+        "expires_at DATETIME NOT NULL, "
+        "CONSTRAINT pk_slot_hold PRIMARY KEY (datetime_), "
+        "CONSTRAINT fk_slot_hold_datetime__slot FOREIGN KEY(datetime_) "
+        "REFERENCES slot (datetime_) ON DELETE CASCADE)",
+        "CREATE INDEX ix_slot_hold_client_id ON slot_hold (client_id)",
+        "CREATE INDEX ix_slot_hold_expires_at ON slot_hold (expires_at)",
+    ),
+}
+
+# Таблицы миграции 6
+_HOLDS_EXPIRATION_TABLES = {
+    "slot_hold": (
+        "CREATE TABLE slot_hold ("
+        "datetime_ INTEGER NOT NULL, "
+        "client_id INTEGER NOT NULL, "
+        "expires_at INTEGER NOT NULL, "
+        "CONSTRAINT pk_slot_hold PRIMARY KEY (datetime_), "
+        "CONSTRAINT fk_slot_hold_datetime__slot FOREIGN KEY(datetime_) "
+        "REFERENCES slot (datetime_) ON DELETE CASCADE)",
+        "CREATE INDEX ix_slot_hold_client_id ON slot_hold (client_id)",
+        "CREATE INDEX ix_slot_hold_expires_at ON slot_hold (expires_at)",
+    ),
+    "interval_hold": (
+        "CREATE TABLE interval_hold ("
+        "starts_at INTEGER NOT NULL, "
+        "ends_at INTEGER NOT NULL, "
+        "client_id INTEGER NOT NULL, "
+        "expires_at INTEGER NOT NULL, "
+        "CONSTRAINT pk_interval_hold PRIMARY KEY (starts_at), "
+        "CONSTRAINT ck_interval_hold_ends_at_gt_starts_at CHECK (ends_at > starts_at))",
+        "CREATE INDEX ix_interval_hold_client_id ON interval_hold (client_id)",
+        "CREATE INDEX ix_interval_hold_expires_at ON interval_hold (expires_at)",
+    ),
+}
+
+
+def _to_epoch_minute_sql(column_name: str) -> str:
+    return (
+        f"CASE WHEN typeof({column_name}) = 'integer' THEN {column_name} "
+        f"ELSE CAST(strftime('%s', {column_name}) AS INTEGER) / 60 END"
+    )
+
+
+def _recreate_tables_with_epoch_minutes(
+    conn: Connection,
+    tables_columns: dict[str, tuple[str, ...]],
+    tables_ddl: dict[str, tuple[str, ...]],
+) -> None:
+    """
+    Перевод столбцов с датой и временем из текста в минуты от начала эпохи Unix (см. EpochMinute).
+
+    tables_columns - таблицы (в порядке зависимостей по внешним ключам) и их переводимые столбцы,
+    tables_ddl - описания (CREATE TABLE и CREATE INDEX) пересоздаваемых таблиц.
+    SQLite не умеет менять тип столбца и WITHOUT ROWID у существующей таблицы, поэтому
+    таблицы пересоздаются по описаниям: старые переименовываются, данные копируются
+    с преобразованием, старые удаляются начиная с зависимых (чтобы не сработали
+    действия внешних ключей). Проверки CHECK при копировании отключаются, так как
+    прошедшие слоты и приемы им уже не удовлетворяют.
+    """
+    inspector = inspect(conn)
+    if all(
+        str(column["type"]) == "INTEGER"
+        for table_name, column_names in tables_columns.items()
+        for column in inspector.get_columns(table_name)
+        if column["name"] in column_names
+    ):
+        return None
+    tables_indexes = {table_name: inspector.get_indexes(table_name) for table_name in tables_columns}
+    conn.execute(text("PRAGMA ignore_check_constraints = ON"))
+    try:
+        for table_name, indexes in tables_indexes.items():
+            conn.execute(text(f"ALTER TABLE {table_name} RENAME TO _{table_name}_old"))
+            for index in indexes:
+                conn.execute(text(f"DROP INDEX {index['name']}"))
+        for table_name, column_names in tables_columns.items():
+            for statement in tables_ddl[table_name]:
+                conn.execute(text(statement))
+            table_columns = [column["name"] for column in inspect(conn).get_columns(table_name)]
+            columns = ", ".join(table_columns)
+            values = ", ".join(
+                _to_epoch_minute_sql(column_name) if column_name in column_names else column_name
+                for column_name in table_columns
+            )
+            conn.execute(
+                text(f"INSERT INTO {table_name} ({columns}) SELECT {values} FROM _{table_name}_old")
+            )
+        for table_name in reversed(tables_columns):
+            conn.execute(text(f"DROP TABLE _{table_name}_old"))
+    finally:
+        conn.execute(text("PRAGMA ignore_check_constraints = OFF"))
+
+
+def _store_datetimes_as_epoch_minutes(conn: Connection) -> None:
+    tables_columns = {
+        "slot": ("datetime_",),
+        "appointment": ("starts_at", "ends_at"),
+        "reservation": ("datetime_",),
+        "slot_hold": ("datetime_",),
+    }
+    _recreate_tables_with_epoch_minutes(conn, tables_columns, _EPOCH_MINUTE_TABLES)
+
+
+def _add_working_interval_tables(conn: Connection) -> None:
+    # Срок блокировки переводится в минуты только миграцией 6
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS working_interval ("
+            "starts_at INTEGER NOT NULL, "
+            "ends_at INTEGER NOT NULL, "
+            "CONSTRAINT pk_working_interval PRIMARY KEY (starts_at), "
+            "CONSTRAINT ck_working_interval_ends_at_gt_starts_at CHECK (ends_at > starts_at)"
+            ") WITHOUT ROWID"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_working_interval_ends_at "
+            "ON working_interval (ends_at)"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS interval_hold ("
+            "starts_at INTEGER NOT NULL, "
+            "ends_at INTEGER NOT NULL, "
+            "client_id INTEGER NOT NULL, "
+            "expires_at DATETIME NOT NULL, "
+            "CONSTRAINT pk_interval_hold PRIMARY KEY (starts_at), "
+            "CONSTRAINT ck_interval_hold_ends_at_gt_starts_at CHECK (ends_at > starts_at))"
+        )
+    )
+    conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_interval_hold_client_id ON interval_hold (client_id)")
+    )
+    conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_interval_hold_expires_at ON interval_hold (expires_at)")
+    )
+
+
+def _add_weekly_rule_tables(conn: Connection) -> None:
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS weekly_rule ("
+            "weekly_rule_id INTEGER NOT NULL, "
+            "day_of_week INTEGER NOT NULL, "
+            "starts_at_minute INTEGER NOT NULL, "
+            "ends_at_minute INTEGER NOT NULL, "
+            "CONSTRAINT pk_weekly_rule PRIMARY KEY (weekly_rule_id), "
+            "CONSTRAINT ck_weekly_rule_day_of_week_check CHECK (day_of_week >= 1 and day_of_week <= 7), "
+            "CONSTRAINT ck_weekly_rule_minutes_check CHECK ("
+            "starts_at_minute >= 0 and ends_at_minute <= 1440 and ends_at_minute > starts_at_minute "
+            "and starts_at_minute % 30 == 0 and ends_at_minute % 30 == 0))"
+        )
+    )
+    conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_weekly_rule_day_of_week ON weekly_rule (day_of_week)")
+    )
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS date_exception ("
+            "date_exception_id INTEGER NOT NULL, "
+            "date_ DATE NOT NULL, "
+            "starts_at_minute INTEGER, "
+            "ends_at_minute INTEGER, "
+            "CONSTRAINT pk_date_exception PRIMARY KEY (date_exception_id), "
+            "CONSTRAINT ck_date_exception_minutes_check CHECK ("
+            "(starts_at_minute IS NULL and ends_at_minute IS NULL) or ("
+            "starts_at_minute >= 0 and ends_at_minute <= 1440 and ends_at_minute > starts_at_minute "
+            "and starts_at_minute % 30 == 0 and ends_at_minute % 30 == 0)))"
+        )
+    )
+    conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_date_exception_date_ ON date_exception (date_)")
+    )
+
+
+def _store_holds_expiration_as_epoch_minutes(conn: Connection) -> None:
+    """
+    Перевод срока блокировок из текста в минуты от начала эпохи Unix.
+
+    Секунды отбрасываются: действующие блокировки могут истечь не более чем на минуту раньше.
+    """
+    tables_columns = {"slot_hold": ("expires_at",), "interval_hold": ("expires_at",)}
+    _recreate_tables_with_epoch_minutes(conn, tables_columns, _HOLDS_EXPIRATION_TABLES)
+    # Прежние версии миграций 3 и 4 создавали таблицы блокировок сразу с типом INTEGER,
+    # но срок блокировки записывался в них текстом
+    for table_name, column_names in tables_columns.items():
+        for column_name in column_names:
+            conn.execute(
+                text(
+                    f"UPDATE {table_name} SET {column_name} = {_to_epoch_minute_sql(column_name)} "
+                    f"WHERE typeof({column_name}) != 'integer'"
+                )
+            )
+
+
+def _add_schedule_storage_state_table(conn: Connection) -> None:
+    """
+    Способ хранения графика работы определяется по имеющимся данным: прежде перевод выполнялся
+    при запуске бота, поэтому данные уже находятся в одном способе хранения. База без графика
+    работы получает способ хранения из настроек.
+    """
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schedule_storage_state ("
+            "storage VARCHAR(20) NOT NULL, "
+            "CONSTRAINT pk_schedule_storage_state PRIMARY KEY (storage))"
+        )
+    )
+    if conn.scalar(text("SELECT 1 FROM slot LIMIT 1")) is not None:
+        storage = ScheduleStorage.SLOTS
+    elif conn.scalar(text("SELECT 1 FROM working_interval LIMIT 1")) is not None:
+        storage = ScheduleStorage.INTERVALS
+    elif (
+        conn.scalar(text("SELECT 1 FROM weekly_rule LIMIT 1")) is not None
+        or conn.scalar(text("SELECT 1 FROM date_exception LIMIT 1")) is not None
+    ):
+        storage = ScheduleStorage.RULES
+    else:
+        storage = SCHEDULE_STORAGE
+    set_schedule_storage(conn, storage)
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(1, "Индексы для частых запросов", _add_hot_path_indexes),
+    Migration(2, "Временные блокировки слотов", _add_slot_hold_table),
+    Migration(3, "Дата и время слотов в минутах от начала эпохи Unix", _store_datetimes_as_epoch_minutes),
+    Migration(4, "Хранение графика работы интервалами", _add_working_interval_tables),
+    Migration(5, "Еженедельные шаблоны графика работы", _add_weekly_rule_tables),
+    Migration(6, "Срок блокировок в минутах от начала эпохи Unix", _store_holds_expiration_as_epoch_minutes),
+    Migration(7, "Способ хранения графика работы в базе данных", _add_schedule_storage_state_table),
+)
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def get_schema_version(conn: Connection) -> int:
+    return conn.execute(text("PRAGMA user_version")).scalar_one()
+
+
+def set_schema_version(conn: Connection, version: int) -> None:
+    # PRAGMA не поддерживает параметры запроса
+    conn.execute(text(f"PRAGMA user_version = {int(version)}"))
+
+
+def get_schedule_storage(conn: Connection) -> ScheduleStorage:
+    return ScheduleStorage(conn.execute(select(ScheduleStorageState.storage)).scalar_one())
+
+
+def set_schedule_storage(conn: Connection, storage: ScheduleStorage) -> None:
+    conn.execute(delete(ScheduleStorageState.__table__))
+    conn.execute(insert(ScheduleStorageState.__table__), [{"storage": storage.value}])
+
+
+def upgrade_schema(conn: Connection) -> None:
+    """
+    Приведение схемы базы данных к последней версии.
+
+    Новая (пустая) база создается по ORM моделям и сразу получает последнюю версию,
+    для существующей базы по порядку применяются еще не примененные миграции.
+    Версия схемы хранится в PRAGMA user_version. Новая база хранит график работы способом
+    из настроек SCHEDULE_STORAGE, способ хранения существующей базы меняется только
+    переводом convert_schedule_storage.
+    """
+    if not inspect(conn).get_table_names():
+        Base.metadata.create_all(conn)
+        set_schedule_storage(conn, SCHEDULE_STORAGE)
+        set_schema_version(conn, LATEST_SCHEMA_VERSION)
+        logger.info("Создана схема базы данных версии %s", LATEST_SCHEMA_VERSION)
+        return None
+    current_version = get_schema_version(conn)
+    for migration in MIGRATIONS:
+        if migration.version <= current_version:
+            continue
+        logger.info("Применение миграции %s: %s", migration.version, migration.description)
+        migration.upgrade(conn)
+        set_schema_version(conn, migration.version)
+    Base.metadata.create_all(conn)
+
+
+def convert_slots_to_intervals(conn: Connection) -> int:
+    """
+    Перевод графика работы, хранящегося слотами, в рабочие интервалы (SCHEDULE_STORAGE = intervals).
+
+    Слоты объединяются в интервалы вместе с уже существующими рабочими интервалами,
+    после чего удаляются вместе с бронированиями (бронированием служит интервал приема)
+    и блокировками слотов. Возвращается количество перенесенных слотов,
+    повторный вызов ничего не меняет.
+    """
+    slots = conn.scalars(select(Slot.datetime_)).all()
+    if not slots:
+        return 0
+    existing = [
+        (start, end)
+        for start, end in conn.execute(select(WorkingInterval.starts_at, WorkingInterval.ends_at))
+    ]
+    intervals = merge_intervals(existing + get_intervals_by_slots(slots))
+    conn.execute(delete(SlotHold.__table__))
+    conn.execute(delete(Reservation.__table__))
+    conn.execute(delete(Slot.__table__))
+    conn.execute(delete(WorkingInterval.__table__))
+    conn.execute(
+        insert(WorkingInterval.__table__),
+        [{"starts_at": start, "ends_at": end} for start, end in intervals],
+    )
+    logger.info("Слотов переведено в рабочие интервалы: %s (интервалов: %s)", len(slots), len(intervals))
+    return len(slots)
+
+
+def convert_working_intervals_to_date_exceptions(conn: Connection) -> int:
+    """
+    Перевод рабочих интервалов в исключения по датам (SCHEDULE_STORAGE = rules).
+
+    Рабочее время каждой даты (в часовом поясе TIMEZONE) объединяется с уже имеющимся
+    исключением этой даты, рабочие интервалы удаляются. Возвращается количество дат,
+    повторный вызов ничего не меняет.
+    """
+    intervals = [
+        (start, end)
+        for start, end in conn.execute(
+            select(WorkingInterval.starts_at, WorkingInterval.ends_at).order_by(WorkingInterval.starts_at)
+        )
+    ]
+    if not intervals:
+        return 0
+    dates_intervals: dict[date, list[Interval]] = {}
+    for start, end in intervals:
+        tz_date, last_tz_date = to_tz_date(start, TIMEZONE), to_tz_date(end - timedelta(minutes=1), TIMEZONE)
+        while tz_date <= last_tz_date:
+            day_start, day_end = get_utc_day_bounds(tz_date, TIMEZONE)
+            dates_intervals.setdefault(tz_date, []).extend(clip_intervals([(start, end)], day_start, day_end))
+            tz_date += timedelta(days=1)
+    exceptions = conn.execute(
+        select(DateException.date_, DateException.starts_at_minute, DateException.ends_at_minute)
+        .where(DateException.date_.in_(list(dates_intervals)))
+    )
+    for tz_date, start_minute, end_minute in exceptions:
+        if start_minute is not None:
+            dates_intervals[tz_date].extend(get_day_intervals(tz_date, [(start_minute, end_minute)], TIMEZONE))
+    conn.execute(delete(DateException.__table__).where(DateException.date_.in_(list(dates_intervals))))
+    conn.execute(
+        insert(DateException.__table__),
+        [
+            {"date_": tz_date, "starts_at_minute": start_minute, "ends_at_minute": end_minute}
+            for tz_date, day_intervals in dates_intervals.items()
+            for start_minute, end_minute in get_day_minutes(tz_date, merge_intervals(day_intervals), TIMEZONE)
+        ],
+    )
+    conn.execute(delete(WorkingInterval.__table__))
+    logger.info("Рабочие интервалы переведены в исключения по датам: %s", len(dates_intervals))
+    return len(dates_intervals)
+
+
+def convert_schedule_storage(conn: Connection, storage: ScheduleStorage) -> None:
+    """
+    Перевод графика работы базы данных в способ хранения storage (python -m src.migrations).
+
+    Перевод выполняется только вперед: slots -> intervals -> rules (слоты объединяются
+    в рабочие интервалы, рабочие интервалы - в исключения по датам). Обратный перевод
+    потерял бы данные, поэтому вызывает ScheduleStorageConversionError.
+    Новый способ хранения записывается в базу данных (см. check_schema).
+    """
+    current_storage = get_schedule_storage(conn)
+    storages = list(ScheduleStorage)
+    if storages.index(storage) < storages.index(current_storage):
+        raise ScheduleStorageConversionError(
+            f"График работы хранится способом {current_storage}, перевод в {storage} не поддерживается"
+        )
+    if current_storage is ScheduleStorage.SLOTS and storage is not ScheduleStorage.SLOTS:
+        convert_slots_to_intervals(conn)
+    if current_storage is not ScheduleStorage.RULES and storage is ScheduleStorage.RULES:
+        convert_working_intervals_to_date_exceptions(conn)
+    set_schedule_storage(conn, storage)
+    logger.info("График работы хранится способом %s", storage)
+
+
+def get_schema_mismatches(conn: Connection) -> list[str]:
+    """Получение списка расхождений схемы базы данных с ORM моделями."""
+    mismatches = []
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            mismatches.append(f"Нет таблицы {table.name}")
+            continue
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                mismatches.append(f"Нет столбца {table.name}.{column.name}")
+        existing_indexes = {
+            index["name"]: (tuple(index["column_names"]), bool(index["unique"]))
+            for index in inspector.get_indexes(table.name)
+        }
+        for index in table.indexes:
+            expected = (tuple(column.name for column in index.columns), bool(index.unique))
+            if index.name not in existing_indexes:
+                mismatches.append(f"Нет индекса {index.name}")
+            elif existing_indexes[index.name] != expected:
+                mismatches.append(f"Индекс {index.name} отличается от описанного в моделях")
+    return mismatches
+
+
+def check_schema(conn: Connection, storage: ScheduleStorage = SCHEDULE_STORAGE) -> None:
+    """
+    Вызывает SchemaMismatchError если схема базы данных не соответствует ORM моделям
+    или график работы хранится не способом storage.
+    """
+    schema_version = get_schema_version(conn)
+    if schema_version != LATEST_SCHEMA_VERSION:
+        raise SchemaMismatchError(
+            f"Версия схемы {schema_version}, ожидается {LATEST_SCHEMA_VERSION}"
+        )
+    mismatches = get_schema_mismatches(conn)
+    if mismatches:
+        raise SchemaMismatchError("; ".join(mismatches))
+    schedule_storage = get_schedule_storage(conn)
+    if schedule_storage is not storage:
+        raise SchemaMismatchError(
+            f"График работы хранится способом {schedule_storage}, ожидается {storage}: "
+            f"выполните перевод python -m src.migrations {storage}"
+        )
+
+
+def main() -> None:
+    """Приведение схемы базы данных к последней версии и перевод графика работы в другой способ хранения."""
+    parser = argparse.ArgumentParser(description="Перевод графика работы в другой способ хранения")
+    parser.add_argument("storage", type=ScheduleStorage, choices=list(ScheduleStorage))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    engine = create_engine(make_url(db_url).set(drivername="sqlite"))
+    try:
+        with engine.begin() as conn:
+            upgrade_schema(conn)
+            try:
+                convert_schedule_storage(conn, args.storage)
+            except ScheduleStorageConversionError as error:
+                parser.error(str(error))
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,21 @@
 """ORM модели."""
 
-from datetime import datetime
+from datetime import date, datetime, timedelta, timezone
+from typing import NamedTuple
 
 from sqlalchemy import (
     Boolean,
     CheckConstraint,
-    DateTime,
+    Date,
+    Dialect,
     ForeignKey,
+    Index,
     Integer,
     MetaData,
     String,
+    TypeDecorator,
     false,
+    text,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
@@ -28,6 +33,34 @@ constraint_naming_conventions = {
 
 metadata = MetaData(naming_convention=constraint_naming_conventions)
 
+EPOCH = datetime(1970, 1, 1)
+# Текущее время в минутах от начала эпохи Unix (для CHECK ограничений столбцов EpochMinute)
+CURRENT_EPOCH_MINUTE = "(CAST(strftime('%s', CURRENT_TIMESTAMP) AS INTEGER) / 60)"
+
+
+class EpochMinute(TypeDecorator):
+    """
+    Дата и время UTC, хранящиеся целым числом минут от начала эпохи Unix.
+
+    Принимаются наивные (UTC) и осведомленные о часовом поясе datetime, секунды отбрасываются.
+    Возвращаются наивные datetime в UTC, как и для DateTime.
+    """
+
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value: datetime | None, dialect: Dialect) -> int | None:
+        if value is None:
+            return None
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return (value - EPOCH) // timedelta(minutes=1)
+
+    def process_result_value(self, value: int | None, dialect: Dialect) -> datetime | None:
+        if value is None:
+            return None
+        return EPOCH + timedelta(minutes=value)
+
 
 class Base(DeclarativeBase):
     metadata = metadata
@@ -44,6 +77,7 @@ class Service(Base):
             f"(duration % {DURATION_MULTIPLIER}) == 0 and duration > 0 and duration < {MAX_DURATION}",
             name="duration_check"
         ),
+        Index("uq_service_name_not_deleted", "name", unique=True, sqlite_where=text("NOT deleted")),
         {"comment": "Услуга (например, 'Стрижка модельная')"},
     )
 
@@ -86,7 +120,9 @@ class Service(Base):
 class Appointment(Base):
     __tablename__ = "appointment"
     __table_args__ = (
-        CheckConstraint("starts_at > CURRENT_TIMESTAMP", name="starts_at_gt_current_timestamp"),
+        CheckConstraint(f"starts_at > {CURRENT_EPOCH_MINUTE}", name="starts_at_gt_current_timestamp"),
+        Index("ix_appointment_client_id_starts_at", "client_id", "starts_at"),
+        Index("ix_appointment_starts_at", "starts_at"),
         {"comment": "Прием (оказание услуги)"},
     )
 
@@ -108,12 +144,12 @@ class Appointment(Base):
         comment="Идентификатор услуги",
     )
     starts_at: Mapped[datetime] = mapped_column(
-        DateTime,
+        EpochMinute,
         nullable=False,
         comment="Дата и время начала приема (UTC, должно быть кратно 30 минутам)",
     )
     ends_at: Mapped[datetime] = mapped_column(
-        DateTime,
+        EpochMinute,
         nullable=False,
         comment="Дата и время окончания приема (UTC, должно быть кратно 30 минутам)",
     )
@@ -121,15 +157,23 @@ class Appointment(Base):
     service: Mapped["Service"] = relationship(back_populates="appointments", lazy="joined")
 
 
+class AppointmentRow(NamedTuple):
+    """Прием без объекта ORM (см. stream_active_appointments): начало и конец (UTC) и название услуги."""
+
+    starts_at: datetime
+    ends_at: datetime
+    service_name: str
+
+
 class Slot(Base):
     __tablename__ = "slot"
     __table_args__ = (
-        CheckConstraint("datetime_ > CURRENT_TIMESTAMP", name="datetime__gt_current_timestamp"),
-        {"comment": "Слоты приема (30 минутные интервалы)"},
+        CheckConstraint(f"datetime_ > {CURRENT_EPOCH_MINUTE}", name="datetime__gt_current_timestamp"),
+        {"comment": "Слоты приема (30 минутные интервалы)", "sqlite_with_rowid": False},
     )
 
     datetime_: Mapped[datetime] = mapped_column(
-        DateTime,
+        EpochMinute,
         primary_key=True,
         nullable=False,
         comment="Дата и время слота (UTC)",
@@ -139,8 +183,9 @@ class Slot(Base):
 class Reservation(Base):
     __tablename__ = "reservation"
     __table_args__ = (
-        CheckConstraint("datetime_ > CURRENT_TIMESTAMP", name="datetime__gt_current_timestamp"),
-        {"comment": "Бронирование слотов (запись на прием)"},
+        CheckConstraint(f"datetime_ > {CURRENT_EPOCH_MINUTE}", name="datetime__gt_current_timestamp"),
+        Index("ix_reservation_appointment_id", "appointment_id"),
+        {"comment": "Бронирование слотов (запись на прием)", "sqlite_with_rowid": False},
     )
 
     datetime_: Mapped[datetime] = mapped_column(
@@ -154,3 +199,185 @@ class Reservation(Base):
         nullable=False,
         comment="Идентификатор приема (оказания услуги)",
     )
+
+
+class SlotHold(Base):
+    __tablename__ = "slot_hold"
+    __table_args__ = (
+        Index("ix_slot_hold_client_id", "client_id"),
+        Index("ix_slot_hold_expires_at", "expires_at"),
+        {"comment": "Временная блокировка слотов клиентом на время подтверждения записи"},
+    )
+
+    datetime_: Mapped[datetime] = mapped_column(
+        ForeignKey("slot.datetime_", ondelete="CASCADE"),
+        primary_key=True,
+        nullable=False,
+        comment="Дата и время слота (UTC)",
+    )
+    client_id: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        comment="Идентификатор клиента (телеграмм ID)",
+    )
+    expires_at: Mapped[datetime] = mapped_column(
+        EpochMinute,
+        nullable=False,
+        comment="Дата и время окончания блокировки (UTC, с точностью до минуты)",
+    )
+
+
+class WorkingInterval(Base):
+    __tablename__ = "working_interval"
+    __table_args__ = (
+        CheckConstraint("ends_at > starts_at", name="ends_at_gt_starts_at"),
+        Index("ix_working_interval_ends_at", "ends_at"),
+        {
+            "comment": "Непрерывные интервалы рабочего времени (при хранении графика работы интервалами)",
+            "sqlite_with_rowid": False,
+        },
+    )
+
+    starts_at: Mapped[datetime] = mapped_column(
+        EpochMinute,
+        primary_key=True,
+        nullable=False,
+        comment="Дата и время начала интервала (UTC, кратно 30 минутам)",
+    )
+    ends_at: Mapped[datetime] = mapped_column(
+        EpochMinute,
+        nullable=False,
+        comment="Дата и время окончания интервала (UTC, кратно 30 минутам, не включается в интервал)",
+    )
+
+
+class IntervalHold(Base):
+    __tablename__ = "interval_hold"
+    __table_args__ = (
+        CheckConstraint("ends_at > starts_at", name="ends_at_gt_starts_at"),
+        Index("ix_interval_hold_client_id", "client_id"),
+        Index("ix_interval_hold_expires_at", "expires_at"),
+        {"comment": "Временная блокировка интервала клиентом (при хранении графика работы интервалами)"},
+    )
+
+    starts_at: Mapped[datetime] = mapped_column(
+        EpochMinute,
+        primary_key=True,
+        nullable=False,
+        comment="Дата и время начала интервала (UTC)",
+    )
+    ends_at: Mapped[datetime] = mapped_column(
+        EpochMinute,
+        nullable=False,
+        comment="Дата и время окончания интервала (UTC, не включается в интервал)",
+    )
+    client_id: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        comment="Идентификатор клиента (телеграмм ID)",
+    )
+    expires_at: Mapped[datetime] = mapped_column(
+        EpochMinute,
+        nullable=False,
+        comment="Дата и время окончания блокировки (UTC, с точностью до минуты)",
+    )
+
+
+# Время внутри дня для еженедельных шаблонов и исключений хранится в минутах от начала дня
+MINUTES_IN_DAY = 24 * 60
+_DAY_MINUTES_CHECK = (
+    f"starts_at_minute >= 0 and ends_at_minute <= {MINUTES_IN_DAY} and ends_at_minute > starts_at_minute "
+    f"and starts_at_minute % {DURATION_MULTIPLIER} == 0 and ends_at_minute % {DURATION_MULTIPLIER} == 0"
+)
+
+
+class WeeklyRule(Base):
+    __tablename__ = "weekly_rule"
+    __table_args__ = (
+        CheckConstraint("day_of_week >= 1 and day_of_week <= 7", name="day_of_week_check"),
+        CheckConstraint(_DAY_MINUTES_CHECK, name="minutes_check"),
+        Index("ix_weekly_rule_day_of_week", "day_of_week"),
+        {"comment": "Еженедельный шаблон графика работы (при хранении графика работы шаблонами)"},
+    )
+
+    weekly_rule_id: Mapped[int] = mapped_column(
+        Integer,
+        primary_key=True,
+        nullable=False,
+        autoincrement=True,
+        comment="Идентификатор интервала шаблона",
+    )
+    day_of_week: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        comment="День недели (1 - понедельник, 7 - воскресенье)",
+    )
+    starts_at_minute: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        comment="Начало рабочего интервала (в минутах от начала дня, местное время)",
+    )
+    ends_at_minute: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        comment="Окончание рабочего интервала (в минутах от начала дня, местное время, не включается)",
+    )
+
+
+class DateException(Base):
+    __tablename__ = "date_exception"
+    __table_args__ = (
+        CheckConstraint(
+            f"(starts_at_minute IS NULL and ends_at_minute IS NULL) or ({_DAY_MINUTES_CHECK})",
+            name="minutes_check",
+        ),
+        Index("ix_date_exception_date_", "date_"),
+        {
+            "comment": (
+                "Исключение из еженедельного шаблона на дату: рабочие интервалы даты заменяют шаблон, "
+                "строка без интервала означает выходной"
+            ),
+        },
+    )
+
+    date_exception_id: Mapped[int] = mapped_column(
+        Integer,
+        primary_key=True,
+        nullable=False,
+        autoincrement=True,
+        comment="Идентификатор исключения",
+    )
+    date_: Mapped[date] = mapped_column(
+        Date,
+        nullable=False,
+        comment="Дата (местная)",
+    )
+    starts_at_minute: Mapped[int | None] = mapped_column(
+        Integer,
+        nullable=True,
+        comment="Начало рабочего интервала (в минутах от начала дня, местное время)",
+    )
+    ends_at_minute: Mapped[int | None] = mapped_column(
+        Integer,
+        nullable=True,
+        comment="Окончание рабочего интервала (в минутах от начала дня, местное время, не включается)",
+    )
+
+
+class ScheduleStorageState(Base):
+    __tablename__ = "schedule_storage_state"
+    __table_args__ = (
+        {
+            "comment": (
+                "Способ хранения графика работы, в котором находятся данные базы (единственная строка, "
+                "меняется только переводом convert_schedule_storage)"
+            ),
+        },
+    )
+
+    storage: Mapped[str] = mapped_column(
+        String(20),
+        primary_key=True,
+        nullable=False,
+        comment="Способ хранения графика работы (slots, intervals или rules)",
+    )
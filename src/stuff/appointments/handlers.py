@@ -2,10 +2,13 @@ from aiogram import Bot, types
 from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from src.availability import AvailabilityCache
 from src.stuff.appointments.keyboards import AppointmentDateTimePicker
 from src.stuff.appointments.logic import (
     appointment_confirmed_logic,
+    back_from_confirm_appointment_logic,
     cancel_choose_date_for_appointment_logic,
+    cancel_confirm_appointment_logic,
     choose_appointments_action_logic,
     choose_service_for_appointment_logic,
     go_to_choose_day_for_appointment_logic,
@@ -15,6 +18,7 @@ from src.stuff.appointments.logic import (
     go_to_confirm_appointment_logic,
 )
 from src.stuff.common.handlers import process_logic_return
+from src.writer import DatabaseWriter
 
 
 async def choose_appointments_action(
@@ -36,13 +40,20 @@ async def choose_appointments_action(
 async def choose_service_for_appointment(
     message: types.Message,
     async_session: async_sessionmaker[AsyncSession],
+    availability_cache: AvailabilityCache,
     state: FSMContext,
 ) -> None:
-    if not message.text:
+    if not message.text or not message.from_user:
         return None
     data = await state.get_data()
     async with async_session() as session:
-        result = await choose_service_for_appointment_logic(message.text, data, session)
+        result = await choose_service_for_appointment_logic(
+            message.text,
+            message.from_user.id,
+            data,
+            session,
+            availability_cache,
+        )
     await process_logic_return(result, fsm_context=state, message=message)
 
 
@@ -85,11 +96,37 @@ async def go_to_choose_time_for_appointment(
     callback: types.CallbackQuery,
     callback_data: AppointmentDateTimePicker,
     state: FSMContext,
+    availability_cache: AvailabilityCache,
+) -> None:
+    if not callback.message:
+        return None
+    data = await state.get_data()
+    result = await go_to_choose_time_for_appointment_logic(
+        data,
+        callback_data,
+        callback.from_user.id,
+        availability_cache,
+    )
+    await process_logic_return(result, fsm_context=state, callback=callback)
+
+
+async def back_from_confirm_appointment(
+    callback: types.CallbackQuery,
+    callback_data: AppointmentDateTimePicker,
+    state: FSMContext,
+    db_writer: DatabaseWriter,
+    availability_cache: AvailabilityCache,
 ) -> None:
     if not callback.message:
         return None
     data = await state.get_data()
-    result = go_to_choose_time_for_appointment_logic(data, callback_data)
+    result = await back_from_confirm_appointment_logic(
+        data,
+        callback_data,
+        callback.from_user.id,
+        db_writer,
+        availability_cache,
+    )
     await process_logic_return(result, fsm_context=state, callback=callback)
 
 
@@ -97,11 +134,19 @@ async def go_to_confirm_appointment(
     callback: types.CallbackQuery,
     callback_data: AppointmentDateTimePicker,
     state: FSMContext,
+    db_writer: DatabaseWriter,
+    availability_cache: AvailabilityCache,
 ) -> None:
     if not callback.message:
         return None
     data = await state.get_data()
-    result = go_to_confirm_appointment_logic(data, callback_data)
+    result = await go_to_confirm_appointment_logic(
+        data,
+        callback_data,
+        callback.from_user.id,
+        db_writer,
+        availability_cache,
+    )
     await process_logic_return(result, fsm_context=state, callback=callback)
 
 
@@ -110,12 +155,21 @@ async def appointment_confirmed(
     callback_data: AppointmentDateTimePicker,
     state: FSMContext,
     async_session: async_sessionmaker[AsyncSession],
+    db_writer: DatabaseWriter,
+    availability_cache: AvailabilityCache,
     bot: Bot,
 ) -> None:
     if not callback.message:
         return None
     data = await state.get_data()
-    result = await appointment_confirmed_logic(callback, data, callback_data, async_session)
+    result = await appointment_confirmed_logic(
+        callback,
+        data,
+        callback_data,
+        async_session,
+        db_writer,
+        availability_cache,
+    )
     await process_logic_return(result, fsm_context=state, callback=callback, bot=bot)
 
 
@@ -127,3 +181,14 @@ async def cancel_choose_date_for_appointment(
         return None
     result = cancel_choose_date_for_appointment_logic()
     await process_logic_return(result, fsm_context=state, callback=callback)
+
+
+async def cancel_confirm_appointment(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    db_writer: DatabaseWriter,
+) -> None:
+    if not callback.message:
+        return None
+    result = await cancel_confirm_appointment_logic(callback.from_user.id, db_writer)
+    await process_logic_return(result, fsm_context=state, callback=callback)
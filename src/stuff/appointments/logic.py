@@ -1,16 +1,16 @@
-from datetime import datetime, time, timedelta
+from datetime import date, datetime, time, timedelta
 from aiogram import types
-from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from src import messages
-from src.config import TIMEZONE
+from src.availability import AvailabilityCache, ClientAvailability
+from src.config import SLOT_HOLD_TTL, TIMEZONE
 from src.database import (
-    get_active_appointments,
-    get_available_slots,
+    book_appointment,
     get_services,
-    insert_appointment,
-    insert_reservations,
+    hold_slots,
+    release_slot_holds,
+    stream_active_appointments,
 )
 from src.models import Appointment
 from src.secrets import ADMIN_TG_ID
@@ -38,7 +38,6 @@ from src.stuff.appointments.utils import (
     get_days_keyboard_buttons,
     get_months_keyboard_buttons,
     get_times_keyboard_buttons,
-    get_times_possible_for_appointment,
     get_years_keyboard_buttons,
 )
 from src.stuff.base.logic import LogicResult, MessageToAnswer, MessageToSend, get_logic_result
@@ -51,9 +50,9 @@ from src.stuff.common.utils import (
     from_utc,
     get_utc_now,
     get_years_with_months,
-    get_years_with_months_days,
     to_utc,
 )
+from src.writer import DatabaseWriter
 
 
 async def choose_appointments_action_logic(
@@ -80,8 +79,10 @@ async def choose_appointments_action_logic(
             return get_logic_result(messages_to_answer, state_to_set, data_to_set)
     elif upper_text == SHOW_ACTIVE_ZAPISI.upper():
         utc_now = get_utc_now()
-        appointments = await get_active_appointments(session, utc_now, filter_by={"client_id": user_id})
-        text = form_appointments_list_text(appointments, for_admin=False)
+        text = await form_appointments_list_text(
+            stream_active_appointments(session, utc_now, client_id=user_id),
+            for_admin=False,
+        )
         messages_to_answer = [ MessageToAnswer(text, appointments_keyboard) ]
         return get_logic_result(messages_to_answer)
     else:
@@ -91,8 +92,10 @@ async def choose_appointments_action_logic(
 
 async def choose_service_for_appointment_logic(
     user_input: str,
+    client_id: int,
     state_data: dict,
     session: AsyncSession,
+    availability_cache: AvailabilityCache,
 ) -> LogicResult:
     text = user_input.strip()
     upper_text = text.upper()
@@ -122,9 +125,9 @@ async def choose_service_for_appointment_logic(
             [service] = services
             utc_now = get_utc_now()
             tz_now = from_utc(utc_now, TIMEZONE)
-            slots = await get_available_slots(session, utc_now)
-            times_dict = await get_times_possible_for_appointment(service, slots)
-            if not times_dict:
+            availability = await availability_cache.get_availability(service.duration, utc_now, client_id)
+            available_days = availability.get_days()
+            if not available_days:
                 messages_to_answer = [
                     MessageToAnswer(
                         messages.NO_POSSIBLE_TIMES_FOR_SERVICE.format(name=service.name),
@@ -133,11 +136,10 @@ async def choose_service_for_appointment_logic(
                 ]
                 return get_logic_result(messages_to_answer)
             else:
-                years_with_months_days = get_years_with_months_days(times_dict)
-                chosen_year = min(years_with_months_days.keys())
-                chosen_month = min(years_with_months_days[chosen_year].keys())
+                chosen_year = min(available_days.keys())
+                chosen_month = min(available_days[chosen_year].keys())
                 days_to_choose = get_days_keyboard_buttons(
-                    years_with_months_days,
+                    available_days,
                     tz_now,
                     chosen_year,
                     chosen_month,
@@ -155,7 +157,8 @@ async def choose_service_for_appointment_logic(
                 state_to_set = MakeAppointment.choose_day
                 data_to_set = {
                     "chosen_service_name": service.name,
-                    "times_dict": times_dict,
+                    "chosen_service_duration": service.duration,
+                    "available_days": available_days,
                 }
                 return get_logic_result(messages_to_answer, state_to_set, data_to_set)
 
@@ -163,8 +166,8 @@ async def choose_service_for_appointment_logic(
 def go_to_choose_year_for_appointment_logic(
     state_data: dict,
 ) -> LogicResult:
-    times_dict = state_data["times_dict"]
-    years = list(times_dict.keys())
+    available_days = state_data["available_days"]
+    years = list(available_days.keys())
     utc_now = get_utc_now()
     tz_now = from_utc(utc_now, TIMEZONE)
     years_keyboard_buttons = get_years_keyboard_buttons(years, tz_now)
@@ -178,11 +181,11 @@ def go_to_choose_month_for_appointment_logic(
     state_data: dict,
     callback_data: AppointmentDateTimePicker,
 ) -> LogicResult:
-    times_dict = state_data["times_dict"]
+    available_days = state_data["available_days"]
     utc_now = get_utc_now()
     tz_now = from_utc(utc_now, TIMEZONE)
     chosen_year = callback_data.year
-    years_with_months = get_years_with_months(times_dict)
+    years_with_months = get_years_with_months(available_days)
     months_keyboard_buttons = get_months_keyboard_buttons(
         years_with_months,
         tz_now,
@@ -198,14 +201,13 @@ def go_to_choose_day_for_appointment_logic(
     state_data: dict,
     callback_data: AppointmentDateTimePicker,
 ) -> LogicResult:
-    times_dict = state_data["times_dict"]
+    available_days = state_data["available_days"]
     utc_now = get_utc_now()
     tz_now = from_utc(utc_now, TIMEZONE)
     chosen_year = callback_data.year
     chosen_month = callback_data.month
-    years_with_months_days = get_years_with_months_days(times_dict)
     days_keyboard_buttons = get_days_keyboard_buttons(
-        years_with_months_days,
+        available_days,
         tz_now,
         chosen_year,
         chosen_month,
@@ -216,18 +218,25 @@ def go_to_choose_day_for_appointment_logic(
     return get_logic_result(state_to_set=state_to_set, edit_message=edit_message)
 
 
-def go_to_choose_time_for_appointment_logic(
+async def go_to_choose_time_for_appointment_logic(
     state_data: dict,
     callback_data: AppointmentDateTimePicker,
+    client_id: int,
+    availability_cache: AvailabilityCache,
 ) -> LogicResult:
-    times_dict = state_data["times_dict"]
+    chosen_service_duration = state_data["chosen_service_duration"]
     utc_now = get_utc_now()
     tz_now = from_utc(utc_now, TIMEZONE)
     chosen_year = callback_data.year
     chosen_month = callback_data.month
     chosen_day = callback_data.day
+    availability = await availability_cache.get_availability(chosen_service_duration, utc_now, client_id)
+    day_times = availability.get_times(date(chosen_year, chosen_month, chosen_day))
+    if not day_times:
+        tz_chosen_day = TIMEZONE.localize(datetime(chosen_year, chosen_month, chosen_day))
+        return _chosen_datetime_not_available_result(availability, tz_chosen_day, tz_now)
     times_keyboard_buttons = get_times_keyboard_buttons(
-        times_dict,
+        {chosen_year: {chosen_month: {chosen_day: day_times}}},
         tz_now,
         chosen_year,
         chosen_month,
@@ -244,11 +253,102 @@ def go_to_choose_time_for_appointment_logic(
     return get_logic_result(state_to_set=state_to_set, edit_message=edit_message)
 
 
-def go_to_confirm_appointment_logic(
+def _chosen_datetime_not_available_result(
+    availability: ClientAvailability,
+    tz_starts_at: datetime,
+    tz_now: datetime,
+) -> LogicResult:
+    """Возврат к выбору даты и времени, если выбранное время стало недоступно для записи."""
+    chosen_year = tz_starts_at.year
+    chosen_month = tz_starts_at.month
+    chosen_day = tz_starts_at.day
+    available_days = availability.get_days()
+    if not available_days:
+        data_to_set = {}
+        state_to_set = MakeAppointment.choose_action
+        messages_to_answer = [
+            MessageToAnswer(
+                messages.NO_POSSIBLE_TIMES_FOR_SERVICE,
+                appointments_keyboard,
+            ),
+        ]
+        return get_logic_result(
+            messages_to_answer=messages_to_answer,
+            state_to_set=state_to_set,
+            data_to_set=data_to_set,
+        )
+    day_times = availability.get_times(tz_starts_at.date())
+    data_to_update = {"available_days": available_days}
+    try:
+        check_chosen_datetime_is_possible(tz_starts_at, available_days, day_times)
+    except DateTimeBecomeNotAvailable as err:
+        if isinstance(err, YearBecomeNotAvailable):
+            state_to_set = MakeAppointment.choose_year
+            message_to_edit_to = messages.CHOOSE_YEAR
+            years = list(available_days.keys())
+            years_keyboard_buttons = get_years_keyboard_buttons(years, tz_now)
+            keyboard_to_show = get_years_keyboard(years_keyboard_buttons)
+        elif isinstance(err, MonthBecomeNotAvailable):
+            state_to_set = MakeAppointment.choose_month
+            message_to_edit_to = messages.CHOOSE_MONTH
+            years_with_months = get_years_with_months(available_days)
+            months_keyboard_buttons = get_months_keyboard_buttons(
+                years_with_months,
+                tz_now,
+                chosen_year,
+            )
+            keyboard_to_show = get_months_keyboard(chosen_year, months_keyboard_buttons)
+        elif isinstance(err, DayBecomeNotAvailable):
+            state_to_set = MakeAppointment.choose_day
+            message_to_edit_to = messages.CHOOSE_DAY
+            days_keyboard_buttons = get_days_keyboard_buttons(
+                available_days,
+                tz_now,
+                chosen_year,
+                chosen_month,
+            )
+            keyboard_to_show = get_days_keyboard(
+                chosen_year,
+                chosen_month,
+                days_keyboard_buttons,
+            )
+        else:
+            state_to_set = MakeAppointment.choose_time
+            message_to_edit_to = messages.CHOOSE_TIME
+            times_keyboard_buttons = get_times_keyboard_buttons(
+                {chosen_year: {chosen_month: {chosen_day: day_times}}},
+                tz_now,
+                chosen_year,
+                chosen_month,
+                chosen_day,
+            )
+            keyboard_to_show = get_times_keyboard(
+                chosen_year,
+                chosen_month,
+                chosen_day,
+                times_keyboard_buttons,
+            )
+        edit_message = MessageToAnswer(message_to_edit_to, keyboard_to_show)
+        alert_text = str(err)
+        return get_logic_result(
+            state_to_set=state_to_set,
+            data_to_update=data_to_update,
+            edit_message=edit_message,
+            alert_text=alert_text,
+        )
+    else:
+        assert False
+
+
+async def go_to_confirm_appointment_logic(
     state_data: dict,
     callback_data: AppointmentDateTimePicker,
+    client_id: int,
+    db_writer: DatabaseWriter,
+    availability_cache: AvailabilityCache,
 ) -> LogicResult:
     chosen_service_name = state_data["chosen_service_name"]
+    chosen_service_duration = state_data["chosen_service_duration"]
     chosen_year = callback_data.year
     chosen_month = callback_data.month
     chosen_day = callback_data.day
@@ -260,6 +360,25 @@ def go_to_confirm_appointment_logic(
         chosen_time.hour,
         chosen_time.minute,
     )
+    tz_starts_at = TIMEZONE.localize(chosen_datetime)
+    datetimes_to_hold = get_datetimes_needed_for_appointment(
+        to_utc(tz_starts_at),
+        chosen_service_duration,
+    )
+    utc_now = get_utc_now()
+    conflicts = await db_writer.write(
+        lambda session: hold_slots(
+            session,
+            client_id,
+            datetimes_to_hold,
+            utc_now,
+            utc_now + SLOT_HOLD_TTL,
+        ),
+    )
+    if conflicts:
+        availability = await availability_cache.get_availability(chosen_service_duration, utc_now, client_id)
+        tz_now = from_utc(utc_now, TIMEZONE)
+        return _chosen_datetime_not_available_result(availability.without(conflicts), tz_starts_at, tz_now)
     keyboard = get_confirm_appointment_keyboard(chosen_datetime)
     state_to_set = MakeAppointment.confirm
     edit_message = MessageToAnswer(
@@ -278,6 +397,8 @@ async def appointment_confirmed_logic(
     state_data: dict,
     callback_data: AppointmentDateTimePicker,
     async_session: async_sessionmaker[AsyncSession],
+    db_writer: DatabaseWriter,
+    availability_cache: AvailabilityCache,
 ) -> LogicResult:
     chosen_service_name = state_data["chosen_service_name"]
     async with async_session() as session:
@@ -306,117 +427,61 @@ async def appointment_confirmed_logic(
     datetimes_to_reserve = get_datetimes_needed_for_appointment(starts_at, chosen_service.duration)
     utc_now = get_utc_now()
     tz_now = from_utc(utc_now, TIMEZONE)
-    async with async_session() as session:
-        try:
-            await insert_appointment(session, appointment)
-            await session.flush()
-            await insert_reservations(session, datetimes_to_reserve, appointment.appointment_id)
-            await session.flush()
-        except IntegrityError:
-            await session.rollback()
-            slots = await get_available_slots(session, utc_now)
-            times_dict = await get_times_possible_for_appointment(chosen_service, slots)
-            if not times_dict:
-                data_to_set = {}
-                state_to_set = MakeAppointment.choose_action
-                messages_to_answer = [
-                    MessageToAnswer(
-                        messages.NO_POSSIBLE_TIMES_FOR_SERVICE,
-                        appointments_keyboard,
-                    ),
-                ]
-                return get_logic_result(
-                    messages_to_answer=messages_to_answer,
-                    state_to_set=state_to_set,
-                    data_to_set=data_to_set,
-                )
-            data_to_update = {"times_dict": times_dict}
-            try:
-                check_chosen_datetime_is_possible(tz_starts_at, times_dict)
-            except DateTimeBecomeNotAvailable as err:
-                if isinstance(err, YearBecomeNotAvailable):
-                    state_to_set = MakeAppointment.choose_year
-                    message_to_edit_to = messages.CHOOSE_YEAR
-                    years = list(times_dict.keys())
-                    years_keyboard_buttons = get_years_keyboard_buttons(years, tz_now)
-                    keyboard_to_show = get_years_keyboard(years_keyboard_buttons)
-                elif isinstance(err, MonthBecomeNotAvailable):
-                    state_to_set = MakeAppointment.choose_month
-                    message_to_edit_to = messages.CHOOSE_MONTH
-                    years_with_months = get_years_with_months(times_dict)
-                    months_keyboard_buttons = get_months_keyboard_buttons(
-                        years_with_months,
-                        tz_now,
-                        chosen_year,
-                    )
-                    keyboard_to_show = get_months_keyboard(chosen_year, months_keyboard_buttons)
-                elif isinstance(err, DayBecomeNotAvailable):
-                    state_to_set = MakeAppointment.choose_day
-                    message_to_edit_to = messages.CHOOSE_DAY
-                    years_with_months_days = get_years_with_months_days(times_dict)
-                    days_keyboard_buttons = get_days_keyboard_buttons(
-                        years_with_months_days,
-                        tz_now,
-                        chosen_year,
-                        chosen_month,
-                    )
-                    keyboard_to_show = get_days_keyboard(
-                        chosen_year,
-                        chosen_month,
-                        days_keyboard_buttons,
-                    )
-                else:
-                    state_to_set = MakeAppointment.choose_time
-                    message_to_edit_to = messages.CHOOSE_TIME
-                    times_keyboard_buttons = get_times_keyboard_buttons(
-                        times_dict,
-                        tz_now,
-                        chosen_year,
-                        chosen_month,
-                        chosen_day,
-                    )
-                    keyboard_to_show = get_times_keyboard(
-                        chosen_year,
-                        chosen_month,
-                        chosen_day,
-                        times_keyboard_buttons,
-                    )
-                edit_message = MessageToAnswer(message_to_edit_to, keyboard_to_show)
-                alert_text = str(err)
-                return get_logic_result(
-                    state_to_set=state_to_set,
-                    data_to_update=data_to_update,
-                    edit_message=edit_message,
-                    alert_text=alert_text,
-                )
-            else:
-                assert False
-        else:
-            await session.refresh(appointment)
-            text_to_answer = (
-                f"{messages.APPOINTMENT_SAVED}\n"
-                f"{messages.COME.format(appointment_view=form_appointment_view(appointment, with_date=True, for_admin=False))}"
-            )
-            messages_to_answer = [ MessageToAnswer(text_to_answer, appointments_keyboard) ]
-            await session.commit()
-            messages_to_send = [
-                MessageToSend(
-                    ADMIN_TG_ID,
-                    messages.NEW_APPOINTMENT_CREATED.format(
-                        appointment_view=form_appointment_view(appointment, with_date=True, for_admin=True),
-                    ),
+    booking = await db_writer.write(
+        lambda session: book_appointment(session, appointment, datetimes_to_reserve, utc_now),
+    )
+    if booking.conflicts:
+        availability = await availability_cache.get_availability(
+            chosen_service.duration,
+            utc_now,
+            appointment.client_id,
+        )
+        return _chosen_datetime_not_available_result(
+            availability.without(booking.conflicts),
+            tz_starts_at,
+            tz_now,
+        )
+    else:
+        text_to_answer = (
+            f"{messages.APPOINTMENT_SAVED}\n"
+            f"{messages.COME.format(appointment_view=form_appointment_view(appointment, with_date=True, for_admin=False))}"
+        )
+        messages_to_answer = [ MessageToAnswer(text_to_answer, appointments_keyboard) ]
+        messages_to_send = [
+            MessageToSend(
+                ADMIN_TG_ID,
+                messages.NEW_APPOINTMENT_CREATED.format(
+                    appointment_view=form_appointment_view(appointment, with_date=True, for_admin=True),
                 ),
-            ]
-            data_to_set = {}
-            state_to_set = MakeAppointment.choose_action
-            alert_text = messages.APPOINTMENT_SAVED
-            return get_logic_result(
-                messages_to_answer=messages_to_answer,
-                state_to_set=state_to_set,
-                data_to_set=data_to_set,
-                messages_to_send=messages_to_send,
-                alert_text=alert_text,
-            )
+            ),
+        ]
+        data_to_set = {}
+        state_to_set = MakeAppointment.choose_action
+        alert_text = messages.APPOINTMENT_SAVED
+        return get_logic_result(
+            messages_to_answer=messages_to_answer,
+            state_to_set=state_to_set,
+            data_to_set=data_to_set,
+            messages_to_send=messages_to_send,
+            alert_text=alert_text,
+        )
+
+
+async def back_from_confirm_appointment_logic(
+    state_data: dict,
+    callback_data: AppointmentDateTimePicker,
+    client_id: int,
+    db_writer: DatabaseWriter,
+    availability_cache: AvailabilityCache,
+) -> LogicResult:
+    """Возврат от подтверждения записи к выбору времени со снятием блокировки слотов клиента."""
+    await db_writer.write(lambda session: release_slot_holds(session, client_id))
+    return await go_to_choose_time_for_appointment_logic(
+        state_data,
+        callback_data,
+        client_id,
+        availability_cache,
+    )
 
 
 def cancel_choose_date_for_appointment_logic() -> LogicResult:
@@ -428,3 +493,9 @@ def cancel_choose_date_for_appointment_logic() -> LogicResult:
         state_to_set=state_to_set,
         data_to_set=data_to_set,
     )
+
+
+async def cancel_confirm_appointment_logic(client_id: int, db_writer: DatabaseWriter) -> LogicResult:
+    """Отмена записи на экране подтверждения со снятием блокировки слотов клиента."""
+    await db_writer.write(lambda session: release_slot_holds(session, client_id))
+    return cancel_choose_date_for_appointment_logic()
@@ -5,7 +5,9 @@ from aiogram.filters import or_f
 from src.secrets import ADMIN_TG_ID
 from src.stuff.appointments.handlers import (
     appointment_confirmed,
+    back_from_confirm_appointment,
     cancel_choose_date_for_appointment,
+    cancel_confirm_appointment,
     choose_service_for_appointment,
     choose_appointments_action,
     go_to_choose_day_for_appointment,
@@ -40,10 +42,14 @@ router.callback_query.register(
         MakeAppointment.choose_month,
         MakeAppointment.choose_day,
         MakeAppointment.choose_time,
-        MakeAppointment.confirm,
     ),
     AppointmentDateTimePicker.filter(F.action == "cancel"),
 )
+router.callback_query.register(
+    cancel_confirm_appointment,
+    MakeAppointment.confirm,
+    AppointmentDateTimePicker.filter(F.action == "cancel"),
+)
 router.callback_query.register(
     go_to_choose_year_for_appointment,
     or_f(
@@ -72,10 +78,12 @@ router.callback_query.register(
 )
 router.callback_query.register(
     go_to_choose_time_for_appointment,
-    or_f(
-        MakeAppointment.choose_day,
-        MakeAppointment.confirm,
-    ),
+    MakeAppointment.choose_day,
+    AppointmentDateTimePicker.filter(F.action == "choose_time"),
+)
+router.callback_query.register(
+    back_from_confirm_appointment,
+    MakeAppointment.confirm,
     AppointmentDateTimePicker.filter(F.action == "choose_time"),
 )
 router.callback_query.register(
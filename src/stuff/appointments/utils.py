@@ -1,7 +1,9 @@
 from calendar import Calendar
-from datetime import datetime, timedelta
+from collections.abc import Sequence
+from datetime import date, datetime, timedelta
 
 from src import messages
+from src.calendar_index import CalendarIndex, SlotsSelector, TimesDict
 from src.config import TIMEZONE
 from src.constraints import DURATION_MULTIPLIER
 from src.models import Service, Slot
@@ -190,40 +192,73 @@ def get_datetimes_needed_for_appointment(starts_at: datetime, duration: int) ->
     return needed_datetimes
 
 
+def get_bookable_positions(utc_minutes: Sequence[int], slots_needed: int) -> list[int]:
+    """
+    Позиции слотов (отсортированных минут), с которых начинается непрерывная серия
+    не менее чем из slots_needed слотов.
+
+    Слоты обходятся один раз с конца: для каждого слота считается длина непрерывной
+    серии слотов, начинающейся с него.
+    """
+    run_lengths = [0] * len(utc_minutes)
+    run_length = 0
+    for i in range(len(utc_minutes) - 1, -1, -1):
+        if i + 1 < len(utc_minutes) and utc_minutes[i + 1] - utc_minutes[i] == DURATION_MULTIPLIER:
+            run_length += 1
+        else:
+            run_length = 1
+        run_lengths[i] = run_length
+    return [i for i, run_length in enumerate(run_lengths) if run_length >= slots_needed]
+
+
 def get_times_for_appointment(
     slots_datetimes: list[datetime],
     service_duration: int,
 ) -> list[str]:
-    possible_times = []
-    for slot_datetime in slots_datetimes:
-        needed_datetimes = get_datetimes_needed_for_appointment(slot_datetime, service_duration)
-        if all([needed_datetime in slots_datetimes for needed_datetime in needed_datetimes]):
-            possible_times.append(slot_datetime.time().isoformat(timespec="minutes"))
-    return possible_times
+    """
+    Получение времен, с которых можно начать прием длительностью service_duration.
+
+    Время подходит для записи, если с него начинается непрерывная серия слотов
+    не короче количества слотов, необходимых для оказания услуги (см. get_bookable_positions).
+    """
+    slots_needed = int(service_duration / DURATION_MULTIPLIER)
+    sorted_datetimes = sorted(slots_datetimes)
+    if not sorted_datetimes:
+        return []
+    minutes = [(slot_datetime - sorted_datetimes[0]) // timedelta(minutes=1) for slot_datetime in sorted_datetimes]
+    return [
+        sorted_datetimes[i].time().isoformat(timespec="minutes")
+        for i in get_bookable_positions(minutes, slots_needed)
+    ]
 
 
 def check_chosen_datetime_is_possible(
     datetime_: datetime,
-    slots: dict[int, dict[int, dict[int, list[str]]]],
+    available_days: dict[int, dict[int, list[int]]],
+    day_times: list[str],
 ) -> None:
-    """Вызывает исключение если дата и время недоступно для записи, иначе возвращает None."""
-    if datetime_.year not in slots:
+    """
+    Вызывает исключение если дата и время недоступно для записи, иначе возвращает None.
+
+    available_days - доступные для записи дни, day_times - доступные времена дня datetime_.
+    """
+    if datetime_.year not in available_days:
         raise YearBecomeNotAvailable(
             messages.YEAR_BECOME_NOT_AVAILABLE.format(lang_year=dates_to_lang(datetime_.year)),
         )
-    elif datetime_.month not in slots[datetime_.year]:
+    elif datetime_.month not in available_days[datetime_.year]:
         raise MonthBecomeNotAvailable(
             messages.MONTH_BECOME_NOT_AVAILABLE.format(
                 lang_month_year=dates_to_lang(datetime_.year, datetime_.month),
             ),
         )
-    elif datetime_.day not in slots[datetime_.year][datetime_.month]:
+    elif datetime_.day not in available_days[datetime_.year][datetime_.month]:
         raise DayBecomeNotAvailable(
             messages.DAY_BECOME_NOT_AVAILABLE.format(
                 lang_day_month_year=dates_to_lang(datetime_.year, datetime_.month, datetime_.day),
             ),
         )
-    elif datetime_.time().isoformat(timespec="minutes") not in slots[datetime_.year][datetime_.month][datetime_.day]:
+    elif datetime_.time().isoformat(timespec="minutes") not in day_times:
         raise TimeBecomeNotAvailable(
             messages.TIME_BECOME_NOT_AVAILABLE.format(time=datetime_.time().isoformat(timespec="minutes")),
         )
@@ -234,7 +269,7 @@ def check_chosen_datetime_is_possible(
 async def get_times_possible_for_appointment(
     service: Service,
     slots: list[Slot],
-) -> dict[int, dict[int, dict[int, list[str]]]]:
+) -> TimesDict:
     """
     Получение доступных времен для записи.
 
@@ -259,30 +294,34 @@ async def get_times_possible_for_appointment(
         },
     }
     """
-    slots_dict = {}
-    for slot in slots:
-        slot_tz_datetime = from_utc(slot.datetime_, TIMEZONE)
-        if slot_tz_datetime.year not in slots_dict:
-            slots_dict[slot_tz_datetime.year] = {}
-        if slot_tz_datetime.month not in slots_dict[slot_tz_datetime.year]:
-            slots_dict[slot_tz_datetime.year][slot_tz_datetime.month] = {}
-        if slot_tz_datetime.day not in slots_dict[slot_tz_datetime.year][slot_tz_datetime.month]:
-            slots_dict[slot_tz_datetime.year][slot_tz_datetime.month][slot_tz_datetime.day] = []
-        slots_dict[slot_tz_datetime.year][slot_tz_datetime.month][slot_tz_datetime.day].append(slot_tz_datetime)
-    times_dict = {}
-    for year_ in slots_dict:
-        for month_ in slots_dict[year_]:
-            for day_ in slots_dict[year_][month_]:
-                slots_datetimes_ = slots_dict[year_][month_][day_]
-                times_for_appointment = get_times_for_appointment(
-                    slots_datetimes_,
-                    service.duration,
-                )
-                if times_for_appointment:
-                    if year_ not in times_dict:
-                        times_dict[year_] = {}
-                    if month_ not in times_dict[year_]:
-                        times_dict[year_][month_] = {}
-                    if day_ not in times_dict[year_][month_]:
-                        times_dict[year_][month_][day_] = times_for_appointment
-    return times_dict
+    slots_needed = int(service.duration / DURATION_MULTIPLIER)
+    index = CalendarIndex.from_utc_datetimes((slot.datetime_ for slot in slots), TIMEZONE)
+    return index.to_times_dict(lambda utc_minutes, _: get_bookable_positions(utc_minutes, slots_needed))
+
+
+def select_start_times_within_day(service_duration: int) -> SlotsSelector:
+    """
+    Выбор времен начала приема длительностью service_duration, при которых
+    последний необходимый слот приходится на тот же день (см. CalendarIndex.to_times_dict).
+    """
+    last_slot_offset = service_duration - DURATION_MULTIPLIER
+
+    def select(utc_minutes: Sequence[int], day_end: int) -> list[int]:
+        return [i for i, utc_minute in enumerate(utc_minutes) if utc_minute + last_slot_offset < day_end]
+
+    return select
+
+
+def get_conflicting_times(conflicts: list[datetime], service_duration: int) -> dict[date, set[str]]:
+    """
+    Местные времена начала приема длительностью service_duration по датам,
+    при которых прием использует хотя бы один из конфликтующих слотов (UTC).
+    """
+    slots_needed = service_duration // DURATION_MULTIPLIER
+    conflicting_times: dict[date, set[str]] = {}
+    for conflict in conflicts:
+        for i in range(slots_needed):
+            tz_start_time = from_utc(conflict - timedelta(minutes=DURATION_MULTIPLIER * i), TIMEZONE)
+            time_ = tz_start_time.time().isoformat(timespec="minutes")
+            conflicting_times.setdefault(tz_start_time.date(), set()).add(time_)
+    return conflicting_times
@@ -1,7 +1,9 @@
 """Вспомогательные функции."""
 
 import re
-from datetime import UTC, datetime, tzinfo
+from bisect import bisect_right
+from collections.abc import AsyncIterable, Iterable, Iterator
+from datetime import UTC, date, datetime, time, timedelta, tzinfo
 
 import pytz
 
@@ -9,7 +11,8 @@ from src import messages
 from src.config import TIMEZONE
 from src.constraints import DURATION_MULTIPLIER, MAX_DURATION, MAX_PRICE, USLUGA_NAME_MAX_LEN
 from src.stuff.services.exceptions import ServiceNameTooLongError
-from src.models import Service, Appointment
+from src.models import EPOCH, MINUTES_IN_DAY, Service, Appointment, AppointmentRow
+from src.tz import get_transition_table
 
 
 ValidationErrorMessage = str
@@ -204,34 +207,50 @@ def dates_to_lang(
 
 
 def form_appointment_view(appointment: Appointment, with_date: bool, for_admin: bool) -> str:
+    return _form_appointment_view(
+        appointment.starts_at, appointment.ends_at, appointment.service.name, with_date, for_admin,
+    )
+
+
+def _form_appointment_view(
+    starts_at: datetime,
+    ends_at: datetime,
+    service_name: str,
+    with_date: bool,
+    for_admin: bool,
+) -> str:
     view = ""
-    tz_starts_at = from_utc(appointment.starts_at, TIMEZONE)
+    tz_starts_at = from_utc(starts_at, TIMEZONE)
     if with_date:
         date_ = tz_starts_at.strftime("%d.%m.%Y")
         view += f"<b>{date_}</b>\n"
     start_time = tz_starts_at.strftime("%H:%M")
     if for_admin:
-        tz_ends_at = from_utc(appointment.ends_at, TIMEZONE)
+        tz_ends_at = from_utc(ends_at, TIMEZONE)
         end_time = tz_ends_at.strftime("%H:%M")
-        view += f"    <i>{start_time} - {end_time}</i>  {appointment.service.name}\n"
+        view += f"    <i>{start_time} - {end_time}</i>  {service_name}\n"
     else:
-        view += f"    <i>{start_time}</i>  {appointment.service.name}\n"
+        view += f"    <i>{start_time}</i>  {service_name}\n"
     return view
 
 
-def form_appointments_list_text(appointments: list[Appointment], for_admin: bool) -> str:
-    appointments_dict = dict()
-    for appointment in appointments:
-        date_ = appointment.starts_at.strftime("%d.%m.%Y")
-        if date_ in appointments_dict:
-            appointments_dict[date_].append(appointment)
-        else:
-            appointments_dict[date_] = [appointment]
+async def form_appointments_list_text(
+    appointments_partitions: AsyncIterable[list[AppointmentRow]],
+    for_admin: bool,
+) -> str:
+    """
+    Список приемов, сгруппированный по датам. Текст формируется по мере чтения частей
+    (см. stream_active_appointments), приемы идут по возрастанию начала.
+    """
     text = ""
-    for date_, appointments_ in appointments_dict.items():
-        text += f"<b>{date_}</b>\n"
-        for appointment in appointments_:
-            text += f"{form_appointment_view(appointment, with_date=False, for_admin=for_admin)}"
+    last_date = None
+    async for appointments in appointments_partitions:
+        for starts_at, ends_at, service_name in appointments:
+            date_ = starts_at.strftime("%d.%m.%Y")
+            if date_ != last_date:
+                text += f"<b>{date_}</b>\n"
+                last_date = date_
+            text += f"{_form_appointment_view(starts_at, ends_at, service_name, with_date=False, for_admin=for_admin)}"
     if not text:
         if for_admin:
             text = messages.NO_APPOINTMENTS_FOR_ADMIN
@@ -242,17 +261,74 @@ def form_appointments_list_text(appointments: list[Appointment], for_admin: bool
 
 def from_utc(utc_dt: datetime, dest_tz: tzinfo) -> datetime:
     if not utc_dt.tzinfo:
-        utc_dt = pytz.timezone("UTC").localize(utc_dt)
+        utc_dt = utc_dt.replace(tzinfo=UTC)
     tz_datetime = utc_dt.astimezone(dest_tz)
     return tz_datetime
 
 
 def to_utc(tz_dt: datetime) -> datetime:
-    utc_tz = pytz.timezone("UTC")
-    utc_datetime = tz_dt.astimezone(utc_tz)
+    utc_datetime = tz_dt.astimezone(UTC)
     return utc_datetime
 
 
+def get_utc_day_bounds(tz_date: date, tz: pytz.BaseTzInfo) -> tuple[datetime, datetime]:
+    """Границы [начало, конец) дня часового пояса tz в UTC (без tzinfo)."""
+    tz_day_start = tz.localize(datetime.combine(tz_date, time()))
+    tz_day_end = tz.localize(datetime.combine(tz_date + timedelta(days=1), time()))
+    utc_day_start = to_utc(tz_day_start).replace(tzinfo=None)
+    utc_day_end = to_utc(tz_day_end).replace(tzinfo=None)
+    return utc_day_start, utc_day_end
+
+
+def get_utc_epoch_minutes(
+    tz_dates: Iterable[date],
+    day_minutes: list[int],
+    tz: tzinfo,
+) -> Iterator[int]:
+    """
+    Моменты UTC (минуты от начала эпохи Unix) местных времен day_minutes (минуты от начала дня)
+    каждой даты tz_dates часового пояса tz, в порядке дат и времен.
+
+    Смещения часового пояса на всем промежутке дат берутся из таблицы смещений (см. src.tz),
+    для каждой даты смещение находится двоичным поиском. Если смещение в течение дня не меняется,
+    моменты всех времен даты получаются сложением. В день перехода для каждого времени берутся
+    моменты всех смещений, при которых это местное время существует:
+    несуществующее местное время (переход вперед) пропускается,
+    повторяющееся местное время (переход назад) дает оба момента, сначала более ранний.
+    """
+    tz_dates = list(tz_dates)
+    if not tz_dates:
+        return
+    # Запас в сутки с каждой стороны покрывает любое смещение часового пояса от UTC
+    utc_start = datetime.combine(min(tz_dates), time()) - timedelta(days=1)
+    utc_end = datetime.combine(max(tz_dates), time()) + timedelta(days=2)
+    table = get_transition_table(utc_start, utc_end, tz)
+    starts, offset_minutes = table.starts, table.offsets
+    ends = starts[1:] + [table.end]
+    for tz_date in tz_dates:
+        local_day_start = (tz_date - EPOCH.date()).days * MINUTES_IN_DAY
+        # Периоды смещений, в которые могут попасть моменты UTC этого дня
+        first = bisect_right(starts, local_day_start - MINUTES_IN_DAY) - 1
+        last = bisect_right(starts, local_day_start + 2 * MINUTES_IN_DAY) - 1
+        periods = [
+            (starts[i], ends[i], offset_minutes[i])
+            for i in range(max(first, 0), last + 1)
+            if starts[i] < local_day_start + MINUTES_IN_DAY - offset_minutes[i]
+            and ends[i] > local_day_start - offset_minutes[i]
+        ]
+        if len(periods) == 1:
+            start, end, offset = periods[0]
+            utc_day_start = local_day_start - offset
+            if start <= utc_day_start and utc_day_start + MINUTES_IN_DAY <= end:
+                yield from (utc_day_start + day_minute for day_minute in day_minutes)
+                continue
+        for day_minute in day_minutes:
+            for start, end, offset in periods:
+                utc_minute = local_day_start + day_minute - offset
+                if start <= utc_minute < end:
+                    yield utc_minute
+
+
 def get_utc_now() -> datetime:
     utc_now = datetime.now(UTC)
     return utc_now
@@ -265,12 +341,8 @@ def get_years_with_months(
     return years_with_months
 
 
-def get_years_with_months_days(
-    slots: dict[int, dict[int, dict[int, list[str]]]],
-) -> dict[int, dict[int, list[int]]]:
-    years_with_months_days = {}
-    for year, dict_ in slots.items():
-        years_with_months_days[year] = {}
-        for month, dict__ in dict_.items():
-            years_with_months_days[year][month] = list(dict__.keys())
+def get_years_with_months_days_by_dates(dates: list[date]) -> dict[int, dict[int, list[int]]]:
+    years_with_months_days: dict[int, dict[int, list[int]]] = {}
+    for date_ in sorted(dates):
+        years_with_months_days.setdefault(date_.year, {}).setdefault(date_.month, []).append(date_.day)
     return years_with_months_days
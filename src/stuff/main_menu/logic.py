@@ -3,7 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src import messages
 from src.config import TIMEZONE
-from src.database import get_future_slots, get_services, get_active_appointments
+from src.database import get_services, stream_active_appointments
 from src.secrets import ADMIN_TG_ID
 from src.stuff.appointments.keyboards import appointments_keyboard
 from src.stuff.appointments.states import MakeAppointment
@@ -12,12 +12,12 @@ from src.stuff.common.utils import (
     form_appointments_list_text,
     from_utc,
     get_utc_now,
-    get_years_with_months_days,
 )
 from src.stuff.main_menu.keyboards import get_main_keyboard
 from src.stuff.schedule.keyboards import view_schedule_get_days_keyboard
+from src.stuff.schedule.logic import get_schedule_days
 from src.stuff.schedule.states import ScheduleStates
-from src.stuff.schedule.utils import get_schedule, view_schedule_get_days_keyboard_buttons
+from src.stuff.schedule.utils import view_schedule_get_days_keyboard_buttons
 from src.stuff.services.keyboards import services_keyboard
 from src.stuff.services.states import ServicesActions
 
@@ -44,8 +44,7 @@ async def services_logic(user_id: int, session: AsyncSession) -> LogicResult:
 async def appointments_logic(user_id: int, session: AsyncSession) -> LogicResult:
     if user_id == ADMIN_TG_ID:
         utc_now = get_utc_now()
-        appointments = await get_active_appointments(session, utc_now)
-        text = form_appointments_list_text(appointments, for_admin=True)
+        text = await form_appointments_list_text(stream_active_appointments(session, utc_now), for_admin=True)
         main_keyboard = get_main_keyboard(for_admin=True)
         messages_to_answer = [ MessageToAnswer(text, main_keyboard) ]
         return get_logic_result(messages_to_answer)
@@ -60,17 +59,16 @@ async def schedule_logic(
 ) -> LogicResult:
     utc_now = get_utc_now()
     tz_now = from_utc(utc_now, TIMEZONE)
-    slots = await get_future_slots(session, utc_now)
-    schedule_dict = get_schedule(slots)
+    schedule_days = await get_schedule_days(session, utc_now)
     state_to_set = ScheduleStates.view_schedule
-    data_to_set = {"schedule_dict": schedule_dict}
+    data_to_set = {"schedule_days": schedule_days}
     messages_to_answer = [
         MessageToAnswer(
             messages.SCHEDULE,
             types.ReplyKeyboardRemove(),
         ),
     ]
-    if not schedule_dict:
+    if not schedule_days:
         messages_to_answer.append(
             MessageToAnswer(
                 messages.NO_SCHEDULE,
@@ -79,11 +77,10 @@ async def schedule_logic(
         )
         return get_logic_result(messages_to_answer, state_to_set)
     else:
-        years_with_months_days = get_years_with_months_days(schedule_dict)
-        chosen_year = min(years_with_months_days.keys())
-        chosen_month = min(years_with_months_days[chosen_year].keys())
+        chosen_year = min(schedule_days.keys())
+        chosen_month = min(schedule_days[chosen_year].keys())
         days_to_choose = view_schedule_get_days_keyboard_buttons(
-            years_with_months_days,
+            schedule_days,
             tz_now,
             chosen_year,
             chosen_month,
@@ -20,11 +20,13 @@ from src.stuff.schedule.logic import (
     go_to_set_working_days_logic,
     go_to_set_working_hours_logic,
     save_schedule_logic,
+    save_weekly_schedule_logic,
     schedule_modifying_logic,
     show_working_hours_in_inline_mode_logic,
     show_working_hours_logic,
     time_clicked_logic,
 )
+from src.writer import DatabaseWriter
 
 
 async def go_to_main_menu(
@@ -120,24 +122,36 @@ async def time_clicked(
 async def save_schedule(
     callback: types.CallbackQuery,
     state: FSMContext,
-    async_session: async_sessionmaker[AsyncSession],
+    db_writer: DatabaseWriter,
 ) -> None:
     if not callback.message:
         return None
     data = await state.get_data()
-    result = await save_schedule_logic(data, async_session)
+    result = await save_schedule_logic(data, db_writer)
+    await process_logic_return(result, fsm_context=state, callback=callback)
+
+
+async def save_weekly_schedule(
+    callback: types.CallbackQuery,
+    state: FSMContext,
+    db_writer: DatabaseWriter,
+) -> None:
+    if not callback.message:
+        return None
+    data = await state.get_data()
+    result = await save_weekly_schedule_logic(data, db_writer)
     await process_logic_return(result, fsm_context=state, callback=callback)
 
 
 async def delete_schedule(
     callback: types.CallbackQuery,
     state: FSMContext,
-    async_session: async_sessionmaker[AsyncSession],
+    db_writer: DatabaseWriter,
 ) -> None:
     if not callback.message:
         return None
     data = await state.get_data()
-    result = await delete_schedule_logic(data, async_session)
+    result = await delete_schedule_logic(data, db_writer)
     await process_logic_return(result, fsm_context=state, callback=callback)
 
 
@@ -156,10 +170,11 @@ async def clear_schedule_confirmed(
     callback_data: Schedule,
     state: FSMContext,
     async_session: async_sessionmaker[AsyncSession],
+    db_writer: DatabaseWriter,
 ) -> None:
     if not callback.message:
         return None
-    result = await clear_schedule_confirmed_logic(async_session)
+    result = await clear_schedule_confirmed_logic(db_writer)
     await process_logic_return(result, fsm_context=state, callback=callback)
     await go_to_choose_day_while_view_schedule(callback, callback_data, state, async_session)
 
@@ -203,13 +218,13 @@ async def show_working_hours(
     callback: types.CallbackQuery,
     callback_data: Schedule,
     state: FSMContext,
+    async_session: async_sessionmaker[AsyncSession],
 ) -> None:
     if not callback.message:
         return None
-    data = await state.get_data()
-    result = show_working_hours_logic(data, callback_data)
+    result = await show_working_hours_logic(callback_data, async_session)
     if result.alert_text and len(result.alert_text) > TG_ALERT_TEXT_MAX_LEN:
-        await show_working_hours_in_inline_mode(callback, callback_data, state)
+        await show_working_hours_in_inline_mode(callback, callback_data, state, async_session)
     else:
         await process_logic_return(result, fsm_context=state, callback=callback)
 
@@ -218,9 +233,9 @@ async def show_working_hours_in_inline_mode(
     callback: types.CallbackQuery,
     callback_data: Schedule,
     state: FSMContext,
+    async_session: async_sessionmaker[AsyncSession],
 ) -> None:
     if not callback.message:
         return None
-    data = await state.get_data()
-    result = show_working_hours_in_inline_mode_logic(data, callback_data)
+    result = await show_working_hours_in_inline_mode_logic(callback_data, async_session)
     await process_logic_return(result, fsm_context=state, callback=callback)
@@ -2,6 +2,7 @@ from aiogram.filters.callback_data import CallbackData
 from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from src.config import SCHEDULE_STORAGE, ScheduleStorage
 from src.stuff.common.keyboards import MAIN_MENU, NO, YES, InlineButton
 from src.stuff.common.utils import months
 
@@ -9,6 +10,7 @@ from src.stuff.common.utils import months
 CLEAR = "Обнулить"
 MODIFY = "Изменить"
 SAVE = "Сохранить"
+SAVE_WEEKLY = "Каждую неделю"
 DELETE = "Удалить"
 SET_TIME = "Задать время"
 SET_DATE = "Задать даты"
@@ -50,6 +52,12 @@ def _attach_modify_buttons_for_edit_schedule(builder: InlineKeyboardBuilder) ->
         text=DELETE,
         callback_data=Schedule(action="delete"),
     )
+    if SCHEDULE_STORAGE is ScheduleStorage.RULES:
+        builder_to_attach.button(
+            text=SAVE_WEEKLY,
+            callback_data=Schedule(action="save_weekly"),
+        )
+        builder_to_attach.adjust(2, 1)
     builder.attach(builder_to_attach)
 
 
@@ -1,30 +1,35 @@
-from datetime import datetime
+from datetime import date, datetime
 
 from aiogram import types
-from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from src import messages
-from src.config import TIMEZONE
+from src.calendar_index import CalendarIndex
+from src.config import SCHEDULE_STORAGE, TIMEZONE, ScheduleStorage
 from src.constraints import DURATION_MULTIPLIER
 from src.database import (
+    apply_schedule,
     delete_not_booked_future_slots,
     delete_slots,
-    get_future_slots,
-    get_slots_by_date,
+    delete_slots_by_days,
+    get_schedule_dates,
+    set_weekly_rules,
+    stream_slot_minutes,
 )
-from src.models import Slot
+from src.intervals import get_next_slot_start
 from src.stuff.base.logic import LogicResult, MessageToAnswer, get_logic_result
 from src.stuff.common.utils import (
     dates_to_lang,
     from_utc,
+    get_utc_day_bounds,
     get_utc_now,
     get_years_with_months,
-    get_years_with_months_days,
+    get_years_with_months_days_by_dates,
 )
 from src.stuff.schedule.keyboards import (
     DELETE,
     SAVE,
+    SAVE_WEEKLY,
     Schedule,
     get_confirm_clear_schedule_keyboard,
     set_schedule_get_days_keyboard,
@@ -38,18 +43,14 @@ from src.stuff.schedule.keyboards import (
 )
 from src.stuff.schedule.states import ScheduleStates
 from src.stuff.schedule.utils import (
-    get_days_statuses,
-    get_initial_times_statuses,
-    get_schedule,
-    get_selected_and_not_selected_dates,
+    MonthSelection,
+    WorkingHours,
+    get_days_of_week,
+    get_booked_slots_view,
+    get_days_of_week_view,
     get_selected_dates_view,
-    get_selected_times,
-    get_slots_to_delete,
-    get_slots_to_save,
-    get_times_statuses_view,
+    get_utc_slots,
     get_working_hours_view,
-    resolve_days_statuses,
-    resolve_times_statuses,
     set_schedule_get_days_keyboard_buttons,
     set_schedule_get_months_keyboard_buttons,
     set_schedule_get_times_keyboard_buttons,
@@ -59,29 +60,34 @@ from src.stuff.schedule.utils import (
     view_schedule_get_times_keyboard_buttons,
     view_schedule_get_years_keyboard_buttons,
 )
+from src.writer import DatabaseWriter
 
 
 def schedule_modifying_logic() -> LogicResult:
     utc_now = get_utc_now()
     tz_now = from_utc(utc_now, TIMEZONE)
     selected_dates = []
-    days_statuses = get_days_statuses(tz_now, selected_dates, None, None)
-    times_statuses = get_initial_times_statuses()
-    days_keyboard_buttons = set_schedule_get_days_keyboard_buttons(days_statuses)
+    month_selection = MonthSelection.create(tz_now, selected_dates, tz_now.year, tz_now.month)
+    working_hours = WorkingHours()
+    days_keyboard_buttons = set_schedule_get_days_keyboard_buttons(month_selection.to_days_statuses())
     selected_dates_view = get_selected_dates_view(selected_dates)
-    times_statuses_view = get_times_statuses_view(times_statuses)
+    times_statuses_view = working_hours.get_view()
     state_to_set = ScheduleStates.set_working_days
     data_to_set = {
         "selected_dates": selected_dates,
-        "days_statuses": days_statuses,
-        "times_statuses": times_statuses,
+        "month_selection": month_selection.to_state(),
+        "working_hours": working_hours.to_state(),
     }
+    how_to_modify_schedule = messages.HOW_TO_MODIFY_SCHEDULE.format(
+        save_button=SAVE,
+        delete_button=DELETE,
+    )
+    if SCHEDULE_STORAGE is ScheduleStorage.RULES:
+        how_to_set_weekly_schedule = messages.HOW_TO_SET_WEEKLY_SCHEDULE.format(save_weekly_button=SAVE_WEEKLY)
+        how_to_modify_schedule = f"{how_to_modify_schedule}\n\n{how_to_set_weekly_schedule}"
     messages_to_answer = [
         MessageToAnswer(
-            text=messages.HOW_TO_MODIFY_SCHEDULE.format(
-                save_button=SAVE,
-                delete_button=DELETE,
-            ),
+            text=how_to_modify_schedule,
             keyboard=types.ReplyKeyboardRemove(),
         ),
         MessageToAnswer(
@@ -98,12 +104,12 @@ def schedule_modifying_logic() -> LogicResult:
 
 def go_to_choose_year_for_set_schedule_logic(state_data: dict) -> LogicResult:
     selected_dates = state_data["selected_dates"]
-    times_statuses = state_data["times_statuses"]
+    working_hours = WorkingHours.from_state(state_data["working_hours"])
     utc_now = get_utc_now()
     tz_now = from_utc(utc_now, TIMEZONE)
     years_keyboard_buttons = set_schedule_get_years_keyboard_buttons(tz_now)
     selected_dates_view = get_selected_dates_view(selected_dates)
-    times_statuses_view = get_times_statuses_view(times_statuses)
+    times_statuses_view = working_hours.get_view()
     state_to_set = ScheduleStates.choose_year
     edit_message = MessageToAnswer(
         text=f"{selected_dates_view}\n\n{times_statuses_view}",
@@ -117,7 +123,7 @@ def go_to_choose_month_for_set_schedule_logic(
     callback_data: Schedule,
 ) -> LogicResult:
     selected_dates = state_data["selected_dates"]
-    times_statuses = state_data["times_statuses"]
+    working_hours = WorkingHours.from_state(state_data["working_hours"])
     utc_now = get_utc_now()
     tz_now = from_utc(utc_now, TIMEZONE)
     chosen_year = callback_data.year
@@ -126,7 +132,7 @@ def go_to_choose_month_for_set_schedule_logic(
         chosen_year,
     )
     selected_dates_view = get_selected_dates_view(selected_dates)
-    times_statuses_view = get_times_statuses_view(times_statuses)
+    times_statuses_view = working_hours.get_view()
     state_to_set = ScheduleStates.choose_month
     edit_message = MessageToAnswer(
         text=f"{selected_dates_view}\n\n{times_statuses_view}",
@@ -140,7 +146,7 @@ def go_to_set_working_days_logic(
     callback_data: Schedule,
 ) -> LogicResult:
     selected_dates = state_data["selected_dates"]
-    times_statuses = state_data["times_statuses"]
+    working_hours = WorkingHours.from_state(state_data["working_hours"])
     utc_now = get_utc_now()
     tz_now = from_utc(utc_now, TIMEZONE)
     chosen_year = callback_data.year
@@ -149,12 +155,12 @@ def go_to_set_working_days_logic(
         chosen_year = tz_now.year
     if not chosen_month:
         chosen_month = tz_now.month
-    days_statuses = get_days_statuses(tz_now, selected_dates, chosen_year, chosen_month)
+    month_selection = MonthSelection.create(tz_now, selected_dates, chosen_year, chosen_month)
     selected_dates_view = get_selected_dates_view(selected_dates)
-    times_statuses_view = get_times_statuses_view(times_statuses)
-    days_keyboard_buttons = set_schedule_get_days_keyboard_buttons(days_statuses)
+    times_statuses_view = working_hours.get_view()
+    days_keyboard_buttons = set_schedule_get_days_keyboard_buttons(month_selection.to_days_statuses())
     state_to_set = ScheduleStates.set_working_days
-    data_to_update = {"days_statuses": days_statuses}
+    data_to_update = {"month_selection": month_selection.to_state()}
     edit_message = MessageToAnswer(
         text=f"{selected_dates_view}\n\n{times_statuses_view}",
         keyboard=set_schedule_get_days_keyboard(chosen_year, chosen_month, days_keyboard_buttons),
@@ -168,12 +174,12 @@ def go_to_set_working_days_logic(
 
 def go_to_set_working_hours_logic(state_data: dict) -> LogicResult:
     selected_dates = state_data["selected_dates"]
-    times_statuses = state_data["times_statuses"]
+    working_hours = WorkingHours.from_state(state_data["working_hours"])
     selected_dates_view = get_selected_dates_view(selected_dates)
-    times_statuses_view = get_times_statuses_view(times_statuses)
-    times_keyboard_buttons = set_schedule_get_times_keyboard_buttons(times_statuses)
+    times_statuses_view = working_hours.get_view()
+    times_keyboard_buttons = set_schedule_get_times_keyboard_buttons(working_hours.to_times_statuses())
     state_to_set = ScheduleStates.set_working_hours
-    data_to_update = {"times_statuses": times_statuses}
+    data_to_update = {"working_hours": working_hours.to_state()}
     edit_message = MessageToAnswer(
         text=f"{selected_dates_view}\n\n{times_statuses_view}",
         keyboard=set_schedule_get_times_keyboard(times_keyboard_buttons),
@@ -189,13 +195,12 @@ def day_clicked_logic(
     state_data: dict,
     callback_data: Schedule,
 ) -> LogicResult:
-    days_statuses = state_data["days_statuses"]
+    month_selection = MonthSelection.from_state(state_data["month_selection"])
     selected_dates = state_data["selected_dates"]
-    times_statuses = state_data["times_statuses"]
-    clicked_element = days_statuses[callback_data.index]
-    days_statuses = resolve_days_statuses(days_statuses, clicked_element)
-    month_selected_dates, month_not_selected_dates = get_selected_and_not_selected_dates(days_statuses)
-    days_keyboard_buttons = set_schedule_get_days_keyboard_buttons(days_statuses)
+    working_hours = WorkingHours.from_state(state_data["working_hours"])
+    month_selection = month_selection.click(callback_data.index)
+    month_selected_dates, month_not_selected_dates = month_selection.get_selected_and_not_selected_dates()
+    days_keyboard_buttons = set_schedule_get_days_keyboard_buttons(month_selection.to_days_statuses())
     for date_ in month_not_selected_dates:
         if date_ in selected_dates:
             selected_dates.remove(date_)
@@ -203,8 +208,11 @@ def day_clicked_logic(
         if date_ not in selected_dates:
             selected_dates.append(date_)
     selected_dates_view = get_selected_dates_view(selected_dates)
-    times_statuses_view = get_times_statuses_view(times_statuses)
-    data_to_update = {"selected_dates": selected_dates, "days_statuses": days_statuses}
+    times_statuses_view = working_hours.get_view()
+    data_to_update = {
+        "selected_dates": selected_dates,
+        "month_selection": month_selection.to_state(),
+    }
     edit_message = MessageToAnswer(
         text=f"{selected_dates_view}\n\n{times_statuses_view}",
         keyboard=set_schedule_get_days_keyboard(
@@ -222,24 +230,25 @@ def time_clicked_logic(
 ) -> LogicResult:
     selected_dates = state_data["selected_dates"]
     selected_dates_view = get_selected_dates_view(selected_dates)
-    times_statuses = state_data["times_statuses"]
-    times_statuses = resolve_times_statuses(times_statuses, callback_data.index)
-    times_statuses_view = get_times_statuses_view(times_statuses)
-    times_keyboard_buttons = set_schedule_get_times_keyboard_buttons(times_statuses)
+    working_hours = WorkingHours.from_state(state_data["working_hours"])
+    working_hours = working_hours.click(callback_data.index)
+    times_statuses_view = working_hours.get_view()
+    times_keyboard_buttons = set_schedule_get_times_keyboard_buttons(working_hours.to_times_statuses())
     edit_message = MessageToAnswer(
         text=f"{selected_dates_view}\n\n{times_statuses_view}",
         keyboard=set_schedule_get_times_keyboard(times_keyboard_buttons),
     )
-    return get_logic_result(edit_message=edit_message)
+    data_to_update = {"working_hours": working_hours.to_state()}
+    return get_logic_result(edit_message=edit_message, data_to_update=data_to_update)
 
 
 async def save_schedule_logic(
     state_data: dict,
-    async_session: async_sessionmaker[AsyncSession],
+    db_writer: DatabaseWriter,
 ) -> LogicResult:
     selected_dates = state_data["selected_dates"]
-    times_statuses = state_data["times_statuses"]
-    selected_times = get_selected_times(times_statuses)
+    working_hours = WorkingHours.from_state(state_data["working_hours"])
+    selected_times = working_hours.get_selected_times()
     if not selected_dates:
         alert_text = messages.SELECT_WORKING_DATES
         result = get_logic_result(alert_text=alert_text)
@@ -247,46 +256,43 @@ async def save_schedule_logic(
         alert_text = messages.SELECT_WORKING_HOURS
         result = get_logic_result(alert_text=alert_text)
     else:
-        async with async_session() as session:
-            utc_dates_slots_to_save = get_slots_to_save(selected_dates, selected_times)
-            for iso_utc_date, iso_utc_slots_to_save in utc_dates_slots_to_save.items():
-                slots_to_delete = await get_slots_by_date(session, iso_utc_date)
-                for slot_to_delete in slots_to_delete:
-                    try:
-                        await session.delete(slot_to_delete)
-                        await session.commit()
-                    except IntegrityError:
-                        await session.rollback()
-                for iso_utc_slot in iso_utc_slots_to_save:
-                    try:
-                        slot = Slot(datetime_=datetime.fromisoformat(iso_utc_slot))
-                        session.add(slot)
-                        await session.commit()
-                    except IntegrityError:
-                        await session.rollback()
+        utc_slots = get_utc_slots(selected_dates, selected_times)
+        days_bounds = [
+            get_utc_day_bounds(date.fromisoformat(iso_date), TIMEZONE) for iso_date in selected_dates
+        ]
+        schedule_changes = await db_writer.write(
+            lambda session: apply_schedule(session, days_bounds, utc_slots),
+        )
         selected_dates = []
         utc_now = get_utc_now()
         tz_now = from_utc(utc_now, TIMEZONE)
-        days_statuses = get_days_statuses(tz_now, selected_dates, tz_now.year, tz_now.month)
-        times_statuses = get_initial_times_statuses()
+        month_selection = MonthSelection.create(tz_now, selected_dates, tz_now.year, tz_now.month)
+        working_hours = WorkingHours()
         selected_dates_view = get_selected_dates_view(selected_dates)
-        times_statuses_view = get_times_statuses_view(times_statuses)
-        days_keyboard_buttons = set_schedule_get_days_keyboard_buttons(days_statuses)
+        times_statuses_view = working_hours.get_view()
+        days_keyboard_buttons = set_schedule_get_days_keyboard_buttons(month_selection.to_days_statuses())
         state_to_set = ScheduleStates.set_working_days
         data_to_update = {
             "selected_dates": selected_dates,
-            "times_statuses": times_statuses,
-            "days_statuses": days_statuses,
+            "working_hours": working_hours.to_state(),
+            "month_selection": month_selection.to_state(),
         }
+        text = f"{selected_dates_view}\n\n{times_statuses_view}"
+        if schedule_changes.booked_slots:
+            text += f"\n\n{get_booked_slots_view(schedule_changes.booked_slots)}"
         edit_message = MessageToAnswer(
-            text=f"{selected_dates_view}\n\n{times_statuses_view}",
+            text=text,
             keyboard=set_schedule_get_days_keyboard(
                 tz_now.year,
                 tz_now.month,
                 days_keyboard_buttons,
             ),
         )
-        alert_text = messages.SCHEDULE_MODIFIED
+        alert_text = messages.SCHEDULE_MODIFIED_WITH_CHANGES.format(
+            inserted=schedule_changes.inserted,
+            removed=schedule_changes.removed,
+            kept_booked=schedule_changes.kept_booked,
+        )
         result = get_logic_result(
             edit_message=edit_message,
             state_to_set=state_to_set,
@@ -296,53 +302,83 @@ async def save_schedule_logic(
     return result
 
 
+async def save_weekly_schedule_logic(
+    state_data: dict,
+    db_writer: DatabaseWriter,
+) -> LogicResult:
+    """Сохранение рабочих часов еженедельным графиком работы для дней недели выбранных дат."""
+    selected_dates = state_data["selected_dates"]
+    working_hours = WorkingHours.from_state(state_data["working_hours"])
+    day_minutes = working_hours.get_day_minutes()
+    if not selected_dates:
+        alert_text = messages.SELECT_WORKING_DATES
+        return get_logic_result(alert_text=alert_text)
+    if not day_minutes:
+        alert_text = messages.SELECT_WORKING_HOURS
+        return get_logic_result(alert_text=alert_text)
+    days_of_week = get_days_of_week(selected_dates)
+    await db_writer.write(lambda session: set_weekly_rules(session, days_of_week, day_minutes))
+    alert_text = messages.WEEKLY_SCHEDULE_SAVED.format(
+        days_of_week=get_days_of_week_view(days_of_week),
+        working_hours=", ".join(
+            f"{working_hours.get_iso_time(start)}-{working_hours.get_iso_time(end)}"
+            for start, end in working_hours.iter_runs()
+        ),
+    )
+    return get_logic_result(alert_text=alert_text)
+
+
 async def delete_schedule_logic(
     state_data: dict,
-    async_session: async_sessionmaker[AsyncSession],
+    db_writer: DatabaseWriter,
 ) -> LogicResult:
     selected_dates = state_data["selected_dates"]
-    times_statuses = state_data["times_statuses"]
-    selected_times = get_selected_times(times_statuses)
+    working_hours = WorkingHours.from_state(state_data["working_hours"])
+    selected_times = working_hours.get_selected_times()
     if not selected_dates:
         alert_text = messages.SELECT_WORKING_DATES
         return get_logic_result(alert_text=alert_text)
     if not selected_times:
-        async with async_session() as session:
-            for iso_date in selected_dates:
-                slots_to_delete = await get_slots_by_date(session, iso_date)
-                for slot_to_delete in slots_to_delete:
-                    try:
-                        await session.delete(slot_to_delete)
-                        await session.commit()
-                    except IntegrityError:
-                        await session.rollback()
+        days_bounds = [
+            get_utc_day_bounds(date.fromisoformat(iso_date), TIMEZONE) for iso_date in selected_dates
+        ]
+        schedule_changes = await db_writer.write(
+            lambda session: delete_slots_by_days(session, days_bounds),
+        )
     else:
-        slots_to_delete = get_slots_to_delete(selected_dates, selected_times)
-        async with async_session() as session:
-            await delete_slots(session, slots_to_delete)
+        slots_to_delete = get_utc_slots(selected_dates, selected_times)
+        schedule_changes = await db_writer.write(
+            lambda session: delete_slots(session, slots_to_delete),
+        )
     selected_dates = []
     utc_now = get_utc_now()
     tz_now = from_utc(utc_now, TIMEZONE)
-    days_statuses = get_days_statuses(tz_now, selected_dates, tz_now.year, tz_now.month)
-    times_statuses = get_initial_times_statuses()
+    month_selection = MonthSelection.create(tz_now, selected_dates, tz_now.year, tz_now.month)
+    working_hours = WorkingHours()
     selected_dates_view = get_selected_dates_view(selected_dates)
-    times_statuses_view = get_times_statuses_view(times_statuses)
-    days_keyboard_buttons = set_schedule_get_days_keyboard_buttons(days_statuses)
+    times_statuses_view = working_hours.get_view()
+    days_keyboard_buttons = set_schedule_get_days_keyboard_buttons(month_selection.to_days_statuses())
     state_to_set = ScheduleStates.set_working_days
     data_to_update = {
         "selected_dates": selected_dates,
-        "times_statuses": times_statuses,
-        "days_statuses": days_statuses,
+        "working_hours": working_hours.to_state(),
+        "month_selection": month_selection.to_state(),
     }
+    text = f"{selected_dates_view}\n\n{times_statuses_view}"
+    if schedule_changes.booked_slots:
+        text += f"\n\n{get_booked_slots_view(schedule_changes.booked_slots)}"
     edit_message = MessageToAnswer(
-        text=f"{selected_dates_view}\n\n{times_statuses_view}",
+        text=text,
         keyboard=set_schedule_get_days_keyboard(
             tz_now.year,
             tz_now.month,
             days_keyboard_buttons,
         ),
     )
-    alert_text = messages.SCHEDULE_MODIFIED
+    alert_text = messages.SCHEDULE_SLOTS_DELETED.format(
+        removed=schedule_changes.removed,
+        kept_booked=schedule_changes.kept_booked,
+    )
     return get_logic_result(
         edit_message=edit_message,
         state_to_set=state_to_set,
@@ -360,20 +396,42 @@ def clear_schedule_clicked_logic() -> LogicResult:
     return get_logic_result(edit_message=edit_message, state_to_set=state_to_set)
 
 
-async def clear_schedule_confirmed_logic(
-    async_session: async_sessionmaker[AsyncSession],
-) -> LogicResult:
+async def clear_schedule_confirmed_logic(db_writer: DatabaseWriter) -> LogicResult:
     utc_now = get_utc_now()
-    async with async_session() as session:
-        await delete_not_booked_future_slots(session, utc_now)
-        await session.commit()
+    await db_writer.write(lambda session: delete_not_booked_future_slots(session, utc_now))
     alert_text = messages.SCHEDULE_CLEARED
     return get_logic_result(alert_text=alert_text)
 
 
+async def get_schedule_days(
+    session: AsyncSession,
+    utc_now: datetime,
+) -> dict[int, dict[int, list[int]]]:
+    """Получение дней графика работы (годы, месяцы и дни, на которые есть будущие слоты)."""
+    schedule_dates = await get_schedule_dates(session, utc_now, TIMEZONE)
+    return get_years_with_months_days_by_dates(schedule_dates)
+
+
+async def get_day_schedule(
+    session: AsyncSession,
+    utc_now: datetime,
+    chosen_year: int,
+    chosen_month: int,
+    chosen_day: int,
+) -> dict[int, dict[int, dict[int, list[str]]]]:
+    """Получение графика работы (см. get_schedule) только на один день."""
+    chosen_date = date(chosen_year, chosen_month, chosen_day)
+    day_start, day_end = get_utc_day_bounds(chosen_date, TIMEZONE)
+    start = max(day_start, get_next_slot_start(utc_now))
+    if start >= day_end:
+        return {}
+    index = await CalendarIndex.from_stream(stream_slot_minutes(session, start, day_end), TIMEZONE)
+    return index.to_times_dict()
+
+
 def go_to_choose_year_while_view_schedule_logic(state_data: dict) -> LogicResult:
-    schedule_dict = state_data["schedule_dict"]
-    years = list(schedule_dict.keys())
+    schedule_days = state_data["schedule_days"]
+    years = list(schedule_days.keys())
     utc_now = get_utc_now()
     tz_now = from_utc(utc_now, TIMEZONE)
     years_keyboard_buttons = view_schedule_get_years_keyboard_buttons(years, tz_now)
@@ -388,11 +446,11 @@ def go_to_choose_month_while_view_schedule_logic(
     state_data: dict,
     callback_data: Schedule,
 ) -> LogicResult:
-    schedule_dict = state_data["schedule_dict"]
+    schedule_days = state_data["schedule_days"]
     utc_now = get_utc_now()
     tz_now = from_utc(utc_now, TIMEZONE)
     chosen_year = callback_data.year
-    years_with_months = get_years_with_months(schedule_dict)
+    years_with_months = get_years_with_months(schedule_days)
     months_keyboard_buttons = view_schedule_get_months_keyboard_buttons(
         years_with_months,
         tz_now,
@@ -412,23 +470,21 @@ async def go_to_choose_day_while_view_schedule_logic(
     utc_now = get_utc_now()
     tz_now = from_utc(utc_now, TIMEZONE)
     async with async_session() as session:
-        slots = await get_future_slots(session, utc_now)
-    schedule_dict = get_schedule(slots)
-    if not schedule_dict:
+        schedule_days = await get_schedule_days(session, utc_now)
+    if not schedule_days:
         edit_message = MessageToAnswer(
             text=messages.NO_SCHEDULE,
             keyboard=view_schedule_get_days_keyboard(0, 0, []),
         )
     else:
-        years_with_months_days = get_years_with_months_days(schedule_dict)
         chosen_year = callback_data.year
         chosen_month = callback_data.month
         if not chosen_year:
-            chosen_year = min(years_with_months_days.keys())
+            chosen_year = min(schedule_days.keys())
         if not chosen_month:
-            chosen_month = min(years_with_months_days[chosen_year].keys())
+            chosen_month = min(schedule_days[chosen_year].keys())
         days_keyboard_buttons = view_schedule_get_days_keyboard_buttons(
-            years_with_months_days,
+            schedule_days,
             tz_now,
             chosen_year,
             chosen_month,
@@ -438,7 +494,7 @@ async def go_to_choose_day_while_view_schedule_logic(
             keyboard=view_schedule_get_days_keyboard(chosen_year, chosen_month, days_keyboard_buttons),
         )
     state_to_set = ScheduleStates.view_schedule
-    data_to_update = {"schedule_dict": schedule_dict}
+    data_to_update = {"schedule_days": schedule_days}
     return get_logic_result(
         edit_message=edit_message,
         state_to_set=state_to_set,
@@ -446,33 +502,41 @@ async def go_to_choose_day_while_view_schedule_logic(
     )
 
 
-def show_working_hours_logic(
-    state_data: dict,
+async def show_working_hours_logic(
     callback_data: Schedule,
+    async_session: async_sessionmaker[AsyncSession],
 ) -> LogicResult:
-    schedule_dict = state_data["schedule_dict"]
     chosen_year = callback_data.year
     chosen_month = callback_data.month
     chosen_day = callback_data.day
+    utc_now = get_utc_now()
+    async with async_session() as session:
+        day_schedule = await get_day_schedule(session, utc_now, chosen_year, chosen_month, chosen_day)
     date_lang = dates_to_lang(chosen_year, chosen_month, chosen_day)
-    iso_working_hours = schedule_dict[chosen_year][chosen_month][chosen_day]
+    if not day_schedule:
+        return get_logic_result(alert_text=f"{date_lang}\n\n{messages.NO_SCHEDULE}")
+    iso_working_hours = day_schedule[chosen_year][chosen_month][chosen_day]
     working_hours_view = get_working_hours_view(iso_working_hours, DURATION_MULTIPLIER)
     alert_text = f"{date_lang}\n\n{working_hours_view}"
     return get_logic_result(alert_text=alert_text)
 
 
-def show_working_hours_in_inline_mode_logic(
-    state_data: dict,
+async def show_working_hours_in_inline_mode_logic(
     callback_data: Schedule,
+    async_session: async_sessionmaker[AsyncSession],
 ) -> LogicResult:
-    schedule_dict = state_data["schedule_dict"]
     chosen_year = callback_data.year
     chosen_month = callback_data.month
     chosen_day = callback_data.day
     utc_now = get_utc_now()
     tz_now = from_utc(utc_now, TIMEZONE)
+    async with async_session() as session:
+        day_schedule = await get_day_schedule(session, utc_now, chosen_year, chosen_month, chosen_day)
+    if not day_schedule:
+        date_lang = dates_to_lang(chosen_year, chosen_month, chosen_day)
+        return get_logic_result(alert_text=f"{date_lang}\n\n{messages.NO_SCHEDULE}")
     times_keyboard_buttons = view_schedule_get_times_keyboard_buttons(
-        schedule_dict,
+        day_schedule,
         tz_now,
         chosen_year,
         chosen_month,
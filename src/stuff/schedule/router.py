@@ -16,6 +16,7 @@ from src.stuff.schedule.handlers import (
     go_to_set_working_days,
     go_to_set_working_hours,
     save_schedule,
+    save_weekly_schedule,
     schedule_modifying,
     time_clicked,
 )
@@ -123,6 +124,16 @@ router.callback_query.register(
     ),
     Schedule.filter(F.action == "save"),
 )
+router.callback_query.register(
+    save_weekly_schedule,
+    or_f(
+        ScheduleStates.choose_year,
+        ScheduleStates.choose_month,
+        ScheduleStates.set_working_days,
+        ScheduleStates.set_working_hours,
+    ),
+    Schedule.filter(F.action == "save_weekly"),
+)
 router.callback_query.register(
     delete_schedule,
     or_f(
@@ -1,13 +1,16 @@
 import re
-from calendar import Calendar
+from collections.abc import Iterator
+from calendar import Calendar, monthrange
+from dataclasses import dataclass, replace
 from datetime import date, datetime, time, timedelta
 
 from src import messages
-from src.config import TIMEZONE
+from src.calendar_index import CalendarIndex, TimesDict
+from src.config import SCHEDULE_VALIDATION_LEVEL, TIMEZONE, ValidationLevel
 from src.constraints import DURATION_MULTIPLIER
-from src.models import Slot
+from src.models import EPOCH, Slot
 from src.stuff.common.keyboards import InlineButton
-from src.stuff.common.utils import from_utc, months, to_utc
+from src.stuff.common.utils import from_utc, get_utc_epoch_minutes, months
 
 
 def get_all_times_len(duration_multiplier: int) -> int:
@@ -53,7 +56,7 @@ class ScheduleTimeStatus:
 
 def get_schedule(
     slots: list[Slot],
-) -> dict[int, dict[int, dict[int, list[str]]]]:
+) -> TimesDict:
     """
     Получение графика работы.
 
@@ -78,29 +81,8 @@ def get_schedule(
         },
     }
     """
-    slots_dict = {}
-    for slot in slots:
-        slot_tz_datetime = from_utc(slot.datetime_, TIMEZONE)
-        if slot_tz_datetime.year not in slots_dict:
-            slots_dict[slot_tz_datetime.year] = {}
-        if slot_tz_datetime.month not in slots_dict[slot_tz_datetime.year]:
-            slots_dict[slot_tz_datetime.year][slot_tz_datetime.month] = {}
-        if slot_tz_datetime.day not in slots_dict[slot_tz_datetime.year][slot_tz_datetime.month]:
-            slots_dict[slot_tz_datetime.year][slot_tz_datetime.month][slot_tz_datetime.day] = []
-        slots_dict[slot_tz_datetime.year][slot_tz_datetime.month][slot_tz_datetime.day].append(slot_tz_datetime)
-    times_dict = {}
-    for year_ in slots_dict:
-        for month_ in slots_dict[year_]:
-            for day_ in slots_dict[year_][month_]:
-                slots_datetimes_ = slots_dict[year_][month_][day_]
-                times = get_schedule_times(slots_datetimes_)
-                if year_ not in times_dict:
-                    times_dict[year_] = {}
-                if month_ not in times_dict[year_]:
-                    times_dict[year_][month_] = {}
-                if day_ not in times_dict[year_][month_]:
-                    times_dict[year_][month_][day_] = times
-    return times_dict
+    index = CalendarIndex.from_utc_datetimes((slot.datetime_ for slot in slots), TIMEZONE)
+    return index.to_times_dict()
 
 
 def _get_groups_possible_elements() -> list[str]:
@@ -134,21 +116,34 @@ def _get_groups_possible_elements() -> list[str]:
 groups_possible_elements = tuple(_get_groups_possible_elements())
 
 
-def _is_element_valid(element: str) -> bool:
-    day_element_pattern = (
-        rf"(?:{ScheduleDayStatus.NOT_AVAILABLE}|{ScheduleDayStatus.NOT_SELECTED}|{ScheduleDayStatus.SELECTED})"
-        r"\d\d\d\d-\d\d-\d\d"
-    )
-    return (
-        element in groups_possible_elements
-        or element == ScheduleDayStatus.IGNORE
-        or bool(re.fullmatch(day_element_pattern, element))
-    )
+def split_element(element: str) -> tuple[str, str]:
+    if ScheduleDayStatus.NOT_SELECTED in element:
+        return ScheduleDayStatus.NOT_SELECTED, element.split(ScheduleDayStatus.NOT_SELECTED)[-1]
+    elif ScheduleDayStatus.SELECTED in element:
+        return ScheduleDayStatus.SELECTED, element.split(ScheduleDayStatus.SELECTED)[-1]
+    elif ScheduleDayStatus.NOT_AVAILABLE in element:
+        return ScheduleDayStatus.NOT_AVAILABLE, element.split(ScheduleDayStatus.NOT_AVAILABLE)[-1]
+    else:
+        return ScheduleDayStatus.IGNORE, ""
 
 
-def _is_day_element(element: str) -> bool:
-    pattern = r"_\d\d\d\d-\d\d-\d\d$"
-    return bool(re.search(pattern, element))
+_DAY_ELEMENT_PATTERN = re.compile(
+    rf"({ScheduleDayStatus.NOT_AVAILABLE}|{ScheduleDayStatus.NOT_SELECTED}|{ScheduleDayStatus.SELECTED})"
+    r"(\d\d\d\d-\d\d-\d\d)"
+)
+_GROUPS_ELEMENTS = {
+    element: split_element(element) for element in groups_possible_elements
+}
+_HEADER_GROUPS = (
+    ScheduleDayGroup.ALL,
+    ScheduleDayGroup.MONDAY,
+    ScheduleDayGroup.TUESDAY,
+    ScheduleDayGroup.WEDNESDAY,
+    ScheduleDayGroup.THURSDAY,
+    ScheduleDayGroup.FRIDAY,
+    ScheduleDayGroup.SATURDAY,
+    ScheduleDayGroup.SUNDAY,
+)
 
 
 def is_week_element(element: str) -> bool:
@@ -169,465 +164,324 @@ def is_day_of_week_element(element: str) -> bool:
     )
 
 
-def _at_least_one_available_day(days_statuses) -> bool:
-    for element in days_statuses:
-        if (
-            _is_day_element(element)
-            and (
-                ScheduleDayStatus.NOT_SELECTED in element
-                or ScheduleDayStatus.SELECTED in element
-            )
-        ):
-            return True
-    return False
-
-
-def _no_not_available_day_after_available(days_statuses) -> bool:
-    days_elements = [element for element in days_statuses if _is_day_element(element)]
-    prev_element = ""
-    for element in days_elements:
-        if (
-            (
-                ScheduleDayStatus.NOT_SELECTED in prev_element
-                or ScheduleDayStatus.SELECTED in prev_element
-            )
-            and ScheduleDayStatus.NOT_AVAILABLE in element
-        ):
-            return False
-        prev_element = element
-    return True
-
-
-def _at_least_one_available_week(days_statuses) -> bool:
-    for element in days_statuses:
-        if (
-            is_week_element(element)
-            and (
-                ScheduleDayStatus.NOT_SELECTED in element
-                or ScheduleDayStatus.SELECTED in element
-            )
-        ):
-            return True
-    return False
-
-
-def _no_not_available_week_after_available(days_statuses) -> bool:
-    weeks_elements = [element for element in days_statuses if is_week_element(element)]
-    prev_element = ""
-    for element in weeks_elements:
-        if (
-            (
-                ScheduleDayStatus.NOT_SELECTED in prev_element
-                or ScheduleDayStatus.SELECTED in prev_element
-            )
-            and ScheduleDayStatus.NOT_AVAILABLE in element
-        ):
-            return False
-        prev_element = element
-    return True
-
-
-def _at_least_one_available_day_of_week(days_statuses) -> bool:
-    for element in days_statuses:
-        if (
-            is_day_of_week_element(element)
-            and (
-                ScheduleDayStatus.NOT_SELECTED in element
-                or ScheduleDayStatus.SELECTED in element
-            )
-        ):
-            return True
-    return False
-
-
-def _uniform_ascending_days(days_elements: list[str]) -> bool:
-    iso_dates = [
-        element.rsplit(sep="_", maxsplit=1)[-1] for element in days_elements
-    ]
-    for i in range(1, len(iso_dates)):
-        prev_element = date.fromisoformat(iso_dates[i-1])
-        current_element = date.fromisoformat(iso_dates[i])
-        if current_element - prev_element != timedelta(days=1):
-            return False
-    return True
+class _GroupCounter:
+    """Количество выбранных, не выбранных и не игнорируемых дней группы (недели или дня недели)."""
 
+    __slots__ = ("selected", "not_selected", "not_ignored")
 
-def _uniform_ascending_weeks(weeks_elements: list[str]) -> bool:
-    weeks = [int(element[-1]) for element in weeks_elements]
-    for i in range(1, len(weeks)):
-        if weeks[i] - weeks[i-1] != 1:
-            return False
-    return True
+    def __init__(self) -> None:
+        self.selected = 0
+        self.not_selected = 0
+        self.not_ignored = 0
 
+    def add(self, status: str) -> None:
+        self.not_ignored += 1
+        if status == ScheduleDayStatus.SELECTED:
+            self.selected += 1
+        elif status == ScheduleDayStatus.NOT_SELECTED:
+            self.not_selected += 1
 
-def _uniform_ascending_elements(days_statuses: list[str]) -> bool:
-    days_elements = []
-    weeks_elements = []
-    for element in days_statuses:
-        if _is_day_element(element):
-            days_elements.append(element)
-        elif is_week_element(element):
-            weeks_elements.append(element)
-    return _uniform_ascending_days(days_elements) and _uniform_ascending_weeks(weeks_elements)
-
-
-def _elements_in_right_place(days_statuses: list[str]) -> bool:
-    for i in range(len(days_statuses)):
-        element = days_statuses[i]
-        if i == 0:
-            if ScheduleDayGroup.ALL not in element:
-                return False
-        elif i == 1:
-            if ScheduleDayGroup.MONDAY not in element:
-                return False
-        elif i == 2:
-            if ScheduleDayGroup.TUESDAY not in element:
-                return False
-        elif i == 3:
-            if ScheduleDayGroup.WEDNESDAY not in element:
-                return False
-        elif i == 4:
-            if ScheduleDayGroup.THURSDAY not in element:
-                return False
-        elif i == 5:
-            if ScheduleDayGroup.FRIDAY not in element:
-                return False
-        elif i == 6:
-            if ScheduleDayGroup.SATURDAY not in element:
-                return False
-        elif i == 7:
-            if ScheduleDayGroup.SUNDAY not in element:
-                return False
-        elif i % 8 == 0:
-            if not is_week_element(element):
-                return False
+    def check(self, group_status: str) -> None:
+        assert self.not_ignored
+        if group_status == ScheduleDayStatus.SELECTED:
+            assert self.selected
+        elif group_status == ScheduleDayStatus.NOT_SELECTED:
+            assert not self.selected and self.not_selected
         else:
-            if not (_is_day_element(element) or element == ScheduleDayStatus.IGNORE):
-                return False
-    return True
-
-
-def _no_ignore_element_among_days_elements(days_statuses: list[str]) -> bool:
-    ignore_elements_indexes = []
-    days_elements_indexes = []
-    for i in range(len(days_statuses)):
-        if days_statuses[i] == ScheduleDayStatus.IGNORE:
-            ignore_elements_indexes.append(i)
-        elif _is_day_element(days_statuses[i]):
-            days_elements_indexes.append(i)
-    for ignore_index in ignore_elements_indexes:
-        days_before_exist = False
-        days_after_exist = False
-        for day_index in days_elements_indexes:
-            if day_index < ignore_index:
-                days_before_exist = True
-            elif day_index > ignore_index:
-                days_after_exist = True
-            if days_before_exist and days_after_exist:
-                return False
-    return True
-
-
-def _at_least_one_should_be_selected(elements: list[str]) -> bool:
-    for element in elements:
-        element_status, _ = split_element(element)
-        if element_status == ScheduleDayStatus.SELECTED:
-            return True
-    return False
-
-
-def _at_least_one_should_be_not_selected(elements: list[str]) -> bool:
-    for element in elements:
-        element_status, _ = split_element(element)
-        if element_status == ScheduleDayStatus.NOT_SELECTED:
-            return True
-    return False
-
-
-def _noone_should_be_selected(elements: list[str]) -> bool:
-    for element in elements:
-        element_status, _ = split_element(element)
-        if element_status == ScheduleDayStatus.SELECTED:
-            return False
-    return True
-
-
-def _all_days_should_be_not_available_or_ignore(days_elements: list[str]) -> bool:
-    for element in days_elements:
-        element_status, _ = split_element(element)
-        if not (
-            element_status == ScheduleDayStatus.NOT_AVAILABLE
-            or element_status == ScheduleDayStatus.IGNORE
-        ):
-            return False
-    return True
-
-
-def _all_group_selected_right(days_statuses: list[str]) -> bool:
-    days_elements = []
-    weeks_elements = []
-    day_of_week_elements = []
-    for element in days_statuses:
-        if _is_day_element(element):
-            days_elements.append(element)
-        elif is_week_element(element):
-            weeks_elements.append(element)
-        elif is_day_of_week_element(element):
-            day_of_week_elements.append(element)
-    all_group_status, _ = split_element(days_statuses[0])
-    if all_group_status == ScheduleDayStatus.SELECTED:
-        return (
-            _at_least_one_should_be_selected(days_elements)
-            and _at_least_one_should_be_selected(weeks_elements)
-            and _at_least_one_should_be_selected(day_of_week_elements)
-        )
-    else:
-        return (
-            _noone_should_be_selected(days_elements)
-            and _noone_should_be_selected(weeks_elements)
-            and _noone_should_be_selected(day_of_week_elements)
-        )
-
-
-def _no_week_with_all_days_ignore(days_statuses: list[str]) -> bool:
-    for i in range(8, len(days_statuses), 8):
-        days_elements = days_statuses[i+1:i+8]
-        for element in days_elements:
-            element_status, _ = split_element(element)
-            if element_status != ScheduleDayStatus.IGNORE:
-                return True
-    return False
-
-
-def _is_group_status_right(group_status: str, group_days_elements: list[str]) -> bool:
-    if group_status == ScheduleDayStatus.SELECTED:
-        if not _at_least_one_should_be_selected(group_days_elements):
-            return False
-    elif group_status == ScheduleDayStatus.NOT_SELECTED:
-        if not (
-            _noone_should_be_selected(group_days_elements)
-            and _at_least_one_should_be_not_selected(group_days_elements)
-        ):
-            return False
-    else:
-        if not _all_days_should_be_not_available_or_ignore(group_days_elements):
-            return False
-    return True
-
-
-def _weeks_groups_statuses_right(days_statuses: list[str]) -> bool:
-    for i in range(8, len(days_statuses), 8):
-        days_elements = days_statuses[i+1:i+8]
-        week_group_status, _ = split_element(days_statuses[i])
-        if not _is_group_status_right(week_group_status, days_elements):
-            return False
-    return True
-
-
-def _all_ignore(elements: list[str]) -> bool:
-    for element in elements:
-        if element != ScheduleDayStatus.IGNORE:
-            return False
-    return True
-
-
-def _collect_days_of_week(days_statuses: list[str]) -> dict[str, dict[str, list[str] | str]]:
-    collected_days_of_week = {}
-    for i in range(1, 8):
-        day_of_week_group_element = days_statuses[i]
-        day_of_week_group_status, day_of_week = split_element(day_of_week_group_element)
-        collected_days_of_week[day_of_week] = {}
-        collected_days_of_week[day_of_week]["status"] = day_of_week_group_status
-        collected_days_of_week[day_of_week]["days_elements"] = []
-    for i in range(8, len(days_statuses)):
-        element = days_statuses[i]
-        if i % 8 == 1:
-            collected_days_of_week[ScheduleDayGroup.MONDAY]["days_elements"].append(element)
-        elif i % 8 == 2:
-            collected_days_of_week[ScheduleDayGroup.TUESDAY]["days_elements"].append(element)
-        elif i % 8 == 3:
-            collected_days_of_week[ScheduleDayGroup.WEDNESDAY]["days_elements"].append(element)
-        elif i % 8 == 4:
-            collected_days_of_week[ScheduleDayGroup.THURSDAY]["days_elements"].append(element)
-        elif i % 8 == 5:
-            collected_days_of_week[ScheduleDayGroup.FRIDAY]["days_elements"].append(element)
-        elif i % 8 == 6:
-            collected_days_of_week[ScheduleDayGroup.SATURDAY]["days_elements"].append(element)
-        elif i % 8 == 7:
-            collected_days_of_week[ScheduleDayGroup.SUNDAY]["days_elements"].append(element)
-    return collected_days_of_week
-
-
-def _no_day_of_week_with_all_days_ignore(days_statuses: list[str]) -> bool:
-    collected_days_of_week = _collect_days_of_week(days_statuses)
-    for item in collected_days_of_week.values():
-        days_elements = item["days_elements"]
-        assert isinstance(days_elements, list)
-        if _all_ignore(days_elements):
-            return False
-    return True
-
-
-def _day_of_week_groups_statuses_right(days_statuses: list[str]) -> bool:
-    collected_days_of_week = _collect_days_of_week(days_statuses)
-    for dict_ in collected_days_of_week.values():
-        day_of_week_group_status = dict_["status"]
-        day_of_week_days_elements = dict_["days_elements"]
-        assert isinstance(day_of_week_group_status, str)
-        assert isinstance(day_of_week_days_elements, list)
-        if not _is_group_status_right(day_of_week_group_status, day_of_week_days_elements):
-            return False
-    return True
+            assert not self.selected and not self.not_selected
 
 
 def check_days_statuses_assertions(days_statuses: list[str]) -> None:
     """
     Проверка отсутствия невозможных сценариев для days_statuses.
 
+    Проверки выполняются за один проход, их объем задается SCHEDULE_VALIDATION_LEVEL:
+    cheap - длина и допустимость каждого элемента на своем месте,
+    full - также порядок дней и недель и согласованность статусов групп со статусами дней.
     При наличии невозможного сценария вызывается AssertionError.
     """
+    if SCHEDULE_VALIDATION_LEVEL == ValidationLevel.OFF:
+        return None
+    full = SCHEDULE_VALIDATION_LEVEL == ValidationLevel.FULL
     assert len(days_statuses) >= MIN_DAYS_STATUSES_LEN
     assert (len(days_statuses) % 8) == 0
-    for element in days_statuses:
-        assert _is_element_valid(element)
-    assert _at_least_one_available_day(days_statuses)
-    assert _no_not_available_day_after_available(days_statuses)
-    assert _at_least_one_available_week(days_statuses)
-    assert _no_not_available_week_after_available(days_statuses)
-    assert _at_least_one_available_day_of_week(days_statuses)
-    assert _uniform_ascending_elements(days_statuses)
-    assert _elements_in_right_place(days_statuses)
-    assert _no_ignore_element_among_days_elements(days_statuses)
-    assert _all_group_selected_right(days_statuses)
-    assert _no_week_with_all_days_ignore(days_statuses)
-    assert _weeks_groups_statuses_right(days_statuses)
-    assert _no_day_of_week_with_all_days_ignore(days_statuses)
-    assert _day_of_week_groups_statuses_right(days_statuses)
-
-
-def check_clicked_element_assertions(clicked_element: str, days_statuses: list[str]) -> None:
-    """
-    Проверка отсутствия невозможных сценариев для clicked_element.
-
-    При наличии невозможного сценария вызывается AssertionError.
-    """
-    assert _is_element_valid(clicked_element)
-    clicked_element_status, _ = split_element(clicked_element)
-    assert clicked_element_status not in [ScheduleDayStatus.NOT_AVAILABLE, ScheduleDayStatus.IGNORE]
-    assert clicked_element in days_statuses
-
-
-def split_element(element: str) -> tuple[str, str]:
-    if ScheduleDayStatus.NOT_SELECTED in element:
-        return ScheduleDayStatus.NOT_SELECTED, element.split(ScheduleDayStatus.NOT_SELECTED)[-1]
-    elif ScheduleDayStatus.SELECTED in element:
-        return ScheduleDayStatus.SELECTED, element.split(ScheduleDayStatus.SELECTED)[-1]
-    elif ScheduleDayStatus.NOT_AVAILABLE in element:
-        return ScheduleDayStatus.NOT_AVAILABLE, element.split(ScheduleDayStatus.NOT_AVAILABLE)[-1]
-    else:
-        return ScheduleDayStatus.IGNORE, ""
-
-
-def change_all_days_selection_status(days_statuses: list[str], new_status: str) -> list[str]:
-    for i in range(len(days_statuses)):
-        if _is_day_element(days_statuses[i]):
-            status, day = split_element(days_statuses[i])
-            if status in [ScheduleDayStatus.NOT_SELECTED, ScheduleDayStatus.SELECTED]:
-                days_statuses[i] = f"{new_status}{day}"
-    return days_statuses
-
-
-def change_day_of_week_days_selection_status(
-    days_statuses: list[str],
-    new_status: str,
-    day_of_week_index: int,
-) -> list[str]:
+    header_statuses = []
+    for i in range(8):
+        status, group = _GROUPS_ELEMENTS.get(days_statuses[i], (None, None))
+        assert group == _HEADER_GROUPS[i]
+        header_statuses.append(status)
+    days_of_week_counters = [_GroupCounter() for _ in range(7)]
+    week_counter = _GroupCounter()
+    week_status = ""
+    prev_week_number = 0
+    prev_week_available = False
+    available_week_exists = False
+    selected_week_exists = False
+    prev_date: date | None = None
+    prev_day_available = False
+    ignore_after_day = False
+    available_day_exists = False
+    selected_day_exists = False
     for i in range(8, len(days_statuses)):
-        if i % 8 == day_of_week_index:
-            status, day = split_element(days_statuses[i])
-            if status in [ScheduleDayStatus.NOT_SELECTED, ScheduleDayStatus.SELECTED]:
-                days_statuses[i] = f"{new_status}{day}"
-    return days_statuses
-
-
-def change_week_days_selection_status(
-    days_statuses: list[str],
-    new_status: str,
-    week_index: int,
-) -> list[str]:
-    for i in range(week_index + 1, week_index + 8):
-        status, day = split_element(days_statuses[i])
-        if status in [ScheduleDayStatus.NOT_SELECTED, ScheduleDayStatus.SELECTED]:
-            days_statuses[i] = f"{new_status}{day}"
-    return days_statuses
-
-
-def actualize_groups_selection_status(days_statuses: list[str]) -> list[str]:
-    selectable_days_elements = []
-    for element in days_statuses:
-        if _is_day_element(element):
-            status, _ = split_element(element)
-            if status in [ScheduleDayStatus.NOT_SELECTED, ScheduleDayStatus.SELECTED]:
-                selectable_days_elements.append(element)
-    if all(
-        [ScheduleDayStatus.NOT_SELECTED in element for element in selectable_days_elements]
-    ):
-        actual_all_group_status = ScheduleDayStatus.NOT_SELECTED
+        element = days_statuses[i]
+        if i % 8 == 0:
+            status, group = _GROUPS_ELEMENTS.get(element, ("", ""))
+            assert is_week_element(group)
+            if not full:
+                continue
+            if i > 8:
+                week_counter.check(week_status)
+                week_counter = _GroupCounter()
+            week_number = int(group[-1])
+            assert prev_week_number == 0 or week_number - prev_week_number == 1
+            week_available = status != ScheduleDayStatus.NOT_AVAILABLE
+            assert not (prev_week_available and not week_available)
+            available_week_exists = available_week_exists or week_available
+            selected_week_exists = selected_week_exists or status == ScheduleDayStatus.SELECTED
+            week_status = status
+            prev_week_number = week_number
+            prev_week_available = week_available
+            continue
+        if element == ScheduleDayStatus.IGNORE:
+            ignore_after_day = ignore_after_day or prev_date is not None
+            continue
+        match = _DAY_ELEMENT_PATTERN.fullmatch(element)
+        assert match is not None
+        if not full:
+            continue
+        assert not ignore_after_day
+        status, iso_date = match.groups()
+        date_ = date.fromisoformat(iso_date)
+        assert prev_date is None or date_ - prev_date == timedelta(days=1)
+        day_available = status != ScheduleDayStatus.NOT_AVAILABLE
+        assert not (prev_day_available and not day_available)
+        available_day_exists = available_day_exists or day_available
+        selected_day_exists = selected_day_exists or status == ScheduleDayStatus.SELECTED
+        week_counter.add(status)
+        days_of_week_counters[i % 8 - 1].add(status)
+        prev_date = date_
+        prev_day_available = day_available
+    if not full:
+        return None
+    week_counter.check(week_status)
+    for day_of_week_status, day_of_week_counter in zip(header_statuses[1:], days_of_week_counters):
+        day_of_week_counter.check(day_of_week_status)
+    assert available_day_exists
+    assert available_week_exists
+    assert any(status != ScheduleDayStatus.NOT_AVAILABLE for status in header_statuses[1:])
+    selected_day_of_week_exists = ScheduleDayStatus.SELECTED in header_statuses[1:]
+    if header_statuses[0] == ScheduleDayStatus.SELECTED:
+        assert selected_day_exists and selected_week_exists and selected_day_of_week_exists
     else:
-        actual_all_group_status = ScheduleDayStatus.SELECTED
-    days_statuses[0] = f"{actual_all_group_status}{ScheduleDayGroup.ALL}"
+        assert not (selected_day_exists or selected_week_exists or selected_day_of_week_exists)
+
+
+_DAYS_IN_WEEK = 7
+_MAX_WEEKS_IN_MONTH = 6
+_DAYS_OF_WEEK_GROUPS = (
+    ScheduleDayGroup.MONDAY,
+    ScheduleDayGroup.TUESDAY,
+    ScheduleDayGroup.WEDNESDAY,
+    ScheduleDayGroup.THURSDAY,
+    ScheduleDayGroup.FRIDAY,
+    ScheduleDayGroup.SATURDAY,
+    ScheduleDayGroup.SUNDAY,
+)
+WEEKS_MASKS = tuple(
+    ((1 << _DAYS_IN_WEEK) - 1) << (_DAYS_IN_WEEK * week) for week in range(_MAX_WEEKS_IN_MONTH)
+)
+DAYS_OF_WEEK_MASKS = tuple(
+    sum(1 << (_DAYS_IN_WEEK * week + day_of_week) for week in range(_MAX_WEEKS_IN_MONTH))
+    for day_of_week in range(_DAYS_IN_WEEK)
+)
+
+
+@dataclass(frozen=True)
+class MonthSelection:
+    """
+    Выбор рабочих дней месяца в виде битовых масок.
+
+    Дни месяца раскладываются по сетке календаря: недели по 7 дней начиная с понедельника,
+    ячейке сетки (неделя, день недели) соответствует бит номер 7 * неделя + день недели.
+    available - доступные для выбора дни, selected - выбранные дни (подмножество available),
+    ignored - ячейки сетки, не относящиеся к месяцу.
+    Представление в виде days_statuses строится через to_days_statuses,
+    индексы элементов days_statuses используются в click.
+    """
 
-    for day_of_week_group_index in range(1, 8):
-        _, day_of_week = split_element(days_statuses[day_of_week_group_index])
-        day_of_week_selectable_days_elements = []
-        for i in range(8, len(days_statuses)):
+    year: int
+    month: int
+    available: int
+    selected: int = 0
+
+    @classmethod
+    def create(
+        cls,
+        tz_now: datetime,
+        selected_dates: list[str],
+        year: int,
+        month: int,
+    ) -> "MonthSelection":
+        month_selection = cls(year, month, 0)
+        first_available_day = 1
+        if (year, month) == (tz_now.year, tz_now.month):
+            first_available_day = tz_now.day
+        selected_dates_set = set(selected_dates)
+        available = 0
+        selected = 0
+        for day in range(first_available_day, month_selection.days_in_month + 1):
+            day_bit = month_selection.get_day_bit(day)
+            available |= day_bit
+            if date(year, month, day).isoformat() in selected_dates_set:
+                selected |= day_bit
+        return replace(month_selection, available=available, selected=selected)
+
+    @classmethod
+    def from_days_statuses(cls, days_statuses: list[str]) -> "MonthSelection":
+        available = 0
+        selected = 0
+        first_day: date | None = None
+        for i in range(_DAYS_IN_WEEK + 1, len(days_statuses)):
+            if i % 8 == 0:
+                continue
             element = days_statuses[i]
-            if i % 8 == day_of_week_group_index:
-                status, _ = split_element(element)
-                if status in [ScheduleDayStatus.NOT_SELECTED, ScheduleDayStatus.SELECTED]:
-                    day_of_week_selectable_days_elements.append(element)
-        if not day_of_week_selectable_days_elements:
-            actual_status = ScheduleDayStatus.NOT_AVAILABLE
-        elif all(
-            [ScheduleDayStatus.NOT_SELECTED in element for element in day_of_week_selectable_days_elements]
-        ):
-            actual_status = ScheduleDayStatus.NOT_SELECTED
-        else:
-            actual_status = ScheduleDayStatus.SELECTED
-        days_statuses[day_of_week_group_index] = f"{actual_status}{day_of_week}"
-
-    for week_group_index in range(8, len(days_statuses), 8):
-        _, week = split_element(days_statuses[week_group_index])
-        week_days_selectable_elements = []
-        for element in days_statuses[week_group_index+1:week_group_index+8]:
-            status, _ = split_element(element)
-            if status in [ScheduleDayStatus.NOT_SELECTED, ScheduleDayStatus.SELECTED]:
-                week_days_selectable_elements.append(element)
-        if not week_days_selectable_elements:
-            actual_status = ScheduleDayStatus.NOT_AVAILABLE
-        elif all(
-            [ScheduleDayStatus.NOT_SELECTED in element for element in week_days_selectable_elements]
-        ):
-            actual_status = ScheduleDayStatus.NOT_SELECTED
+            if element == ScheduleDayStatus.IGNORE:
+                continue
+            cell_bit = 1 << (_DAYS_IN_WEEK * (i // 8 - 1) + i % 8 - 1)
+            if first_day is None:
+                first_day = date.fromisoformat(element.rsplit(sep="_", maxsplit=1)[-1])
+            if element.startswith(ScheduleDayStatus.SELECTED):
+                available |= cell_bit
+                selected |= cell_bit
+            elif element.startswith(ScheduleDayStatus.NOT_SELECTED):
+                available |= cell_bit
+        assert first_day is not None
+        return cls(first_day.year, first_day.month, available, selected)
+
+    @classmethod
+    def from_state(cls, state: dict[str, int]) -> "MonthSelection":
+        month_selection = cls(**state)
+        month_selection.check()
+        return month_selection
+
+    def to_state(self) -> dict[str, int]:
+        return {
+            "year": self.year,
+            "month": self.month,
+            "available": self.available,
+            "selected": self.selected,
+        }
+
+    def check(self) -> None:
+        """
+        Проверка отсутствия невозможных сценариев.
+
+        При наличии невозможного сценария вызывается AssertionError.
+        """
+        if SCHEDULE_VALIDATION_LEVEL == ValidationLevel.OFF:
+            return None
+        assert not self.available & ~self.month_mask
+        assert not self.selected & ~self.available
+        if SCHEDULE_VALIDATION_LEVEL == ValidationLevel.CHEAP:
+            return None
+        # Недоступны для выбора только прошедшие дни, то есть доступные дни идут подряд до конца месяца
+        assert self.available
+        first_available_bit = self.available & -self.available
+        assert self.available == self.month_mask & ~(first_available_bit - 1)
+        # Клавиатура строится по days_statuses: представление должно проходить их проверки
+        # и однозначно задавать выбор
+        days_statuses = self.to_days_statuses()
+        check_days_statuses_assertions(days_statuses)
+        assert MonthSelection.from_days_statuses(days_statuses) == self
+
+    @property
+    def first_day_of_week(self) -> int:
+        return date(self.year, self.month, 1).weekday()
+
+    @property
+    def days_in_month(self) -> int:
+        return monthrange(self.year, self.month)[1]
+
+    @property
+    def weeks_count(self) -> int:
+        return -(-(self.first_day_of_week + self.days_in_month) // _DAYS_IN_WEEK)
+
+    @property
+    def month_mask(self) -> int:
+        return ((1 << self.days_in_month) - 1) << self.first_day_of_week
+
+    @property
+    def ignored(self) -> int:
+        return ((1 << (_DAYS_IN_WEEK * self.weeks_count)) - 1) & ~self.month_mask
+
+    def get_day_bit(self, day: int) -> int:
+        return 1 << (self.first_day_of_week + day - 1)
+
+    def get_element_mask(self, index: int) -> int:
+        """Ячейки сетки, к которым относится элемент days_statuses с индексом index."""
+        assert 0 <= index < 8 * (self.weeks_count + 1)
+        if index == 0:
+            return self.month_mask
+        elif index < 8:
+            return DAYS_OF_WEEK_MASKS[index - 1]
+        elif index % 8 == 0:
+            return WEEKS_MASKS[index // 8 - 1]
         else:
-            actual_status = ScheduleDayStatus.SELECTED
-        days_statuses[week_group_index] = f"{actual_status}{week}"
+            return 1 << (_DAYS_IN_WEEK * (index // 8 - 1) + index % 8 - 1)
+
+    def click(self, index: int) -> "MonthSelection":
+        """
+        Нажатие на элемент days_statuses с индексом index (день, неделя, день недели или все).
+
+        Нажатие на элемент без доступных для выбора дней ничего не меняет.
+        """
+        mask = self.get_element_mask(index) & self.available
+        if not mask:
+            return self
+        if self.selected & mask:
+            return replace(self, selected=self.selected & ~mask)
+        return replace(self, selected=self.selected | mask)
+
+    def get_dates(self, mask: int) -> list[str]:
+        first_day_of_week = self.first_day_of_week
+        return [
+            date(self.year, self.month, day).isoformat()
+            for day in range(1, self.days_in_month + 1)
+            if mask >> (first_day_of_week + day - 1) & 1
+        ]
 
-    check_days_statuses_assertions(days_statuses)
-    return days_statuses
+    def get_selected_and_not_selected_dates(self) -> tuple[list[str], list[str]]:
+        return self.get_dates(self.selected), self.get_dates(self.available & ~self.selected)
 
+    def _get_group_status(self, mask: int) -> str:
+        if not mask & self.available:
+            return ScheduleDayStatus.NOT_AVAILABLE
+        elif mask & self.selected:
+            return ScheduleDayStatus.SELECTED
+        return ScheduleDayStatus.NOT_SELECTED
 
-def get_selected_and_not_selected_dates(days_statuses: list[str]) -> tuple[list[str], list[str]]:
-    selected_days: list[str] = []
-    not_selected_days: list[str] = []
-    for element in days_statuses:
-        if _is_day_element(element):
-            status, iso_date = split_element(element)
-            if status == ScheduleDayStatus.SELECTED:
-                selected_days.append(iso_date)
-            elif status == ScheduleDayStatus.NOT_SELECTED:
-                not_selected_days.append(iso_date)
-    return selected_days, not_selected_days
+    def to_days_statuses(self) -> list[str]:
+        if self.selected:
+            all_group_status = ScheduleDayStatus.SELECTED
+        else:
+            all_group_status = ScheduleDayStatus.NOT_SELECTED
+        days_statuses = [f"{all_group_status}{ScheduleDayGroup.ALL}"]
+        for day_of_week, day_of_week_mask in zip(_DAYS_OF_WEEK_GROUPS, DAYS_OF_WEEK_MASKS):
+            days_statuses.append(f"{self._get_group_status(day_of_week_mask)}{day_of_week}")
+        first_day_of_week = self.first_day_of_week
+        days_in_month = self.days_in_month
+        iso_month = f"{self.year:04d}-{self.month:02d}"
+        for week in range(self.weeks_count):
+            days_statuses.append(f"{self._get_group_status(WEEKS_MASKS[week])}week{week + 1}")
+            for day_of_week in range(_DAYS_IN_WEEK):
+                cell = _DAYS_IN_WEEK * week + day_of_week
+                day = cell - first_day_of_week + 1
+                if not 1 <= day <= days_in_month:
+                    days_statuses.append(ScheduleDayStatus.IGNORE)
+                    continue
+                status = self._get_group_status(1 << cell)
+                days_statuses.append(f"{status}{iso_month}-{day:02d}")
+        return days_statuses
 
 
 def _get_years_months_days(iso_dates: list[str]) -> dict[int, dict[int, list[int]]]:
@@ -663,6 +517,18 @@ def _get_month_selected_days_view(days: list[int]) -> str:
     return view
 
 
+WEEK_DAYS_NAMES = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+
+
+def get_days_of_week(iso_dates: list[str]) -> list[int]:
+    """Дни недели (1 - понедельник) дат."""
+    return sorted({date.fromisoformat(iso_date).isoweekday() for iso_date in iso_dates})
+
+
+def get_days_of_week_view(days_of_week: list[int]) -> str:
+    return ", ".join(WEEK_DAYS_NAMES[day_of_week - 1] for day_of_week in days_of_week)
+
+
 def get_selected_dates_view(iso_dates: list[str]) -> str:
     view = ""
     years_months_days = _get_years_months_days(iso_dates)
@@ -680,61 +546,14 @@ def get_selected_dates_view(iso_dates: list[str]) -> str:
     return view
 
 
-def get_days_statuses(
-    tz_now: datetime,
-    selected_dates: list[str],
-    chosen_year: int | None,
-    chosen_month: int | None,
-) -> list[str]:
-    current_year = tz_now.year
-    current_month = tz_now.month
-    current_day = tz_now.day
-    if chosen_year is None:
-        assert chosen_month is None
-        assert not selected_dates
-        chosen_year = current_year
-        chosen_month = current_month
-    else:
-        assert chosen_month is not None
-    if chosen_year == current_year:
-        assert chosen_month >= current_month
-    days_statuses = [
-        "not_selected_all",
-        "not_selected_monday",
-        "not_selected_tuesday",
-        "not_selected_wednesday",
-        "not_selected_thursday",
-        "not_selected_friday",
-        "not_selected_saturday",
-        "not_selected_sunday",
-    ]
-    calendar = Calendar()
-    week = 1
-    for year, month, day, day_of_week_number in calendar.itermonthdays4(chosen_year, chosen_month):
-        if month != chosen_month:
-            element = ScheduleDayStatus.IGNORE
-        else:
-            iso_date = date(year, month, day).isoformat()
-            if year == current_year and month == current_month:
-                if day < current_day:
-                    element = f"{ScheduleDayStatus.NOT_AVAILABLE}{iso_date}"
-                else:
-                    if iso_date in selected_dates:
-                        element = f"{ScheduleDayStatus.SELECTED}{iso_date}"
-                    else:
-                        element = f"{ScheduleDayStatus.NOT_SELECTED}{iso_date}"
-            else:
-                if iso_date in selected_dates:
-                    element = f"{ScheduleDayStatus.SELECTED}{iso_date}"
-                else:
-                    element = f"{ScheduleDayStatus.NOT_SELECTED}{iso_date}"
-        days_statuses.append(element)
-        if day_of_week_number % 7 == 6:
-            week_element = f"{ScheduleDayStatus.NOT_AVAILABLE}week{week}"
-            days_statuses.insert(week*8, week_element)
-            week += 1
-    days_statuses = actualize_groups_selection_status(days_statuses)
-    return days_statuses
+def get_booked_slots_view(utc_slots: list[datetime]) -> str:
+    """Забронированные слоты, которые не удалось удалить, по датам (местное время)."""
+    dates_times: dict[str, list[str]] = {}
+    for utc_slot in utc_slots:
+        tz_slot = from_utc(utc_slot, TIMEZONE)
+        dates_times.setdefault(tz_slot.strftime("%d.%m.%Y"), []).append(tz_slot.strftime("%H:%M"))
+    view = "\n".join(f"{date_}: {', '.join(times)}" for date_, times in dates_times.items())
+    return messages.KEPT_BOOKED_SLOTS.format(booked_slots_view=view)
 
 
 _days_of_week = {
@@ -816,34 +635,6 @@ def set_schedule_get_days_keyboard_buttons(days_statuses: list[str]) -> list[Inl
     return result
 
 
-def resolve_days_statuses(days_statuses: list[str], clicked_element: str) -> list[str]:
-    """Выбор диапазонов рабочих дней."""
-    check_days_statuses_assertions(days_statuses)
-    check_clicked_element_assertions(clicked_element, days_statuses)
-    clicked_index = days_statuses.index(clicked_element)
-    clicked_element_status, clicked_element_group_or_day = split_element(clicked_element)
-    if clicked_element_status == ScheduleDayStatus.NOT_SELECTED:
-        new_status = ScheduleDayStatus.SELECTED
-    else:
-        new_status = ScheduleDayStatus.NOT_SELECTED
-    if clicked_element_group_or_day == ScheduleDayGroup.ALL:
-        days_statuses = change_all_days_selection_status(days_statuses, new_status)
-    elif is_day_of_week_element(clicked_element):
-        days_statuses = change_day_of_week_days_selection_status(days_statuses, new_status, clicked_index)
-    elif is_week_element(clicked_element):
-        days_statuses = change_week_days_selection_status(days_statuses, new_status, clicked_index)
-    else:
-        _, day = split_element(clicked_element)
-        days_statuses[clicked_index] = f"{new_status}{day}"
-    days_statuses = actualize_groups_selection_status(days_statuses)
-    return days_statuses
-
-
-def get_initial_times_statuses() -> list[str]:
-    statuses_times = [ScheduleTimeStatus.NOT_SELECTED] * TIMES_STATUSES_LEN
-    return statuses_times
-
-
 def _no_isolated_selected(times_statuses: list[str]) -> bool:
     assert len(times_statuses) >= MINIMAL_TIMES_STATUSES_LEN
     if (
@@ -892,6 +683,8 @@ def check_times_statuses_assertions(times_statuses: list[str]) -> None:
 
     При наличии невозможного сценария вызывается AssertionError.
     """
+    if SCHEDULE_VALIDATION_LEVEL == ValidationLevel.OFF:
+        return None
     possible_statuses = [
         ScheduleTimeStatus.SELECTED,
         ScheduleTimeStatus.NOT_SELECTED,
@@ -899,21 +692,14 @@ def check_times_statuses_assertions(times_statuses: list[str]) -> None:
     ]
     assert len(times_statuses) == TIMES_STATUSES_LEN
     assert all([status in possible_statuses for status in times_statuses])
+    if SCHEDULE_VALIDATION_LEVEL == ValidationLevel.CHEAP:
+        return None
     assert times_statuses.count(ScheduleTimeStatus.EDGE) <= 1
     assert _no_isolated_selected(times_statuses)
     assert _no_edge_selected_combination(times_statuses)
     assert _no_selected_edge_combination(times_statuses)
 
 
-def check_clicked_index_assertions(clicked_index: int) -> None:
-    """
-    Проверка отсутствия невозможных сценариев для clicked_index.
-
-    При наличии невозможного сценария вызывается AssertionError.
-    """
-    assert clicked_index in range(TIMES_STATUSES_LEN)
-
-
 def _get_duration_multiplier_by_times_statuses(times_statuses_len: int) -> int:
     assert times_statuses_len >= MINIMAL_TIMES_STATUSES_LEN
     duration_multiplier = 24*60/(times_statuses_len - 1)
@@ -928,54 +714,165 @@ def _get_iso_time_from_time_index(index: int, duration_multiplier: int) -> str:
     return time_.isoformat(timespec="minutes")
 
 
-def get_selected_times(times_statuses: list[str]) -> list[str]:
-    selected_iso_times = []
-    duration_multiplier = _get_duration_multiplier_by_times_statuses(len(times_statuses))
-    for i in range(len(times_statuses)):
-        current_element = times_statuses[i]
-        try:
-            next_element = times_statuses[i+1]
-        except IndexError:
-            next_element = None
-        if (
-            current_element == ScheduleTimeStatus.SELECTED
-            and next_element == ScheduleTimeStatus.SELECTED
-        ):
-            iso_time = _get_iso_time_from_time_index(i, duration_multiplier)
-            selected_iso_times.append(iso_time)
-    return selected_iso_times
+@dataclass(frozen=True)
+class WorkingHours:
+    """
+    Выбранное рабочее время в виде битового множества точек сетки времени.
 
+    Точка i сетки соответствует времени i * duration_multiplier минут от начала суток,
+    последняя точка - концу суток. Выбранные точки образуют интервалы (серии) минимум
+    из двух точек, edge - одиночная точка, от которой ожидается выбор второй границы интервала.
+    В состоянии FSM хранится одно число (см. to_state).
+    """
 
-def get_times_statuses_view(times_statuses: list[str]) -> str:
-    view = ""
-    duration_multiplier = _get_duration_multiplier_by_times_statuses(len(times_statuses))
-    prev_element = None
-    for i in range(len(times_statuses)):
-        current_element = times_statuses[i]
-        try:
-            next_element = times_statuses[i+1]
-        except IndexError:
-            next_element = None
-        iso_time = _get_iso_time_from_time_index(i, duration_multiplier)
-        if current_element == ScheduleTimeStatus.EDGE:
-            view += "\n"
-            if prev_element:
-                view += "...-"
-            view += iso_time
-            if next_element:
-                view += "-..."
-        elif current_element == ScheduleTimeStatus.SELECTED:
-            if prev_element != ScheduleTimeStatus.SELECTED:
-                view += f"\n{iso_time}-"
-            elif next_element != ScheduleTimeStatus.SELECTED:
-                view += f"{iso_time}"
-        prev_element = times_statuses[i]
-    view = view.strip()
-    if view == "":
-        view = messages.SET_WORKING_HOURS
-    else:
-        view = messages.SELECTED_WORKING_HOURS.format(selected_times_view=view)
-    return view
+    duration_multiplier: int = DURATION_MULTIPLIER
+    selected: int = 0
+    edge: int | None = None
+
+    @property
+    def points_count(self) -> int:
+        return get_all_times_len(self.duration_multiplier)
+
+    @classmethod
+    def from_state(cls, state: int, duration_multiplier: int = DURATION_MULTIPLIER) -> "WorkingHours":
+        points_count = get_all_times_len(duration_multiplier)
+        edge = (state >> points_count) - 1
+        working_hours = cls(
+            duration_multiplier,
+            state & ((1 << points_count) - 1),
+            edge if edge >= 0 else None,
+        )
+        working_hours.check()
+        return working_hours
+
+    def to_state(self) -> int:
+        if self.edge is None:
+            return self.selected
+        return self.selected | (self.edge + 1) << self.points_count
+
+    @classmethod
+    def from_times_statuses(cls, times_statuses: list[str]) -> "WorkingHours":
+        duration_multiplier = _get_duration_multiplier_by_times_statuses(len(times_statuses))
+        assert get_all_times_len(duration_multiplier) == len(times_statuses)
+        selected = 0
+        edge = None
+        for i, status in enumerate(times_statuses):
+            if status == ScheduleTimeStatus.SELECTED:
+                selected |= 1 << i
+            elif status == ScheduleTimeStatus.EDGE:
+                edge = i
+        return cls(duration_multiplier, selected, edge)
+
+    def to_times_statuses(self) -> list[str]:
+        times_statuses = []
+        for i in range(self.points_count):
+            if i == self.edge:
+                times_statuses.append(ScheduleTimeStatus.EDGE)
+            elif self.selected >> i & 1:
+                times_statuses.append(ScheduleTimeStatus.SELECTED)
+            else:
+                times_statuses.append(ScheduleTimeStatus.NOT_SELECTED)
+        return times_statuses
+
+    def check(self) -> None:
+        """
+        Проверка отсутствия невозможных сценариев.
+
+        При наличии невозможного сценария вызывается AssertionError.
+        """
+        if SCHEDULE_VALIDATION_LEVEL == ValidationLevel.OFF:
+            return None
+        assert 0 <= self.selected < 1 << self.points_count
+        assert self.edge is None or 0 <= self.edge < self.points_count
+        if SCHEDULE_VALIDATION_LEVEL == ValidationLevel.CHEAP:
+            return None
+        assert all(end > start for start, end in self.iter_runs())
+        if self.edge is not None:
+            assert not (0b111 << self.edge >> 1) & self.selected
+        if self.points_count == TIMES_STATUSES_LEN:
+            # Клавиатура строится по times_statuses: представление должно проходить их проверки
+            # и однозначно задавать выбор
+            times_statuses = self.to_times_statuses()
+            check_times_statuses_assertions(times_statuses)
+            assert WorkingHours.from_times_statuses(times_statuses) == self
+
+    def add_range(self, start: int, end: int) -> "WorkingHours":
+        """Выбор точек с start по end включительно."""
+        assert 0 <= start <= end < self.points_count
+        return replace(self, selected=self.selected | ((1 << (end - start + 1)) - 1) << start)
+
+    def remove_range(self, start: int, end: int) -> "WorkingHours":
+        """Снятие выбора точек с start по end включительно."""
+        assert 0 <= start <= end < self.points_count
+        return replace(self, selected=self.selected & ~(((1 << (end - start + 1)) - 1) << start))
+
+    def get_run_end(self, index: int) -> int:
+        """Последняя точка серии выбранных точек, начиная с index."""
+        not_selected = ~self.selected >> index
+        return index + (not_selected & -not_selected).bit_length() - 2
+
+    def iter_runs(self) -> Iterator[tuple[int, int]]:
+        """Серии выбранных точек (первая и последняя точки) по возрастанию."""
+        selected = self.selected
+        while selected:
+            start = (selected & -selected).bit_length() - 1
+            end = self.get_run_end(start)
+            yield start, end
+            selected &= ~((1 << (end + 1)) - 1)
+
+    def click(self, index: int) -> "WorkingHours":
+        """Выбор диапазонов рабочего времени (нажатие на точку сетки index)."""
+        assert 0 <= index < self.points_count
+        if self.edge is not None:
+            if index == self.edge:
+                return replace(self, edge=None)
+            return replace(self.add_range(min(index, self.edge), max(index, self.edge)), edge=None)
+        index_bit = 1 << index
+        if not self.selected & index_bit:
+            if (index_bit << 1 | index_bit >> 1) & self.selected:
+                return replace(self, selected=self.selected | index_bit)
+            return replace(self, edge=index)
+        working_hours = self.remove_range(index, self.get_run_end(index))
+        prev_selected = index >= 1 and self.selected >> (index - 1) & 1
+        prev_prev_selected = index >= 2 and self.selected >> (index - 2) & 1
+        if prev_selected and not prev_prev_selected:
+            working_hours = replace(working_hours.remove_range(index - 1, index - 1), edge=index - 1)
+        return working_hours
+
+    def get_iso_time(self, index: int) -> str:
+        return _get_iso_time_from_time_index(index, self.duration_multiplier)
+
+    def get_selected_times(self) -> list[str]:
+        """Начала выбранных слотов."""
+        return [
+            self.get_iso_time(i)
+            for start, end in self.iter_runs()
+            for i in range(start, end)
+        ]
+
+    def get_day_minutes(self) -> list[tuple[int, int]]:
+        """Выбранные интервалы [начало, конец) в минутах от начала суток."""
+        return [
+            (start * self.duration_multiplier, end * self.duration_multiplier)
+            for start, end in self.iter_runs()
+        ]
+
+    def get_view(self) -> str:
+        lines = [
+            (start, f"{self.get_iso_time(start)}-{self.get_iso_time(end)}")
+            for start, end in self.iter_runs()
+        ]
+        if self.edge is not None:
+            edge_view = self.get_iso_time(self.edge)
+            if self.edge > 0:
+                edge_view = f"...-{edge_view}"
+            if self.edge < self.points_count - 1:
+                edge_view = f"{edge_view}-..."
+            lines.append((self.edge, edge_view))
+        view = "\n".join(line for _, line in sorted(lines))
+        if view == "":
+            return messages.SET_WORKING_HOURS
+        return messages.SELECTED_WORKING_HOURS.format(selected_times_view=view)
 
 
 def get_working_hours_view(iso_times: list[str], duration_multiplier: int) -> str:
@@ -1028,107 +925,22 @@ def set_schedule_get_times_keyboard_buttons(times_statuses: list[str]) -> list[I
     return result
 
 
-def get_slots_to_save(iso_tz_dates: list[str], iso_tz_times: list[str]) -> dict[str, list[str]]:
-    assert iso_tz_dates
-    assert iso_tz_times
-    utc_slots: list[datetime] = []
-    for iso_tz_date in iso_tz_dates:
-        for iso_time in iso_tz_times:
-            tz_date = date.fromisoformat(iso_tz_date)
-            tz_time = time.fromisoformat(iso_time)
-            slot_tz_dt = TIMEZONE.localize(datetime(tz_date.year, tz_date.month, tz_date.day, tz_time.hour, tz_time.minute))
-            slot_utc_dt = to_utc(slot_tz_dt)
-            utc_slots.append(slot_utc_dt)
-    dates_slots = {}
-    for utc_datetime in utc_slots:
-        iso_date = utc_datetime.date().isoformat()
-        iso_datetime = utc_datetime.replace(tzinfo=None).isoformat()
-        if iso_date not in dates_slots:
-            dates_slots[iso_date] = [iso_datetime]
-        else:
-            dates_slots[iso_date].append(iso_datetime)
-    return dates_slots
-
-
-def get_slots_to_delete(iso_tz_dates: list[str], iso_tz_times: list[str]) -> list[str]:
+def get_utc_slots(iso_tz_dates: list[str], iso_tz_times: list[str]) -> list[datetime]:
+    """
+    Слоты UTC (без tzinfo) выбранных местных дат и времен для сохранения или удаления,
+    см. get_utc_epoch_minutes.
+    """
     assert iso_tz_dates
     assert iso_tz_times
-    slots = []
-    for iso_tz_date in iso_tz_dates:
-        for iso_tz_time in iso_tz_times:
-            tz_date = date.fromisoformat(iso_tz_date)
-            tz_time = time.fromisoformat(iso_tz_time)
-            slot_tz_dt = TIMEZONE.localize(datetime(tz_date.year, tz_date.month, tz_date.day, tz_time.hour, tz_time.minute))
-            slot_utc_dt = to_utc(slot_tz_dt)
-            iso_utc_datetime = slot_utc_dt.replace(tzinfo=None).isoformat()
-            slots.append(iso_utc_datetime)
-    return slots
-
-
-def resolve_times_statuses(times_statuses: list[str], clicked_index: int) -> list[str]:
-    """Выбор диапазонов рабочего времени."""
-    check_times_statuses_assertions(times_statuses)
-    check_clicked_index_assertions(clicked_index)
-    prev_index = clicked_index - 1
-    prev_prev_index = clicked_index - 2
-    next_index = clicked_index + 1
-    if ScheduleTimeStatus.EDGE in times_statuses:
-        edge_index = times_statuses.index(ScheduleTimeStatus.EDGE)
-        if clicked_index < edge_index:
-            for i in range(clicked_index, edge_index + 1):
-                times_statuses[i] = ScheduleTimeStatus.SELECTED
-        elif clicked_index == edge_index:
-            times_statuses[edge_index] = ScheduleTimeStatus.NOT_SELECTED
-        else:
-            for i in range(edge_index, next_index):
-                times_statuses[i] = ScheduleTimeStatus.SELECTED
-    else:
-        if times_statuses[clicked_index] == ScheduleTimeStatus.NOT_SELECTED:
-            try:
-                prev_status = times_statuses[prev_index]
-            except IndexError:
-                prev_status = None
-            try:
-                next_status = times_statuses[next_index]
-            except IndexError:
-                next_status = None
-            if (
-                prev_status == ScheduleTimeStatus.SELECTED
-                or next_status == ScheduleTimeStatus.SELECTED
-            ):
-                times_statuses[clicked_index] = ScheduleTimeStatus.SELECTED
-            else:
-                times_statuses[clicked_index] = ScheduleTimeStatus.EDGE
-        else:
-            if prev_prev_index < 0:
-                prev_prev_status = None
-            else:
-                prev_prev_status = times_statuses[prev_prev_index]
-            if prev_index < 0:
-                prev_status = None
-            else:
-                prev_status = times_statuses[prev_index]
-            if prev_status != ScheduleTimeStatus.SELECTED:
-                for i in range(clicked_index, len(times_statuses)):
-                    if times_statuses[i] != ScheduleTimeStatus.SELECTED:
-                        break
-                    times_statuses[i] = ScheduleTimeStatus.NOT_SELECTED
-            else:
-                for i in range(clicked_index, len(times_statuses)):
-                    if times_statuses[i] != ScheduleTimeStatus.SELECTED:
-                        break
-                    times_statuses[i] = ScheduleTimeStatus.NOT_SELECTED
-                if prev_prev_status != ScheduleTimeStatus.SELECTED:
-                    times_statuses[prev_index] = ScheduleTimeStatus.EDGE
-    check_times_statuses_assertions(times_statuses)
-    return times_statuses
-
-
-def get_schedule_times(slots_datetimes: list[datetime]) -> list[str]:
-    times = []
-    for slot_datetime in slots_datetimes:
-        times.append(slot_datetime.time().isoformat(timespec="minutes"))
-    return times
+    tz_dates = [date.fromisoformat(iso_tz_date) for iso_tz_date in iso_tz_dates]
+    day_minutes = [
+        tz_time.hour * 60 + tz_time.minute
+        for tz_time in map(time.fromisoformat, iso_tz_times)
+    ]
+    return [
+        EPOCH + timedelta(minutes=utc_minute)
+        for utc_minute in get_utc_epoch_minutes(tz_dates, day_minutes, TIMEZONE)
+    ]
 
 
 def view_schedule_get_years_keyboard_buttons(
@@ -1205,8 +1017,7 @@ def view_schedule_get_days_keyboard_buttons(
     calendar = Calendar()
     result.append(InlineButton("choose_month", str(months[chosen_month]), str(chosen_month)))
     result.append(InlineButton("choose_year", str(chosen_year), str(chosen_year)))
-    week_days_names = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
-    for week_day_name in week_days_names:
+    for week_day_name in WEEK_DAYS_NAMES:
         result.append(InlineButton("ignore", week_day_name, str(0)))
     for month_day_number in calendar.itermonthdays(chosen_year, chosen_month):
         if month_day_number == 0:
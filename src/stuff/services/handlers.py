@@ -15,6 +15,7 @@ from src.stuff.services.logic import (
     set_service_new_price_logic,
     set_service_price_logic,
 )
+from src.writer import DatabaseWriter
 
 
 async def choose_services_action(
@@ -50,27 +51,25 @@ async def set_service_price(message: types.Message, state: FSMContext) -> None:
 
 async def set_service_duration(
     message: types.Message,
-    async_session: async_sessionmaker[AsyncSession],
+    db_writer: DatabaseWriter,
     state: FSMContext,
 ) -> None:
     if not message.text:
         return None
     data = await state.get_data()
-    async with async_session() as session:
-        result = await set_service_duration_logic(message.text, session, data)
+    result = await set_service_duration_logic(message.text, db_writer, data)
     await process_logic_return(result, fsm_context=state, message=message)
 
 
 async def choose_service_to_delete(
     message: types.Message,
-    async_session: async_sessionmaker[AsyncSession],
+    db_writer: DatabaseWriter,
     state: FSMContext,
 ) -> None:
     if not message.text:
         return None
     services_to_delete = await state.get_data()
-    async with async_session() as session:
-        result = await choose_service_to_delete_logic(message.text, session, services_to_delete)
+    result = await choose_service_to_delete_logic(message.text, db_writer, services_to_delete)
     await process_logic_return(result, fsm_context=state, message=message)
 
 
@@ -102,38 +101,35 @@ async def choose_service_field_to_update(
 
 async def set_service_new_name(
     message: types.Message,
-    async_session: async_sessionmaker[AsyncSession],
+    db_writer: DatabaseWriter,
     state: FSMContext,
 ) -> None:
     if not message.text:
         return None
     data = await state.get_data()
-    async with async_session() as session:
-        result = await set_service_new_name_logic(message.text, session, data)
+    result = await set_service_new_name_logic(message.text, db_writer, data)
     await process_logic_return(result, fsm_context=state, message=message)
 
 
 async def set_service_new_price(
     message: types.Message,
-    async_session: async_sessionmaker[AsyncSession],
+    db_writer: DatabaseWriter,
     state: FSMContext,
 ) -> None:
     if not message.text:
         return None
     data = await state.get_data()
-    async with async_session() as session:
-        result = await set_service_new_price_logic(message.text, session, data)
+    result = await set_service_new_price_logic(message.text, db_writer, data)
     await process_logic_return(result, fsm_context=state, message=message)
 
 
 async def set_service_new_duration(
     message: types.Message,
-    async_session: async_sessionmaker[AsyncSession],
+    db_writer: DatabaseWriter,
     state: FSMContext,
 ) -> None:
     if not message.text:
         return None
     data = await state.get_data()
-    async with async_session() as session:
-        result = await set_service_new_duration_logic(message.text, session, data)
+    result = await set_service_new_duration_logic(message.text, db_writer, data)
     await process_logic_return(result, fsm_context=state, message=message)
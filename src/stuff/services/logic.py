@@ -35,6 +35,7 @@ from src.stuff.services.keyboards import (
     set_service_new_field_keyboard,
 )
 from src.stuff.services.states import ServicesActions
+from src.writer import DatabaseWriter
 
 
 async def choose_services_action_logic(user_input: str, session: AsyncSession) -> LogicResult:
@@ -141,7 +142,7 @@ async def set_service_price_logic(user_input: str) -> LogicResult:
 
 async def set_service_duration_logic(
     user_input: str,
-    session: AsyncSession,
+    db_writer: DatabaseWriter,
     state_data: dict,
 ) -> LogicResult:
     text = user_input.strip()
@@ -157,7 +158,7 @@ async def set_service_duration_logic(
         if isinstance(possible_duration, int):
             state_data.update({"duration": possible_duration})
             new_service = Service(**state_data)
-            await insert_service(session, new_service)
+            await db_writer.write(lambda session: insert_service(session, new_service))
             messages_to_answer = [
                 MessageToAnswer(
                     messages.SERVICE_CREATED.format(name=new_service.name),
@@ -174,7 +175,7 @@ async def set_service_duration_logic(
 
 async def choose_service_to_delete_logic(
     user_input: str,
-    session: AsyncSession,
+    db_writer: DatabaseWriter,
     services_to_delete: dict,
 ) -> LogicResult:
     text = user_input.strip()
@@ -192,7 +193,9 @@ async def choose_service_to_delete_logic(
             messages_to_answer = [ MessageToAnswer(messages.CHOOSE_SERVICE_TO_DELETE, back_main_keyboard) ]
             return get_logic_result(messages_to_answer)
         else:
-            await delete_service(session, service_name_to_delete)
+            await db_writer.write(
+                lambda session: delete_service(session, service_name_to_delete),
+            )
             messages_to_answer = [
                 MessageToAnswer(
                     messages.SERVICE_DELETED.format(name=service_name_to_delete),
@@ -315,7 +318,7 @@ def _update_another_service(services_names: list[str]) -> LogicResult:
 
 async def set_service_new_name_logic(
     user_input: str,
-    session: AsyncSession,
+    db_writer: DatabaseWriter,
     state_data: dict,
 ) -> LogicResult:
     text = preprocess_text(user_input)
@@ -357,7 +360,11 @@ async def set_service_new_name_logic(
                         new_name if name == old_name else name
                         for name in services_names
                     ]
-                    await update_service(session, old_name, new_values={"name": new_name})
+                    await db_writer.write(
+                        lambda session: update_service(
+                            session, old_name, new_values={"name": new_name},
+                        ),
+                    )
                     data_to_update = {
                         "services_names": updated_services_names,
                         "chosen_service_name": new_name,
@@ -376,7 +383,7 @@ async def set_service_new_name_logic(
 
 async def set_service_new_price_logic(
     user_input: str,
-    session: AsyncSession,
+    db_writer: DatabaseWriter,
     state_data: dict,
 ) -> LogicResult:
     text = user_input.strip()
@@ -403,7 +410,11 @@ async def set_service_new_price_logic(
                 return get_logic_result(messages_to_answer)
             else:
                 service_name = state_data["chosen_service_name"]
-                await update_service(session, service_name, new_values={"price": new_price})
+                await db_writer.write(
+                    lambda session: update_service(
+                        session, service_name, new_values={"price": new_price},
+                    ),
+                )
                 data_to_update = {"chosen_service_price": new_price}
                 messages_to_answer = [
                     MessageToAnswer(
@@ -424,7 +435,7 @@ async def set_service_new_price_logic(
 
 async def set_service_new_duration_logic(
     user_input: str,
-    session: AsyncSession,
+    db_writer: DatabaseWriter,
     state_data: dict,
 ) -> LogicResult:
     text = user_input.strip()
@@ -451,7 +462,11 @@ async def set_service_new_duration_logic(
                 return get_logic_result(messages_to_answer)
             else:
                 service_name = state_data["chosen_service_name"]
-                await update_service(session, service_name, new_values={"duration": new_duration})
+                await db_writer.write(
+                    lambda session: update_service(
+                        session, service_name, new_values={"duration": new_duration},
+                    ),
+                )
                 data_to_update = {"chosen_service_duration": new_duration}
                 messages_to_answer = [
                     MessageToAnswer(
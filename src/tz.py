@@ -0,0 +1,174 @@
+"""
+Перевод времени UTC в местное время по заранее вычисленной таблице смещений часового пояса.
+
+Таблица строится через zoneinfo один раз на промежуток времени, дальше смещение момента
+находится двоичным поиском по таблице, а для отсортированных моментов - проходом по ней.
+"""
+
+from bisect import bisect_right
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta, tzinfo
+from zoneinfo import ZoneInfo
+
+from src.config import TIMEZONE, TIMEZONE_TABLE_HORIZON_DAYS
+from src.models import EPOCH
+
+
+_MINUTE = timedelta(minutes=1)
+
+
+def to_zoneinfo(tz: tzinfo) -> tzinfo:
+    """Часовой пояс zoneinfo для часового пояса pytz (другие часовые пояса возвращаются как есть)."""
+    zone = getattr(tz, "zone", None)
+    if zone is None:
+        return tz
+    return ZoneInfo(zone)
+
+
+def to_epoch_minute(utc_datetime: datetime) -> int:
+    """Минуты от начала эпохи Unix (наивные значения считаются заданными в UTC)."""
+    if utc_datetime.tzinfo is not None:
+        utc_datetime = utc_datetime.astimezone(UTC).replace(tzinfo=None)
+    return (utc_datetime - EPOCH) // _MINUTE
+
+
+def _get_offset(tz: tzinfo, utc_minute: int) -> int:
+    utc_datetime = (EPOCH + timedelta(minutes=utc_minute)).replace(tzinfo=UTC)
+    return utc_datetime.astimezone(tz).utcoffset() // _MINUTE
+
+
+@dataclass(frozen=True)
+class TransitionTable:
+    """
+    Смещения часового пояса tz от UTC на промежутке [start, end) в минутах.
+
+    starts - минуты UTC (от начала эпохи Unix), с которых действуют смещения offsets,
+    первый элемент равен start. Для моментов вне промежутка смещение вычисляется через tz.
+    """
+
+    tz: tzinfo
+    start: int
+    end: int
+    starts: list[int]
+    offsets: list[int]
+
+    @classmethod
+    def build(cls, tz: tzinfo, utc_start: datetime, utc_end: datetime) -> "TransitionTable":
+        """
+        Построение таблицы: смещение проверяется раз в сутки,
+        момент перехода уточняется двоичным поиском с точностью до минуты.
+        """
+        tz = to_zoneinfo(tz)
+        start, end = to_epoch_minute(utc_start), to_epoch_minute(utc_end)
+        starts, offsets = [start], [_get_offset(tz, start)]
+        day_start = start
+        while day_start < end:
+            day_end = min(day_start + 24 * 60, end)
+            if _get_offset(tz, day_end) != offsets[-1]:
+                low, high = day_start + 1, day_end
+                while low < high:
+                    middle = (low + high) // 2
+                    if _get_offset(tz, middle) == offsets[-1]:
+                        low = middle + 1
+                    else:
+                        high = middle
+                starts.append(low)
+                offsets.append(_get_offset(tz, low))
+            day_start = day_end
+        return cls(tz, start, end, starts, offsets)
+
+    def covers(self, utc_start: int, utc_end: int) -> bool:
+        return self.start <= utc_start and utc_end <= self.end
+
+    def get_offset(self, utc_minute: int) -> int:
+        """Смещение (в минутах) в момент utc_minute."""
+        if not self.start <= utc_minute < self.end:
+            return _get_offset(self.tz, utc_minute)
+        return self.offsets[bisect_right(self.starts, utc_minute) - 1]
+
+    def get_transitions(self, utc_start: int, utc_end: int) -> list[tuple[int, int]]:
+        """
+        Смещения, действующие на промежутке [utc_start, utc_end] внутри таблицы: пары
+        (минута UTC, с которой действует смещение; смещение), первая пара начинается с utc_start.
+        """
+        first = bisect_right(self.starts, utc_start) - 1
+        last = bisect_right(self.starts, utc_end) - 1
+        return [(utc_start, self.offsets[first])] + [
+            (self.starts[period], self.offsets[period]) for period in range(first + 1, last + 1)
+        ]
+
+    def _get_periods(self, utc_minutes: list[int]) -> list[int]:
+        """
+        Номера периодов смещения моментов UTC (-1 для моментов вне таблицы).
+
+        Пока моменты идут по возрастанию, период ищется проходом вперед по таблице,
+        иначе - двоичным поиском.
+        """
+        periods = []
+        period = 0
+        last_period = len(self.starts) - 1
+        previous = None
+        for utc_minute in utc_minutes:
+            if not self.start <= utc_minute < self.end:
+                periods.append(-1)
+                continue
+            if previous is None or utc_minute < previous:
+                period = bisect_right(self.starts, utc_minute) - 1
+            else:
+                while period < last_period and self.starts[period + 1] <= utc_minute:
+                    period += 1
+            previous = utc_minute
+            periods.append(period)
+        return periods
+
+    def to_local_minutes(self, utc_minutes: Iterable[int]) -> list[int]:
+        """Местное время (минуты от начала эпохи Unix по местным часам) для моментов UTC."""
+        utc_minutes = list(utc_minutes)
+        return [
+            utc_minute + (self.offsets[period] if period >= 0 else _get_offset(self.tz, utc_minute))
+            for utc_minute, period in zip(utc_minutes, self._get_periods(utc_minutes))
+        ]
+
+    def from_utc(self, utc_datetimes: Iterable[datetime]) -> list[datetime]:
+        """
+        Перевод моментов UTC (наивные значения считаются заданными в UTC, секунды отбрасываются)
+        в местное время часового пояса таблицы, как from_utc для каждого момента.
+        """
+        utc_minutes = [to_epoch_minute(utc_datetime) for utc_datetime in utc_datetimes]
+        # До этого момента UTC местное время периода повторяет время предыдущего периода
+        # (переход назад), такое время - второе из двух (fold=1)
+        fold_ends = [self.starts[0]] + [
+            self.starts[i] + max(self.offsets[i - 1] - self.offsets[i], 0) for i in range(1, len(self.starts))
+        ]
+        tz_datetimes = []
+        for utc_minute, period in zip(utc_minutes, self._get_periods(utc_minutes)):
+            if period < 0:
+                utc_datetime = (EPOCH + timedelta(minutes=utc_minute)).replace(tzinfo=UTC)
+                tz_datetimes.append(utc_datetime.astimezone(self.tz))
+                continue
+            local_datetime = EPOCH + timedelta(minutes=utc_minute + self.offsets[period])
+            tz_datetimes.append(local_datetime.replace(tzinfo=self.tz, fold=int(utc_minute < fold_ends[period])))
+        return tz_datetimes
+
+
+_tables: dict[str, TransitionTable] = {}
+
+
+def get_transition_table(utc_start: datetime, utc_end: datetime, tz: tzinfo = TIMEZONE) -> TransitionTable:
+    """
+    Таблица смещений часового пояса tz, покрывающая промежуток [utc_start, utc_end].
+
+    Таблица часового пояса хранится и перестраивается, только если промежуток выходит за ее пределы:
+    новая таблица начинается за сутки до utc_start и покрывает TIMEZONE_TABLE_HORIZON_DAYS дней
+    (но не меньше промежутка).
+    """
+    key = str(tz)
+    start, end = to_epoch_minute(utc_start), to_epoch_minute(utc_end) + 1
+    table = _tables.get(key)
+    if table is None or not table.covers(start, end):
+        table_start = utc_start - timedelta(days=1)
+        table_end = max(utc_start + timedelta(days=TIMEZONE_TABLE_HORIZON_DAYS), utc_end + timedelta(days=1))
+        table = TransitionTable.build(tz, table_start, table_end)
+        _tables[key] = table
+    return table
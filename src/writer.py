@@ -0,0 +1,109 @@
+"""Очередь записи в базу данных."""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+WriteJob = Callable[[AsyncSession], Awaitable[T]]
+CommitListener = Callable[[dict], None]
+
+
+class DatabaseWriter:
+    """
+    Единственный писатель в базу данных.
+
+    Записи выполняются строго по очереди через единственное пишущее подключение.
+    Накопившиеся в очереди записи фиксируются одной транзакцией (group commit),
+    каждая запись выполняется в своей точке сохранения (SAVEPOINT), поэтому ошибка
+    одной записи не откатывает остальные записи пачки.
+    Запись (job) получает сессию и не должна сама вызывать commit.
+    После фиксации каждой пачки вызываются слушатели с session.info транзакции.
+    """
+
+    def __init__(
+        self,
+        async_session: async_sessionmaker[AsyncSession],
+        max_batch_size: int = 32,
+    ) -> None:
+        self._async_session = async_session
+        self._max_batch_size = max_batch_size
+        self._queue: asyncio.Queue[tuple[WriteJob, asyncio.Future] | None] = asyncio.Queue()
+        self._worker: asyncio.Task | None = None
+        self._commit_listeners: list[CommitListener] = []
+
+    def add_commit_listener(self, listener: CommitListener) -> None:
+        self._commit_listeners.append(listener)
+
+    def start(self) -> None:
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка писателя после выполнения уже поставленных в очередь записей."""
+        if self._worker is None:
+            return None
+        await self._queue.put(None)
+        await self._worker
+        self._worker = None
+
+    async def write(self, job: WriteJob[T]) -> T:
+        """Постановка записи в очередь и ожидание ее фиксации в базе данных."""
+        if self._worker is None:
+            raise RuntimeError("Писатель в базу данных не запущен")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((job, future))
+        return await future
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            while len(batch) < self._max_batch_size and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._process_batch(batch)
+
+    async def _process_batch(self, batch: list[tuple[WriteJob, asyncio.Future]]) -> None:
+        outcomes: list[tuple[asyncio.Future, Any, BaseException | None]] = []
+        session_info: dict | None = None
+        try:
+            async with self._async_session() as session:
+                for job, future in batch:
+                    try:
+                        async with session.begin_nested():
+                            result = await job(session)
+                    except Exception as error:
+                        outcomes.append((future, None, error))
+                    else:
+                        outcomes.append((future, result, None))
+                await session.commit()
+                session_info = dict(session.info)
+        except Exception as error:
+            logger.exception("Не удалось зафиксировать пачку из %s записей", len(batch))
+            outcomes = [(future, None, error) for _, future in batch]
+        if session_info is not None:
+            for listener in self._commit_listeners:
+                try:
+                    listener(session_info)
+                except Exception:
+                    logger.exception("Ошибка слушателя фиксации транзакции")
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
@@ -1,5 +1,76 @@
+import asyncio
+
+import pytest
 from pytest import MonkeyPatch
 
 
 monkeypatch = MonkeyPatch()
 monkeypatch.setenv("TIMEZONE", "Europe/Moscow")
+monkeypatch.setenv("SCHEDULE_VALIDATION_LEVEL", "full")
+
+
+@pytest.fixture
+def run_with_session(tmp_path):
+    """
+    Запуск сценария scenario(async_session) на новой базе данных database в tmp_path.
+
+    Схема создается миграциями, сессии открываются на пишущем движке, движок закрывается
+    после сценария. Возвращается результат сценария.
+    """
+    # Модули src читают переменные окружения при импорте, поэтому импортируются после их установки
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    from src.config import SQLITE_PROFILES
+    from src.engine import create_write_engine
+    from src.migrations import upgrade_schema
+
+    def run(scenario, database="db.sqlite3"):
+        async def main():
+            engine = create_write_engine(f"sqlite+aiosqlite:///{tmp_path / database}", SQLITE_PROFILES["tuned"])
+            try:
+                async with engine.begin() as conn:
+                    await conn.run_sync(upgrade_schema)
+                return await scenario(async_sessionmaker(engine, expire_on_commit=False))
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture
+def run_with_writer(tmp_path):
+    """
+    Запуск сценария scenario(db_writer, async_session) на новой базе данных в tmp_path.
+
+    db_writer - запущенный DatabaseWriter, async_session - сессии читающего движка (как в боте).
+    Писатель останавливается и движки закрываются после сценария. Возвращается результат сценария.
+    """
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    from src.config import SQLITE_PROFILES
+    from src.engine import create_read_engine, create_write_engine
+    from src.migrations import upgrade_schema
+    from src.writer import DatabaseWriter
+
+    def run(scenario, **writer_kwargs):
+        async def main():
+            db_url = f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite3'}"
+            profile = SQLITE_PROFILES["tuned"]
+            write_engine = create_write_engine(db_url, profile)
+            read_engine = create_read_engine(db_url, profile, pool_size=2)
+            async with write_engine.begin() as conn:
+                await conn.run_sync(upgrade_schema)
+            db_writer = DatabaseWriter(async_sessionmaker(write_engine, expire_on_commit=False), **writer_kwargs)
+            db_writer.start()
+            try:
+                return await scenario(db_writer, async_sessionmaker(read_engine, expire_on_commit=False))
+            finally:
+                await db_writer.stop()
+                await read_engine.dispose()
+                await write_engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
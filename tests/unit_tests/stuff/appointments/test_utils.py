@@ -1,7 +1,11 @@
-from datetime import datetime
+import asyncio
+from datetime import date, datetime, timedelta
 
 import pytest
 
+from src.calendar_index import CalendarIndex
+from src.config import TIMEZONE
+from src.models import Service, Slot
 from src.stuff.appointments.exceptions import (
     DayBecomeNotAvailable,
     MonthBecomeNotAvailable,
@@ -11,37 +15,44 @@ from src.stuff.appointments.exceptions import (
 from src.stuff.appointments.keyboards import InlineButton
 from src.stuff.appointments.utils import (
     check_chosen_datetime_is_possible,
+    get_conflicting_times,
     get_datetimes_needed_for_appointment,
-    get_times_for_appointment,
     get_months_keyboard_buttons,
+    get_times_for_appointment,
+    get_times_possible_for_appointment,
     get_years_keyboard_buttons,
+    select_start_times_within_day,
 )
 
 
 @pytest.mark.parametrize(
-    "datetime_,slots,expected_exception,expected_exception_message",
+    "datetime_,available_days,day_times,expected_exception,expected_exception_message",
     [
         (
             datetime(2026, 6, 15),
-            {2027: {3: {18: ["10:00"]}}},
+            {2027: {3: [18]}},
+            [],
             YearBecomeNotAvailable,
             "2026 год стал недоступен для записи",
         ),
         (
             datetime(2026, 6, 15),
-            {2026: {3: {18: ["10:00"]}}},
+            {2026: {3: [18]}},
+            [],
             MonthBecomeNotAvailable,
             "Июнь 2026 года стал недоступен для записи",
         ),
         (
             datetime(2026, 6, 15),
-            {2026: {6: {18: ["10:00"]}}},
+            {2026: {6: [18]}},
+            [],
             DayBecomeNotAvailable,
             "15 июня 2026 года стало недоступно для записи",
         ),
         (
             datetime(2026, 6, 15, 9, 0),
-            {2026: {6: {15: ["10:00"]}}},
+            {2026: {6: [15]}},
+            ["10:00"],
             TimeBecomeNotAvailable,
             "Время 09:00 стало недоступно для записи",
         ),
@@ -49,18 +60,20 @@ from src.stuff.appointments.utils import (
 )
 def test_check_chosen_datetime_is_possible_raise_exception(
     datetime_,
-    slots,
+    available_days,
+    day_times,
     expected_exception,
     expected_exception_message,
 ):
     with pytest.raises(expected_exception, match=expected_exception_message):
-        check_chosen_datetime_is_possible(datetime_, slots)
+        check_chosen_datetime_is_possible(datetime_, available_days, day_times)
 
 
 def test_check_chosen_datetime_is_possible_not_raise_exception():
     assert check_chosen_datetime_is_possible(
         datetime(2026, 6, 15, 9, 0),
-        {2026: {6: {15: ["09:00"]}}},
+        {2026: {6: [15]}},
+        ["09:00"],
     ) is None
 
 
@@ -340,12 +353,105 @@ def test_get_months_keyboard_buttons(
             60,
             ["23:00", "23:30", "00:00"],
         ),
+        (
+            [
+                datetime(2000, 1, 1, 11, 0),
+                datetime(2000, 1, 1, 10, 0),
+                datetime(2000, 1, 1, 10, 30),
+            ],
+            60,
+            ["10:00", "10:30"],
+        ),
+        (
+            [datetime(2000, 1, 1, 8, 0) + timedelta(minutes=30 * i) for i in range(10)],
+            240,
+            ["08:00", "08:30", "09:00"],
+        ),
+        (
+            [
+                *[datetime(2000, 1, 1, 8, 0) + timedelta(minutes=30 * i) for i in range(7)],
+                *[datetime(2000, 1, 1, 12, 30) + timedelta(minutes=30 * i) for i in range(8)],
+            ],
+            240,
+            ["12:30"],
+        ),
     ],
 )
 def test_get_times_for_appointment(slots_datetimes, service_duration, expected_possible_times):
     assert get_times_for_appointment(slots_datetimes, service_duration) == expected_possible_times
 
 
+def test_get_times_possible_for_appointment():
+    # 10:00, 10:30, 11:00 и 12:00 по Москве
+    slots = [Slot(datetime_=datetime(2030, 1, 1, hour, minute)) for hour, minute in ((7, 0), (7, 30), (8, 0), (9, 0))]
+    service = Service(name="Стрижка", price=1000, duration=60)
+    assert asyncio.run(get_times_possible_for_appointment(service, slots)) == {2030: {1: {1: ["10:00", "10:30"]}}}
+
+
+@pytest.mark.parametrize(
+    "start_times,service_duration,expected_result",
+    [
+        ([], 60, {}),
+        (
+            [
+                datetime(2025, 2, 14, 21, 0),
+                datetime(2025, 2, 15, 7, 0),
+                datetime(2025, 2, 15, 7, 30),
+                datetime(2025, 3, 1, 6, 0),
+            ],
+            30,
+            {
+                2025: {
+                    2: {15: ["00:00", "10:00", "10:30"]},
+                    3: {1: ["09:00"]},
+                },
+            },
+        ),
+        (
+            [
+                datetime(2025, 2, 14, 20, 0),
+                datetime(2025, 2, 14, 20, 30),
+                datetime(2025, 2, 14, 21, 0),
+            ],
+            90,
+            {2025: {2: {15: ["00:00"]}}},
+        ),
+    ],
+)
+def test_select_start_times_within_day(start_times, service_duration, expected_result):
+    index = CalendarIndex.from_utc_datetimes(start_times, TIMEZONE)
+    assert index.to_times_dict(select_start_times_within_day(service_duration)) == expected_result
+
+
+@pytest.mark.parametrize(
+    "conflicts,service_duration,expected_result",
+    [
+        ([], 60, {}),
+        (
+            [datetime(2025, 2, 15, 7, 0)],
+            60,
+            {date(2025, 2, 15): {"09:30", "10:00"}},
+        ),
+        (
+            [datetime(2025, 2, 15, 7, 0), datetime(2025, 2, 15, 7, 30)],
+            30,
+            {date(2025, 2, 15): {"10:00", "10:30"}},
+        ),
+        (
+            [datetime(2025, 2, 14, 21, 0), datetime(2025, 2, 28, 20, 30)],
+            60,
+            {
+                date(2025, 2, 14): {"23:30"},
+                date(2025, 2, 15): {"00:00"},
+                date(2025, 2, 28): {"23:00", "23:30"},
+            },
+        ),
+    ],
+)
+def test_get_conflicting_times(conflicts, service_duration, expected_result):
+    assert get_conflicting_times(conflicts, service_duration) == expected_result
+
+
 @pytest.mark.parametrize(
     "years,current_year,expected_result",
     [
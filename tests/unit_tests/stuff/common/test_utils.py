@@ -1,13 +1,19 @@
-from datetime import UTC, datetime, timedelta, timezone
+import asyncio
+from datetime import UTC, date, datetime, timedelta, timezone
 
 import pytest
 import pytz
 
+from src import messages
+from src.models import EPOCH, AppointmentRow
 from src.stuff.common.utils import (
     dates_to_lang,
+    form_appointments_list_text,
     from_utc,
+    get_utc_day_bounds,
+    get_utc_epoch_minutes,
     get_years_with_months,
-    get_years_with_months_days,
+    get_years_with_months_days_by_dates,
     to_utc,
     validate_service_duration,
     validate_service_price,
@@ -87,6 +93,43 @@ def test_to_utc(datetime_, expected_result):
     assert to_utc(datetime_) == expected_result
 
 
+@pytest.mark.parametrize(
+    "tz_date,tz,expected_result",
+    [
+        (
+            date(2025, 4, 12),
+            pytz.timezone("Europe/Moscow"),
+            (datetime(2025, 4, 11, 21, 0), datetime(2025, 4, 12, 21, 0)),
+        ),
+        (
+            date(2025, 3, 30),
+            pytz.timezone("Europe/London"),
+            (datetime(2025, 3, 30, 0, 0), datetime(2025, 3, 30, 23, 0)),
+        ),
+        (
+            date(2025, 10, 26),
+            pytz.timezone("Europe/London"),
+            (datetime(2025, 10, 25, 23, 0), datetime(2025, 10, 27, 0, 0)),
+        ),
+    ],
+)
+def test_get_utc_day_bounds(tz_date, tz, expected_result):
+    assert get_utc_day_bounds(tz_date, tz) == expected_result
+
+
+@pytest.mark.parametrize(
+    "dates,expected_result",
+    [
+        ([], {}),
+        (
+            [date(2025, 3, 1), date(2024, 12, 31), date(2025, 2, 28), date(2025, 2, 1)],
+            {2024: {12: [31]}, 2025: {2: [1, 28], 3: [1]}},
+        ),
+    ],
+)
+def test_get_years_with_months_days_by_dates(dates, expected_result):
+    assert get_years_with_months_days_by_dates(dates) == expected_result
+
 
 DURATION_SHOULD_BE_INTEGER = "Длительность должна быть целым числом"
 DURATION_SHOULD_BE_GT_0 = "Длительность должна быть больше 0"
@@ -516,31 +559,115 @@ def test_get_years_with_months(slots, expected_result):
 
 
 @pytest.mark.parametrize(
-    "slots,expected_result",
+    "tz,tz_dates,day_minutes,expected_result",
     [
-        ({}, {}),
         (
-            {
-                2025: {3: {18: ["10:00"]}},
-                2026: {
-                    5: {
-                        22: ["18:00", "18:30", "20:00"],
-                    },
-                    8: {
-                        3: ["12:30", "20:30"],
-                        27: ["16:30"],
-                    },
-                },
-            },
-            {
-                2025: {3: [18]},
-                2026: {
-                    5: [22],
-                    8: [3, 27],
-                },
-            },
+            pytz.timezone("Europe/Moscow"),
+            [date(2030, 1, 2), date(2030, 1, 1)],
+            [0, 630],
+            [
+                datetime(2030, 1, 1, 21, 0),
+                datetime(2030, 1, 2, 7, 30),
+                datetime(2029, 12, 31, 21, 0),
+                datetime(2030, 1, 1, 7, 30),
+            ],
+        ),
+        # Переход вперед: 02:00-03:00 местного времени не существует и пропускается
+        (
+            pytz.timezone("Europe/Berlin"),
+            [date(2030, 3, 31)],
+            [60, 120, 150, 180],
+            [datetime(2030, 3, 31, 0, 0), datetime(2030, 3, 31, 1, 0)],
+        ),
+        # Переход назад: 02:00-03:00 местного времени повторяется, оба момента по порядку
+        (
+            pytz.timezone("Europe/Berlin"),
+            [date(2030, 10, 27)],
+            [60, 120, 150, 180],
+            [
+                datetime(2030, 10, 26, 23, 0),
+                datetime(2030, 10, 27, 0, 0),
+                datetime(2030, 10, 27, 1, 0),
+                datetime(2030, 10, 27, 0, 30),
+                datetime(2030, 10, 27, 1, 30),
+                datetime(2030, 10, 27, 2, 0),
+            ],
         ),
+        # Переход в полночь: 00:00-01:00 местного времени не существует
+        (
+            pytz.timezone("America/Santiago"),
+            [date(2025, 9, 7)],
+            [0, 30, 60],
+            [datetime(2025, 9, 7, 4, 0)],
+        ),
+        # Переход в полночь: 23:00-00:00 местного времени повторяется
+        (
+            pytz.timezone("America/Santiago"),
+            [date(2025, 4, 5)],
+            [1380, 1410],
+            [
+                datetime(2025, 4, 6, 2, 0),
+                datetime(2025, 4, 6, 3, 0),
+                datetime(2025, 4, 6, 2, 30),
+                datetime(2025, 4, 6, 3, 30),
+            ],
+        ),
+        # Переход на 30 минут
+        (
+            pytz.timezone("Australia/Lord_Howe"),
+            [date(2025, 10, 5)],
+            [90, 120, 150],
+            [datetime(2025, 10, 4, 15, 0), datetime(2025, 10, 4, 15, 30)],
+        ),
+        (pytz.timezone("Europe/Moscow"), [], [0], []),
     ],
 )
-def test_get_years_with_months_days(slots, expected_result):
-    assert get_years_with_months_days(slots) == expected_result
+def test_get_utc_epoch_minutes(tz, tz_dates, day_minutes, expected_result):
+    result = get_utc_epoch_minutes(tz_dates, day_minutes, tz)
+    assert [EPOCH + timedelta(minutes=utc_minute) for utc_minute in result] == expected_result
+
+
+@pytest.mark.parametrize(
+    "tz_name,first_date",
+    [
+        ("Europe/Berlin", date(2025, 3, 26)),
+        ("Europe/Berlin", date(2025, 10, 22)),
+        ("America/Santiago", date(2025, 4, 1)),
+        ("America/Santiago", date(2025, 9, 3)),
+        ("Australia/Lord_Howe", date(2025, 4, 2)),
+        ("Australia/Lord_Howe", date(2025, 10, 1)),
+    ],
+)
+def test_get_utc_epoch_minutes_matches_every_utc_moment(tz_name, first_date):
+    tz = pytz.timezone(tz_name)
+    tz_dates = [first_date + timedelta(days=i) for i in range(10)]
+    day_minutes = list(range(0, 24 * 60, 30))
+    # Все моменты UTC (с шагом 30 минут), местное время которых совпадает с заданным
+    expected_result = []
+    for tz_date in tz_dates:
+        for day_minute in day_minutes:
+            tz_datetime = datetime.combine(tz_date, datetime.min.time()) + timedelta(minutes=day_minute)
+            for i in range(-30, 31):
+                utc_datetime = tz_datetime + timedelta(minutes=30 * i)
+                if from_utc(utc_datetime, tz).replace(tzinfo=None) == tz_datetime:
+                    expected_result.append((utc_datetime - EPOCH) // timedelta(minutes=1))
+    assert list(get_utc_epoch_minutes(tz_dates, day_minutes, tz)) == expected_result
+
+
+def test_form_appointments_list_text():
+    async def partitions(*rows_partitions):
+        for rows in rows_partitions:
+            yield rows
+
+    first = AppointmentRow(datetime(2030, 1, 1, 7, 0), datetime(2030, 1, 1, 8, 0), "Стрижка")
+    second = AppointmentRow(datetime(2030, 1, 1, 9, 0), datetime(2030, 1, 1, 9, 30), "Бритье")
+    third = AppointmentRow(datetime(2030, 1, 2, 7, 0), datetime(2030, 1, 2, 8, 0), "Стрижка")
+    # Приемы одной даты в разных частях выводятся под одной датой
+    assert asyncio.run(form_appointments_list_text(partitions([first], [second, third]), for_admin=True)) == (
+        "<b>01.01.2030</b>\n"
+        "    <i>10:00 - 11:00</i>  Стрижка\n"
+        "    <i>12:00 - 12:30</i>  Бритье\n"
+        "<b>02.01.2030</b>\n"
+        "    <i>10:00 - 11:00</i>  Стрижка"
+    )
+    assert asyncio.run(form_appointments_list_text(partitions(), for_admin=False)) == messages.NO_APPOINTMENTS_FOR_CLIENT
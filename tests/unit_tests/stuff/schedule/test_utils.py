@@ -2,10 +2,13 @@ from datetime import datetime
 
 import pytest
 
+from src.config import ValidationLevel
 from src.stuff.schedule.keyboards import InlineButton
 from src.stuff.schedule.utils import (
     MINIMAL_TIMES_STATUSES_LEN,
     TIMES_STATUSES_LEN,
+    MonthSelection,
+    WorkingHours,
     _get_all_times,
     _get_month_selected_days_view,
     _get_schedule_times_from_to,
@@ -14,19 +17,12 @@ from src.stuff.schedule.utils import (
     _no_edge_selected_combination,
     _no_isolated_selected,
     _no_selected_edge_combination,
-    actualize_groups_selection_status,
-    check_clicked_index_assertions,
+    check_days_statuses_assertions,
     check_times_statuses_assertions,
     get_all_times_len,
-    get_days_statuses,
-    get_initial_times_statuses,
-    get_selected_times,
-    get_slots_to_delete,
-    get_slots_to_save,
-    get_times_statuses_view,
+    get_booked_slots_view,
+    get_utc_slots,
     get_working_hours_view,
-    resolve_days_statuses,
-    resolve_times_statuses,
 )
 
 
@@ -244,8 +240,8 @@ def test__get_times_buttons_for_view_schedule(all_times, schedule_times_from_to,
         (
             datetime(2025, 2, 27),
             [],
-            None,
-            None,
+            2025,
+            2,
             [
                 "not_selected_all", "not_available_monday", "not_available_tuesday", "not_available_wednesday", "not_selected_thursday", "not_selected_friday", "not_available_saturday", "not_available_sunday",
                 "not_available_week1", "ignore", "ignore", "ignore", "ignore", "ignore", "not_available_2025-02-01", "not_available_2025-02-02",
@@ -258,8 +254,8 @@ def test__get_times_buttons_for_view_schedule(all_times, schedule_times_from_to,
 
     ]
 )
-def test_get_days_statuses(tz_now, selected_dates, chosen_year, chosen_month, expected_result):
-    result = get_days_statuses(tz_now, selected_dates, chosen_year, chosen_month)
+def test_month_selection_create(tz_now, selected_dates, chosen_year, chosen_month, expected_result):
+    result = MonthSelection.create(tz_now, selected_dates, chosen_year, chosen_month).to_days_statuses()
     assert result == expected_result
 
 
@@ -304,9 +300,10 @@ def test__get_month_selected_days_view(days, expected_result):
         ),
     ],
 )
-def test_actualize_groups_selection_status(days_statuses, expected_result):
-    result = actualize_groups_selection_status(days_statuses)
-    assert result == expected_result
+def test_month_selection_from_days_statuses(days_statuses, expected_result):
+    month_selection = MonthSelection.from_days_statuses(days_statuses)
+    month_selection.check()
+    assert month_selection.to_days_statuses() == expected_result
 
 
 @pytest.mark.parametrize(
@@ -597,11 +594,110 @@ def test_actualize_groups_selection_status(days_statuses, expected_result):
         ),
     ],
 )
-def test_resolve_days_statuses(days_statuses, clicked_element, expected_result):
-    result = resolve_days_statuses(days_statuses, clicked_element)
+def test_month_selection_click_days_statuses(days_statuses, clicked_element, expected_result):
+    clicked_index = days_statuses.index(clicked_element)
+    result = MonthSelection.from_days_statuses(days_statuses).click(clicked_index).to_days_statuses()
     assert result == expected_result
 
 
+def _get_march_2025_days_statuses(**replacements: str) -> list[str]:
+    days_statuses = MonthSelection.create(datetime(2025, 3, 4), ["2025-03-05"], 2025, 3).to_days_statuses()
+    for old_element, new_element in replacements.items():
+        days_statuses[days_statuses.index(old_element)] = new_element
+    return days_statuses
+
+
+@pytest.mark.parametrize(
+    "days_statuses,cheap_passes",
+    [
+        # Статус группы "все" не соответствует выбранному дню
+        (_get_march_2025_days_statuses(selected_all="not_selected_all"), True),
+        # Статус недели не соответствует статусам ее дней
+        (_get_march_2025_days_statuses(not_selected_week3="selected_week3"), True),
+        # Доступный день перед прошедшим днем
+        (_get_march_2025_days_statuses(**{"not_available_2025-03-02": "not_selected_2025-03-02"}), True),
+        # Пропущен день
+        (_get_march_2025_days_statuses(**{"not_selected_2025-03-12": "not_selected_2025-03-13"}), True),
+        # Неделя, все дни которой не относятся к месяцу
+        (
+            _get_march_2025_days_statuses(**{
+                "not_available_2025-03-01": "ignore",
+                "not_available_2025-03-02": "ignore",
+            }),
+            True,
+        ),
+        # Элемент не на своем месте
+        (_get_march_2025_days_statuses(not_selected_week3="not_selected_monday"), False),
+        # Недопустимый элемент
+        (_get_march_2025_days_statuses(**{"not_selected_2025-03-12": "not_selected_12"}), False),
+    ],
+)
+def test_check_days_statuses_assertions_validation_levels(
+    days_statuses,
+    cheap_passes,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    with pytest.raises(AssertionError):
+        check_days_statuses_assertions(days_statuses)
+    monkeypatch.setattr("src.stuff.schedule.utils.SCHEDULE_VALIDATION_LEVEL", ValidationLevel.CHEAP)
+    if cheap_passes:
+        check_days_statuses_assertions(days_statuses)
+    else:
+        with pytest.raises(AssertionError):
+            check_days_statuses_assertions(days_statuses)
+    monkeypatch.setattr("src.stuff.schedule.utils.SCHEDULE_VALIDATION_LEVEL", ValidationLevel.OFF)
+    check_days_statuses_assertions(days_statuses)
+
+
+@pytest.mark.parametrize(
+    "clicked_indexes,expected_selected_dates",
+    [
+        ([], []),
+        ([16], ["2025-03-04", "2025-03-05", "2025-03-06", "2025-03-07", "2025-03-08", "2025-03-09"]),
+        ([3], ["2025-03-05", "2025-03-12", "2025-03-19", "2025-03-26"]),
+        ([3, 16], ["2025-03-12", "2025-03-19", "2025-03-26"]),
+        ([3, 16, 16], [
+            "2025-03-04", "2025-03-05", "2025-03-06", "2025-03-07", "2025-03-08", "2025-03-09",
+            "2025-03-12", "2025-03-19", "2025-03-26",
+        ]),
+        ([0], [f"2025-03-{day:02d}" for day in range(4, 32)]),
+        ([0, 27], [f"2025-03-{day:02d}" for day in range(4, 32) if day != 12]),
+        ([0, 0], []),
+    ],
+)
+def test_month_selection_click(clicked_indexes, expected_selected_dates):
+    month_selection = MonthSelection.create(datetime(2025, 3, 4), [], 2025, 3)
+    for clicked_index in clicked_indexes:
+        month_selection = month_selection.click(clicked_index)
+    selected_dates, not_selected_dates = month_selection.get_selected_and_not_selected_dates()
+    assert selected_dates == expected_selected_dates
+    assert sorted(selected_dates + not_selected_dates) == [f"2025-03-{day:02d}" for day in range(4, 32)]
+    assert MonthSelection.from_state(month_selection.to_state()) == month_selection
+    assert MonthSelection.from_days_statuses(month_selection.to_days_statuses()) == month_selection
+
+
+@pytest.mark.parametrize("clicked_index", [9, 13, 14, 17, 50])
+def test_month_selection_click_not_available(clicked_index):
+    month_selection = MonthSelection.create(datetime(2025, 3, 4), ["2025-03-05"], 2025, 3)
+    assert month_selection.click(clicked_index) == month_selection
+
+
+@pytest.mark.parametrize("clicked_index", [-1, 56])
+def test_month_selection_click_raises_assertion_error(clicked_index):
+    month_selection = MonthSelection.create(datetime(2025, 3, 4), [], 2025, 3)
+    with pytest.raises(AssertionError):
+        month_selection.click(clicked_index)
+
+
+def test_month_selection_masks():
+    month_selection = MonthSelection.create(datetime(2025, 3, 4), ["2025-03-02", "2025-03-10"], 2025, 3)
+    assert month_selection.weeks_count == 6
+    assert month_selection.month_mask == ((1 << 31) - 1) << 5
+    assert month_selection.ignored == 0b11111 | 0b111111 << 36
+    assert month_selection.available == ((1 << 28) - 1) << 8
+    assert month_selection.selected == 1 << 14
+
+
 def test_times_statuses_len():
     assert TIMES_STATUSES_LEN == 49
 
@@ -610,8 +706,8 @@ def test_minimal_times_statuses_len():
     assert MINIMAL_TIMES_STATUSES_LEN == 3
 
 
-def test_get_initial_times_statuses():
-    assert get_initial_times_statuses() == ["not_selected"] * 49
+def test_working_hours_initial_times_statuses():
+    assert WorkingHours().to_times_statuses() == ["not_selected"] * 49
 
 
 @pytest.mark.parametrize(
@@ -871,23 +967,11 @@ def test_check_times_statuses_assertions_raises_assertion_error(
         check_times_statuses_assertions(times_statuses)
 
 
-@pytest.mark.parametrize("clicked_index", [0, 1, 2])
-def test_check_clicked_index_assertions_passes(
-    clicked_index,
-    monkeypatch: pytest.MonkeyPatch,
-):
-    monkeypatch.setattr("src.stuff.schedule.utils.TIMES_STATUSES_LEN", 3)
-    assert check_clicked_index_assertions(clicked_index) is None
-
-
 @pytest.mark.parametrize("clicked_index", [-10, -1, 3, 5, 10])
-def test_check_clicked_index_assertions_raises_assertion_error(
-    clicked_index,
-    monkeypatch: pytest.MonkeyPatch,
-):
-    monkeypatch.setattr("src.stuff.schedule.utils.TIMES_STATUSES_LEN", 3)
+def test_working_hours_click_raises_assertion_error(clicked_index):
+    working_hours = WorkingHours(duration_multiplier=720)
     with pytest.raises(AssertionError):
-        check_clicked_index_assertions(clicked_index)
+        working_hours.click(clicked_index)
 
 
 @pytest.mark.parametrize(
@@ -1013,8 +1097,8 @@ def test_check_clicked_index_assertions_raises_assertion_error(
         ),
     ],
 )
-def test_get_selected_times(times_statuses, expected_result):
-    result = get_selected_times(times_statuses)
+def test_working_hours_get_selected_times(times_statuses, expected_result):
+    result = WorkingHours.from_times_statuses(times_statuses).get_selected_times()
     assert result == expected_result
 
 
@@ -1113,30 +1197,8 @@ def test_get_selected_times(times_statuses, expected_result):
         ),
     ],
 )
-def test_get_times_statuses_view(times_statuses, expected_result):
-    assert get_times_statuses_view(times_statuses) == expected_result
-
-
-@pytest.mark.parametrize(
-    "iso_dates,iso_times,expected_result",
-    [
-        (
-            ["2025-02-15", "2025-02-22", "2026-04-10"],
-            ["00:30", "10:00", "10:30", "16:30"],
-            {
-                "2025-02-14": ["2025-02-14T21:30:00"],
-                "2025-02-15": ["2025-02-15T07:00:00", "2025-02-15T07:30:00", "2025-02-15T13:30:00"],
-                "2025-02-21": ["2025-02-21T21:30:00"],
-                "2025-02-22": ["2025-02-22T07:00:00", "2025-02-22T07:30:00", "2025-02-22T13:30:00"],
-                "2026-04-09": ["2026-04-09T21:30:00"],
-                "2026-04-10": ["2026-04-10T07:00:00", "2026-04-10T07:30:00", "2026-04-10T13:30:00"],
-            },
-        ),
-    ],
-)
-def test_get_slots_to_save(iso_dates, iso_times, expected_result):
-    result = get_slots_to_save(iso_dates, iso_times)
-    assert result == expected_result
+def test_working_hours_get_view(times_statuses, expected_result):
+    assert WorkingHours.from_times_statuses(times_statuses).get_view() == expected_result
 
 
 @pytest.mark.parametrize(
@@ -1154,9 +1216,9 @@ def test_get_slots_to_save(iso_dates, iso_times, expected_result):
         ),
     ],
 )
-def test_get_slots_to_delete(iso_dates, iso_times, expected_result):
-    result = get_slots_to_delete(iso_dates, iso_times)
-    assert result == expected_result
+def test_get_utc_slots(iso_dates, iso_times, expected_result):
+    result = get_utc_slots(iso_dates, iso_times)
+    assert result == [datetime.fromisoformat(iso_utc_slot) for iso_utc_slot in expected_result]
 
 
 @pytest.mark.parametrize(
@@ -1186,6 +1248,13 @@ def test_get_working_hours_view(iso_times, duration_multiplier, expected_result)
     assert result == expected_result
 
 
+def test_get_booked_slots_view():
+    utc_slots = [datetime(2030, 1, 1, 7, 0), datetime(2030, 1, 1, 7, 30), datetime(2030, 1, 1, 21, 0)]
+    assert get_booked_slots_view(utc_slots) == (
+        "<b>Оставлены забронированные слоты:</b>\n01.01.2030: 10:00, 10:30\n02.01.2030: 00:00"
+    )
+
+
 @pytest.mark.parametrize(
     "times_statuses,clicked_element,expected_result",
     [
@@ -1414,9 +1483,14 @@ def test_get_working_hours_view(iso_times, duration_multiplier, expected_result)
             1,
             ["not_selected", "not_selected", "not_selected", "not_selected", "not_selected"],
         ),
+        (
+            ["not_selected", "not_selected", "not_selected", "selected", "selected"],
+            1,
+            ["edge", "not_selected", "not_selected", "selected", "selected"],
+        ),
     ],
 )
-def test_resolve_times_statuses(
+def test_working_hours_click_times_statuses(
     times_statuses,
     clicked_element,
     expected_result,
@@ -1424,7 +1498,74 @@ def test_resolve_times_statuses(
 ):
     monkeypatch.setattr("src.stuff.schedule.utils.TIMES_STATUSES_LEN", len(times_statuses))
     clicked_index = clicked_element - 1
-    assert resolve_times_statuses(times_statuses, clicked_index) == expected_result
+    working_hours = WorkingHours.from_times_statuses(times_statuses)
+    working_hours.check()
+    result = working_hours.click(clicked_index)
+    result.check()
+    assert result.to_times_statuses() == expected_result
+
+
+def test_working_hours_ranges():
+    working_hours = WorkingHours(duration_multiplier=60)
+    assert working_hours.points_count == 25
+    working_hours = working_hours.add_range(8, 12).add_range(14, 18).add_range(20, 24)
+    assert list(working_hours.iter_runs()) == [(8, 12), (14, 18), (20, 24)]
+    working_hours = working_hours.remove_range(10, 16)
+    assert list(working_hours.iter_runs()) == [(8, 9), (17, 18), (20, 24)]
+    assert working_hours.get_selected_times() == ["08:00", "17:00", "20:00", "21:00", "22:00", "23:00"]
+    assert working_hours.get_view() == (
+        "<b>Выбранные рабочие часы:</b>\n08:00-09:00\n17:00-18:00\n20:00-00:00"
+    )
+    assert working_hours.get_day_minutes() == [(480, 540), (1020, 1080), (1200, 1440)]
+
+
+@pytest.mark.parametrize(
+    "working_hours",
+    [
+        WorkingHours(),
+        WorkingHours(selected=0b11 << 47),
+        WorkingHours(selected=0b111 << 3, edge=0),
+        WorkingHours(selected=0b11, edge=48),
+        WorkingHours(duration_multiplier=720, edge=1),
+    ],
+)
+def test_working_hours_state(working_hours):
+    state = working_hours.to_state()
+    assert isinstance(state, int)
+    assert WorkingHours.from_state(state, working_hours.duration_multiplier) == working_hours
+
+
+@pytest.mark.parametrize(
+    "working_hours",
+    [
+        WorkingHours(selected=0b1 << 5),
+        WorkingHours(selected=0b11, edge=2),
+        WorkingHours(selected=0b11, edge=1),
+        WorkingHours(selected=1 << 49),
+    ],
+)
+def test_working_hours_check_raises_assertion_error(working_hours):
+    with pytest.raises(AssertionError):
+        working_hours.check()
+
+
+@pytest.mark.parametrize(
+    "selection,validator_name",
+    [
+        (MonthSelection.create(datetime(2025, 3, 4), ["2025-03-05"], 2025, 3), "check_days_statuses_assertions"),
+        (WorkingHours(selected=0b111 << 3, edge=0), "check_times_statuses_assertions"),
+    ],
+)
+def test_check_validates_statuses_on_full_level(selection, validator_name, monkeypatch: pytest.MonkeyPatch):
+    validated = []
+    monkeypatch.setattr(f"src.stuff.schedule.utils.{validator_name}", validated.append)
+    selection.check()
+    assert validated == [
+        selection.to_days_statuses() if isinstance(selection, MonthSelection) else selection.to_times_statuses()
+    ]
+    monkeypatch.setattr("src.stuff.schedule.utils.SCHEDULE_VALIDATION_LEVEL", ValidationLevel.CHEAP)
+    selection.check()
+    assert len(validated) == 1
 
 
 @pytest.mark.parametrize(
@@ -1454,10 +1595,10 @@ def test_resolve_times_statuses(
         ["selected", "selected", "selected", "selected"],
     ],
 )
-def test_resolve_times_statuses_raises_assertion_error(
+def test_check_times_statuses_assertions_impossible_combinations(
     times_statuses,
     monkeypatch: pytest.MonkeyPatch,
 ):
     monkeypatch.setattr("src.stuff.schedule.utils.TIMES_STATUSES_LEN", 3)
     with pytest.raises(AssertionError):
-        resolve_times_statuses(times_statuses, clicked_index=1)
+        check_times_statuses_assertions(times_statuses)
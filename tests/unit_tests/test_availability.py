@@ -0,0 +1,119 @@
+import asyncio
+from datetime import UTC, date, datetime, timedelta
+
+import pytest
+
+from src.availability import AvailabilityCache, ClientAvailability, get_next_slot_boundary
+from src.calendar_index import CalendarIndex
+from src.config import TIMEZONE
+from src.database import hold_slots, insert_slot, release_slot_holds
+from src.models import Slot
+
+
+TZ_DATE = date(2030, 1, 1)
+
+
+def _get_days_and_times(availabilities):
+    return [(availability.get_days(), availability.get_times(TZ_DATE)) for availability in availabilities]
+
+
+@pytest.mark.parametrize(
+    "utc_now,expected_result",
+    [
+        (datetime(2025, 2, 15, 7, 0), datetime(2025, 2, 15, 7, 30)),
+        (datetime(2025, 2, 15, 7, 0, 0, 1), datetime(2025, 2, 15, 7, 30)),
+        (datetime(2025, 2, 15, 7, 29, 59), datetime(2025, 2, 15, 7, 30)),
+        (datetime(2025, 2, 15, 7, 30), datetime(2025, 2, 15, 8, 0)),
+        (datetime(2025, 2, 15, 23, 45, tzinfo=UTC), datetime(2025, 2, 16, 0, 0, tzinfo=UTC)),
+    ],
+)
+def test_get_next_slot_boundary(utc_now, expected_result):
+    assert get_next_slot_boundary(utc_now) == expected_result
+
+
+def test_availability_cache(run_with_writer):
+    async def scenario(db_writer, async_session):
+        availability_cache = AvailabilityCache(async_session)
+        db_writer.add_commit_listener(availability_cache.on_commit)
+        utc_now = datetime(2030, 1, 1, 6, 10, tzinfo=UTC)
+        slot_datetime = datetime(2030, 1, 1, 7, 0, tzinfo=UTC)
+        results = [await availability_cache.get_availability(30, utc_now, 1)]
+        results.append(await availability_cache.get_availability(30, utc_now, 1))
+        await db_writer.write(lambda session: insert_slot(session, Slot(datetime_=slot_datetime)))
+        results.append(await availability_cache.get_availability(30, utc_now, 1))
+        results.append(await availability_cache.get_availability(30, utc_now + timedelta(minutes=19), 1))
+        results.append(await availability_cache.get_availability(30, utc_now + timedelta(minutes=20), 1))
+        return results, availability_cache.get_stats()
+
+    results, stats = run_with_writer(scenario)
+    assert _get_days_and_times(results) == [
+        ({}, []),
+        ({}, []),
+        ({2030: {1: [1]}}, ["10:00"]),
+        ({2030: {1: [1]}}, ["10:00"]),
+        ({2030: {1: [1]}}, ["10:00"]),
+    ]
+    assert stats == {"hits": 2, "misses": 3, "merged": 0, "invalidations": 1, "entries": 1, "holds_loads": 1}
+
+
+def test_availability_cache_merges_concurrent_misses(run_with_writer):
+    async def scenario(db_writer, async_session):
+        await db_writer.write(lambda session: insert_slot(session, Slot(datetime_=datetime(2030, 1, 1, 7, 0))))
+        availability_cache = AvailabilityCache(async_session)
+        utc_now = datetime(2030, 1, 1, 6, 10, tzinfo=UTC)
+        results = await asyncio.gather(
+            *(availability_cache.get_availability(30, utc_now, 1) for _ in range(10)),
+            availability_cache.get_availability(60, utc_now, 1),
+        )
+        return results, availability_cache.get_stats()
+
+    results, stats = run_with_writer(scenario)
+    assert _get_days_and_times(results) == [({2030: {1: [1]}}, ["10:00"])] * 10 + [({}, [])]
+    assert stats == {"hits": 0, "misses": 11, "merged": 9, "invalidations": 0, "entries": 2, "holds_loads": 1}
+
+
+def test_availability_cache_excludes_holds_of_other_clients(run_with_writer):
+    async def scenario(db_writer, async_session):
+        availability_cache = AvailabilityCache(async_session)
+        db_writer.add_commit_listener(availability_cache.on_commit)
+        utc_now = datetime(2030, 1, 1, 6, 10, tzinfo=UTC)
+        slots = [datetime(2030, 1, 1, 7, 0, tzinfo=UTC), datetime(2030, 1, 1, 7, 30, tzinfo=UTC)]
+        for slot in slots:
+            await db_writer.write(lambda session, slot=slot: insert_slot(session, Slot(datetime_=slot)))
+        results = [await availability_cache.get_availability(30, utc_now, 1)]
+        await db_writer.write(
+            lambda session: hold_slots(session, 2, slots[:1], utc_now, utc_now + timedelta(minutes=5)),
+        )
+        results.append(await availability_cache.get_availability(30, utc_now, 1))
+        results.append(await availability_cache.get_availability(30, utc_now, 2))
+        results.append(await availability_cache.get_availability(60, utc_now, 1))
+        # Истекшая блокировка не учитывается без повторного чтения блокировок
+        results.append(await availability_cache.get_availability(30, utc_now + timedelta(minutes=6), 1))
+        await db_writer.write(lambda session: release_slot_holds(session, 2))
+        results.append(await availability_cache.get_availability(30, utc_now, 1))
+        return results, availability_cache.get_stats()
+
+    results, stats = run_with_writer(scenario)
+    assert _get_days_and_times(results) == [
+        ({2030: {1: [1]}}, ["10:00", "10:30"]),
+        ({2030: {1: [1]}}, ["10:30"]),
+        ({2030: {1: [1]}}, ["10:00", "10:30"]),
+        ({}, []),
+        ({2030: {1: [1]}}, ["10:00", "10:30"]),
+        ({2030: {1: [1]}}, ["10:00", "10:30"]),
+    ]
+    # Блокировки и их снятие не сбрасывают индексы, а только перечитываются
+    assert stats == {"hits": 4, "misses": 2, "merged": 0, "invalidations": 2, "entries": 2, "holds_loads": 3}
+
+
+def test_client_availability_without_conflicts():
+    index = CalendarIndex.from_utc_datetimes(
+        [datetime(2030, 1, 1, 7, 0), datetime(2030, 1, 1, 7, 30), datetime(2030, 1, 2, 7, 0)],
+        TIMEZONE,
+    )
+    availability = ClientAvailability(index, 30, {})
+    without_conflicts = availability.without([datetime(2030, 1, 2, 7, 0, tzinfo=UTC)])
+    assert availability.get_days() == {2030: {1: [1, 2]}}
+    assert without_conflicts.get_days() == {2030: {1: [1]}}
+    assert without_conflicts.without([datetime(2030, 1, 1, 7, 0, tzinfo=UTC)]).get_times(TZ_DATE) == ["10:30"]
+    assert without_conflicts.get_times(TZ_DATE) == ["10:00", "10:30"]
@@ -0,0 +1,108 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+import pytz
+
+from src.calendar_index import CalendarIndex
+from src.stuff.appointments.utils import select_start_times_within_day
+from src.stuff.common.utils import from_utc
+from src.tz import to_epoch_minute
+
+
+def _get_times_dict_by_from_utc(utc_datetimes: list[datetime], tz) -> dict:
+    """Группировка с переводом каждого слота в местное время (как до появления CalendarIndex)."""
+    times_dict: dict = {}
+    for utc_datetime in sorted(utc_datetimes):
+        tz_datetime = from_utc(utc_datetime, tz)
+        days = times_dict.setdefault(tz_datetime.year, {}).setdefault(tz_datetime.month, {})
+        days.setdefault(tz_datetime.day, []).append(tz_datetime.time().isoformat(timespec="minutes"))
+    return times_dict
+
+
+def test_calendar_index():
+    tz = pytz.timezone("Europe/Moscow")
+    utc_datetimes = [
+        datetime(2025, 1, 31, 20, 30),
+        datetime(2024, 12, 31, 7, 0),
+        datetime(2025, 1, 31, 21, 0),
+        datetime(2025, 1, 31, 21, 30),
+        datetime(2025, 2, 1, 7, 0),
+    ]
+    index = CalendarIndex.from_utc_datetimes(utc_datetimes, tz)
+    assert list(index) == [date(2024, 12, 31), date(2025, 1, 31), date(2025, 2, 1)]
+    assert len(index) == 3
+    assert index.get_dates(2025) == [date(2025, 1, 31), date(2025, 2, 1)]
+    assert index.get_dates(2024, 12) == [date(2024, 12, 31)]
+    assert index.get_dates(2025, 3) == []
+    assert index.get_times(date(2025, 2, 1)) == ["00:00", "00:30", "10:00"]
+    assert index.get_times(date(2025, 2, 2)) == []
+    assert index.to_times_dict() == {
+        2024: {12: {31: ["10:00"]}},
+        2025: {1: {31: ["23:30"]}, 2: {1: ["00:00", "00:30", "10:00"]}},
+    }
+    # Выбираются первые слоты дней, заканчивающиеся до конца дня через час
+    assert index.to_times_dict(
+        lambda utc_minutes, day_end: [i for i, utc_minute in enumerate(utc_minutes) if utc_minute + 60 < day_end][:1],
+    ) == {2024: {12: {31: ["10:00"]}}, 2025: {2: {1: ["00:00"]}}}
+
+
+def test_calendar_index_empty():
+    index = CalendarIndex.from_utc_datetimes([], pytz.timezone("Europe/Moscow"))
+    assert len(index) == 0
+    assert index.to_times_dict() == {}
+    assert index.get_times(date(2025, 1, 1)) == []
+
+
+@pytest.mark.parametrize(
+    "tz_name,utc_start",
+    [
+        ("Europe/Berlin", datetime(2025, 3, 28)),
+        ("Europe/Berlin", datetime(2025, 10, 24)),
+        ("America/Santiago", datetime(2025, 4, 3)),
+        ("America/Santiago", datetime(2025, 9, 5)),
+        ("Australia/Lord_Howe", datetime(2025, 10, 3)),
+    ],
+)
+def test_calendar_index_matches_from_utc(tz_name, utc_start):
+    tz = pytz.timezone(tz_name)
+    utc_datetimes = [utc_start + timedelta(minutes=30 * i) for i in range(5 * 48) if i % 7 != 3]
+    index = CalendarIndex.from_utc_datetimes(utc_datetimes, tz)
+    assert index.to_times_dict() == _get_times_dict_by_from_utc(utc_datetimes, tz)
+    for i, tz_date in enumerate(index):
+        # Конец дня - первая минута UTC следующей даты
+        day_end = datetime(1970, 1, 1) + timedelta(minutes=index.day_ends[i])
+        assert from_utc(day_end - timedelta(minutes=1), tz).date() == tz_date
+        assert from_utc(day_end, tz).date() > tz_date
+
+
+def test_calendar_index_from_stream(monkeypatch):
+    # Таблица смещений на 30 дней: при чтении потока она перестраивается несколько раз
+    monkeypatch.setattr("src.tz._tables", {})
+    monkeypatch.setattr("src.tz.TIMEZONE_TABLE_HORIZON_DAYS", 30)
+    tz = pytz.timezone("Europe/Berlin")
+    utc_datetimes = [datetime(2025, 1, 1, 6) + timedelta(hours=5 * i) for i in range(2000)]
+    utc_minutes = [to_epoch_minute(utc_datetime) for utc_datetime in utc_datetimes]
+
+    async def stream():
+        for i in range(0, len(utc_minutes), 7):
+            yield utc_minutes[i:i + 7]
+
+    index = asyncio.run(CalendarIndex.from_stream(stream(), tz))
+    expected_index = CalendarIndex.from_utc_datetimes(reversed(utc_datetimes), tz)
+    assert index.to_times_dict() == expected_index.to_times_dict() == _get_times_dict_by_from_utc(utc_datetimes, tz)
+    assert index.dates == expected_index.dates
+    assert index.day_ends == expected_index.day_ends
+
+
+@pytest.mark.parametrize("duration", [30, 90, 180])
+def test_calendar_index_select(duration):
+    tz = pytz.timezone("Europe/Berlin")
+    # Переход на летнее время и пропуски, из-за которых часть дней остается без выбранных слотов
+    utc_datetimes = [datetime(2030, 3, 29, 20) + timedelta(minutes=30 * i) for i in range(4 * 48) if i % 11 > 3]
+    index = CalendarIndex.from_utc_datetimes(utc_datetimes, tz)
+    select = select_start_times_within_day(duration)
+    selected = index.select(select)
+    assert selected.to_times_dict() == index.to_times_dict(select)
+    for tz_date in selected:
+        assert selected.get_times(tz_date) == index.to_times_dict(select)[tz_date.year][tz_date.month][tz_date.day]
@@ -0,0 +1,192 @@
+from datetime import UTC, date, datetime, timedelta
+
+import pytest
+import pytz
+from sqlalchemy import func, select
+
+from src.config import TIMEZONE, ScheduleStorage
+from src.database import (
+    HeldSlot,
+    apply_schedule,
+    book_appointment,
+    get_held_slots,
+    get_schedule_backend,
+    get_schedule_dates,
+    get_slots_by_days,
+    hold_slots,
+    insert_service,
+)
+from src.models import Appointment, Service, Slot
+from src.stuff.appointments.utils import get_datetimes_needed_for_appointment
+from src.stuff.common.utils import get_utc_day_bounds
+
+
+@pytest.mark.parametrize("storage", [ScheduleStorage.SLOTS, ScheduleStorage.INTERVALS])
+def test_book_appointment(run_with_session, monkeypatch, storage):
+    monkeypatch.setattr("src.database.schedule_backend", get_schedule_backend(storage))
+    tz_date = date(2030, 1, 1)
+    utc_now = datetime(2029, 12, 31, 12, 0, tzinfo=UTC)
+    # 10:00-12:00 МСК = 07:00-09:00 UTC, слоты запрашиваются с часовым поясом (как в логике записи)
+    starts_at = datetime(2030, 1, 1, 7, 0, tzinfo=UTC)
+
+    def new_appointment(client_id, appointment_starts_at):
+        return Appointment(
+            client_id=client_id,
+            service_id=1,
+            starts_at=appointment_starts_at,
+            ends_at=appointment_starts_at + timedelta(hours=1),
+        )
+
+    async def scenario(async_session):
+        async with async_session() as session:
+            await insert_service(session, Service(name="Стрижка", price=1000, duration=60))
+            await apply_schedule(
+                session,
+                [get_utc_day_bounds(tz_date, TIMEZONE)],
+                [datetime(2030, 1, 1, 7, 0) + timedelta(minutes=30 * i) for i in range(4)],
+            )
+            free = await book_appointment(
+                session,
+                new_appointment(1, starts_at),
+                get_datetimes_needed_for_appointment(starts_at, 60),
+                utc_now,
+            )
+            taken_starts_at = starts_at + timedelta(minutes=30)
+            taken = await book_appointment(
+                session,
+                new_appointment(2, taken_starts_at),
+                get_datetimes_needed_for_appointment(taken_starts_at, 60),
+                utc_now,
+            )
+            appointments_count = await session.scalar(select(func.count()).select_from(Appointment))
+            await session.commit()
+        return free, taken, appointments_count
+
+    free, taken, appointments_count = run_with_session(scenario)
+    assert free.conflicts == []
+    assert free.appointment is not None
+    assert free.appointment.starts_at == datetime(2030, 1, 1, 7, 0)
+    assert taken.appointment is None
+    assert taken.conflicts == [datetime(2030, 1, 1, 7, 30, tzinfo=UTC)]
+    assert appointments_count == 1
+
+
+@pytest.mark.parametrize("storage", [ScheduleStorage.SLOTS, ScheduleStorage.INTERVALS])
+def test_hold_slots_expiration_rounded_up_to_minute(run_with_session, monkeypatch, storage):
+    monkeypatch.setattr("src.database.schedule_backend", get_schedule_backend(storage))
+    utc_now = datetime(2029, 12, 31, 12, 0, 10, tzinfo=UTC)
+    slot = datetime(2030, 1, 1, 7, 0)
+
+    async def scenario(async_session):
+        async with async_session() as session:
+            await apply_schedule(session, [get_utc_day_bounds(date(2030, 1, 1), TIMEZONE)], [slot])
+            conflicts = await hold_slots(session, 1, [slot], utc_now, utc_now + timedelta(seconds=30))
+            held_slots = [
+                await get_held_slots(session, utc_now + timedelta(seconds=seconds))
+                for seconds in (40, 50)
+            ]
+            await session.commit()
+        return conflicts, held_slots
+
+    conflicts, held_slots = run_with_session(scenario)
+    assert conflicts == []
+    # Срок 12:00:40 хранится как 12:01
+    assert held_slots == [[HeldSlot(slot, 1, datetime(2029, 12, 31, 12, 1))], []]
+
+
+def test_get_schedule_dates_across_utc_offset_change(run_with_session, monkeypatch):
+    monkeypatch.setattr("src.database.schedule_backend", get_schedule_backend(ScheduleStorage.SLOTS))
+    # В Лондоне летнее время с 2030-03-31 01:00 UTC
+    slots = [datetime(2030, 3, 30, 23, 30), datetime(2030, 3, 31, 23, 30)]
+
+    async def scenario(async_session):
+        async with async_session() as session:
+            session.add_all([Slot(datetime_=slot) for slot in slots])
+            await session.flush()
+            return await get_schedule_dates(session, datetime(2030, 3, 1, tzinfo=UTC), pytz.timezone("Europe/London"))
+
+    assert run_with_session(scenario) == [date(2030, 3, 30), date(2030, 4, 1)]
+
+
+@pytest.mark.parametrize("storage", list(ScheduleStorage))
+def test_book_appointment_started_slot(run_with_session, monkeypatch, storage):
+    monkeypatch.setattr("src.database.schedule_backend", get_schedule_backend(storage))
+    starts_at = datetime(2030, 1, 1, 7, 0, tzinfo=UTC)
+    # Клиент подтверждает запись, когда прием уже начался
+    utc_now = starts_at + timedelta(minutes=10)
+    datetimes_to_reserve = get_datetimes_needed_for_appointment(starts_at, 60)
+
+    async def scenario(async_session):
+        async with async_session() as session:
+            await insert_service(session, Service(name="Стрижка", price=1000, duration=60))
+            await apply_schedule(
+                session,
+                [get_utc_day_bounds(date(2030, 1, 1), TIMEZONE)],
+                [datetime(2030, 1, 1, 7, 0) + timedelta(minutes=30 * i) for i in range(4)],
+            )
+            hold_conflicts = await hold_slots(
+                session, 1, datetimes_to_reserve, utc_now, utc_now + timedelta(minutes=5),
+            )
+            booking = await book_appointment(
+                session,
+                Appointment(client_id=1, service_id=1, starts_at=starts_at, ends_at=starts_at + timedelta(hours=1)),
+                datetimes_to_reserve,
+                utc_now,
+            )
+            await session.commit()
+        return hold_conflicts, booking
+
+    hold_conflicts, booking = run_with_session(scenario)
+    assert hold_conflicts == [starts_at]
+    assert booking.appointment is None
+    assert booking.conflicts == [starts_at]
+
+
+@pytest.mark.parametrize("storage", list(ScheduleStorage))
+def test_get_slots_by_days(run_with_session, monkeypatch, storage):
+    monkeypatch.setattr("src.database.schedule_backend", get_schedule_backend(storage))
+    days = [date(2030, 1, 1) + timedelta(days=i) for i in range(4)]
+    # 10:00-11:00 и 23:00-24:00 по Москве каждого из первых трех дней
+    day_slots = {
+        day: [
+            day_start + timedelta(hours=hours, minutes=minutes)
+            for hours in (10, 23)
+            for minutes in (0, 30)
+        ]
+        for day, (day_start, _) in ((day, get_utc_day_bounds(day, TIMEZONE)) for day in days[:3])
+    }
+    utc_now = datetime(2029, 12, 31, 12, 0, tzinfo=UTC)
+    booked_starts_at = day_slots[days[0]][0]
+
+    async def scenario(async_session):
+        async with async_session() as session:
+            await insert_service(session, Service(name="Стрижка", price=1000, duration=30))
+            await apply_schedule(
+                session,
+                [get_utc_day_bounds(day, TIMEZONE) for day in days[:3]],
+                [slot for slots in day_slots.values() for slot in slots],
+            )
+            await book_appointment(
+                session,
+                Appointment(
+                    client_id=1,
+                    service_id=1,
+                    starts_at=booked_starts_at,
+                    ends_at=booked_starts_at + timedelta(minutes=30),
+                ),
+                [booked_starts_at],
+                utc_now,
+            )
+            # Дни не по порядку, второй день пропущен, последний день без слотов
+            slots_by_days = await get_slots_by_days(
+                session,
+                {day: get_utc_day_bounds(day, TIMEZONE) for day in (days[2], days[0], days[3])},
+            )
+            await session.commit()
+        return {day: [slot.datetime_ for slot in slots] for day, slots in slots_by_days.items()}
+
+    assert run_with_session(scenario) == {
+        days[2]: day_slots[days[2]],
+        days[0]: day_slots[days[0]],
+        days[3]: [],
+    }
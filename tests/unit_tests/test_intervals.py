@@ -0,0 +1,346 @@
+from datetime import UTC, date, datetime, timedelta
+
+import pytest
+import pytz
+
+from src.config import TIMEZONE, ScheduleStorage
+from src.database import (
+    apply_schedule,
+    book_appointment,
+    delete_slots_by_days,
+    delete_expired_slot_holds,
+    delete_not_booked_future_slots,
+    delete_slots,
+    get_available_start_times,
+    get_schedule_backend,
+    get_schedule_dates,
+    hold_slots,
+    insert_service,
+    set_weekly_rules,
+    stream_active_appointments,
+    stream_available_start_minutes,
+    stream_slot_minutes,
+)
+from src.intervals import (
+    clip_intervals,
+    get_day_intervals,
+    get_day_minutes,
+    get_intervals_by_rules,
+    get_intervals_by_slots,
+    get_next_slot_start,
+    get_slots_count,
+    get_start_times,
+    intersect_intervals,
+    merge_intervals,
+    subtract_intervals,
+)
+from src.models import EPOCH, Appointment, AppointmentRow, Service
+from src.stuff.appointments.utils import get_datetimes_needed_for_appointment
+from src.stuff.common.utils import get_utc_day_bounds
+from src.tz import to_epoch_minute
+
+
+def _dt(hour, minute=0, day=1):
+    return datetime(2030, 1, day, hour, minute)
+
+
+@pytest.mark.parametrize(
+    "intervals,expected_result",
+    [
+        ([], []),
+        ([(_dt(10), _dt(10))], []),
+        ([(_dt(12), _dt(13)), (_dt(10), _dt(11))], [(_dt(10), _dt(11)), (_dt(12), _dt(13))]),
+        ([(_dt(10), _dt(11)), (_dt(11), _dt(12))], [(_dt(10), _dt(12))]),
+        ([(_dt(10), _dt(12)), (_dt(11), _dt(11, 30))], [(_dt(10), _dt(12))]),
+        ([(_dt(10), _dt(12)), (_dt(11), _dt(13)), (_dt(14), _dt(15))], [(_dt(10), _dt(13)), (_dt(14), _dt(15))]),
+    ],
+)
+def test_merge_intervals(intervals, expected_result):
+    assert merge_intervals(intervals) == expected_result
+
+
+@pytest.mark.parametrize(
+    "intervals,to_subtract,expected_result",
+    [
+        ([(_dt(10), _dt(14))], [], [(_dt(10), _dt(14))]),
+        ([(_dt(10), _dt(14))], [(_dt(8), _dt(9)), (_dt(15), _dt(16))], [(_dt(10), _dt(14))]),
+        ([(_dt(10), _dt(14))], [(_dt(9), _dt(15))], []),
+        ([(_dt(10), _dt(14))], [(_dt(10), _dt(11))], [(_dt(11), _dt(14))]),
+        ([(_dt(10), _dt(14))], [(_dt(13), _dt(14))], [(_dt(10), _dt(13))]),
+        (
+            [(_dt(10), _dt(14))],
+            [(_dt(11), _dt(11, 30)), (_dt(12), _dt(13))],
+            [(_dt(10), _dt(11)), (_dt(11, 30), _dt(12)), (_dt(13), _dt(14))],
+        ),
+        (
+            [(_dt(10), _dt(12)), (_dt(13), _dt(15))],
+            [(_dt(11), _dt(14))],
+            [(_dt(10), _dt(11)), (_dt(14), _dt(15))],
+        ),
+    ],
+)
+def test_subtract_intervals(intervals, to_subtract, expected_result):
+    assert subtract_intervals(intervals, to_subtract) == expected_result
+
+
+def test_intervals_operations():
+    intervals = [(_dt(10), _dt(12)), (_dt(13), _dt(15))]
+    assert intersect_intervals(intervals, [(_dt(11), _dt(14))]) == [(_dt(11), _dt(12)), (_dt(13), _dt(14))]
+    assert clip_intervals(intervals, _dt(11, 30)) == [(_dt(11, 30), _dt(12)), (_dt(13), _dt(15))]
+    assert clip_intervals(intervals, _dt(11, 30), _dt(13, 30)) == [(_dt(11, 30), _dt(12)), (_dt(13), _dt(13, 30))]
+    assert get_intervals_by_slots([_dt(11), _dt(10), _dt(10, 30), _dt(13)]) == [
+        (_dt(10), _dt(11, 30)),
+        (_dt(13), _dt(13, 30)),
+    ]
+    assert get_slots_count(intervals) == 8
+    assert get_start_times(intervals, 90) == [_dt(10), _dt(10, 30), _dt(13), _dt(13, 30)]
+    assert get_start_times(intervals, 180) == []
+
+
+@pytest.mark.parametrize(
+    "utc_now,expected_result",
+    [
+        (datetime(2030, 1, 1, 7, 0), datetime(2030, 1, 1, 7, 30)),
+        (datetime(2030, 1, 1, 7, 29, 59), datetime(2030, 1, 1, 7, 30)),
+        (datetime(2030, 1, 1, 23, 45, tzinfo=UTC), datetime(2030, 1, 2, 0, 0)),
+    ],
+)
+def test_get_next_slot_start(utc_now, expected_result):
+    assert get_next_slot_start(utc_now) == expected_result
+
+
+def test_get_intervals_by_rules():
+    tz = pytz.timezone("Europe/Moscow")
+    weekly_minutes = {1: [(540, 780), (840, 1080)], 3: [(600, 1440)]}
+    # 2030-01-07 и 2030-01-14 - понедельники, 2030-01-09 - среда
+    dates_minutes = {date(2030, 1, 9): [], date(2030, 1, 10): [(0, 60)]}
+    assert get_intervals_by_rules(weekly_minutes, dates_minutes, tz, datetime(2030, 1, 7, 8), datetime(2030, 1, 14, 7)) == [
+        (datetime(2030, 1, 7, 8), datetime(2030, 1, 7, 10)),
+        (datetime(2030, 1, 7, 11), datetime(2030, 1, 7, 15)),
+        (datetime(2030, 1, 9, 21), datetime(2030, 1, 9, 22)),
+        (datetime(2030, 1, 14, 6), datetime(2030, 1, 14, 7)),
+    ]
+
+
+@pytest.mark.parametrize(
+    "tz_date,day_minutes,expected",
+    [
+        (date(2030, 1, 7), [(0, 90), (540, 1440)], [(0, 90), (540, 1440)]),
+        # Переход на летнее время: 02:00-03:00 местного времени не существует, интервалы смежные
+        (date(2030, 3, 31), [(0, 120), (180, 1440)], [(0, 1440)]),
+        # Переход на зимнее время: 02:00-03:00 местного времени повторяется
+        (date(2030, 10, 27), [(0, 120), (180, 1440)], [(0, 120), (180, 1440)]),
+    ],
+)
+def test_day_minutes_round_trip(tz_date, day_minutes, expected):
+    tz = pytz.timezone("Europe/Berlin")
+    assert get_day_minutes(tz_date, get_day_intervals(tz_date, day_minutes, tz), tz) == expected
+
+
+async def _collect(partitions) -> list:
+    return [item async for items in partitions for item in items]
+
+
+async def _get_slots_by_days(session, days: list[date]) -> dict[date, list[datetime]]:
+    """Слоты дней (UTC), прочитанные через stream_slot_minutes."""
+    slots_by_days = {}
+    for day in days:
+        slot_minutes = await _collect(stream_slot_minutes(session, *get_utc_day_bounds(day, TIMEZONE)))
+        slots_by_days[day] = [EPOCH + timedelta(minutes=slot_minute) for slot_minute in slot_minutes]
+    return slots_by_days
+
+
+def _get_utc_slots(tz_date: date, hours: range) -> list[datetime]:
+    day_start, _ = get_utc_day_bounds(tz_date, TIMEZONE)
+    return [day_start + timedelta(hours=hour, minutes=minute) for hour in hours for minute in (0, 30)]
+
+
+def _run_schedule_scenario(run_with_session, database: str) -> list:
+    """Одинаковые изменения графика работы, записи и блокировки, результаты которых сравниваются."""
+    first_day, second_day = date(2030, 1, 1), date(2030, 1, 2)
+    days_bounds = {day: get_utc_day_bounds(day, TIMEZONE) for day in (first_day, second_day)}
+    utc_now = datetime(2029, 12, 31, 12, 0, tzinfo=UTC)
+
+    async def scenario(async_session):
+        results = []
+        async with async_session() as session:
+            service = Service(name="Стрижка", price=1000, duration=60)
+            await insert_service(session, service)
+            results.append(
+                await apply_schedule(
+                    session,
+                    list(days_bounds.values()),
+                    _get_utc_slots(first_day, range(10, 14)) + _get_utc_slots(second_day, range(10, 14)),
+                )
+            )
+            starts_at = _get_utc_slots(first_day, range(11, 12))[0]
+            booking = await book_appointment(
+                session,
+                Appointment(
+                    client_id=1,
+                    service_id=service.service_id,
+                    starts_at=starts_at,
+                    ends_at=starts_at + timedelta(hours=1),
+                ),
+                get_datetimes_needed_for_appointment(starts_at, 60),
+                utc_now,
+            )
+            results.append(booking.conflicts)
+            conflicting = await book_appointment(
+                session,
+                Appointment(
+                    client_id=2,
+                    service_id=service.service_id,
+                    starts_at=starts_at + timedelta(minutes=30),
+                    ends_at=starts_at + timedelta(minutes=90),
+                ),
+                get_datetimes_needed_for_appointment(starts_at + timedelta(minutes=30), 60),
+                utc_now,
+            )
+            results.append((conflicting.appointment, conflicting.conflicts))
+            hold_start = _get_utc_slots(first_day, range(13, 14))[0]
+            results.append(
+                await hold_slots(
+                    session, 2, [hold_start], utc_now, utc_now + timedelta(minutes=5),
+                )
+            )
+            results.append(await get_available_start_times(session, utc_now, 60))
+            results.append(await get_available_start_times(session, utc_now, 30, client_id=2))
+            results.append(
+                await apply_schedule(
+                    session,
+                    [days_bounds[first_day]],
+                    _get_utc_slots(first_day, range(12, 16)),
+                )
+            )
+            results.append(
+                await delete_slots(
+                    session,
+                    _get_utc_slots(second_day, range(11, 12)),
+                )
+            )
+            results.append(await delete_expired_slot_holds(session, utc_now + timedelta(minutes=10)))
+            results.append(await get_schedule_dates(session, utc_now, TIMEZONE))
+            results.append(await _get_slots_by_days(session, list(days_bounds)))
+            results.append(await get_available_start_times(session, utc_now, 60))
+            results.append(
+                await _collect(
+                    stream_slot_minutes(session, days_bounds[first_day][0], days_bounds[second_day][1]),
+                )
+            )
+            results.append(await _collect(stream_available_start_minutes(session, utc_now, 60)))
+            results.append(await _collect(stream_active_appointments(session, utc_now)))
+            results.append(await _collect(stream_active_appointments(session, utc_now, client_id=2)))
+            await delete_not_booked_future_slots(session, utc_now)
+            results.append(await get_schedule_dates(session, utc_now, TIMEZONE))
+            await session.commit()
+        return results
+
+    return run_with_session(scenario, database)
+
+
+@pytest.mark.parametrize("storage", [ScheduleStorage.INTERVALS, ScheduleStorage.RULES])
+def test_schedule_storages_give_same_results(run_with_session, monkeypatch, storage):
+    # Небольшие части потокового чтения, чтобы слоты читались в несколько частей
+    monkeypatch.setattr("src.database.STREAM_PARTITION_SIZE", 3)
+    monkeypatch.setattr("src.database.schedule_backend", get_schedule_backend(ScheduleStorage.SLOTS))
+    slots_results = _run_schedule_scenario(run_with_session, "slots.sqlite3")
+    monkeypatch.setattr("src.database.schedule_backend", get_schedule_backend(storage))
+    intervals_results = _run_schedule_scenario(run_with_session, "intervals.sqlite3")
+    assert intervals_results == slots_results
+    (
+        inserted_changes,
+        booking_conflicts,
+        conflicting_booking,
+        hold_conflicts,
+        start_times,
+        start_times_for_holder,
+        modified_changes,
+        deleted_changes,
+        expired_holds,
+        schedule_dates,
+        slots_by_days,
+        modified_start_times,
+        streamed_slot_minutes,
+        streamed_start_minutes,
+        streamed_appointments,
+        streamed_client_appointments,
+        schedule_dates_after_delete,
+    ) = intervals_results
+    assert (inserted_changes.inserted, inserted_changes.removed, inserted_changes.kept_booked) == (16, 0, 0)
+    assert booking_conflicts == []
+    assert conflicting_booking == (None, [datetime(2030, 1, 1, 8, 30)])
+    assert hold_conflicts == []
+    # 10:00 МСК = 07:00 UTC, прием 11:00-12:00 МСК, 13:00-13:30 МСК заблокировано клиентом 2
+    assert start_times == [datetime(2030, 1, 1, 7, 0), datetime(2030, 1, 1, 9, 0)] + [
+        datetime(2030, 1, 2, 7, 0) + timedelta(minutes=30 * i) for i in range(7)
+    ]
+    assert datetime(2030, 1, 1, 10, 0) in start_times_for_holder
+    assert (modified_changes.inserted, modified_changes.removed, modified_changes.kept_booked) == (4, 2, 2)
+    assert modified_changes.booked_slots == [datetime(2030, 1, 1, 8, 0), datetime(2030, 1, 1, 8, 30)]
+    assert (deleted_changes.inserted, deleted_changes.removed, deleted_changes.kept_booked) == (0, 2, 0)
+    assert expired_holds == 1
+    assert schedule_dates == [date(2030, 1, 1), date(2030, 1, 2)]
+    assert slots_by_days[date(2030, 1, 1)] == [datetime(2030, 1, 1, 8, 0) + timedelta(minutes=30 * i) for i in range(10)]
+    assert modified_start_times[0] == datetime(2030, 1, 1, 9, 0)
+    assert streamed_slot_minutes == [
+        to_epoch_minute(slot) for slots in slots_by_days.values() for slot in slots
+    ]
+    assert streamed_start_minutes == [to_epoch_minute(start_time) for start_time in modified_start_times]
+    assert streamed_appointments == [
+        AppointmentRow(datetime(2030, 1, 1, 8, 0), datetime(2030, 1, 1, 9, 0), "Стрижка"),
+    ]
+    assert streamed_client_appointments == []
+    assert schedule_dates_after_delete == [date(2030, 1, 1)]
+
+
+def test_weekly_rules(run_with_session, monkeypatch):
+    monkeypatch.setattr("src.database.schedule_backend", get_schedule_backend(ScheduleStorage.RULES))
+    monkeypatch.setattr("src.database.SCHEDULE_RULES_HORIZON_DAYS", 14)
+    # 2030-01-07 - понедельник
+    monday = date(2030, 1, 7)
+    utc_now = datetime(2030, 1, 6, 12, 0, tzinfo=UTC)
+
+    async def scenario(async_session):
+        async with async_session() as session:
+            # Пн-Пт 09:00-18:00
+            await set_weekly_rules(session, [1, 2, 3, 4, 5], [(540, 1080)])
+            schedule_dates = await get_schedule_dates(session, utc_now, TIMEZONE)
+            start_times = await get_available_start_times(session, utc_now, 540)
+            # Выходной в понедельник и другие часы во вторник
+            changes = [
+                await delete_slots_by_days(session, [get_utc_day_bounds(monday, TIMEZONE)]),
+                await apply_schedule(
+                    session,
+                    [get_utc_day_bounds(monday + timedelta(days=1), TIMEZONE)],
+                    _get_utc_slots(monday + timedelta(days=1), range(12, 14)),
+                ),
+            ]
+            slots_by_days = await _get_slots_by_days(session, [monday, monday + timedelta(days=1)])
+            modified_schedule_dates = await get_schedule_dates(session, utc_now, TIMEZONE)
+            # Шаблон меняется, исключения остаются
+            await set_weekly_rules(session, [1, 2], [(600, 660)])
+            rules_slots_by_days = await _get_slots_by_days(session, [monday + timedelta(days=1), date(2030, 1, 14)])
+            await session.commit()
+        return schedule_dates, start_times, changes, slots_by_days, modified_schedule_dates, rules_slots_by_days
+
+    schedule_dates, start_times, changes, slots_by_days, modified_schedule_dates, rules_slots_by_days = (
+        run_with_session(scenario)
+    )
+    working_days = [date(2030, 1, day) for day in (7, 8, 9, 10, 11, 14, 15, 16, 17, 18)]
+    assert schedule_dates == working_days
+    # 09:00 МСК = 06:00 UTC, горизонт - 14 дней начиная со следующего слота
+    assert start_times == [datetime.combine(day, datetime.min.time()) + timedelta(hours=6) for day in working_days]
+    assert [(change.inserted, change.removed, change.kept_booked) for change in changes] == [(0, 18, 0), (0, 14, 0)]
+    assert slots_by_days[monday] == []
+    assert slots_by_days[monday + timedelta(days=1)] == [
+        datetime(2030, 1, 8, 9, 0) + timedelta(minutes=30 * i) for i in range(4)
+    ]
+    assert modified_schedule_dates == working_days[1:]
+    assert rules_slots_by_days[monday + timedelta(days=1)] == [
+        datetime(2030, 1, 8, 9, 0) + timedelta(minutes=30 * i) for i in range(4)
+    ]
+    assert rules_slots_by_days[date(2030, 1, 14)] == [
+        datetime(2030, 1, 14, 7, 0),
+        datetime(2030, 1, 14, 7, 30),
+    ]
@@ -0,0 +1,447 @@
+import re
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, insert, inspect, select, text
+from sqlalchemy.exc import IntegrityError
+
+from src.config import ScheduleStorage
+from src.migrations import (
+    LATEST_SCHEMA_VERSION,
+    ScheduleStorageConversionError,
+    SchemaMismatchError,
+    check_schema,
+    convert_schedule_storage,
+    convert_slots_to_intervals,
+    convert_working_intervals_to_date_exceptions,
+    get_schedule_storage,
+    get_schema_version,
+    set_schedule_storage,
+    set_schema_version,
+    upgrade_schema,
+)
+from src.models import (
+    Appointment,
+    Base,
+    DateException,
+    IntervalHold,
+    Reservation,
+    Service,
+    Slot,
+    SlotHold,
+    WorkingInterval,
+)
+
+
+HOT_PATH_INDEXES = [
+    "ix_appointment_client_id_starts_at",
+    "ix_appointment_starts_at",
+    "ix_reservation_appointment_id",
+    "uq_service_name_not_deleted",
+]
+
+# Схема версии 2, в которой дата и время хранились текстом
+LEGACY_TABLES = [
+    "CREATE TABLE service ("
+    "service_id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, price INTEGER NOT NULL, "
+    "duration INTEGER NOT NULL, deleted BOOLEAN DEFAULT (0) NOT NULL, "
+    "CONSTRAINT pk_service PRIMARY KEY (service_id))",
+    "CREATE TABLE slot ("
+    "datetime_ DATETIME NOT NULL, "
+    "CONSTRAINT pk_slot PRIMARY KEY (datetime_), "
+    "CONSTRAINT ck_slot_datetime__gt_current_timestamp CHECK (datetime_ > CURRENT_TIMESTAMP))",
+    "CREATE TABLE appointment ("
+    "appointment_id INTEGER NOT NULL, client_id INTEGER NOT NULL, service_id INTEGER NOT NULL, "
+    "starts_at DATETIME NOT NULL, ends_at DATETIME NOT NULL, "
+    "CONSTRAINT pk_appointment PRIMARY KEY (appointment_id), "
+    "CONSTRAINT ck_appointment_starts_at_gt_current_timestamp CHECK (starts_at > CURRENT_TIMESTAMP), "
+    "CONSTRAINT fk_appointment_service_id_service FOREIGN KEY(service_id) "
+    "REFERENCES service (service_id) ON DELETE RESTRICT)",
+    "CREATE TABLE reservation ("
+    "datetime_ DATETIME NOT NULL, appointment_id INTEGER NOT NULL, "
+    "CONSTRAINT pk_reservation PRIMARY KEY (datetime_), "
+    "CONSTRAINT ck_reservation_datetime__gt_current_timestamp CHECK (datetime_ > CURRENT_TIMESTAMP), "
+    "CONSTRAINT fk_reservation_datetime__slot FOREIGN KEY(datetime_) "
+    "REFERENCES slot (datetime_) ON DELETE RESTRICT, "
+    "CONSTRAINT fk_reservation_appointment_id_appointment FOREIGN KEY(appointment_id) "
+    "REFERENCES appointment (appointment_id) ON DELETE CASCADE)",
+    "CREATE TABLE slot_hold ("
+    "datetime_ DATETIME NOT NULL, client_id INTEGER NOT NULL, expires_at DATETIME NOT NULL, "
+    "CONSTRAINT pk_slot_hold PRIMARY KEY (datetime_), "
+    "CONSTRAINT fk_slot_hold_datetime__slot FOREIGN KEY(datetime_) "
+    "REFERENCES slot (datetime_) ON DELETE CASCADE)",
+]
+
+LEGACY_INDEXES = [
+    "CREATE INDEX ix_appointment_client_id_starts_at ON appointment (client_id, starts_at)",
+    "CREATE INDEX ix_appointment_starts_at ON appointment (starts_at)",
+    "CREATE INDEX ix_reservation_appointment_id ON reservation (appointment_id)",
+    "CREATE UNIQUE INDEX uq_service_name_not_deleted ON service (name) WHERE NOT deleted",
+    "CREATE INDEX ix_slot_hold_client_id ON slot_hold (client_id)",
+    "CREATE INDEX ix_slot_hold_expires_at ON slot_hold (expires_at)",
+]
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    yield engine
+    engine.dispose()
+
+
+def test_upgrade_schema_creates_new_database(engine):
+    with engine.begin() as conn:
+        upgrade_schema(conn)
+        assert get_schema_version(conn) == LATEST_SCHEMA_VERSION
+        check_schema(conn)
+
+
+def test_upgrade_schema_migrates_existing_database(engine):
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        for index_name in HOT_PATH_INDEXES:
+            conn.execute(text(f"DROP INDEX {index_name}"))
+        assert get_schema_version(conn) == 0
+        with pytest.raises(SchemaMismatchError):
+            check_schema(conn)
+        upgrade_schema(conn)
+        assert get_schema_version(conn) == LATEST_SCHEMA_VERSION
+        check_schema(conn)
+        indexes = {
+            index["name"]
+            for table_name in inspect(conn).get_table_names()
+            for index in inspect(conn).get_indexes(table_name)
+        }
+        assert set(HOT_PATH_INDEXES) <= indexes
+
+
+def test_upgrade_schema_adds_slot_hold_table(engine):
+    with engine.begin() as conn:
+        upgrade_schema(conn)
+        conn.execute(text("DROP TABLE slot_hold"))
+        set_schema_version(conn, 1)
+        upgrade_schema(conn)
+        assert get_schema_version(conn) == LATEST_SCHEMA_VERSION
+        check_schema(conn)
+
+
+def test_upgrade_schema_stores_datetimes_as_epoch_minutes(engine):
+    with engine.begin() as conn:
+        conn.execute(text("PRAGMA foreign_keys = ON"))
+        for statement in LEGACY_TABLES + LEGACY_INDEXES:
+            conn.execute(text(statement))
+        set_schema_version(conn, 2)
+        # Прошедшие слоты и приемы уже не удовлетворяют проверкам CHECK
+        conn.execute(text("PRAGMA ignore_check_constraints = ON"))
+        conn.execute(text("INSERT INTO service (name, price, duration) VALUES ('Стрижка', 100, 60)"))
+        conn.execute(
+            text("INSERT INTO slot (datetime_) VALUES (:datetime_)"),
+            [
+                {"datetime_": "2020-01-01 07:00:00.000000"},
+                {"datetime_": "2020-01-01 07:30:00.000000"},
+                {"datetime_": "2030-01-01 07:00:00.000000"},
+                {"datetime_": "2030-01-01 07:30:00.000000"},
+            ],
+        )
+        conn.execute(
+            text(
+                "INSERT INTO appointment (client_id, service_id, starts_at, ends_at) "
+                "VALUES (1, 1, '2020-01-01 07:00:00.000000', '2020-01-01 08:00:00.000000')"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO reservation (datetime_, appointment_id) "
+                "VALUES ('2020-01-01 07:00:00.000000', 1), ('2020-01-01 07:30:00.000000', 1)"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO slot_hold (datetime_, client_id, expires_at) "
+                "VALUES ('2030-01-01 07:00:00.000000', 2, '2029-12-31 07:05:00.000000')"
+            )
+        )
+        conn.execute(text("PRAGMA ignore_check_constraints = OFF"))
+
+        upgrade_schema(conn)
+
+        assert get_schema_version(conn) == LATEST_SCHEMA_VERSION
+        check_schema(conn)
+        assert conn.execute(text("PRAGMA foreign_key_check")).all() == []
+        for table_name in ["slot", "reservation"]:
+            table_sql = conn.execute(
+                text("SELECT sql FROM sqlite_master WHERE name = :name"), {"name": table_name},
+            ).scalar_one()
+            assert "WITHOUT ROWID" in table_sql
+        assert conn.execute(text("SELECT datetime_ FROM slot ORDER BY datetime_")).scalars().all() == [
+            26297700, 26297730, 31558020, 31558050,
+        ]
+        assert conn.scalars(select(Slot.datetime_).order_by(Slot.datetime_)).all() == [
+            datetime(2020, 1, 1, 7, 0),
+            datetime(2020, 1, 1, 7, 30),
+            datetime(2030, 1, 1, 7, 0),
+            datetime(2030, 1, 1, 7, 30),
+        ]
+        assert conn.execute(select(Appointment.starts_at, Appointment.ends_at)).one() == (
+            datetime(2020, 1, 1, 7, 0),
+            datetime(2020, 1, 1, 8, 0),
+        )
+        assert conn.scalars(select(Reservation.datetime_).order_by(Reservation.datetime_)).all() == [
+            datetime(2020, 1, 1, 7, 0),
+            datetime(2020, 1, 1, 7, 30),
+        ]
+        assert conn.execute(select(SlotHold.datetime_, SlotHold.expires_at)).one() == (
+            datetime(2030, 1, 1, 7, 0),
+            datetime(2029, 12, 31, 7, 5),
+        )
+        with pytest.raises(IntegrityError):
+            conn.execute(text("INSERT INTO slot (datetime_) VALUES (26297760)"))
+
+
+def _get_table_schema(conn, table_name):
+    inspector = inspect(conn)
+    table_sql = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE name = :name"), {"name": table_name},
+    ).scalar_one()
+    # Описание таблицы без различий в пробелах и переносах строк
+    table_sql = re.sub(r"\s+", " ", re.sub(r"\s*([(),])\s*", r"\1", table_sql)).strip()
+    return table_sql, sorted(inspector.get_indexes(table_name), key=lambda index: index["name"])
+
+
+def test_upgrade_schema_migrated_database_matches_new_database(engine):
+    new_engine = create_engine("sqlite://")
+    try:
+        with new_engine.begin() as new_conn, engine.begin() as conn:
+            upgrade_schema(new_conn)
+            for statement in LEGACY_TABLES + LEGACY_INDEXES:
+                conn.execute(text(statement))
+            set_schema_version(conn, 2)
+            upgrade_schema(conn)
+            table_names = inspect(new_conn).get_table_names()
+            assert inspect(conn).get_table_names() == table_names
+            # Таблица service в схеме версии 2 описана без проверок CHECK
+            for table_name in set(table_names) - {"service"}:
+                assert _get_table_schema(conn, table_name) == _get_table_schema(new_conn, table_name)
+    finally:
+        new_engine.dispose()
+
+
+def test_upgrade_schema_stores_holds_expiration_as_epoch_minutes(engine):
+    with engine.begin() as conn:
+        upgrade_schema(conn)
+        # Схема версии 5, в которой срок блокировок хранился текстом
+        conn.execute(text("DROP TABLE slot_hold"))
+        conn.execute(text("DROP TABLE interval_hold"))
+        conn.execute(
+            text(
+                "CREATE TABLE slot_hold ("
+                "datetime_ INTEGER NOT NULL, client_id INTEGER NOT NULL, expires_at DATETIME NOT NULL, "
+                "CONSTRAINT pk_slot_hold PRIMARY KEY (datetime_), "
+                "CONSTRAINT fk_slot_hold_datetime__slot FOREIGN KEY(datetime_) "
+                "REFERENCES slot (datetime_) ON DELETE CASCADE)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE TABLE interval_hold ("
+                "starts_at INTEGER NOT NULL, ends_at INTEGER NOT NULL, client_id INTEGER NOT NULL, "
+                "expires_at DATETIME NOT NULL, "
+                "CONSTRAINT pk_interval_hold PRIMARY KEY (starts_at), "
+                "CONSTRAINT ck_interval_hold_ends_at_gt_starts_at CHECK (ends_at > starts_at))"
+            )
+        )
+        conn.execute(insert(Slot), [{"datetime_": datetime(2030, 1, 1, 7, 0)}])
+        conn.execute(
+            text(
+                "INSERT INTO slot_hold (datetime_, client_id, expires_at) "
+                "VALUES (31558020, 2, '2029-12-31 07:05:30.000000')"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO interval_hold (starts_at, ends_at, client_id, expires_at) "
+                "VALUES (31558020, 31558050, 3, '2029-12-31 07:06:00.000000')"
+            )
+        )
+        set_schema_version(conn, 5)
+
+        upgrade_schema(conn)
+
+        assert get_schema_version(conn) == LATEST_SCHEMA_VERSION
+        check_schema(conn)
+        for table_name in ["slot_hold", "interval_hold"]:
+            [expires_at_column] = [
+                column for column in inspect(conn).get_columns(table_name) if column["name"] == "expires_at"
+            ]
+            assert str(expires_at_column["type"]) == "INTEGER"
+            assert conn.execute(text(f"SELECT typeof(expires_at) FROM {table_name}")).scalar_one() == "integer"
+        assert conn.execute(select(SlotHold.datetime_, SlotHold.client_id, SlotHold.expires_at)).one() == (
+            datetime(2030, 1, 1, 7, 0),
+            2,
+            datetime(2029, 12, 31, 7, 5),
+        )
+        assert conn.execute(select(IntervalHold.starts_at, IntervalHold.client_id, IntervalHold.expires_at)).one() == (
+            datetime(2030, 1, 1, 7, 0),
+            3,
+            datetime(2029, 12, 31, 7, 6),
+        )
+
+
+def test_upgrade_schema_is_idempotent(engine):
+    with engine.begin() as conn:
+        upgrade_schema(conn)
+        upgrade_schema(conn)
+        assert get_schema_version(conn) == LATEST_SCHEMA_VERSION
+        check_schema(conn)
+
+
+def test_check_schema_raises_on_missing_index(engine):
+    with engine.begin() as conn:
+        upgrade_schema(conn)
+        conn.execute(text("DROP INDEX ix_appointment_starts_at"))
+        with pytest.raises(SchemaMismatchError, match="ix_appointment_starts_at"):
+            check_schema(conn)
+
+
+def test_service_name_unique_only_among_not_deleted(engine):
+    with engine.begin() as conn:
+        upgrade_schema(conn)
+        insert_service = text(
+            "INSERT INTO service (name, price, duration, deleted) VALUES ('Стрижка', 100, 30, :deleted)"
+        )
+        conn.execute(insert_service, {"deleted": True})
+        conn.execute(insert_service, {"deleted": False})
+        with pytest.raises(IntegrityError):
+            conn.execute(insert_service, {"deleted": False})
+
+
+def test_convert_slots_to_intervals(engine):
+    with engine.begin() as conn:
+        upgrade_schema(conn)
+        conn.execute(
+            insert(Service),
+            [{"name": "Стрижка", "price": 100, "duration": 60}],
+        )
+        conn.execute(
+            insert(Slot),
+            [
+                {"datetime_": datetime(2030, 1, 1, hour, minute)}
+                for hour in (7, 8, 11)
+                for minute in (0, 30)
+            ],
+        )
+        conn.execute(
+            insert(Appointment),
+            [
+                {
+                    "client_id": 1,
+                    "service_id": 1,
+                    "starts_at": datetime(2030, 1, 1, 8, 0),
+                    "ends_at": datetime(2030, 1, 1, 9, 0),
+                },
+            ],
+        )
+        conn.execute(
+            insert(Reservation),
+            [
+                {"datetime_": datetime(2030, 1, 1, 8, 0), "appointment_id": 1},
+                {"datetime_": datetime(2030, 1, 1, 8, 30), "appointment_id": 1},
+            ],
+        )
+        conn.execute(
+            insert(SlotHold),
+            [{"datetime_": datetime(2030, 1, 1, 11, 0), "client_id": 2, "expires_at": datetime(2030, 1, 1)}],
+        )
+        conn.execute(
+            insert(WorkingInterval),
+            [{"starts_at": datetime(2030, 1, 1, 12, 0), "ends_at": datetime(2030, 1, 1, 13, 0)}],
+        )
+
+        assert convert_slots_to_intervals(conn) == 6
+        assert convert_slots_to_intervals(conn) == 0
+
+        assert conn.execute(
+            select(WorkingInterval.starts_at, WorkingInterval.ends_at).order_by(WorkingInterval.starts_at)
+        ).all() == [
+            (datetime(2030, 1, 1, 7, 0), datetime(2030, 1, 1, 9, 0)),
+            (datetime(2030, 1, 1, 11, 0), datetime(2030, 1, 1, 13, 0)),
+        ]
+        for model in (Slot, Reservation, SlotHold):
+            assert conn.execute(select(model)).all() == []
+        assert conn.execute(select(Appointment.starts_at, Appointment.ends_at)).all() == [
+            (datetime(2030, 1, 1, 8, 0), datetime(2030, 1, 1, 9, 0)),
+        ]
+
+
+def test_convert_working_intervals_to_date_exceptions(engine):
+    with engine.begin() as conn:
+        upgrade_schema(conn)
+        conn.execute(
+            insert(WorkingInterval),
+            [
+                # 2030-01-01 12:00-14:00 и 2030-01-01 22:00 - 2030-01-02 01:00 по Москве
+                {"starts_at": datetime(2030, 1, 1, 9, 0), "ends_at": datetime(2030, 1, 1, 11, 0)},
+                {"starts_at": datetime(2030, 1, 1, 19, 0), "ends_at": datetime(2030, 1, 1, 22, 0)},
+            ],
+        )
+        conn.execute(
+            insert(DateException),
+            [
+                {"date_": date(2030, 1, 1), "starts_at_minute": 780, "ends_at_minute": 900},
+                {"date_": date(2030, 1, 5), "starts_at_minute": None, "ends_at_minute": None},
+            ],
+        )
+
+        assert convert_working_intervals_to_date_exceptions(conn) == 2
+        assert convert_working_intervals_to_date_exceptions(conn) == 0
+
+        assert conn.execute(
+            select(DateException.date_, DateException.starts_at_minute, DateException.ends_at_minute)
+            .order_by(DateException.date_, DateException.starts_at_minute)
+        ).all() == [
+            (date(2030, 1, 1), 720, 900),
+            (date(2030, 1, 1), 1320, 1440),
+            (date(2030, 1, 2), 0, 60),
+            (date(2030, 1, 5), None, None),
+        ]
+        assert conn.execute(select(WorkingInterval)).all() == []
+
+
+def test_upgrade_schema_detects_schedule_storage(engine):
+    with engine.begin() as conn:
+        upgrade_schema(conn)
+        conn.execute(
+            insert(WorkingInterval),
+            [{"starts_at": datetime(2030, 1, 1, 9, 0), "ends_at": datetime(2030, 1, 1, 11, 0)}],
+        )
+        conn.execute(text("DROP TABLE schedule_storage_state"))
+        set_schema_version(conn, 6)
+        upgrade_schema(conn)
+        assert get_schedule_storage(conn) is ScheduleStorage.INTERVALS
+        check_schema(conn, ScheduleStorage.INTERVALS)
+        with pytest.raises(SchemaMismatchError, match="python -m src.migrations slots"):
+            check_schema(conn, ScheduleStorage.SLOTS)
+
+
+def test_convert_schedule_storage(engine):
+    with engine.begin() as conn:
+        upgrade_schema(conn)
+        set_schedule_storage(conn, ScheduleStorage.SLOTS)
+        conn.execute(
+            insert(Slot),
+            [{"datetime_": datetime(2030, 1, 1, 9, 0)}, {"datetime_": datetime(2030, 1, 1, 9, 30)}],
+        )
+
+        convert_schedule_storage(conn, ScheduleStorage.RULES)
+        convert_schedule_storage(conn, ScheduleStorage.RULES)
+        with pytest.raises(ScheduleStorageConversionError):
+            convert_schedule_storage(conn, ScheduleStorage.INTERVALS)
+
+        assert get_schedule_storage(conn) is ScheduleStorage.RULES
+        check_schema(conn, ScheduleStorage.RULES)
+        for model in (Slot, WorkingInterval):
+            assert conn.execute(select(model)).all() == []
+        # 12:00-13:00 по Москве
+        assert conn.execute(
+            select(DateException.date_, DateException.starts_at_minute, DateException.ends_at_minute)
+        ).all() == [(date(2030, 1, 1), 720, 780)]
@@ -0,0 +1,128 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+import pytz
+
+from src.models import EPOCH
+from src.stuff.common.utils import from_utc
+from src.tz import TransitionTable, get_transition_table, to_epoch_minute
+
+
+@pytest.mark.parametrize(
+    "tz_name,utc_start,utc_end,expected_starts,expected_offsets",
+    [
+        (
+            "Europe/Moscow",
+            datetime(2025, 1, 1),
+            datetime(2026, 1, 1),
+            [datetime(2025, 1, 1)],
+            [180],
+        ),
+        (
+            "Europe/Berlin",
+            datetime(2025, 1, 1, 12, 30),
+            datetime(2026, 1, 1),
+            [datetime(2025, 1, 1, 12, 30), datetime(2025, 3, 30, 1, 0), datetime(2025, 10, 26, 1, 0)],
+            [60, 120, 60],
+        ),
+        (
+            "Australia/Lord_Howe",
+            datetime(2025, 9, 1),
+            datetime(2025, 11, 1),
+            [datetime(2025, 9, 1), datetime(2025, 10, 4, 15, 30)],
+            [630, 660],
+        ),
+    ],
+)
+def test_transition_table_build(tz_name, utc_start, utc_end, expected_starts, expected_offsets):
+    table = TransitionTable.build(pytz.timezone(tz_name), utc_start, utc_end)
+    assert table.starts == [to_epoch_minute(start) for start in expected_starts]
+    assert table.offsets == expected_offsets
+    assert table.end == to_epoch_minute(utc_end)
+
+
+def test_transition_table_conversion():
+    tz = pytz.timezone("Europe/Berlin")
+    table = TransitionTable.build(tz, datetime(2025, 10, 1), datetime(2025, 11, 1))
+    # Вне таблицы смещение вычисляется через часовой пояс
+    utc_datetimes = [
+        datetime(2025, 10, 25, 23, 30),
+        datetime(2025, 10, 26, 0, 30),
+        datetime(2025, 10, 26, 1, 30),
+        datetime(2025, 10, 26, 1, 0, tzinfo=UTC),
+        datetime(2025, 9, 1),
+        datetime(2025, 12, 1),
+        datetime(2025, 10, 26, 0, 59),
+    ]
+    utc_minutes = [to_epoch_minute(utc_datetime) for utc_datetime in utc_datetimes]
+    assert [table.get_offset(utc_minute) for utc_minute in utc_minutes] == [120, 120, 60, 60, 120, 60, 120]
+    assert table.to_local_minutes(utc_minutes) == [
+        utc_minute + table.get_offset(utc_minute) for utc_minute in utc_minutes
+    ]
+    tz_datetimes = table.from_utc(utc_datetimes)
+    expected_result = [from_utc(utc_datetime, tz) for utc_datetime in utc_datetimes]
+    # Сравнение моментов: повторяющееся время разных часовых поясов напрямую не сравнивается (PEP 495)
+    assert [tz_datetime.astimezone(UTC) for tz_datetime in tz_datetimes] == [
+        tz_datetime.astimezone(UTC) for tz_datetime in expected_result
+    ]
+    assert [tz_datetime.utcoffset() for tz_datetime in tz_datetimes] == [
+        tz_datetime.utcoffset() for tz_datetime in expected_result
+    ]
+    assert [tz_datetime.replace(tzinfo=None) for tz_datetime in tz_datetimes] == [
+        tz_datetime.replace(tzinfo=None) for tz_datetime in expected_result
+    ]
+    # 02:30 повторяется: сначала летнее время, затем зимнее
+    assert [(tz_datetime.hour, tz_datetime.minute, tz_datetime.fold) for tz_datetime in tz_datetimes[1:3]] == [
+        (2, 30, 0),
+        (2, 30, 1),
+    ]
+
+
+@pytest.mark.parametrize(
+    "tz_name,utc_start,utc_end,expected_result",
+    [
+        (
+            "Europe/Moscow",
+            datetime(2025, 1, 1),
+            datetime(2026, 1, 1),
+            [(datetime(2025, 1, 1), 180)],
+        ),
+        (
+            "Europe/London",
+            datetime(2025, 1, 1, 12, 30),
+            datetime(2026, 1, 1),
+            [(datetime(2025, 1, 1, 12, 30), 0), (datetime(2025, 3, 30, 1, 0), 60), (datetime(2025, 10, 26, 1, 0), 0)],
+        ),
+        (
+            "Europe/London",
+            datetime(2025, 3, 30, 0, 30),
+            datetime(2025, 3, 30, 1, 0),
+            [(datetime(2025, 3, 30, 0, 30), 0), (datetime(2025, 3, 30, 1, 0), 60)],
+        ),
+        (
+            "Australia/Lord_Howe",
+            datetime(2025, 9, 1),
+            datetime(2025, 11, 1),
+            [(datetime(2025, 9, 1), 630), (datetime(2025, 10, 4, 15, 30), 660)],
+        ),
+    ],
+)
+def test_transition_table_get_transitions(tz_name, utc_start, utc_end, expected_result):
+    table = TransitionTable.build(pytz.timezone(tz_name), datetime(2024, 12, 1), datetime(2026, 2, 1))
+    assert table.get_transitions(to_epoch_minute(utc_start), to_epoch_minute(utc_end)) == [
+        (to_epoch_minute(start), offset) for start, offset in expected_result
+    ]
+
+
+def test_get_transition_table(monkeypatch):
+    monkeypatch.setattr("src.tz._tables", {})
+    monkeypatch.setattr("src.tz.TIMEZONE_TABLE_HORIZON_DAYS", 30)
+    tz = pytz.timezone("Europe/Berlin")
+    table = get_transition_table(datetime(2025, 3, 1), datetime(2025, 3, 2), tz)
+    assert (table.start, table.end) == (to_epoch_minute(datetime(2025, 2, 28)), to_epoch_minute(datetime(2025, 3, 31)))
+    assert get_transition_table(datetime(2025, 3, 20), datetime(2025, 3, 30), tz) is table
+    wider_table = get_transition_table(datetime(2025, 3, 20), datetime(2025, 6, 1), tz)
+    assert wider_table is not table
+    assert wider_table.end == to_epoch_minute(datetime(2025, 6, 2))
+    assert wider_table.get_offset(to_epoch_minute(datetime(2025, 4, 1))) == 120
+    assert EPOCH + timedelta(minutes=wider_table.starts[1]) == datetime(2025, 3, 30, 1, 0)
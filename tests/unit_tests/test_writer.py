@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from src.database import get_services, insert_service
+from src.models import Service
+
+
+def test_writes_are_committed_and_visible_to_readers(run_with_writer):
+    async def scenario(db_writer, async_session):
+        names = [f"Услуга {i}" for i in range(10)]
+        await asyncio.gather(
+            *(
+                db_writer.write(
+                    lambda session, name=name: insert_service(
+                        session, Service(name=name, price=100, duration=30),
+                    ),
+                )
+                for name in names
+            )
+        )
+        async with async_session() as session:
+            return [service.name for service in await get_services(session)], sorted(names)
+
+    services_names, expected = run_with_writer(scenario)
+    assert services_names == expected
+
+
+def test_failed_write_does_not_affect_batch(run_with_writer):
+    async def scenario(db_writer, async_session):
+        def job(name):
+            return lambda session: insert_service(session, Service(name=name, price=100, duration=30))
+
+        results = await asyncio.gather(
+            db_writer.write(job("Стрижка")),
+            db_writer.write(job("Стрижка")),
+            db_writer.write(job("Бритье")),
+            return_exceptions=True,
+        )
+        async with async_session() as session:
+            services_count = await session.scalar(select(func.count()).select_from(Service))
+        return results, services_count
+
+    results, services_count = run_with_writer(scenario)
+    assert results[0] is None
+    assert isinstance(results[1], IntegrityError)
+    assert results[2] is None
+    assert services_count == 2
+
+
+def test_writes_are_executed_in_order(run_with_writer):
+    async def scenario(db_writer, _):
+        order = []
+
+        def job(i):
+            async def write(session):
+                order.append(i)
+                return i
+            return write
+
+        results = await asyncio.gather(*(db_writer.write(job(i)) for i in range(20)))
+        return results, order
+
+    results, order = run_with_writer(scenario, max_batch_size=3)
+    assert results == list(range(20))
+    assert order == list(range(20))
+
+
+def test_reader_connections_are_read_only(run_with_writer):
+    async def scenario(_, async_session):
+        async with async_session() as session:
+            session.add(Service(name="Стрижка", price=100, duration=30))
+            await session.commit()
+
+    with pytest.raises(OperationalError, match="readonly"):
+        run_with_writer(scenario)